@@ -2,6 +2,9 @@
 import workflowConfig from '../config/workflowConfig';
 import config from '../config';
 
+// WebSocket protocol version advertised to the runtime (2 = accepts batched frames)
+const WS_PROTOCOL_VERSION = 2;
+
 /**
  * Get the current access token from storage.
  * In production, this should be provided by the auth adapter.
@@ -269,31 +272,63 @@ export class WebSocketApiAdapter extends ApiAdapter {
     
     const wsBase = this.getWsBaseUrl();
     
-    // Build WebSocket URL with access_token query param for authentication
-    let wsUrl = `${wsBase}/ws/${actualworkflowname}/${appId}/${chatId}/${userId}`;
+    // Build WebSocket URL with access_token query param for authentication.
+    // protocol=2 advertises support for batched frames ({type: 'transport.batch', events: [...]}).
+    // F7/F8: Sequence tracking and resume capability (strict canonical key)
+    let lastSequence = parseInt(localStorage.getItem(`ws_idx_${chatId}`) || '0');
+    // seq only counts within one server-side replay ring; seq_epoch names that ring
+    let seqEpoch = localStorage.getItem(`ws_epoch_${chatId}`) || null;
+    // 0-based index of the last transcript message seen; when the replay ring no longer
+    // covers lastSequence the server resumes from this message instead of reloading everything
+    let lastClientIndex = parseInt(localStorage.getItem(`ws_msg_${chatId}`) || '-1');
+    let resumePending = false;
+
+    const rememberSequence = (seq, epoch) => {
+      lastSequence = seq;
+      if (typeof epoch === 'string') seqEpoch = epoch;
+      try {
+        localStorage.setItem(`ws_idx_${chatId}`, lastSequence.toString());
+        if (seqEpoch) localStorage.setItem(`ws_epoch_${chatId}`, seqEpoch);
+      } catch (_) {}
+    };
+
+    const rememberMessageIndex = (index) => {
+      if (typeof index !== 'number' || index <= lastClientIndex) return;
+      lastClientIndex = index;
+      try { localStorage.setItem(`ws_msg_${chatId}`, lastClientIndex.toString()); } catch (_) {}
+    };
+
+    const baseWsUrl = `${wsBase}/ws/${actualworkflowname}/${appId}/${chatId}/${userId}`;
+    let wsUrl = `${baseWsUrl}?protocol=${WS_PROTOCOL_VERSION}`;
+    // last_seq lets the server replay missed frames from memory instead of reloading the transcript
+    if (lastSequence > 0) {
+      wsUrl += `&last_seq=${lastSequence}`;
+      if (seqEpoch) wsUrl += `&seq_epoch=${encodeURIComponent(seqEpoch)}`;
+      if (lastClientIndex >= 0) wsUrl += `&last_client_index=${lastClientIndex}`;
+    }
     const token = getAccessToken();
     if (token) {
-      wsUrl += `?access_token=${encodeURIComponent(token)}`;
-      console.log(`🔗 Connecting to WebSocket with auth token: ${wsUrl.split('?')[0]}?access_token=***`);
+      console.log(`🔗 Connecting to WebSocket with auth token: ${wsUrl}&access_token=***`);
+      wsUrl += `&access_token=${encodeURIComponent(token)}`;
     } else {
       console.log(`🔗 Connecting to WebSocket (no auth token): ${wsUrl}`);
     }
     
     const socket = new WebSocket(wsUrl);
     
-    // F7/F8: Sequence tracking and resume capability (strict canonical key)
-    let lastSequence = parseInt(localStorage.getItem(`ws_idx_${chatId}`) || '0');
-    let resumePending = false;
-    
     // Helper to send client.resume
     const sendResume = () => {
       if (socket.readyState === WebSocket.OPEN && !resumePending) {
         resumePending = true;
-        console.log(`📡 Sending client.resume with lastClientIndex: ${lastSequence}`);
+        console.log(`📡 Sending client.resume with lastSeq: ${lastSequence} (epoch ${seqEpoch}), lastClientIndex: ${lastClientIndex}`);
+        // lastSeq/seqEpoch serve the resume from the replay ring; lastClientIndex (a message
+        // index, not a frame counter) keeps the transcript fallback incremental
         socket.send(JSON.stringify({
           type: 'client.resume',
           chat_id: chatId,
-          lastClientIndex: lastSequence
+          lastClientIndex: lastClientIndex,
+          lastSeq: lastSequence,
+          seqEpoch: seqEpoch
         }));
       }
     };
@@ -309,31 +344,61 @@ export class WebSocketApiAdapter extends ApiAdapter {
       if (callbacks.onOpen) callbacks.onOpen();
     };
 
+    // Process one event envelope (a whole frame, or one element of a batch frame)
+    const handleEnvelope = (data) => {
+      // F7/F8: Track sequence numbers for resume capability
+      if (data.seq && typeof data.seq === 'number') {
+        if (data.seq_epoch && data.seq_epoch !== seqEpoch) {
+          // A new ring on the server (restart, idle expiry): its numbering starts over
+          rememberSequence(data.seq, data.seq_epoch);
+        } else if (data.seq > lastSequence) {
+          rememberSequence(data.seq, data.seq_epoch);
+        } else if (data.seq < lastSequence - 1 && !resumePending) {
+          // Sequence gap detected - request resume
+          console.warn(`⚠️ Sequence gap detected: received ${data.seq}, expected > ${lastSequence}`);
+          sendResume();
+          return; // Don't process this message until after resume
+        }
+      }
+      
+      // Track the transcript position: replayed messages carry their index, live ones a 1-based sequence
+      if (data.type === 'chat.text' && data.data) {
+        const { index, sequence } = data.data;
+        rememberMessageIndex(typeof index === 'number' ? index : (typeof sequence === 'number' ? sequence - 1 : null));
+      }
+
+      // Handle resume boundary
+      if (data.type === 'chat.resume_boundary') {
+        console.log(`✅ Resume completed: ${data.data?.replayed_events || 0} events replayed`);
+        resumePending = false;
+        rememberMessageIndex(data.data?.last_message_index);
+        // Re-base on the server's sequence (it restarts from 1 after a server restart)
+        if (typeof data.seq === 'number') {
+          rememberSequence(data.seq, data.seq_epoch);
+        }
+      }
+      
+      // Production: Only handle chat.* namespace events
+      if (callbacks.onMessage) callbacks.onMessage(data);
+    };
+
     socket.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
         
-        // F7/F8: Track sequence numbers for resume capability
-        if (data.seq && typeof data.seq === 'number') {
-          if (data.seq > lastSequence) {
-            lastSequence = data.seq;
-            try { localStorage.setItem(`ws_idx_${chatId}`, lastSequence.toString()); } catch (_) {}
-          } else if (data.seq < lastSequence - 1 && !resumePending) {
-            // Sequence gap detected - request resume
-            console.warn(`⚠️ Sequence gap detected: received ${data.seq}, expected > ${lastSequence}`);
-            sendResume();
-            return; // Don't process this message until after resume
-          }
+        // Protocol v2: server announces the negotiated version / batching settings
+        if (data.type === 'transport.protocol') {
+          console.log('🤝 WebSocket protocol negotiated:', data.data);
+          return;
         }
         
-        // Handle resume boundary
-        if (data.type === 'chat.resume_boundary') {
-          console.log(`✅ Resume completed: ${data.data?.replayed_events || 0} events replayed`);
-          resumePending = false;
+        // Protocol v2: several envelopes packed into one frame, in send order
+        if (data.type === 'transport.batch' && Array.isArray(data.events)) {
+          data.events.forEach(handleEnvelope);
+          return;
         }
         
-        // Production: Only handle chat.* namespace events
-        if (callbacks.onMessage) callbacks.onMessage(data);
+        handleEnvelope(data);
         
       } catch (error) {
         console.error('Failed to parse WebSocket message:', error);
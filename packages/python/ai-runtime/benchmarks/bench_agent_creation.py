@@ -0,0 +1,87 @@
+"""Per-chat ``create_agents`` cost with warm agent templates vs rebuilt templates.
+
+"rebuilt" drops the workflow's agent templates before every chat (prompt
+composition, hooks.json resolution, template assembly - roughly what every
+chat paid before templates existed, tool loading excluded); "warm" stamps
+agents from the cached templates. Each chat uses its own cache seed, as
+``run_workflow_orchestration`` does.
+
+No LLM calls are made; agent construction only needs a provider config, so set
+OPENAI_API_KEY (any value) if no provider config is stored in MongoDB.
+
+Usage:
+    MOZAIKS_WORKFLOWS_PATH=workflows python benchmarks/bench_agent_creation.py \
+        [--workflow subscription_manager] [--chats 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mozaiks_ai.runtime.workflow.agents import create_agents  # noqa: E402
+from mozaiks_ai.runtime.workflow.agents.templates import (  # noqa: E402
+    clear_agent_templates,
+    get_agent_template_metrics,
+)
+
+
+async def _per_chat_ms(workflow: str, chats: int, rebuild: bool, seed_base: int) -> tuple[list, int]:
+    samples = []
+    agent_count = 0
+    for i in range(chats):
+        if rebuild:
+            clear_agent_templates(workflow)
+        start = time.perf_counter()
+        agents = await create_agents(workflow, context_variables=None, cache_seed=seed_base + i)
+        samples.append((time.perf_counter() - start) * 1000.0)
+        agent_count = len(agents)
+    return samples, agent_count
+
+
+def _report(label: str, samples: list, agent_count: int) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    total_s = sum(samples) / 1000.0
+    print(
+        f"{label:<9} p50={statistics.median(samples):>8.2f} ms/chat   p95={p95:>8.2f} ms/chat   "
+        f"{len(samples) * agent_count / total_s:>9,.0f} agents/s"
+    )
+
+
+async def main(workflow: str, chats: int) -> None:
+    logging.disable(logging.INFO)
+    _, agent_count = await _per_chat_ms(workflow, 1, rebuild=False, seed_base=0)  # imports, bundle, provider config
+    if not agent_count:
+        raise SystemExit(f"no agents created for workflow '{workflow}'")
+
+    rebuilt, _ = await _per_chat_ms(workflow, chats, rebuild=True, seed_base=1_000)
+    warm, _ = await _per_chat_ms(workflow, chats, rebuild=False, seed_base=100_000)
+
+    print(f"workflow={workflow} chats={chats} agents/chat={agent_count}")
+    _report("rebuilt", rebuilt, agent_count)
+    _report("warm", warm, agent_count)
+    metrics = get_agent_template_metrics()
+    print(
+        f"templates: workflows={metrics['workflows']} agent_templates={metrics['agent_templates']} "
+        f"builds={metrics['builds']} reuses={metrics['reuses']} agents_stamped={metrics['agents_stamped']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflow", default="subscription_manager")
+    parser.add_argument("--chats", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.workflow, args.chats))
@@ -0,0 +1,126 @@
+"""Pre-send trigger matching: per-trigger loop vs the compiled ``TriggerMatcher``.
+
+"loop" is what the pre-send hook did before the matcher existed: every
+``(variable, trigger)`` pair re-stripped and re-lowercased the message and
+checked equals / contains / regex on its own. "matcher" normalizes the message
+once per hook call, answers equals with one lookup and skips regexes whose
+required literal is absent.
+Both sides must report the same firing triggers; the script exits non-zero if
+they disagree.
+
+Usage:
+    python benchmarks/bench_derived_triggers.py [--triggers 60] [--chars 12000] [--messages 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mozaiks_ai.runtime.workflow.context.derived import (  # noqa: E402
+    AgentTextTrigger,
+    DerivedContextManager,
+    DerivedVariableSpec,
+    TriggerMatcher,
+)
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def _build(trigger_count: int, chars: int, messages: int, seed: int):
+    rng = random.Random(seed)
+    vocab = [_word(rng) for _ in range(3_000)]
+    pairs = []
+    samples = []  # text that fires each trigger
+    for i in range(trigger_count):
+        kind = i % 4
+        if kind == 0:
+            trigger = AgentTextTrigger(agent="Agent", equals=f"{_word(rng)} complete")
+        elif kind == 1:
+            trigger = AgentTextTrigger(agent="Agent", contains=f"{_word(rng)}_{_word(rng)} ready")
+        elif kind == 2:
+            trigger = AgentTextTrigger(agent="Agent", contains=f"step {i} done")
+        else:
+            word = _word(rng)
+            trigger = AgentTextTrigger(agent="Agent", regex=rf"\b{word}[- ]id[:=]\s*(\d+)", value="$1")
+        var = DerivedVariableSpec(name=f"var_{i}", default=False, triggers=[trigger])
+        pairs.append((var, trigger))
+        samples.append(trigger.contains or (f"{word} ID: {i}" if trigger.regex else trigger.equals))
+
+    texts = []
+    for _ in range(messages):
+        parts = []
+        size = 0
+        while size < chars:
+            word = rng.choice(vocab)
+            parts.append(word.capitalize() if rng.random() < 0.1 else word)
+            size += len(word) + 1
+        for _ in range(rng.randint(0, 3)):  # a few firing triggers per message
+            sample = rng.choice(samples)
+            parts.insert(rng.randrange(len(parts)), sample.upper())
+        texts.append(" ".join(parts))
+    texts.append(pairs[0][1].equals.upper())
+    return pairs, texts
+
+
+def _loop(pairs, text: str):
+    return [var.name for var, trigger in pairs if DerivedContextManager._matches_trigger(trigger, text)]
+
+
+def _per_message_us(fn, texts) -> list:
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - start) * 1_000_000.0)
+    return samples
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<8} p50={statistics.median(samples):>9.1f} us/msg   p95={p95:>9.1f} us/msg")
+
+
+def main(trigger_count: int, chars: int, messages: int, seed: int) -> None:
+    pairs, texts = _build(trigger_count, chars, messages, seed)
+    matcher = TriggerMatcher(pairs)
+
+    fired = 0
+    for text in texts:
+        expected = _loop(pairs, text)
+        got = [var.name for var, _, _ in matcher.match(text)]
+        if expected != got:
+            raise SystemExit(f"matcher disagrees with loop: {expected} != {got}")
+        fired += len(got)
+
+    loop = _per_message_us(lambda text: _loop(pairs, text), texts)
+    compiled = _per_message_us(matcher.match, texts)
+
+    print(f"triggers={len(pairs)} messages={len(texts)} chars/msg~{chars} fired={fired}")
+    _report("loop", loop)
+    _report("matcher", compiled)
+    print(f"speedup  {statistics.median(loop) / statistics.median(compiled):.1f}x (p50)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triggers", type=int, default=60)
+    parser.add_argument("--chars", type=int, default=12_000)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.triggers, args.chars, args.messages, args.seed)
@@ -0,0 +1,141 @@
+"""AG2 event -> UI payload throughput for ``build_ui_event_payload``.
+
+Replays a recorded AG2 event stream (a JSON-lines file of
+``{"event": "<AG2 event class>", "fields": {...}}`` records, or the built-in
+streaming-run sample) through ``build_ui_event_payload`` and reports events per
+second, plus the one-time cost of the first call (AG2 class registry build).
+
+Events are rebuilt with ``model_construct`` so field validation is not part of
+the measurement. Requires ``ag2`` to be installed.
+
+Usage:
+    python benchmarks/bench_event_serialization.py [--events 200000] [--stream run.jsonl]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mozaiks_ai.runtime.events import event_serialization  # noqa: E402
+from mozaiks_ai.runtime.events.event_serialization import EventBuildContext, build_ui_event_payload  # noqa: E402
+
+_EVENT_MODULES = (
+    "autogen.events.agent_events",
+    "autogen.events.client_events",
+    "autogen.events.print_event",
+    "autogen.agentchat.group.events.transition_events",
+)
+
+# A short streaming run: speaker selection, token-by-token prints, a tool round trip, text, usage, completion.
+_SAMPLE_RUN = (
+    [{"event": "GroupChatRunChatEvent", "fields": {"uuid": "r1"}}]
+    + [{"event": "SelectSpeakerEvent", "fields": {"uuid": "s1", "agents": None}}]
+    + [{"event": "PrintEvent", "fields": {"uuid": f"p{i}", "objects": [f"tok{i} "], "sep": "", "end": ""}} for i in range(40)]
+    + [
+        {"event": "ToolCallEvent", "fields": {"uuid": "t1", "content": {"tool_calls": [{"id": "call_1", "function": {"name": "search", "arguments": "{\"q\": \"pricing\"}"}}]}, "sender": "PlannerAgent", "recipient": "ToolAgent"}},
+        {"event": "ToolResponseEvent", "fields": {"uuid": "t2", "content": {"tool_responses": [{"tool_call_id": "call_1", "content": "3 results"}]}, "sender": "ToolAgent", "recipient": "PlannerAgent"}},
+        {"event": "TextEvent", "fields": {"uuid": "x1", "content": "Here is the plan:\n" + "- step\n" * 20, "sender": "PlannerAgent", "recipient": "UserProxy"}},
+        {"event": "UsageSummaryEvent", "fields": {"uuid": "u1", "actual": {"total_cost": 0.01}, "total": {"total_cost": 0.01}, "mode": "both"}},
+        {"event": "RunCompletionEvent", "fields": {"uuid": "c1", "summary": "done", "history": [], "cost": {"total_tokens": 1234}, "last_speaker": "PlannerAgent", "context_variables": None}},
+    ]
+)
+
+
+def _event_classes() -> dict:
+    import importlib
+
+    classes = {}
+    for module_name in _EVENT_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        for name in dir(module):
+            obj = getattr(module, name)
+            if isinstance(obj, type) and name.endswith("Event"):
+                classes.setdefault(name, obj)
+    return classes
+
+
+def _rebuild(record: dict, classes: dict):
+    cls = classes.get(record["event"])
+    if cls is None:
+        return None
+    fields = record.get("fields") or {}
+    if hasattr(cls, "model_construct"):
+        return cls.model_construct(**fields)
+    ev = cls.__new__(cls)
+    ev.__dict__.update(fields)
+    return ev
+
+
+def _load_stream(path: str | None) -> list:
+    if not path:
+        return list(_SAMPLE_RUN)
+    with open(path, "r", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def main(events: int, stream_path: str | None) -> None:
+    classes = _event_classes()
+    if not classes:
+        raise SystemExit("ag2 (autogen) is not installed")
+    records = _load_stream(stream_path)
+    stream = [ev for ev in (_rebuild(r, classes) for r in records) if ev is not None]
+    if not stream:
+        raise SystemExit("no replayable events in stream")
+
+    wf_logger = logging.getLogger("bench_event_serialization")
+    wf_logger.setLevel(logging.WARNING)
+    ctx = EventBuildContext(
+        workflow_name="",  # no structured-output config in the benchmark
+        turn_agent="PlannerAgent",
+        tool_call_initiators={"call_1": "PlannerAgent"},
+        tool_names_by_id={"call_1": "search"},
+        workflow_name_upper="",
+        wf_logger=wf_logger,
+    )
+
+    clear = getattr(event_serialization, "clear_event_builder_caches", None)
+    if clear is not None:
+        clear()
+    start = time.perf_counter()
+    build_ui_event_payload(ev=stream[0], ctx=ctx)
+    first_ms = (time.perf_counter() - start) * 1000.0
+
+    kinds: dict = {}
+    for ev in stream:
+        kind = build_ui_event_payload(ev=ev, ctx=ctx)["kind"]
+        kinds[kind] = kinds.get(kind, 0) + 1
+
+    n = len(stream)
+    rounds = max(1, events // n)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for ev in stream:
+            build_ui_event_payload(ev=ev, ctx=ctx)
+    elapsed = time.perf_counter() - start
+    total = rounds * n
+
+    print(f"stream: {n} events ({', '.join(f'{k}={v}' for k, v in sorted(kinds.items()))})")
+    print(f"{'first call (cold)':<28} {first_ms:>12.2f} ms")
+    print(f"{'build_ui_event_payload':<28} {total / elapsed:>12,.0f} ev/s   ({elapsed / total * 1e6:.2f} us/event)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--stream", default=None, help="JSON-lines recording of AG2 events (default: built-in sample run)")
+    args = parser.parse_args()
+    main(args.events, args.stream)
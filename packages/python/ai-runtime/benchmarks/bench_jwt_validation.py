@@ -0,0 +1,113 @@
+"""Bearer-token validation throughput with and without the auth caches.
+
+"uncached" is what ``JWTValidator.validate_token`` did before the caches
+existed: rebuild the RSA key from the JWK and run a full ``jwt.decode`` for
+every request. "key cache" reuses the parsed public key but still verifies
+every signature (``AUTH_TOKEN_CACHE_SIZE=0``). "token cache" is the default:
+a token verified recently is answered from the verified-token cache.
+
+Traffic is ``--requests`` validations spread over ``--tokens`` distinct
+bearer tokens, like a few users each making many API calls and WebSocket
+handshakes.
+
+Usage:
+    python benchmarks/bench_jwt_validation.py [--tokens 50] [--requests 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from jwt import algorithms  # noqa: E402
+
+from mozaiks_ai.runtime.auth import jwt_validator as jwt_validator_module  # noqa: E402
+from mozaiks_ai.runtime.auth.config import AuthConfig  # noqa: E402
+from mozaiks_ai.runtime.auth.jwks import JWKSClient  # noqa: E402
+from mozaiks_ai.runtime.auth.jwt_validator import JWTValidator  # noqa: E402
+
+ISSUER = "https://issuer.bench"
+AUDIENCE = "api://bench"
+KID = "bench-key"
+
+
+class _StaticJWKS(JWKSClient):
+    def __init__(self, jwk):
+        super().__init__(jwks_url="https://issuer.bench/keys", cache_ttl=3600)
+        self._jwk = jwk
+
+    async def _fetch_keys(self):
+        self._store_keys({"keys": [self._jwk]}, "https://issuer.bench/keys")
+
+
+class _ReparsingJWKS(_StaticJWKS):
+    """The pre-cache behaviour: build the RSA key from the JWK on every call."""
+
+    async def get_public_key(self, kid):
+        jwk = await self.get_signing_key(kid)
+        return algorithms.RSAAlgorithm.from_jwk(jwk) if jwk else None
+
+
+async def _rate(validator: JWTValidator, jwks: JWKSClient, traffic) -> float:
+    jwt_validator_module.get_jwks_client = lambda: jwks
+    start = time.perf_counter()
+    for token in traffic:
+        await validator.validate_token(token)
+    return len(traffic) / (time.perf_counter() - start)
+
+
+async def _compare(jwk: dict, config: AuthConfig, tokens, traffic):
+    uncached_config = replace(config, token_cache_size=0)
+    await _rate(JWTValidator(uncached_config), _ReparsingJWKS(jwk), tokens)  # warm-up
+    return [
+        ("uncached", await _rate(JWTValidator(uncached_config), _ReparsingJWKS(jwk), traffic)),
+        ("key cache", await _rate(JWTValidator(uncached_config), _StaticJWKS(jwk), traffic)),
+        ("token cache", await _rate(JWTValidator(config), _StaticJWKS(jwk), traffic)),
+    ]
+
+
+def main(token_count: int, requests: int, seed: int) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = {**algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True), "kid": KID}
+    exp = int(time.time()) + 3600
+    tokens = [
+        jwt.encode(
+            {"sub": f"user-{i}", "iss": ISSUER, "aud": AUDIENCE, "exp": exp, "scp": "access_as_user"},
+            private_key,
+            algorithm="RS256",
+            headers={"kid": KID},
+        )
+        for i in range(token_count)
+    ]
+    rng = random.Random(seed)
+    traffic = [rng.choice(tokens) for _ in range(requests)]
+
+    config = AuthConfig(issuer_override=ISSUER, audience=AUDIENCE, required_scope="access_as_user")
+    results = asyncio.run(_compare(jwk, config, tokens, traffic))
+
+    print(f"tokens={token_count} requests={requests}")
+    for label, rate in results:
+        print(f"{label:<12} {rate:>10.0f} validations/s   {1_000_000.0 / rate:>8.1f} us/validation")
+    print(f"speedup      {results[2][1] / results[0][1]:.1f}x (token cache vs uncached)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.tokens, args.requests, args.seed)
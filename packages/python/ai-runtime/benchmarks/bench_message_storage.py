@@ -0,0 +1,109 @@
+"""Resume / diff latency: embedded ChatSessions.messages vs ChatMessages collection.
+
+Seeds one chat per layout at 100, 1k and 10k messages, then times
+``resume_chat`` (full transcript) and ``fetch_event_diff`` (last 20 messages,
+the reconnect case) against the MongoDB at MONGO_URI.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_message_storage.py [--repeat 20]
+
+Seeded documents use a throwaway app_id and are removed afterwards.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mozaiks_ai.runtime.data.models import WorkflowStatus  # noqa: E402
+from mozaiks_ai.runtime.data.persistence.message_store import MESSAGE_STORAGE_COLLECTION  # noqa: E402
+from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager  # noqa: E402
+
+SIZES = (100, 1_000, 10_000)
+DIFF_TAIL = 20
+
+
+def _message(seq: int) -> dict:
+    return {
+        "role": "assistant" if seq % 2 else "user",
+        "agent_name": "BenchAgent" if seq % 2 else "user",
+        "content": f"message {seq} " + ("lorem ipsum " * 40),
+        "timestamp": datetime.now(UTC),
+        "event_type": "message.created",
+        "event_id": f"bench_{seq}",
+        "sequence": seq,
+    }
+
+
+async def _seed(pm: AG2PersistenceManager, app_id: str, size: int) -> tuple[str, str]:
+    sessions = await pm._coll()
+    rows = await pm.message_store._messages_coll()
+    now = datetime.now(UTC)
+    embedded_id = f"bench-emb-{size}-{uuid4().hex[:8]}"
+    collection_id = f"bench-col-{size}-{uuid4().hex[:8]}"
+    messages = [_message(seq) for seq in range(1, size + 1)]
+    base = {
+        "app_id": app_id,
+        "workflow_name": "bench",
+        "user_id": "bench",
+        "status": int(WorkflowStatus.IN_PROGRESS),
+        "created_at": now,
+        "last_updated_at": now,
+        "last_sequence": size,
+    }
+    await sessions.insert_one({"_id": embedded_id, "chat_id": embedded_id, **base, "messages": messages})
+    await sessions.insert_one(
+        {"_id": collection_id, "chat_id": collection_id, **base, "message_storage": MESSAGE_STORAGE_COLLECTION}
+    )
+    await rows.insert_many([{**m, "chat_id": collection_id, "app_id": app_id} for m in messages])
+    return embedded_id, collection_id
+
+
+async def _time(coro_factory, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main(repeat: int) -> None:
+    pm = AG2PersistenceManager()
+    app_id = f"bench_{uuid4().hex[:8]}"
+    print(f"{'messages':>9} | {'layout':>10} | {'resume ms':>10} | {'diff ms':>8}")
+    print("-" * 47)
+    try:
+        for size in SIZES:
+            embedded_id, collection_id = await _seed(pm, app_id, size)
+            for label, chat_id in (("embedded", embedded_id), ("collection", collection_id)):
+                resume_ms = await _time(lambda: pm.resume_chat(chat_id, app_id), repeat)
+                diff_ms = await _time(
+                    lambda: pm.fetch_event_diff(chat_id=chat_id, app_id=app_id, last_sequence=size - DIFF_TAIL),
+                    repeat,
+                )
+                print(f"{size:>9} | {label:>10} | {resume_ms:>10.2f} | {diff_ms:>8.2f}")
+    finally:
+        sessions = await pm._coll()
+        rows = await pm.message_store._messages_coll()
+        await sessions.delete_many({"app_id": app_id})
+        await rows.delete_many({"app_id": app_id})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed iterations per measurement (median reported)")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
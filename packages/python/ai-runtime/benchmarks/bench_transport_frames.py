@@ -0,0 +1,121 @@
+"""Outbound serialization throughput for SimpleTransport.
+
+Measures, in messages per second:
+  * ``_serialize_ag2_events`` over a representative envelope payload
+  * per-recipient send path: copy + ``_serialize_ag2_events`` + ``json.dumps``
+    for every socket (what ``websocket.send_json`` fan-out used to cost)
+  * pre-serialized frames: prepare + encode once, reuse bytes for every socket
+    (with the active JSON backend, and with the stdlib fallback forced)
+
+No network or database is involved; sockets are in-memory sinks.
+
+Usage:
+    python benchmarks/bench_transport_frames.py [--messages 20000] [--recipients 1 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mozaiks_ai.runtime.transport.simple_transport import SimpleTransport  # noqa: E402
+
+try:
+    from mozaiks_ai.runtime.transport import frames  # noqa: E402
+except ImportError:  # benchmark also runs against trees without the frame stage
+    frames = None
+
+
+def _envelope(i: int) -> dict:
+    return {
+        "type": "chat.text",
+        "data": {
+            "kind": "text",
+            "agent": "PlannerAgent",
+            "content": f"Step {i}: " + "analysis of the requested change " * 8,
+            "sequence": i,
+            "chat_id": "bench-chat",
+            "run_id": "bench-chat",
+            "metadata": {"tokens": {"prompt": 812, "completion": 96}, "tags": ["plan", "draft"], "visible": True},
+        },
+        "timestamp": "2026-01-01T00:00:00Z",
+    }
+
+
+class _Sink:
+    def __init__(self):
+        self.count = 0
+
+    async def send_json(self, message):
+        json.dumps(message, separators=(",", ":"), ensure_ascii=False)  # Starlette's send_json encoding
+        self.count += 1
+
+    async def send_text(self, text):
+        self.count += 1
+
+    async def send_bytes(self, data):
+        self.count += 1
+
+
+def _rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>12,.0f} msg/s"
+
+
+async def _legacy_fanout(transport: SimpleTransport, envelopes, sinks) -> float:
+    start = time.perf_counter()
+    for env in envelopes:
+        for sink in sinks:
+            safe = env.copy()
+            safe["data"] = transport._serialize_ag2_events(env["data"])
+            await sink.send_json(safe)
+    return time.perf_counter() - start
+
+
+async def _frame_fanout(transport: SimpleTransport, envelopes, sinks) -> float:
+    start = time.perf_counter()
+    for env in envelopes:
+        frame = transport._prepare_frame(env)
+        for sink in sinks:
+            await frames.send_frame(sink, frame)
+    return time.perf_counter() - start
+
+
+async def main(messages: int, recipients: list[int]) -> None:
+    transport = await SimpleTransport.get_instance()
+    envelopes = [_envelope(i) for i in range(messages)]
+
+    start = time.perf_counter()
+    for env in envelopes:
+        transport._serialize_ag2_events(env["data"])
+    print(f"_serialize_ag2_events            {_rate(messages, time.perf_counter() - start)}")
+
+    for n in recipients:
+        sinks = [_Sink() for _ in range(n)]
+        sent = messages * n
+        print(f"send_json fan-out     x{n:<3}        {_rate(sent, await _legacy_fanout(transport, envelopes, sinks))}")
+        if frames is None:
+            continue
+        backend = frames.get_encoder_backend()
+        print(f"frames ({backend:<7}) fan-out x{n:<3}  {_rate(sent, await _frame_fanout(transport, envelopes, sinks))}")
+        if backend != frames.BACKEND_STDLIB:
+            frames.set_encoder_backend(frames.BACKEND_STDLIB)
+            print(f"frames (stdlib ) fan-out x{n:<3}  {_rate(sent, await _frame_fanout(transport, envelopes, sinks))}")
+            frames.set_encoder_backend(backend)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--recipients", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.recipients))
@@ -0,0 +1,83 @@
+"""Per-run startup cost before the first AG2 event: cold vs warm workflow bundle.
+
+For each iteration this times the workflow-definition work that
+``run_workflow_orchestration`` does before the pattern starts streaming:
+bundle lookup (config, structured-output models, tool modules, context plan)
+followed by ``create_agents``. "cold" invalidates the bundle first, which is
+what every run paid before bundles were cached; "warm" reuses it.
+
+No LLM calls are made; agent construction only needs a provider config, so set
+OPENAI_API_KEY (any value) if no provider config is stored in MongoDB.
+
+Usage:
+    MOZAIKS_WORKFLOWS_PATH=workflows python benchmarks/bench_workflow_startup.py \
+        [--workflow subscription_manager] [--runs 20] [--no-agents]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from mozaiks_ai.runtime.workflow.bundle import (  # noqa: E402
+    get_bundle_metrics,
+    get_workflow_bundle,
+    invalidate_workflow_bundle,
+)
+
+
+async def _startup(workflow: str, with_agents: bool) -> float:
+    start = time.perf_counter()
+    get_workflow_bundle(workflow)
+    if with_agents:
+        from mozaiks_ai.runtime.workflow.agents import create_agents
+
+        agents = await create_agents(workflow, context_variables=None, cache_seed=42)
+        if not agents:
+            raise SystemExit(f"no agents created for workflow '{workflow}'")
+    return (time.perf_counter() - start) * 1000.0
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<8} p50={statistics.median(samples):>9.2f} ms   p95={p95:>9.2f} ms   max={samples[-1]:>9.2f} ms")
+
+
+async def main(workflow: str, runs: int, with_agents: bool) -> None:
+    logging.disable(logging.INFO)
+    await _startup(workflow, with_agents)  # imports, provider config, AG2 warm-up
+
+    cold = []
+    for _ in range(runs):
+        invalidate_workflow_bundle(workflow)
+        cold.append(await _startup(workflow, with_agents))
+
+    warm = [await _startup(workflow, with_agents) for _ in range(runs)]
+
+    scope = "bundle + create_agents" if with_agents else "bundle only"
+    print(f"workflow={workflow} runs={runs} ({scope})")
+    _report("cold", cold)
+    _report("warm", warm)
+    info = get_bundle_metrics()["bundles"].get(workflow.lower(), {})
+    print(f"bundle: build_ms={info.get('build_ms')} tools={info.get('tools')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflow", default="subscription_manager")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--no-agents", action="store_true", help="time the bundle lookup only")
+    args = parser.parse_args()
+    asyncio.run(main(args.workflow, args.runs, not args.no_agents))
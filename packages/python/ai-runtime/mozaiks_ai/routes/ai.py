@@ -264,7 +264,7 @@ async def launch_capability(request: LaunchRequest, current_user: dict = Depends
 
     launch_token, expires_in = mint_execution_token(claims=execution_claims)
     try:
-        state_manager.set(f"ai_execution_context:{chat_id}", execution_claims, expire_in=expires_in)
+        await state_manager.aset(f"ai_execution_context:{chat_id}", execution_claims, expire_in=expires_in)
     except Exception:
         pass
 
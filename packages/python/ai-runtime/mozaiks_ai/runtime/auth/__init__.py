@@ -63,6 +63,10 @@ Configuration (environment variables):
     # Caching
     AUTH_JWKS_CACHE_TTL=3600       # JWKS cache TTL (seconds)
     AUTH_DISCOVERY_CACHE_TTL=86400 # Discovery cache TTL (seconds)
+    AUTH_STALE_GRACE=3600          # Serve cached JWKS/discovery this long past TTL if the IdP is down
+    AUTH_JWKS_MIN_REFRESH_INTERVAL=30  # Min seconds between refreshes forced by an unknown kid
+    AUTH_TOKEN_CACHE_SIZE=10000    # Verified tokens kept in memory (0 disables)
+    AUTH_TOKEN_CACHE_TTL=60        # Max seconds a verified token is reused (0 disables)
 """
 
 # Configuration
@@ -42,6 +42,12 @@ class AuthConfig:
     # Caching TTLs
     jwks_cache_ttl_seconds: int = 3600  # 1 hour
     discovery_cache_ttl_seconds: int = 86400  # 24 hours
+    stale_grace_seconds: int = 3600  # serve JWKS/discovery this long past TTL while the IdP is down
+    jwks_min_refresh_seconds: int = 30  # rate limit for refreshes forced by an unknown kid
+
+    # Verified-token cache (0 disables)
+    token_cache_size: int = 10000
+    token_cache_ttl_seconds: int = 60
 
     # Allowed algorithms
     algorithms: List[str] = field(default_factory=lambda: ["RS256"])
@@ -103,6 +109,10 @@ def get_auth_config() -> AuthConfig:
     Cache Variables:
         AUTH_JWKS_CACHE_TTL: JWKS cache TTL in seconds (default: 3600)
         AUTH_DISCOVERY_CACHE_TTL: Discovery cache TTL in seconds (default: 86400)
+        AUTH_STALE_GRACE: Seconds past TTL a cached JWKS/discovery document is served while refreshes fail (default: 3600)
+        AUTH_JWKS_MIN_REFRESH_INTERVAL: Minimum seconds between JWKS refreshes forced by an unknown kid (default: 30)
+        AUTH_TOKEN_CACHE_SIZE: Verified tokens kept in memory (default: 10000, 0 disables)
+        AUTH_TOKEN_CACHE_TTL: Seconds a verified token is reused before full validation (default: 60, 0 disables)
 
     Other Variables:
         AUTH_ALGORITHMS: Comma-separated list of allowed algorithms (default: RS256)
@@ -135,6 +145,10 @@ def get_auth_config() -> AuthConfig:
         # Cache TTLs
         jwks_cache_ttl_seconds=int(os.getenv("AUTH_JWKS_CACHE_TTL", "3600")),
         discovery_cache_ttl_seconds=int(os.getenv("AUTH_DISCOVERY_CACHE_TTL", "86400")),
+        stale_grace_seconds=int(os.getenv("AUTH_STALE_GRACE", "3600")),
+        jwks_min_refresh_seconds=int(os.getenv("AUTH_JWKS_MIN_REFRESH_INTERVAL", "30")),
+        token_cache_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+        token_cache_ttl_seconds=int(os.getenv("AUTH_TOKEN_CACHE_TTL", "60")),
         # Other
         algorithms=algorithms,
         clock_skew_seconds=int(os.getenv("AUTH_CLOCK_SKEW", "120")),
@@ -6,16 +6,17 @@ Fetches the OpenID Connect discovery document to obtain:
 - issuer: Expected token issuer
 
 This makes JWT validation provider-agnostic by dynamically discovering endpoints.
+The document is refreshed in the background before it expires and served stale
+(up to AUTH_STALE_GRACE seconds) while the IdP is unreachable; see refresh.py.
 """
 
-import asyncio
 import time
 import os
 from typing import Dict, Optional, Any
 from dataclasses import dataclass
 
-import aiohttp
-
+from mozaiks_ai.runtime.auth.config import get_auth_config
+from mozaiks_ai.runtime.auth.refresh import RefreshSchedule, fetch_json
 from mozaiks_infra.logs.logging_config import get_core_logger
 
 logger = get_core_logger("auth.discovery")
@@ -52,13 +53,14 @@ class OIDCDiscoveryClient:
     Async OIDC discovery client with in-memory caching.
 
     Fetches the .well-known/openid-configuration document and caches it.
-    Thread-safe via asyncio.Lock.
+    Concurrent callers share one in-flight fetch (single-flight refresh).
     """
 
     def __init__(
         self,
         discovery_url: Optional[str] = None,
         cache_ttl: Optional[int] = None,
+        stale_grace: Optional[int] = None,
     ):
         """
         Initialize OIDC discovery client.
@@ -67,6 +69,7 @@ class OIDCDiscoveryClient:
             discovery_url: Direct URL to discovery document. If None, computed from
                            MOZAIKS_OIDC_AUTHORITY and MOZAIKS_OIDC_TENANT_ID.
             cache_ttl: Cache TTL in seconds (default: 86400 = 24h)
+            stale_grace: Seconds past the TTL the last document is served while refreshes fail
         """
         # Allow explicit override via MOZAIKS_OIDC_DISCOVERY_URL
         explicit_url = os.getenv("MOZAIKS_OIDC_DISCOVERY_URL", "").strip()
@@ -85,7 +88,14 @@ class OIDCDiscoveryClient:
             os.getenv("AUTH_DISCOVERY_CACHE_TTL", str(_DEFAULT_DISCOVERY_CACHE_TTL))
         )
         self._cache: Optional[CachedDiscovery] = None
-        self._lock = asyncio.Lock()
+        config = get_auth_config()
+        self._refresh = RefreshSchedule(
+            "OIDC discovery",
+            self._fetch_discovery,
+            ttl_seconds=self._cache_ttl,
+            stale_grace_seconds=config.stale_grace_seconds if stale_grace is None else stale_grace,
+            min_interval_seconds=config.jwks_min_refresh_seconds,
+        )
 
     @property
     def discovery_url(self) -> str:
@@ -100,12 +110,12 @@ class OIDCDiscoveryClient:
             CachedDiscovery with the document and metadata
 
         Raises:
-            RuntimeError on fetch failure (fail-closed)
+            RuntimeError on fetch failure with no usable cached copy (fail-closed)
         """
-        if self._cache is not None and not self._cache.is_expired():
-            return self._cache
-
-        return await self._fetch_discovery()
+        await self._refresh.ensure()
+        if self._cache is None:
+            raise RuntimeError("OIDC discovery document not loaded")
+        return self._cache
 
     async def get_jwks_uri(self) -> str:
         """
@@ -139,59 +149,36 @@ class OIDCDiscoveryClient:
             raise RuntimeError("Discovery document missing issuer")
         return issuer
 
-    async def _fetch_discovery(self, force: bool = False) -> CachedDiscovery:
-        """Fetch OIDC discovery document from the identity provider."""
-        async with self._lock:
-            # Double-check after acquiring lock
-            if not force and self._cache is not None and not self._cache.is_expired():
-                return self._cache
-
-            logger.info(f"Fetching OIDC discovery from {self._discovery_url}")
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        self._discovery_url,
-                        timeout=aiohttp.ClientTimeout(total=10),
-                    ) as resp:
-                        if resp.status != 200:
-                            error_text = await resp.text()
-                            logger.error(
-                                f"OIDC discovery fetch failed: {resp.status} {error_text}"
-                            )
-                            raise RuntimeError(
-                                f"Failed to fetch OIDC discovery: {resp.status}"
-                            )
-
-                        document = await resp.json()
-
-                # Validate required fields
-                if "jwks_uri" not in document:
-                    raise RuntimeError("OIDC discovery missing jwks_uri")
-                if "issuer" not in document:
-                    raise RuntimeError("OIDC discovery missing issuer")
-
-                self._cache = CachedDiscovery(
-                    document=document,
-                    fetched_at=time.time(),
-                    ttl_seconds=self._cache_ttl,
-                )
-
-                logger.info(
-                    f"OIDC discovery loaded: issuer={document.get('issuer')}, "
-                    f"jwks_uri={document.get('jwks_uri')}"
-                )
-                return self._cache
-
-            except asyncio.TimeoutError:
-                logger.error("OIDC discovery fetch timed out")
-                raise RuntimeError("OIDC discovery fetch timed out")
-            except aiohttp.ClientError as e:
-                logger.error(f"OIDC discovery fetch client error: {e}")
-                raise RuntimeError(f"OIDC discovery fetch failed: {e}")
+    async def _fetch_discovery(self) -> CachedDiscovery:
+        """Fetch OIDC discovery document from the identity provider (called through the refresh schedule)."""
+        logger.info(f"Fetching OIDC discovery from {self._discovery_url}")
+        document = await fetch_json(self._discovery_url, "OIDC discovery")
+
+        # Validate required fields
+        if "jwks_uri" not in document:
+            raise RuntimeError("OIDC discovery missing jwks_uri")
+        if "issuer" not in document:
+            raise RuntimeError("OIDC discovery missing issuer")
+
+        self._cache = CachedDiscovery(
+            document=document,
+            fetched_at=time.time(),
+            ttl_seconds=self._cache_ttl,
+        )
+
+        logger.info(
+            f"OIDC discovery loaded: issuer={document.get('issuer')}, "
+            f"jwks_uri={document.get('jwks_uri')}"
+        )
+        return self._cache
 
     def clear_cache(self) -> None:
         """Clear the discovery cache (useful for testing)."""
         self._cache = None
+        self._refresh.reset()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._refresh.get_metrics()
 
 
 # Module-level singleton
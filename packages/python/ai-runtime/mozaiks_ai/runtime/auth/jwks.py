@@ -3,16 +3,19 @@ JWKS (JSON Web Key Set) client with caching.
 
 Fetches public keys from the identity provider for JWT signature validation.
 Supports OIDC discovery-driven jwks_uri or explicit URL override.
+
+Keys are refreshed in the background before they expire and served stale
+(up to AUTH_STALE_GRACE seconds) while the IdP is unreachable; see refresh.py.
 """
 
-import asyncio
 import time
 from typing import Dict, Optional, Any
 from dataclasses import dataclass
 
-import aiohttp
+from jwt import algorithms
 
 from mozaiks_ai.runtime.auth.config import get_auth_config
+from mozaiks_ai.runtime.auth.refresh import RefreshSchedule, fetch_json
 from mozaiks_infra.logs.logging_config import get_core_logger
 
 logger = get_core_logger("auth.jwks")
@@ -39,7 +42,7 @@ class JWKSClient:
     1. Discovery-driven: jwks_uri obtained from OIDC discovery document
     2. Explicit URL: jwks_url set directly via constructor or AUTH_JWKS_URL env var
 
-    Thread-safe via asyncio.Lock.
+    Concurrent callers share one in-flight fetch (single-flight refresh).
     """
 
     def __init__(
@@ -47,6 +50,8 @@ class JWKSClient:
         jwks_url: Optional[str] = None,
         cache_ttl: Optional[int] = None,
         use_discovery: bool = True,
+        stale_grace: Optional[int] = None,
+        min_refresh_interval: Optional[float] = None,
     ):
         """
         Initialize JWKS client.
@@ -55,15 +60,32 @@ class JWKSClient:
             jwks_url: Explicit JWKS URL (skips discovery if set)
             cache_ttl: Cache TTL in seconds
             use_discovery: If True and jwks_url not set, fetch from OIDC discovery
+            stale_grace: Seconds past the TTL the last key set is served while refreshes fail
+            min_refresh_interval: Minimum seconds between refreshes forced by an unknown kid
         """
         config = get_auth_config()
         self._explicit_jwks_url = jwks_url or config.jwks_url_override
         self._cache_ttl = cache_ttl or config.jwks_cache_ttl_seconds
         self._use_discovery = use_discovery and not self._explicit_jwks_url
         self._cache: Optional[CachedJWKS] = None
-        self._lock = asyncio.Lock()
         self._keys_by_kid: Dict[str, Dict[str, Any]] = {}
+        self._public_keys: Dict[str, Any] = {}  # kid -> parsed key, rebuilt when the key set changes
+        self._keys_version = 0
         self._resolved_jwks_url: Optional[str] = None
+        self._refresh = RefreshSchedule(
+            "JWKS",
+            self._fetch_keys,
+            ttl_seconds=self._cache_ttl,
+            stale_grace_seconds=config.stale_grace_seconds if stale_grace is None else stale_grace,
+            min_interval_seconds=(
+                config.jwks_min_refresh_seconds if min_refresh_interval is None else min_refresh_interval
+            ),
+        )
+
+    @property
+    def keys_version(self) -> int:
+        """Bumped whenever the loaded key set changes (rotation, cache clear)."""
+        return self._keys_version
 
     async def _get_jwks_url(self) -> str:
         """
@@ -91,7 +113,8 @@ class JWKSClient:
         """
         Get signing key by key ID (kid).
 
-        Fetches JWKS if not cached or expired.
+        Fetches JWKS on first use. An unknown kid triggers a refresh at most
+        once per min refresh interval (AUTH_JWKS_MIN_REFRESH_INTERVAL).
         Returns the JWK dict or None if not found.
         """
         await self._ensure_keys_loaded()
@@ -100,73 +123,83 @@ class JWKSClient:
         if key:
             return key
 
-        # Key not found - force refresh in case of key rotation
-        logger.info(f"Key {kid} not found, forcing JWKS refresh")
-        await self._fetch_keys(force=True)
+        # Key not found - refresh in case of key rotation, at most once per min interval
+        if not await self._refresh.force():
+            logger.info(f"Key {kid} not found; JWKS refreshed recently, not refetching")
+            return None
+        logger.info(f"Key {kid} not found, refreshed JWKS")
         return self._keys_by_kid.get(kid)
 
+    async def get_public_key(self, kid: str) -> Optional[Any]:
+        """
+        Get the parsed RSA public key for a key ID (kid).
+
+        The JWK is parsed on first use and reused until the key set changes.
+        Returns None if the kid is unknown; raises if the JWK cannot be parsed.
+        """
+        await self._ensure_keys_loaded()
+
+        public_key = self._public_keys.get(kid)
+        if public_key is not None:
+            return public_key
+
+        jwk = await self.get_signing_key(kid)
+        if not jwk:
+            return None
+        public_key = algorithms.RSAAlgorithm.from_jwk(jwk)
+        self._public_keys[kid] = public_key
+        return public_key
+
     async def get_all_keys(self) -> Dict[str, Dict[str, Any]]:
         """Get all signing keys (kid -> JWK)."""
         await self._ensure_keys_loaded()
         return self._keys_by_kid.copy()
 
     async def _ensure_keys_loaded(self) -> None:
-        """Load keys if not cached or expired."""
-        if self._cache is None or self._cache.is_expired():
-            await self._fetch_keys()
-
-    async def _fetch_keys(self, force: bool = False) -> None:
-        """Fetch JWKS from the identity provider."""
-        async with self._lock:
-            # Double-check after acquiring lock
-            if not force and self._cache is not None and not self._cache.is_expired():
-                return
-
-            # Resolve JWKS URL (may involve discovery)
-            jwks_url = await self._get_jwks_url()
-            self._resolved_jwks_url = jwks_url
-
-            logger.info(f"Fetching JWKS from {jwks_url}")
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        jwks_url,
-                        timeout=aiohttp.ClientTimeout(total=10),
-                    ) as resp:
-                        if resp.status != 200:
-                            error_text = await resp.text()
-                            logger.error(f"JWKS fetch failed: {resp.status} {error_text}")
-                            raise RuntimeError(f"Failed to fetch JWKS: {resp.status}")
-
-                        data = await resp.json()
-
-                keys = data.get("keys", [])
-                if not keys:
-                    logger.warning("JWKS response contains no keys")
-
-                # Index by kid
-                self._keys_by_kid = {k["kid"]: k for k in keys if "kid" in k}
-                self._cache = CachedJWKS(
-                    keys=data,
-                    fetched_at=time.time(),
-                    ttl_seconds=self._cache_ttl,
-                    source_url=jwks_url,
-                )
-
-                logger.info(f"Loaded {len(self._keys_by_kid)} signing keys from JWKS")
-
-            except asyncio.TimeoutError:
-                logger.error("JWKS fetch timed out")
-                raise RuntimeError("JWKS fetch timed out")
-            except aiohttp.ClientError as e:
-                logger.error(f"JWKS fetch client error: {e}")
-                raise RuntimeError(f"JWKS fetch failed: {e}")
+        """Load keys on first use; refresh in the background once they near expiry."""
+        await self._refresh.ensure()
+
+    async def _fetch_keys(self) -> None:
+        """Fetch JWKS from the identity provider (called through the refresh schedule)."""
+        # Resolve JWKS URL (may involve discovery)
+        jwks_url = await self._get_jwks_url()
+        self._resolved_jwks_url = jwks_url
+
+        logger.info(f"Fetching JWKS from {jwks_url}")
+        data = await fetch_json(jwks_url, "JWKS")
+        self._store_keys(data, jwks_url)
+
+    def _store_keys(self, data: Dict[str, Any], jwks_url: str) -> None:
+        """Index a JWKS response by kid; parsed keys are dropped only if the set changed."""
+        keys = data.get("keys", [])
+        if not keys:
+            logger.warning("JWKS response contains no keys")
+
+        keys_by_kid = {k["kid"]: k for k in keys if "kid" in k}
+        if keys_by_kid != self._keys_by_kid:
+            self._public_keys = {}
+            self._keys_version += 1
+        self._keys_by_kid = keys_by_kid
+        self._cache = CachedJWKS(
+            keys=data,
+            fetched_at=time.time(),
+            ttl_seconds=self._cache_ttl,
+            source_url=jwks_url,
+        )
+
+        logger.info(f"Loaded {len(self._keys_by_kid)} signing keys from JWKS")
 
     def clear_cache(self) -> None:
         """Clear the JWKS cache (useful for testing)."""
         self._cache = None
         self._keys_by_kid = {}
+        self._public_keys = {}
+        self._keys_version += 1
         self._resolved_jwks_url = None
+        self._refresh.reset()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self._refresh.get_metrics(), "keys": len(self._keys_by_kid)}
 
 
 # Module-level singleton
@@ -9,10 +9,16 @@ Validates access tokens against JWKS, checking:
 - Required scope (scp claim)
 
 Supports OIDC discovery-driven validation or explicit configuration.
+
+Verified tokens are cached by SHA-256 digest until min(exp, AUTH_TOKEN_CACHE_TTL),
+so repeat requests with the same bearer token skip signature verification.
+The cache is dropped whenever the JWKS key set changes.
 """
 
-from typing import Optional, List, Any, Dict
+from collections import OrderedDict
+from typing import Optional, List, Any, Dict, Tuple
 from dataclasses import dataclass
+import hashlib
 import time
 
 import jwt
@@ -140,6 +146,64 @@ class JWTValidator:
     def __init__(self, config: Optional[AuthConfig] = None):
         self._config = config or get_auth_config()
         self._cached_issuer: Optional[str] = None
+        # token digest -> (claims, expires_at, JWKS keys_version); LRU order
+        self._token_cache: "OrderedDict[bytes, Tuple[TokenClaims, float, int]]" = OrderedDict()
+        self._token_cache_hits = 0
+        self._token_cache_misses = 0
+
+    @property
+    def _token_cache_enabled(self) -> bool:
+        return self._config.token_cache_size > 0 and self._config.token_cache_ttl_seconds > 0
+
+    def _get_cached_claims(self, digest: bytes, keys_version: int) -> Optional[TokenClaims]:
+        entry = self._token_cache.get(digest)
+        if entry is None:
+            self._token_cache_misses += 1
+            return None
+        claims, expires_at, cached_version = entry
+        if cached_version != keys_version or time.time() >= expires_at:
+            del self._token_cache[digest]
+            self._token_cache_misses += 1
+            return None
+        self._token_cache.move_to_end(digest)
+        self._token_cache_hits += 1
+        return claims
+
+    def _cache_claims(self, digest: bytes, token_claims: TokenClaims, keys_version: int) -> None:
+        expires_at = time.time() + self._config.token_cache_ttl_seconds
+        exp = token_claims.raw_claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        self._token_cache[digest] = (token_claims, expires_at, keys_version)
+        self._token_cache.move_to_end(digest)
+        while len(self._token_cache) > self._config.token_cache_size:
+            self._token_cache.popitem(last=False)
+
+    def clear_token_cache(self) -> None:
+        """Drop all cached verified tokens."""
+        self._token_cache.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self._token_cache_hits + self._token_cache_misses
+        return {
+            "token_cache_enabled": self._token_cache_enabled,
+            "token_cache_size": len(self._token_cache),
+            "token_cache_hits": self._token_cache_hits,
+            "token_cache_misses": self._token_cache_misses,
+            "token_cache_hit_rate": round(self._token_cache_hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _enforce_scope(self, token_claims: TokenClaims, require_scope: bool) -> None:
+        if require_scope and self._config.required_scope:
+            if not token_claims.has_user_scope:
+                logger.warning(
+                    f"Token missing required scope: {self._config.required_scope}. "
+                    f"Token scopes: {token_claims.scopes}"
+                )
+                raise AuthError(
+                    f"Missing required scope: {self._config.required_scope}",
+                    403,
+                )
 
     async def _get_issuer(self) -> str:
         """
@@ -187,6 +251,16 @@ class JWTValidator:
             raise AuthError("Missing access token", 401)
 
         token = token.strip()
+        jwks_client = get_jwks_client()
+
+        # Reuse a recent verification of the same token
+        digest: Optional[bytes] = None
+        if self._token_cache_enabled:
+            digest = hashlib.sha256(token.encode("utf-8")).digest()
+            cached = self._get_cached_claims(digest, jwks_client.keys_version)
+            if cached is not None:
+                self._enforce_scope(cached, require_scope)
+                return cached
 
         # Decode header to get kid
         try:
@@ -199,26 +273,20 @@ class JWTValidator:
         if not kid:
             raise AuthError("Token missing key ID (kid)", 401)
 
-        # Fetch signing key from JWKS (may trigger discovery + JWKS fetch)
-        jwks_client = get_jwks_client()
+        # Fetch the parsed signing key (may trigger discovery + JWKS fetch)
         try:
-            jwk = await jwks_client.get_signing_key(kid)
+            public_key = await jwks_client.get_public_key(kid)
         except RuntimeError as e:
             logger.error(f"Failed to fetch signing key: {e}")
             raise AuthError("Unable to validate token signature", 401)
-
-        if not jwk:
-            logger.warning(f"Signing key not found: {kid}")
-            raise AuthError("Invalid signing key", 401)
-
-        # Build public key from JWK
-        try:
-            from jwt import algorithms
-            public_key = algorithms.RSAAlgorithm.from_jwk(jwk)
         except Exception as e:
             logger.error(f"Failed to load public key from JWK: {e}")
             raise AuthError("Invalid signing key format", 401)
 
+        if public_key is None:
+            logger.warning(f"Signing key not found: {kid}")
+            raise AuthError("Invalid signing key", 401)
+
         # Get expected issuer (may trigger discovery fetch)
         try:
             expected_issuer = await self._get_issuer()
@@ -304,17 +372,12 @@ class JWTValidator:
             mozaiks_capability_id=mozaiks_capability_id,
         )
 
+        # Cache before the scope check: scope depends on the caller, not the token
+        if digest is not None:
+            self._cache_claims(digest, token_claims, jwks_client.keys_version)
+
         # Enforce scope if required
-        if require_scope and self._config.required_scope:
-            if not token_claims.has_user_scope:
-                logger.warning(
-                    f"Token missing required scope: {self._config.required_scope}. "
-                    f"Token scopes: {scopes}"
-                )
-                raise AuthError(
-                    f"Missing required scope: {self._config.required_scope}",
-                    403,
-                )
+        self._enforce_scope(token_claims, require_scope)
 
         logger.debug(f"Token validated for user: {user_id}")
         return token_claims
@@ -0,0 +1,203 @@
+"""
+Background refresh for identity-provider documents (JWKS, OIDC discovery).
+
+A cached document moves through four windows, measured from its last
+successful fetch:
+
+    fresh    age < ttl * REFRESH_AHEAD      served as-is
+    due      age < ttl                      served; a background refresh starts
+    stale    age < ttl + stale_grace        served; a background refresh starts
+    expired  otherwise                      callers wait for a fetch (fail closed)
+
+Refreshes are single-flight: concurrent callers share one in-flight fetch
+instead of queueing on a lock. A failed background refresh is retried no
+sooner than ``min_interval`` seconds later, and refreshes forced by an
+unknown ``kid`` run at most once per ``min_interval``, so an IdP outage or a
+flood of bogus key IDs cannot turn every request into an outbound call.
+
+All fetches go through one pooled aiohttp session per event loop.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from mozaiks_infra.logs.logging_config import get_core_logger
+
+logger = get_core_logger("auth.refresh")
+
+REFRESH_AHEAD = 0.8  # fraction of the TTL after which a background refresh starts
+_FETCH_TIMEOUT_SECONDS = 10
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Pooled session shared by the auth clients (recreated per event loop)."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=_FETCH_TIMEOUT_SECONDS),
+            connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_http_session() -> None:
+    """Close the pooled session (application shutdown)."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed and _session_loop is asyncio.get_running_loop():
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+async def fetch_json(url: str, label: str) -> Dict[str, Any]:
+    """
+    GET a JSON document from the identity provider.
+
+    Raises:
+        RuntimeError on non-200 responses, timeouts and connection errors
+    """
+    try:
+        async with get_http_session().get(url) as resp:
+            if resp.status != 200:
+                error_text = await resp.text()
+                logger.error(f"{label} fetch failed: {resp.status} {error_text[:500]}")
+                raise RuntimeError(f"Failed to fetch {label}: {resp.status}")
+            return await resp.json(content_type=None)
+    except asyncio.TimeoutError:
+        logger.error(f"{label} fetch timed out")
+        raise RuntimeError(f"{label} fetch timed out")
+    except aiohttp.ClientError as e:
+        logger.error(f"{label} fetch client error: {e}")
+        raise RuntimeError(f"{label} fetch failed: {e}")
+
+
+class RefreshSchedule:
+    """
+    Decides when a cached document is refreshed and runs the refresh.
+
+    ``fetch`` loads the document into its owner and raises RuntimeError on
+    failure; the owner calls :meth:`ensure` before each read.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        stale_grace_seconds: float,
+        min_interval_seconds: float,
+    ):
+        self._label = label
+        self._fetch = fetch
+        self.ttl_seconds = float(ttl_seconds)
+        self.stale_grace_seconds = max(0.0, float(stale_grace_seconds))
+        self.min_interval_seconds = max(0.0, float(min_interval_seconds))
+        self.fetched_at: Optional[float] = None  # wall clock of the last successful fetch
+        self._last_attempt: Optional[float] = None  # monotonic
+        self._last_failure: Optional[float] = None  # monotonic
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {
+            "fetches": 0,
+            "background_refreshes": 0,
+            "failures": 0,
+            "stale_served": 0,
+            "forced_refreshes": 0,
+            "forced_refreshes_skipped": 0,
+            "last_error": None,
+        }
+
+    def age(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    def mark_fetched(self) -> None:
+        self.fetched_at = time.time()
+
+    def reset(self) -> None:
+        self.fetched_at = None
+        self._last_attempt = None
+        self._last_failure = None
+
+    async def ensure(self) -> None:
+        """Return once a usable document is loaded, refreshing in the background when due."""
+        age = self.age()
+        if age is None or age >= self.ttl_seconds + self.stale_grace_seconds:
+            await self._run()
+            return
+        if age < self.ttl_seconds * REFRESH_AHEAD:
+            return
+        if age >= self.ttl_seconds:
+            self._stats["stale_served"] += 1
+        if self._task is None and self._elapsed_since(self._last_failure):
+            self._stats["background_refreshes"] += 1
+            self._start()
+
+    async def force(self) -> bool:
+        """Refresh now unless one was attempted within ``min_interval``; True if it ran."""
+        if self._task is None and not self._elapsed_since(self._last_attempt):
+            self._stats["forced_refreshes_skipped"] += 1
+            return False
+        self._stats["forced_refreshes"] += 1
+        await self._run()
+        return True
+
+    def _elapsed_since(self, moment: Optional[float]) -> bool:
+        return moment is None or time.monotonic() - moment >= self.min_interval_seconds
+
+    def _start(self) -> asyncio.Task:
+        if self._task is None:
+            self._last_attempt = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._guarded_fetch())
+        return self._task
+
+    async def _run(self) -> None:
+        # Shield so a cancelled request does not cancel the fetch other callers are waiting on.
+        error = await asyncio.shield(self._start())
+        if error is not None:
+            if isinstance(error, RuntimeError):
+                raise error
+            raise RuntimeError(f"{self._label} fetch failed: {error}") from error
+
+    async def _guarded_fetch(self) -> Optional[Exception]:
+        # Errors are returned, not raised: nobody awaits a background refresh.
+        try:
+            self._stats["fetches"] += 1
+            await self._fetch()
+            self.mark_fetched()
+            self._stats["last_error"] = None
+            self._last_failure = None
+            return None
+        except Exception as e:
+            self._stats["failures"] += 1
+            self._last_failure = time.monotonic()
+            self._stats["last_error"] = str(e)
+            age = self.age()
+            if age is not None and age < self.ttl_seconds + self.stale_grace_seconds:
+                logger.warning(f"{self._label} refresh failed, serving cached copy ({age:.0f}s old): {e}")
+            return e
+        finally:
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            **self._stats,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "refreshing": self._task is not None,
+        }
+
+
+__all__ = [
+    "REFRESH_AHEAD",
+    "RefreshSchedule",
+    "close_http_session",
+    "fetch_json",
+    "get_http_session",
+]
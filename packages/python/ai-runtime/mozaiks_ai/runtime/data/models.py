@@ -28,7 +28,8 @@ ChatSessions Stored Fields (superset; some optional):
     _id, app_id (+ app_id alias), workflow_name, user_id, status, created_at, last_updated_at,
     completed_at?, trace_id?, duration_sec (float),
     usage_prompt_tokens_final?, usage_completion_tokens_final?, usage_total_tokens_final?,
-    usage_total_cost_final?, usage_summary_raw?, messages[]
+    usage_total_cost_final?, usage_summary_raw?, messages[] (or message_storage="collection",
+    in which case the transcript lives in ChatMessages keyed by chat_id/sequence)
 
 WorkflowSummaryDoc Stored Fields:
     _id, app_id (+ app_id alias), workflow_name, overall_avg, chat_sessions, agents
@@ -218,6 +219,8 @@ class ChatSessionDoc(BaseModel):
     usage_total_cost_final: float = 0.0
     # messages and timestamps only; token/cost fields are stored in WorkflowStats
     messages: List[ChatMessage] = Field(default_factory=list)
+    # "collection" when the transcript lives in ChatMessages instead of messages[]
+    message_storage: Optional[str] = None
 
     @model_validator(mode="before")
     @classmethod
@@ -394,7 +397,13 @@ class ChatWorkflowManager:
             )
             overall_sessions[sid] = stats
 
-            agents_in_session = [m.get("agent_name") for m in sess.get("messages", []) if m.get("role") == "assistant" and m.get("agent_name")]
+            if sess.get("message_storage") == "collection":
+                agents_in_session = await self.db["ChatMessages"].distinct(
+                    "agent_name",
+                    {"chat_id": sid, "role": "assistant", **build_app_scope_filter(str(resolved_app_id))},
+                )
+            else:
+                agents_in_session = [m.get("agent_name") for m in sess.get("messages", []) if m.get("role") == "assistant" and m.get("agent_name")]
             for agent in agents_in_session:
                 per_agent_totals[agent].append((sid, stats))
 
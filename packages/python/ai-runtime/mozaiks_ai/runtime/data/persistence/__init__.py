@@ -6,9 +6,16 @@ Handles MongoDB operations and session management.
 
 from .persistence_manager import PersistenceManager, AG2PersistenceManager
 from .db_manager import get_db_manager
+from .message_store import ChatMessageStore
+from .artifact_state import ArtifactStateStore
+from .write_behind import PersistenceWriteBehind, get_write_behind
 
 __all__ = [
     'PersistenceManager',
     'AG2PersistenceManager',
     'get_db_manager',
+    'ChatMessageStore',
+    'ArtifactStateStore',
+    'PersistenceWriteBehind',
+    'get_write_behind',
 ]
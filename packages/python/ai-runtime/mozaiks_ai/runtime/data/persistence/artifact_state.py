@@ -0,0 +1,577 @@
+# ==============================================================================
+# FILE: artifact_state.py
+# DESCRIPTION: Versioned artifact state (targeted head updates + patch log)
+# ==============================================================================
+
+"""Versioned artifact state storage.
+
+Two collections back every artifact:
+  * ArtifactStates   : the head document per ``(app_id, artifact_id, chat_id)``
+                       with the current ``state`` and its ``version``. JSON
+                       patches are written as ``$set`` / ``$unset`` on the
+                       touched ``state.*`` paths whenever the patch can be
+                       expressed that way, so a small change to a large artifact
+                       no longer rewrites the whole state. Writes are guarded by
+                       the expected ``version``.
+  * ArtifactStateOps : append-only log, one document per patched version with
+                       the ops that produced it. A client holding version N is
+                       served ``(N, head]`` as deltas instead of the full state.
+
+The head is the snapshot. A full state write (UI tool render, non-patch
+update) starts a new snapshot and drops the log before it; otherwise the log
+is compacted every ``ARTIFACT_STATE_COMPACT_EVERY`` versions down to the last
+``ARTIFACT_STATE_LOG_RETAIN``. ``log_start`` on the head records the oldest
+version that can still be replayed; older clients get a snapshot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import weakref
+from collections import OrderedDict
+from copy import deepcopy
+from datetime import datetime, UTC, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from mozaiks_infra.logs.logging_config import get_workflow_logger
+from mozaiks_ai.runtime.multitenant import build_app_scope_filter, dual_write_app_scope
+
+logger = get_workflow_logger("persistence")
+
+_OPS_COLLECTION = "ArtifactStateOps"
+_OPS_INDEX_NAME = "artifact_ops_version"
+_OPS_TTL_INDEX_NAME = "artifact_ops_ttl"
+_WRITE_ATTEMPTS = 3
+
+
+def _env_int(name: str, default: int, *, minimum: int = 0) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw.strip()))
+    except ValueError:
+        logger.warning("Invalid %s value '%s'; using default %s", name, raw, default)
+        return default
+
+
+# JSON patch ----------------------------------------------------------------
+
+def _decode_json_pointer(segment: str) -> str:
+    return segment.replace("~1", "/").replace("~0", "~")
+
+
+def _apply_json_patch(target: Any, patch_ops: Optional[List[Dict[str, Any]]]) -> Any:
+    if not isinstance(patch_ops, list):
+        return target
+
+    result = deepcopy(target) if target is not None else {}
+    if not isinstance(result, (dict, list)):
+        result = {}
+
+    def _is_index(seg: str) -> bool:
+        if seg == "-":
+            return True
+        try:
+            int(seg)
+            return True
+        except Exception:
+            return False
+
+    def _parse_index(seg: str, length: int) -> Optional[int]:
+        if seg == "-":
+            return length
+        try:
+            return int(seg)
+        except Exception:
+            return None
+
+    for op in patch_ops:
+        if not isinstance(op, dict):
+            continue
+        operation = op.get("op")
+        path = op.get("path")
+        if not isinstance(path, str):
+            path = ""
+        segments = path.split("/")[1:] if path else []
+
+        if not segments:
+            if operation in ("add", "replace"):
+                result = deepcopy(op.get("value"))
+            elif operation == "remove":
+                result = None
+            continue
+
+        parent = result
+        for idx, raw_seg in enumerate(segments[:-1]):
+            seg = _decode_json_pointer(raw_seg)
+            next_seg = segments[idx + 1]
+            next_is_index = _is_index(next_seg)
+            if isinstance(parent, list):
+                index = _parse_index(seg, len(parent))
+                if index is None:
+                    parent = None
+                    break
+                if index >= len(parent):
+                    while len(parent) < index:
+                        parent.append({} if not next_is_index else [])
+                    parent.append({} if not next_is_index else [])
+                if not isinstance(parent[index], (dict, list)):
+                    parent[index] = {} if not next_is_index else []
+                parent = parent[index]
+            elif isinstance(parent, dict):
+                if seg not in parent or not isinstance(parent[seg], (dict, list)):
+                    parent[seg] = {} if not next_is_index else []
+                parent = parent[seg]
+            else:
+                parent = None
+                break
+
+        if parent is None:
+            continue
+
+        last_seg = _decode_json_pointer(segments[-1])
+        if isinstance(parent, list):
+            index = _parse_index(last_seg, len(parent))
+            if index is None:
+                continue
+            if operation == "remove":
+                if 0 <= index < len(parent):
+                    parent.pop(index)
+            elif operation == "add":
+                if index >= len(parent):
+                    parent.append(op.get("value"))
+                else:
+                    parent.insert(index, op.get("value"))
+            elif operation == "replace":
+                if 0 <= index < len(parent):
+                    parent[index] = op.get("value")
+                elif index == len(parent):
+                    parent.append(op.get("value"))
+        elif isinstance(parent, dict):
+            if operation == "remove":
+                parent.pop(last_seg, None)
+            elif operation in ("add", "replace"):
+                parent[last_seg] = op.get("value")
+
+    return result
+
+
+def _is_mongo_key(segment: str) -> bool:
+    return bool(segment) and "." not in segment and not segment.startswith("$") and "\x00" not in segment
+
+
+def _list_index(segment: str, length: int) -> Optional[int]:
+    if not segment.isdigit() or (segment != "0" and segment.startswith("0")):
+        return None
+    index = int(segment)
+    return index if index < length else None
+
+
+def patch_to_mongo_update(
+    base_state: Any,
+    patch_ops: Optional[List[Dict[str, Any]]],
+    *,
+    field: str = "state",
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Translate JSON patch ops into ``{"$set": ..., "$unset": ...}`` on ``field``.
+
+    Returns ``None`` when the patch cannot be expressed as targeted updates
+    with exactly the result ``_apply_json_patch`` gives on ``base_state``:
+    root replacement, list inserts/removals, ``move``/``copy``/``test`` ops,
+    paths through missing containers, keys Mongo cannot address, or ops whose
+    paths overlap (updates to a path and one of its parents).
+    """
+    if not isinstance(patch_ops, list) or not isinstance(base_state, (dict, list)):
+        return None
+
+    set_fields: Dict[str, Any] = {}
+    unset_fields: Dict[str, str] = {}
+    paths: List[Tuple[str, ...]] = []
+    for op in patch_ops:
+        if not isinstance(op, dict):
+            return None
+        operation = op.get("op")
+        path = op.get("path")
+        if operation not in ("add", "replace", "remove") or not isinstance(path, str) or not path.startswith("/"):
+            return None
+        segments = tuple(_decode_json_pointer(seg) for seg in path.split("/")[1:])
+        if not all(_is_mongo_key(seg) for seg in segments):
+            return None
+
+        parent: Any = base_state
+        for seg in segments[:-1]:
+            if isinstance(parent, dict) and isinstance(parent.get(seg), (dict, list)):
+                parent = parent[seg]
+            elif isinstance(parent, list) and _list_index(seg, len(parent)) is not None:
+                parent = parent[int(seg)]
+                if not isinstance(parent, (dict, list)):
+                    return None
+            else:
+                return None
+
+        dotted = ".".join((field, *segments))
+        last = segments[-1]
+        if isinstance(parent, dict):
+            if operation == "remove":
+                unset_fields[dotted] = ""
+            else:
+                set_fields[dotted] = op.get("value")
+        elif operation == "replace" and _list_index(last, len(parent)) is not None:
+            set_fields[dotted] = op.get("value")
+        else:
+            return None
+        paths.append(segments)
+
+    # In sorted order a path is immediately followed by the paths it prefixes.
+    ordered = sorted(paths)
+    for current, following in zip(ordered, ordered[1:]):
+        if following[: len(current)] == current:
+            return None
+
+    update: Dict[str, Dict[str, Any]] = {}
+    if set_fields:
+        update["$set"] = set_fields
+    if unset_fields:
+        update["$unset"] = unset_fields
+    return update
+
+
+def _json_safe(value: Any) -> Any:
+    try:
+        return json.loads(json.dumps(value, default=str))
+    except Exception:
+        return value if isinstance(value, (dict, list)) else {"value": str(value)}
+
+
+# Store -----------------------------------------------------------------------
+
+class ArtifactStateStore:
+    """Versioned artifact state over the ArtifactStates head + ArtifactStateOps log."""
+
+    def __init__(self, persistence: Any, head_coll: Callable[[], Awaitable[Any]]):
+        # ``persistence`` is the shared PersistenceManager (lazy Mongo client holder);
+        # ``head_coll`` returns the index-checked ArtifactStates collection.
+        self._persistence = persistence
+        self._head_coll = head_coll
+        self._ops_indexes_checked = False
+        self.compact_every = _env_int("ARTIFACT_STATE_COMPACT_EVERY", 100, minimum=1)
+        self.log_retain = _env_int("ARTIFACT_STATE_LOG_RETAIN", 200, minimum=1)
+        self.cache_size = _env_int("ARTIFACT_STATE_CACHE_SIZE", 256)
+        # key -> (version, state, expires_at) of heads this process wrote last; saves the read before a patch.
+        self._heads: "OrderedDict[Tuple[str, str, str], Tuple[int, Any, Optional[datetime]]]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[Tuple[str, str, str], asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._stats = {
+            "targeted_writes": 0,
+            "full_writes": 0,
+            "version_conflicts": 0,
+            "head_cache_hits": 0,
+            "ops_logged": 0,
+            "compactions": 0,
+            "delta_syncs": 0,
+            "snapshot_syncs": 0,
+        }
+
+    async def _ops_coll(self):
+        await self._persistence._ensure_client()
+        assert self._persistence.client is not None, "Mongo client not initialized"
+        coll = self._persistence.client["MozaiksAI"][_OPS_COLLECTION]
+        if not self._ops_indexes_checked:
+            await self._ensure_ops_indexes(coll)
+        return coll
+
+    async def _ensure_ops_indexes(self, coll) -> None:
+        try:
+            existing = await coll.list_indexes().to_list(length=None)
+            index_names = [idx.get("name") for idx in existing]
+            if _OPS_INDEX_NAME not in index_names:
+                await coll.create_index(
+                    [("app_id", ASCENDING), ("artifact_id", ASCENDING), ("chat_id", ASCENDING), ("version", ASCENDING)],
+                    name=_OPS_INDEX_NAME,
+                    unique=True,
+                )
+                logger.debug("Created artifact state ops index")
+            if _OPS_TTL_INDEX_NAME not in index_names:
+                await coll.create_index("expires_at", name=_OPS_TTL_INDEX_NAME, expireAfterSeconds=0)
+                logger.debug("Created artifact state ops TTL index")
+        except Exception as idx_err:
+            logger.warning("Artifact state ops index check failed: %s", idx_err)
+        finally:
+            self._ops_indexes_checked = True
+
+    @staticmethod
+    def _key_filter(app_id: str, artifact_id: str, chat_id: str) -> Dict[str, Any]:
+        return {"artifact_id": artifact_id, "chat_id": chat_id, **build_app_scope_filter(app_id)}
+
+    def _lock(self, key: Tuple[str, str, str]) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def _remember(self, key: Tuple[str, str, str], version: int, state: Any, expires_at: Optional[datetime]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._heads[key] = (version, state, expires_at)
+        self._heads.move_to_end(key)
+        while len(self._heads) > self.cache_size:
+            self._heads.popitem(last=False)
+
+    async def _load_head(self, key: Tuple[str, str, str], *, with_state: bool) -> Tuple[int, Any, bool]:
+        """Return ``(version, state, exists)`` for the head, from cache when possible."""
+        cached = self._heads.get(key)
+        if cached is not None:
+            version, state, expires_at = cached
+            self._stats["head_cache_hits"] += 1
+            if isinstance(expires_at, datetime) and expires_at <= datetime.now(UTC):
+                # Same as an expired head read from Mongo: rewrite it from scratch.
+                self._heads.pop(key, None)
+                return version, None, True
+            return version, state, True
+        coll = await self._head_coll()
+        projection = {"version": 1, "expires_at": 1, **({"state": 1} if with_state else {})}
+        doc = await coll.find_one(self._key_filter(*key), projection)
+        if not doc:
+            return 0, None, False
+        expires_at = doc.get("expires_at")
+        if isinstance(expires_at, datetime) and expires_at <= datetime.now(UTC):
+            return int(doc.get("version") or 0), None, True
+        state = doc.get("state")
+        version = int(doc.get("version") or 0)
+        if with_state:
+            self._remember(key, version, state, expires_at)
+        return version, state, True
+
+    async def _write_head(
+        self,
+        key: Tuple[str, str, str],
+        *,
+        expected_version: int,
+        exists: bool,
+        update: Dict[str, Dict[str, Any]],
+    ) -> bool:
+        coll = await self._head_coll()
+        query = self._key_filter(*key)
+        # Heads written before versioning have no ``version`` field.
+        query["version"] = expected_version if expected_version else {"$in": [None, 0]}
+        try:
+            result = await coll.update_one(query, update, upsert=not exists)
+        except DuplicateKeyError:
+            return False
+        return bool(result.matched_count or getattr(result, "upserted_id", None) is not None)
+
+    def _head_update(
+        self,
+        *,
+        app_id: str,
+        version: int,
+        workflow_name: Optional[str],
+        ttl_seconds: Optional[int],
+        now: datetime,
+    ) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {"version": version, "workflow_name": workflow_name, "updated_at": now}
+        if isinstance(ttl_seconds, int) and ttl_seconds > 0:
+            fields["ttl_seconds"] = ttl_seconds
+            fields["expires_at"] = now + timedelta(seconds=ttl_seconds)
+        else:
+            fields["ttl_seconds"] = None
+            fields["expires_at"] = None
+        return dual_write_app_scope(fields, app_id)
+
+    async def write_state(
+        self,
+        *,
+        app_id: str,
+        artifact_id: str,
+        chat_id: str,
+        state: Any,
+        workflow_name: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Replace the full state (a new snapshot); returns the written head fields."""
+        key = (app_id, artifact_id, chat_id)
+        safe_state = _json_safe(state)
+        async with self._lock(key):
+            for _attempt in range(_WRITE_ATTEMPTS):
+                version, _, exists = await self._load_head(key, with_state=False)
+                now = datetime.now(UTC)
+                fields = self._head_update(
+                    app_id=app_id, version=version + 1, workflow_name=workflow_name, ttl_seconds=ttl_seconds, now=now
+                )
+                fields.update({"artifact_id": artifact_id, "chat_id": chat_id, "state": safe_state, "log_start": version + 2})
+                update = {"$set": fields, "$setOnInsert": {"created_at": now}}
+                if await self._write_head(key, expected_version=version, exists=exists, update=update):
+                    self._stats["full_writes"] += 1
+                    self._remember(key, version + 1, safe_state, fields.get("expires_at"))
+                    await self._trim_log(key, below_version=version + 2)
+                    return fields
+                self._stats["version_conflicts"] += 1
+                self._heads.pop(key, None)
+        logger.warning("Artifact state write for %s lost %s version races; skipped", artifact_id, _WRITE_ATTEMPTS)
+        return None
+
+    async def apply_patch(
+        self,
+        *,
+        app_id: str,
+        artifact_id: str,
+        chat_id: str,
+        patch_ops: Optional[List[Dict[str, Any]]],
+        workflow_name: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> Tuple[Optional[Any], Optional[int]]:
+        """Apply ``patch_ops`` to the head; returns ``(next_state, version)``."""
+        key = (app_id, artifact_id, chat_id)
+        safe_ops = _json_safe(patch_ops) if isinstance(patch_ops, list) else []
+        async with self._lock(key):
+            for _attempt in range(_WRITE_ATTEMPTS):
+                version, head_state, exists = await self._load_head(key, with_state=True)
+                base_state = head_state if isinstance(head_state, (dict, list)) else {}
+                next_state = _apply_json_patch(base_state, safe_ops)
+                now = datetime.now(UTC)
+                fields = self._head_update(
+                    app_id=app_id, version=version + 1, workflow_name=workflow_name, ttl_seconds=ttl_seconds, now=now
+                )
+                # Expired or non-container heads are rewritten from ``{}``, never patched in
+                # place. That rewrite is a new snapshot: the old head's log no longer applies.
+                rebased = bool(version) and not isinstance(head_state, (dict, list))
+                if not version:
+                    fields["log_start"] = 1  # new or pre-versioning head: the log starts here
+                elif rebased:
+                    fields["log_start"] = version + 2  # as in write_state
+                targeted = patch_to_mongo_update(head_state, safe_ops) if exists else None
+                if targeted is not None:
+                    update: Dict[str, Dict[str, Any]] = {**targeted, "$set": {**targeted.get("$set", {}), **fields}}
+                else:
+                    fields.update({"artifact_id": artifact_id, "chat_id": chat_id, "state": _json_safe(next_state)})
+                    update = {"$set": fields, "$setOnInsert": {"created_at": now}}
+                if await self._write_head(key, expected_version=version, exists=exists, update=update):
+                    self._stats["targeted_writes" if targeted is not None else "full_writes"] += 1
+                    self._remember(key, version + 1, next_state, fields.get("expires_at"))
+                    if rebased:
+                        await self._trim_log(key, below_version=version + 2)
+                    else:
+                        await self._append_ops(key, version + 1, safe_ops, fields.get("expires_at"), now)
+                    return next_state, version + 1
+                self._stats["version_conflicts"] += 1
+                self._heads.pop(key, None)
+        logger.warning("Artifact patch for %s lost %s version races; skipped", artifact_id, _WRITE_ATTEMPTS)
+        return None, None
+
+    async def _append_ops(
+        self,
+        key: Tuple[str, str, str],
+        version: int,
+        ops: List[Dict[str, Any]],
+        expires_at: Optional[datetime],
+        now: datetime,
+    ) -> None:
+        app_id, artifact_id, chat_id = key
+        try:
+            coll = await self._ops_coll()
+            entry = dual_write_app_scope(
+                {
+                    "artifact_id": artifact_id,
+                    "chat_id": chat_id,
+                    "version": version,
+                    "ops": ops,
+                    "created_at": now,
+                    "expires_at": expires_at,
+                },
+                app_id,
+            )
+            await coll.insert_one(entry)
+            self._stats["ops_logged"] += 1
+        except Exception as e:  # pragma: no cover
+            # A gap in the log only costs clients a snapshot; get_sync checks continuity.
+            logger.debug("Failed to log artifact ops for %s v%s: %s", artifact_id, version, e)
+            return
+        if version % self.compact_every == 0:
+            await self._compact(key, version)
+
+    async def _compact(self, key: Tuple[str, str, str], version: int) -> None:
+        log_start = max(1, version - self.log_retain + 1)
+        try:
+            head = await self._head_coll()
+            await head.update_one(self._key_filter(*key), {"$max": {"log_start": log_start}})
+            await self._trim_log(key, below_version=log_start)
+            self._stats["compactions"] += 1
+        except Exception as e:  # pragma: no cover
+            logger.debug("Artifact state compaction failed for %s: %s", key[1], e)
+
+    async def _trim_log(self, key: Tuple[str, str, str], *, below_version: int) -> None:
+        try:
+            coll = await self._ops_coll()
+            await coll.delete_many({**self._key_filter(*key), "version": {"$lt": below_version}})
+        except Exception as e:  # pragma: no cover
+            logger.debug("Artifact state log trim failed for %s: %s", key[1], e)
+
+    async def get_sync(
+        self,
+        *,
+        app_id: str,
+        artifact_id: str,
+        chat_id: str,
+        since_version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return what a client at ``since_version`` needs to reach the head.
+
+        ``{"mode": "delta", "version": V, "deltas": [{"version", "patch"}, ...]}``
+        when the log still covers ``(since_version, V]``, otherwise
+        ``{"mode": "snapshot", "version": V, "state": ...}``.
+        """
+        key = (app_id, artifact_id, chat_id)
+        head = await self._head_coll()
+        doc = await head.find_one(self._key_filter(*key))
+        if not doc:
+            return None
+        expires_at = doc.get("expires_at")
+        if isinstance(expires_at, datetime) and expires_at <= datetime.now(UTC):
+            return None
+        version = int(doc.get("version") or 0)
+        log_start = int(doc.get("log_start") or version + 1)
+        result: Dict[str, Any] = {
+            "artifact_id": artifact_id,
+            "chat_id": chat_id,
+            "workflow_name": doc.get("workflow_name"),
+            "version": version,
+            "updated_at": doc.get("updated_at"),
+            "expires_at": expires_at,
+        }
+
+        if since_version is not None and log_start - 1 <= since_version <= version:
+            deltas: List[Dict[str, Any]] = []
+            if since_version < version:
+                ops_coll = await self._ops_coll()
+                cursor = ops_coll.find(
+                    {**self._key_filter(*key), "version": {"$gt": since_version, "$lte": version}},
+                    {"_id": 0, "version": 1, "ops": 1},
+                ).sort("version", ASCENDING)
+                entries = await cursor.to_list(length=None)
+                deltas = [{"version": int(e["version"]), "patch": e.get("ops") or []} for e in entries]
+            if [d["version"] for d in deltas] == list(range(since_version + 1, version + 1)):
+                self._stats["delta_syncs"] += 1
+                return {**result, "mode": "delta", "since_version": since_version, "deltas": deltas}
+
+        self._stats["snapshot_syncs"] += 1
+        return {**result, "mode": "snapshot", "state": doc.get("state")}
+
+    def forget(self, artifact_id: Optional[str] = None) -> None:
+        """Drop cached heads (all, or those of one artifact) so the next write re-reads Mongo."""
+        for key in [k for k in self._heads if artifact_id is None or k[1] == artifact_id]:
+            self._heads.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "cached_heads": len(self._heads)}
+
+
+__all__ = [
+    "ArtifactStateStore",
+    "patch_to_mongo_update",
+]
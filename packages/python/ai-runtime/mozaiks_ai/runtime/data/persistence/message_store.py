@@ -0,0 +1,341 @@
+# ==============================================================================
+# FILE: message_store.py
+# DESCRIPTION: Sequence-indexed chat transcript storage (ChatMessages collection)
+# ==============================================================================
+
+"""Chat transcript storage layouts for ChatSessions.
+
+Two layouts are supported:
+  * embedded   : messages live in ``ChatSessions.messages[]`` (legacy default)
+  * collection : one document per message in ``ChatMessages``, indexed by
+                 ``(app_id, chat_id, sequence)`` so diffs and resumes become
+                 indexed range queries instead of whole-array loads.
+
+``CHAT_MESSAGE_STORAGE`` selects the layout used for writes. Each session
+records its own layout in ``ChatSessions.message_storage`` and readers always
+follow that field, so a process running either mode can read any chat.
+Embedded sessions are migrated lazily on first touch when the collection
+layout is active, or in bulk via ``ChatMessageStore.migrate_embedded_sessions``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+
+from mozaiks_infra.logs.logging_config import get_workflow_logger
+from mozaiks_ai.runtime.multitenant import build_app_scope_filter
+
+logger = get_workflow_logger("persistence")
+
+MESSAGE_STORAGE_EMBEDDED = "embedded"
+MESSAGE_STORAGE_COLLECTION = "collection"
+
+_MESSAGE_COLLECTION = "ChatMessages"
+_MESSAGE_INDEX_NAME = "cm_app_chat_seq"
+# Fields added to each message row that are not part of the embedded message shape.
+_ROW_ONLY_FIELDS = {"_id": 0, "chat_id": 0, "app_id": 0}
+_MIGRATION_ATTEMPTS = 3
+
+
+def resolve_message_storage_mode() -> str:
+    """Resolve the transcript layout for new writes from ``CHAT_MESSAGE_STORAGE``."""
+    raw = os.getenv("CHAT_MESSAGE_STORAGE", MESSAGE_STORAGE_EMBEDDED).strip().lower()
+    if raw in (MESSAGE_STORAGE_EMBEDDED, MESSAGE_STORAGE_COLLECTION):
+        return raw
+    logger.warning(
+        "Invalid CHAT_MESSAGE_STORAGE value '%s'; using '%s'", raw, MESSAGE_STORAGE_EMBEDDED
+    )
+    return MESSAGE_STORAGE_EMBEDDED
+
+
+def session_uses_collection(doc: Optional[Dict[str, Any]]) -> bool:
+    """Return True when a ChatSessions document stores its transcript in ChatMessages."""
+    return bool(doc) and doc.get("message_storage") == MESSAGE_STORAGE_COLLECTION
+
+
+class ChatMessageStore:
+    """One-document-per-message transcript store backed by ``ChatMessages``."""
+
+    def __init__(self, persistence: Any):
+        # ``persistence`` is the shared PersistenceManager (lazy Mongo client holder).
+        self._persistence = persistence
+        self._indexes_checked = False
+        # chat_id -> [lock, holders]; an entry lives while anyone holds or awaits it
+        self._migration_locks: Dict[str, List[Any]] = {}
+
+    async def _messages_coll(self):
+        await self._persistence._ensure_client()
+        assert self._persistence.client is not None, "Mongo client not initialized"
+        coll = self._persistence.client["MozaiksAI"][_MESSAGE_COLLECTION]
+        if not self._indexes_checked:
+            await self._ensure_indexes(coll)
+        return coll
+
+    async def _ensure_indexes(self, coll) -> None:
+        try:
+            existing = await coll.list_indexes().to_list(length=None)
+            index_names = [idx.get("name") for idx in existing]
+            if _MESSAGE_INDEX_NAME not in index_names:
+                await coll.create_index(
+                    [("app_id", ASCENDING), ("chat_id", ASCENDING), ("sequence", ASCENDING)],
+                    name=_MESSAGE_INDEX_NAME,
+                )
+                logger.debug("Created chat message app/chat/sequence index")
+        except Exception as idx_err:
+            logger.warning("ChatMessages index check failed: %s", idx_err)
+        finally:
+            self._indexes_checked = True
+
+    @staticmethod
+    def _scope(chat_id: str, app_id: str) -> Dict[str, Any]:
+        return {"chat_id": chat_id, **build_app_scope_filter(app_id)}
+
+    # Reads -------------------------------------------------------------
+    async def fetch(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        after_sequence: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return messages with ``sequence > after_sequence`` in sequence order."""
+        coll = await self._messages_coll()
+        query = self._scope(chat_id, app_id)
+        if after_sequence > 0:
+            query["sequence"] = {"$gt": int(after_sequence)}
+        cursor = coll.find(query, _ROW_ONLY_FIELDS).sort("sequence", ASCENDING)
+        if limit:
+            cursor = cursor.limit(int(limit))
+        return await cursor.to_list(length=None)
+
+    async def fetch_tail(self, *, chat_id: str, app_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Return the last ``limit`` messages in sequence order."""
+        coll = await self._messages_coll()
+        cursor = (
+            coll.find(self._scope(chat_id, app_id), _ROW_ONLY_FIELDS)
+            .sort("sequence", DESCENDING)
+            .limit(int(limit))
+        )
+        docs = await cursor.to_list(length=int(limit))
+        docs.reverse()
+        return docs
+
+    async def count(self, *, chat_id: str, app_id: str) -> int:
+        coll = await self._messages_coll()
+        return int(await coll.count_documents(self._scope(chat_id, app_id)))
+
+    async def assistant_agent_names(self, *, chat_id: str, app_id: str) -> List[str]:
+        coll = await self._messages_coll()
+        names = await coll.distinct("agent_name", {**self._scope(chat_id, app_id), "role": "assistant"})
+        return [n for n in names if n]
+
+    # Writes ------------------------------------------------------------
+    async def append(self, *, chat_id: str, app_id: str, message: Dict[str, Any]) -> None:
+        """Insert a single message row. Callers allocate ``sequence`` beforehand."""
+        coll = await self._messages_coll()
+        row = dict(message)
+        row["chat_id"] = chat_id
+        row["app_id"] = app_id
+        await coll.insert_one(row)
+
+    async def append_batches(
+        self,
+        batches: List[tuple[str, str, List[Dict[str, Any]]]],
+        *,
+        idempotent: bool = False,
+    ) -> None:
+        """Insert ``(chat_id, app_id, messages)`` batches with one unordered bulk_write.
+
+        Ops follow batch/message order, so ``BulkWriteError`` write-error
+        indexes map back to the flattened messages. With ``idempotent`` each
+        row is upserted on ``(app_id, chat_id, sequence)`` instead, so rows
+        that already landed on an earlier attempt are left as they are.
+        """
+        if idempotent:
+            ops = [
+                UpdateOne(
+                    {"app_id": app_id, "chat_id": chat_id, "sequence": message["sequence"]},
+                    {"$setOnInsert": {**message, "chat_id": chat_id, "app_id": app_id}},
+                    upsert=True,
+                )
+                for chat_id, app_id, messages in batches
+                for message in messages
+            ]
+        else:
+            ops = [
+                InsertOne({**message, "chat_id": chat_id, "app_id": app_id})
+                for chat_id, app_id, messages in batches
+                for message in messages
+            ]
+        if not ops:
+            return
+        coll = await self._messages_coll()
+        await coll.bulk_write(ops, ordered=False)
+
+    async def set_last_assistant_metadata(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        metadata: Dict[str, Any],
+    ) -> Optional[int]:
+        """Set ``metadata`` on the newest assistant message; returns its sequence."""
+        coll = await self._messages_coll()
+        last = await coll.find_one(
+            {**self._scope(chat_id, app_id), "role": "assistant"},
+            {"_id": 1, "sequence": 1},
+            sort=[("sequence", DESCENDING)],
+        )
+        if not last:
+            return None
+        await coll.update_one({"_id": last["_id"]}, {"$set": {"metadata": metadata}})
+        return last.get("sequence")
+
+    async def update_ui_tool_state(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        event_id: str,
+        fields: Dict[str, Any],
+    ) -> int:
+        coll = await self._messages_coll()
+        result = await coll.update_many(
+            {**self._scope(chat_id, app_id), "metadata.ui_tool.event_id": event_id},
+            {"$set": {f"metadata.ui_tool.{k}": v for k, v in fields.items()}},
+        )
+        return int(result.modified_count)
+
+    # Migration ---------------------------------------------------------
+    @staticmethod
+    def _build_rows(
+        chat_id: str,
+        app_id: str,
+        messages: List[Any],
+    ) -> tuple[List[Dict[str, Any]], bool]:
+        """Convert an embedded transcript to rows.
+
+        Embedded transcripts written before every message carried a sequence
+        (e.g. context snapshots) are renumbered by position so that
+        ``sequence == index + 1`` holds, which is what resume/diff rely on.
+        The original value is kept under ``legacy_sequence``.
+        """
+        dict_messages = [m for m in messages if isinstance(m, dict)]
+        sequences = [m.get("sequence") for m in dict_messages]
+        in_order = all(isinstance(s, int) for s in sequences) and all(
+            a < b for a, b in zip(sequences, sequences[1:])
+        )
+        rows: List[Dict[str, Any]] = []
+        for position, message in enumerate(dict_messages, start=1):
+            row = dict(message)
+            if not in_order:
+                if "sequence" in row:
+                    row["legacy_sequence"] = row["sequence"]
+                row["sequence"] = position
+            row["chat_id"] = chat_id
+            row["app_id"] = app_id
+            rows.append(row)
+        return rows, not in_order
+
+    @staticmethod
+    def _unchanged_since(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Filter matching the session only while its transcript is as ``doc`` saw it."""
+        guard: Dict[str, Any] = {}
+        if "last_sequence" in doc:
+            guard["last_sequence"] = doc["last_sequence"]
+        else:  # legacy sessions written before sequences were tracked
+            guard["last_sequence"] = {"$in": [0, None]}
+        if isinstance(doc.get("messages"), list):
+            guard["messages"] = {"$size": len(doc["messages"])}
+        else:
+            guard["messages"] = None  # missing or null
+        return guard
+
+    async def migrate_session(self, sessions_coll, *, chat_id: str, app_id: str) -> bool:
+        """Move one session's embedded ``messages`` into ChatMessages.
+
+        Idempotent: rows for the chat are replaced wholesale, and the session is
+        only flipped to the collection layout if neither ``last_sequence`` nor
+        the length of the embedded array changed while copying (optimistic
+        concurrency against embedded writers, which reserve a sequence and push
+        in separate writes). Returns True when the session ends up in the
+        collection layout.
+        """
+        entry = self._migration_locks.setdefault(chat_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                for _ in range(_MIGRATION_ATTEMPTS):
+                    scope = {"_id": chat_id, **build_app_scope_filter(app_id)}
+                    doc = await sessions_coll.find_one(
+                        scope, {"messages": 1, "message_storage": 1, "last_sequence": 1}
+                    )
+                    if not doc:
+                        return False
+                    if session_uses_collection(doc):
+                        return True
+                    rows, renumbered = self._build_rows(chat_id, app_id, doc.get("messages") or [])
+                    coll = await self._messages_coll()
+                    await coll.delete_many(self._scope(chat_id, app_id))
+                    if rows:
+                        await coll.insert_many(rows, ordered=True)
+                    update: Dict[str, Any] = {
+                        "$set": {
+                            "message_storage": MESSAGE_STORAGE_COLLECTION,
+                            "messages_migrated_at": datetime.now(UTC),
+                        },
+                        "$unset": {"messages": ""},
+                    }
+                    if renumbered:
+                        update["$set"]["last_sequence"] = len(rows)
+                    res = await sessions_coll.update_one({**scope, **self._unchanged_since(doc)}, update)
+                    if res.modified_count > 0:
+                        logger.info(
+                            "[MESSAGE_STORE] Migrated embedded transcript",
+                            extra={"chat_id": chat_id, "app_id": app_id, "messages": len(rows), "renumbered": renumbered},
+                        )
+                        return True
+                    logger.debug("[MESSAGE_STORE] Transcript moved during migration; retrying chat_id=%s", chat_id)
+                logger.warning("[MESSAGE_STORE] Migration did not settle for chat_id=%s", chat_id)
+                return False
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                self._migration_locks.pop(chat_id, None)
+
+    async def migrate_embedded_sessions(
+        self,
+        sessions_coll,
+        *,
+        app_id: Optional[str] = None,
+        batch_size: int = 100,
+    ) -> int:
+        """Bulk-migrate every embedded session (optionally scoped to one app)."""
+        query: Dict[str, Any] = {"message_storage": {"$ne": MESSAGE_STORAGE_COLLECTION}}
+        if app_id:
+            query.update(build_app_scope_filter(app_id))
+        migrated = 0
+        cursor = sessions_coll.find(query, {"_id": 1, "app_id": 1}).batch_size(max(1, int(batch_size)))
+        async for doc in cursor:
+            doc_app_id = doc.get("app_id")
+            if not doc_app_id:
+                continue
+            if await self.migrate_session(sessions_coll, chat_id=doc["_id"], app_id=str(doc_app_id)):
+                migrated += 1
+        logger.info("[MESSAGE_STORE] Bulk migration finished", extra={"migrated": migrated, "app_id": app_id})
+        return migrated
+
+
+__all__ = [
+    "MESSAGE_STORAGE_EMBEDDED",
+    "MESSAGE_STORAGE_COLLECTION",
+    "ChatMessageStore",
+    "resolve_message_storage_mode",
+    "session_uses_collection",
+]
@@ -15,17 +15,26 @@ from __future__ import annotations
 import asyncio
 import json
 import os
-from datetime import datetime, UTC, timedelta
-from typing import Dict, List, Any, Optional, Union, cast
+from datetime import datetime, UTC
+from typing import Dict, List, Any, Optional, Tuple, Union, cast
 import hashlib
 from copy import deepcopy
 import textwrap
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from uuid import uuid4
 from mozaiks_infra.logs.logging_config import get_workflow_logger
 from mozaiks_ai.runtime.core_config import get_mongo_client
 from mozaiks_ai.runtime.multitenant import build_app_scope_filter, coalesce_app_id, dual_write_app_scope
 from ..models import WorkflowStatus
+from .message_store import (
+    MESSAGE_STORAGE_COLLECTION,
+    ChatMessageStore,
+    resolve_message_storage_mode,
+    session_uses_collection,
+)
+from .write_behind import PendingMessage, get_write_behind
+from .artifact_state import ArtifactStateStore, _apply_json_patch  # noqa: F401 - re-exported
 from autogen.events.base_event import BaseEvent
 from autogen.events.agent_events import TextEvent
 from mozaiks_ai.runtime.workflow.outputs.structured import agent_has_structured_output, get_structured_output_model_fields
@@ -48,106 +57,6 @@ def _resolve_agent_log_limit(env_key: str, default: Optional[int]) -> Optional[i
     return None if parsed <= 0 else parsed
 
 
-def _decode_json_pointer(segment: str) -> str:
-    return segment.replace("~1", "/").replace("~0", "~")
-
-
-def _apply_json_patch(target: Any, patch_ops: Optional[List[Dict[str, Any]]]) -> Any:
-    if not isinstance(patch_ops, list):
-        return target
-
-    result = deepcopy(target) if target is not None else {}
-    if not isinstance(result, (dict, list)):
-        result = {}
-
-    def _is_index(seg: str) -> bool:
-        if seg == "-":
-            return True
-        try:
-            int(seg)
-            return True
-        except Exception:
-            return False
-
-    def _parse_index(seg: str, length: int) -> Optional[int]:
-        if seg == "-":
-            return length
-        try:
-            return int(seg)
-        except Exception:
-            return None
-
-    for op in patch_ops:
-        if not isinstance(op, dict):
-            continue
-        operation = op.get("op")
-        path = op.get("path")
-        if not isinstance(path, str):
-            path = ""
-        segments = path.split("/")[1:] if path else []
-
-        if not segments:
-            if operation in ("add", "replace"):
-                result = deepcopy(op.get("value"))
-            elif operation == "remove":
-                result = None
-            continue
-
-        parent = result
-        for idx, raw_seg in enumerate(segments[:-1]):
-            seg = _decode_json_pointer(raw_seg)
-            next_seg = segments[idx + 1]
-            next_is_index = _is_index(next_seg)
-            if isinstance(parent, list):
-                index = _parse_index(seg, len(parent))
-                if index is None:
-                    parent = None
-                    break
-                if index >= len(parent):
-                    while len(parent) < index:
-                        parent.append({} if not next_is_index else [])
-                    parent.append({} if not next_is_index else [])
-                if not isinstance(parent[index], (dict, list)):
-                    parent[index] = {} if not next_is_index else []
-                parent = parent[index]
-            elif isinstance(parent, dict):
-                if seg not in parent or not isinstance(parent[seg], (dict, list)):
-                    parent[seg] = {} if not next_is_index else []
-                parent = parent[seg]
-            else:
-                parent = None
-                break
-
-        if parent is None:
-            continue
-
-        last_seg = _decode_json_pointer(segments[-1])
-        if isinstance(parent, list):
-            index = _parse_index(last_seg, len(parent))
-            if index is None:
-                continue
-            if operation == "remove":
-                if 0 <= index < len(parent):
-                    parent.pop(index)
-            elif operation == "add":
-                if index >= len(parent):
-                    parent.append(op.get("value"))
-                else:
-                    parent.insert(index, op.get("value"))
-            elif operation == "replace":
-                if 0 <= index < len(parent):
-                    parent[index] = op.get("value")
-                elif index == len(parent):
-                    parent.append(op.get("value"))
-        elif isinstance(parent, dict):
-            if operation == "remove":
-                parent.pop(last_seg, None)
-            elif operation in ("add", "replace"):
-                parent[last_seg] = op.get("value")
-
-    return result
-
-
 _AGENT_CONV_JSON_MAX_LEN = _resolve_agent_log_limit("AGENT_CONV_JSON_MAX_LEN", None)
 _AGENT_CONV_TEXT_MAX_LEN = _resolve_agent_log_limit("AGENT_CONV_TEXT_MAX_LEN", None)
 
@@ -156,6 +65,15 @@ _GENERAL_CHAT_COUNTER_COLLECTION = "GeneralChatCounters"
 _ARTIFACT_STATE_COLLECTION = "ArtifactStates"
 
 
+def _failed_write_indexes(error: Exception, count: int) -> set:
+    """Indexes of the ``count`` bulk ops that may not have been applied."""
+    if isinstance(error, BulkWriteError) and not error.details.get("writeConcernErrors"):
+        failed = {int(err["index"]) for err in error.details.get("writeErrors") or []}
+        if failed:
+            return failed
+    return set(range(count))
+
+
 class PersistenceManager:
     """Mongo connection holder for runtime persistence."""
 
@@ -249,8 +167,12 @@ class AG2PersistenceManager:
     WorkflowStats: holds unified live rollup documents (mon_{app}_{workflow}).
 
     Per-event normalized rows were intentionally disabled to reduce collection noise.
-    Replay/resume relies on ChatSessions.messages; metrics aggregate in real-time
+    Replay/resume relies on the session transcript; metrics aggregate in real-time
     in the mon_ rollup documents.
+
+    With CHAT_MESSAGE_STORAGE=collection the transcript moves out of
+    ChatSessions.messages into the sequence-indexed ChatMessages collection
+    (see message_store.py); sessions record their layout in ``message_storage``.
     """
 
     def __init__(self):
@@ -258,6 +180,11 @@ class AG2PersistenceManager:
         logger.info("AG2PersistenceManager (lean) ready")
         self._workflow_stats_indexes_checked = False
         self._artifact_state_indexes_checked = False
+        self._message_storage_mode = resolve_message_storage_mode()
+        self.message_store = ChatMessageStore(self.persistence)
+        self.artifact_states = ArtifactStateStore(self.persistence, self._artifact_state_coll)
+        # chat_ids known to use the collection layout (skips per-write migration checks)
+        self._collection_layout_chats: set[str] = set()
 
     async def _coll(self, collection_name: Optional[str] = None):
         await self.persistence._ensure_client()
@@ -389,7 +316,137 @@ class AG2PersistenceManager:
             )
         return seed
 
+    # Transcript layout ------------------------------------------------
+    async def _prepare_message_layout(self, coll, chat_id: str, app_id: Optional[str]) -> Optional[str]:
+        """Ensure the session uses the collection layout when that mode is active.
+
+        Returns MESSAGE_STORAGE_COLLECTION when the transcript is known to live in
+        ChatMessages, otherwise None (caller falls back to the session's own field).
+        """
+        if chat_id in self._collection_layout_chats:
+            return MESSAGE_STORAGE_COLLECTION
+        if self._message_storage_mode != MESSAGE_STORAGE_COLLECTION or not app_id:
+            return None
+        if await self.message_store.migrate_session(coll, chat_id=chat_id, app_id=str(app_id)):
+            self._collection_layout_chats.add(chat_id)
+            return MESSAGE_STORAGE_COLLECTION
+        return None
+
+    async def _store_message(
+        self,
+        coll,
+        *,
+        chat_id: str,
+        app_id: Optional[str],
+        scope_filter: Dict[str, Any],
+        msg: Dict[str, Any],
+        layout: Optional[str],
+    ) -> None:
+        if layout == MESSAGE_STORAGE_COLLECTION and app_id:
+            await self.message_store.append(chat_id=chat_id, app_id=str(app_id), message=msg)
+            return
+        await coll.update_one(
+            {"_id": chat_id, **scope_filter},
+            {"$push": {"messages": msg}, "$set": {"last_updated_at": datetime.now(UTC)}},
+        )
+
+    async def _load_messages(
+        self,
+        doc: Dict[str, Any],
+        *,
+        chat_id: str,
+        app_id: str,
+        after_sequence: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return a session's transcript (optionally only sequence > after_sequence)."""
+        if session_uses_collection(doc):
+            return await self.message_store.fetch(
+                chat_id=chat_id,
+                app_id=app_id,
+                after_sequence=int(after_sequence) if after_sequence is not None else 0,
+            )
+        msgs = doc.get("messages", []) or []
+        if after_sequence is None:
+            return msgs
+        return [m for m in msgs if isinstance(m, dict) and m.get("sequence", 0) > int(after_sequence)]
+
+    async def append_chat_message(
+        self,
+        *,
+        chat_id: str,
+        app_id: Optional[str],
+        message: Dict[str, Any],
+    ) -> Optional[int]:
+        """Allocate the next sequence for a chat and persist ``message`` under it.
+
+        ``app_id`` may be None for callers that only know the chat_id (legacy
+        transport paths); the session's own app_id is used for the message row.
+        Returns the assigned sequence, or None when the session does not exist.
+        """
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        scope_filter = build_app_scope_filter(str(resolved_app_id)) if resolved_app_id else {}
+        # Buffered agent messages must take their sequences before this one
+        await self.flush_pending_writes(chat_id)
+        coll = await self._coll()
+        layout_app_id = resolved_app_id
+        if not layout_app_id and self._message_storage_mode == MESSAGE_STORAGE_COLLECTION:
+            owner = await coll.find_one({"_id": chat_id}, {"app_id": 1})
+            layout_app_id = coalesce_app_id(app_id=(owner or {}).get("app_id"))
+        layout = await self._prepare_message_layout(coll, chat_id, layout_app_id)
+        now = datetime.now(UTC)
+        bump = await coll.find_one_and_update(
+            {"_id": chat_id, **scope_filter},
+            {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": now}},
+            projection={"last_sequence": 1, "app_id": 1, "message_storage": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not bump:
+            return None
+        seq = int(bump.get("last_sequence", 1))
+        if session_uses_collection(bump):
+            layout = MESSAGE_STORAGE_COLLECTION
+        msg = dict(message)
+        msg["sequence"] = seq
+        await self._store_message(
+            coll,
+            chat_id=chat_id,
+            app_id=resolved_app_id or bump.get("app_id"),
+            scope_filter=scope_filter,
+            msg=msg,
+            layout=layout,
+        )
+        return seq
+
+    async def migrate_message_storage(self, *, app_id: Optional[str] = None, batch_size: int = 100) -> int:
+        """Move embedded transcripts into ChatMessages; returns sessions migrated."""
+        coll = await self._coll()
+        return await self.message_store.migrate_embedded_sessions(coll, app_id=app_id, batch_size=batch_size)
+
+    async def load_chat_transcript(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        after_sequence: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return ``{"status", "last_sequence", "messages"}`` for a chat regardless of layout."""
+        await self.flush_pending_writes(chat_id)
+        coll = await self._coll()
+        layout = await self._prepare_message_layout(coll, chat_id, app_id)
+        projection: Dict[str, Any] = {"status": 1, "last_sequence": 1, "message_storage": 1}
+        if layout != MESSAGE_STORAGE_COLLECTION:
+            projection["messages"] = 1
+        doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(str(app_id))}, projection)
+        if not doc:
+            return None
+        return {
+            "status": doc.get("status"),
+            "last_sequence": int(doc.get("last_sequence", 0) or 0),
+            "messages": await self._load_messages(doc, chat_id=chat_id, app_id=str(app_id), after_sequence=after_sequence),
+        }
+
     # Artifact state persistence ---------------------------------------
+    # Heads, versions and the patch log live in ArtifactStateStore (artifact_state.py).
     async def upsert_artifact_state(
         self,
         *,
@@ -409,43 +466,14 @@ class AG2PersistenceManager:
             raise ValueError("chat_id is required")
 
         try:
-            coll = await self._artifact_state_coll()
-            now = datetime.now(UTC)
-            try:
-                safe_state = json.loads(json.dumps(state, default=str))
-            except Exception:
-                safe_state = state if isinstance(state, (dict, list)) else {"value": str(state)}
-
-            doc: Dict[str, Any] = {
-                "artifact_id": artifact_id,
-                "chat_id": chat_id,
-                "app_id": resolved_app_id,
-                "workflow_name": workflow_name,
-                "state": safe_state,
-                "updated_at": now,
-            }
-            if isinstance(ttl_seconds, int) and ttl_seconds > 0:
-                doc["ttl_seconds"] = ttl_seconds
-                doc["expires_at"] = now + timedelta(seconds=ttl_seconds)
-            else:
-                doc["ttl_seconds"] = None
-                doc["expires_at"] = None
-
-            doc = dual_write_app_scope(doc, resolved_app_id)
-
-            await coll.update_one(
-                {
-                    "artifact_id": artifact_id,
-                    "chat_id": chat_id,
-                    **build_app_scope_filter(resolved_app_id),
-                },
-                {
-                    "$set": doc,
-                    "$setOnInsert": {"created_at": now},
-                },
-                upsert=True,
+            return await self.artifact_states.write_state(
+                app_id=resolved_app_id,
+                artifact_id=artifact_id,
+                chat_id=chat_id,
+                state=state,
+                workflow_name=workflow_name,
+                ttl_seconds=ttl_seconds,
             )
-            return doc
         except Exception as e:  # pragma: no cover
             logger.debug("Failed to upsert artifact state for %s: %s", artifact_id, e)
             return None
@@ -482,6 +510,32 @@ class AG2PersistenceManager:
             logger.debug("Failed to fetch artifact state for %s: %s", artifact_id, e)
             return None
 
+    async def get_artifact_state_since(
+        self,
+        *,
+        artifact_id: str,
+        chat_id: str,
+        app_id: Optional[str] = None,
+        since_version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Deltas ``(since_version, head]`` when still logged, else the head snapshot."""
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        if not artifact_id or not chat_id:
+            raise ValueError("artifact_id and chat_id are required")
+
+        try:
+            return await self.artifact_states.get_sync(
+                app_id=resolved_app_id,
+                artifact_id=artifact_id,
+                chat_id=chat_id,
+                since_version=since_version,
+            )
+        except Exception as e:  # pragma: no cover
+            logger.debug("Failed to sync artifact state for %s: %s", artifact_id, e)
+            return None
+
     async def apply_artifact_patch(
         self,
         *,
@@ -491,27 +545,28 @@ class AG2PersistenceManager:
         patch_ops: Optional[List[Dict[str, Any]]],
         workflow_name: Optional[str] = None,
         ttl_seconds: Optional[int] = None,
+        with_version: bool = False,
     ) -> Optional[Any]:
-        if not artifact_id or not chat_id:
-            return None
-        current_doc = await self.get_artifact_state(
-            artifact_id=artifact_id,
-            app_id=app_id,
-            chat_id=chat_id,
-        )
-        base_state = {}
-        if current_doc and isinstance(current_doc.get("state"), (dict, list)):
-            base_state = current_doc.get("state")
-        next_state = _apply_json_patch(base_state, patch_ops)
-        await self.upsert_artifact_state(
-            artifact_id=artifact_id,
-            chat_id=chat_id,
-            app_id=app_id,
-            state=next_state,
-            workflow_name=workflow_name,
-            ttl_seconds=ttl_seconds,
-        )
-        return next_state
+        """Apply a JSON patch to the artifact head and log it.
+
+        Returns the next state, or ``(next_state, version)`` with ``with_version``.
+        """
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not artifact_id or not chat_id or not resolved_app_id:
+            return (None, None) if with_version else None
+        try:
+            next_state, version = await self.artifact_states.apply_patch(
+                app_id=resolved_app_id,
+                artifact_id=artifact_id,
+                chat_id=chat_id,
+                patch_ops=patch_ops,
+                workflow_name=workflow_name,
+                ttl_seconds=ttl_seconds,
+            )
+        except Exception as e:  # pragma: no cover
+            logger.debug("Failed to apply artifact patch for %s: %s", artifact_id, e)
+            next_state, version = None, None
+        return (next_state, version) if with_version else next_state
 
     # Chat sessions -----------------------------------------------------
     async def create_chat_session(
@@ -545,8 +600,11 @@ class AG2PersistenceManager:
                 # persisted UI context for multi-user resume of active artifact/tool panel
                 # null until first artifact/tool emission is persisted via update_last_artifact()
                 "last_artifact": None,
-                "messages": [],
             }
+            if self._message_storage_mode == MESSAGE_STORAGE_COLLECTION:
+                session_doc["message_storage"] = MESSAGE_STORAGE_COLLECTION
+            else:
+                session_doc["messages"] = []
 
             if isinstance(extra_fields, dict) and extra_fields:
                 # Prevent callers from overwriting canonical identifiers/state.
@@ -561,6 +619,7 @@ class AG2PersistenceManager:
                     "last_updated_at",
                     "last_sequence",
                     "messages",
+                    "message_storage",
                 }
                 for k, v in list(extra_fields.items()):
                     if not isinstance(k, str) or not k.strip():
@@ -571,6 +630,8 @@ class AG2PersistenceManager:
 
             session_doc = dual_write_app_scope(session_doc, resolved_app_id)
             await coll.insert_one(session_doc)
+            if session_uses_collection(session_doc):
+                self._collection_layout_chats.add(chat_id)
             # Initialize / upsert unified real-time rollup doc (mon_{app_id}_{workflow_name})
             # We maintain a single rollup document that is updated live instead of
             # a per-chat metrics_{chat_id} document plus a completion rollup.
@@ -651,6 +712,8 @@ class AG2PersistenceManager:
                 "last_updated_at",
                 "last_sequence",
                 "messages",
+                "message_storage",
+                "messages_migrated_at",
                 "last_artifact",
             }
             extra: Dict[str, Any] = {}
@@ -738,6 +801,7 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            await self.flush_pending_writes(chat_id)
             coll = await self._coll()
             now = datetime.now(UTC)
             # Fetch created_at & usage to compute duration for rollup averages
@@ -753,6 +817,7 @@ class AG2PersistenceManager:
                 "last_updated_at": now,
                 "duration_sec": dur,
             }})
+            self._collection_layout_chats.discard(chat_id)
             # Fire & forget rollup refresh (no await block on success path)
             if res.modified_count > 0:
                 try:  # pragma: no cover
@@ -848,10 +913,18 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            await self.flush_pending_writes(chat_id)
             coll = await self._coll()
-            base_doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, {"messages": {"$slice": -5}})
+            layout = await self._prepare_message_layout(coll, chat_id, resolved_app_id)
+            base_doc = await coll.find_one(
+                {"_id": chat_id, **build_app_scope_filter(resolved_app_id)},
+                {"messages": {"$slice": -5}, "message_storage": 1},
+            )
             recent: List[Dict[str, Any]] = []
-            if base_doc and isinstance(base_doc.get("messages"), list):
+            if session_uses_collection(base_doc):
+                layout = MESSAGE_STORAGE_COLLECTION
+                recent = await self.message_store.fetch_tail(chat_id=chat_id, app_id=resolved_app_id, limit=5)
+            elif base_doc and isinstance(base_doc.get("messages"), list):
                 recent = [m for m in base_doc["messages"] if isinstance(m, dict)]
             for m in messages:
                 role = m.get("role") or "user"
@@ -867,6 +940,7 @@ class AG2PersistenceManager:
                 bump = await coll.find_one_and_update(
                     {"_id": chat_id, **build_app_scope_filter(resolved_app_id)},
                     {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": datetime.now(UTC)}},
+                    projection={"last_sequence": 1},
                     return_document=ReturnDocument.AFTER,
                 )
                 seq = int(bump.get("last_sequence", 1)) if bump else 1
@@ -879,9 +953,13 @@ class AG2PersistenceManager:
                     "sequence": seq,
                     "agent_name": m.get("name") or ("user" if role == "user" else "assistant"),
                 }
-                await coll.update_one(
-                    {"_id": chat_id, **build_app_scope_filter(resolved_app_id)},
-                    {"$push": {"messages": msg_doc}, "$set": {"last_updated_at": datetime.now(UTC)}},
+                await self._store_message(
+                    coll,
+                    chat_id=chat_id,
+                    app_id=resolved_app_id,
+                    scope_filter=build_app_scope_filter(resolved_app_id),
+                    msg=msg_doc,
+                    layout=layout,
                 )
                 recent.append(msg_doc)
                 logger.debug(
@@ -902,16 +980,15 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
-            coll = await self._coll()
-            doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, {"messages": 1, "status": 1})
+            transcript = await self.load_chat_transcript(chat_id=chat_id, app_id=resolved_app_id)
             
-            if not doc:
+            if not transcript:
                 logger.warning(f"[RESUME_CHAT] No document found for chat_id={chat_id} app_id={resolved_app_id}")
                 return None
             
-            status = int(doc.get("status", -1))
+            status = int(transcript.get("status", -1))
             status_name = WorkflowStatus(status).name if status in [s.value for s in WorkflowStatus] else "UNKNOWN"
-            msgs = doc.get("messages", [])
+            msgs = transcript["messages"]
             
             logger.info(f"[RESUME_CHAT] chat_id={chat_id} status={status_name}({status}) messages_count={len(msgs)}")
             
@@ -1137,18 +1214,21 @@ class AG2PersistenceManager:
 
         Assumes every persisted message carries an authoritative 'sequence'
         integer; absence of that field is considered a data integrity issue and
-        results in those messages being ignored for diff purposes.
+        results in those messages being ignored for diff purposes. In the
+        collection layout this is an indexed range query on ChatMessages.
         """
         resolved_app_id = coalesce_app_id(app_id=app_id)
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
-            coll = await self._coll()
-            doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))}, {"messages": 1})
-            if not doc:
+            transcript = await self.load_chat_transcript(
+                chat_id=chat_id,
+                app_id=str(resolved_app_id),
+                after_sequence=int(last_sequence),
+            )
+            if not transcript:
                 return []
-            msgs = doc.get("messages", [])
-            return [m for m in msgs if isinstance(m, dict) and m.get("sequence", 0) > int(last_sequence)]
+            return transcript["messages"]
         except Exception as e:  # pragma: no cover
             logger.warning(f"Failed to fetch event diff for {chat_id}: {e}")
             return []
@@ -1163,228 +1243,371 @@ class AG2PersistenceManager:
             if not isinstance(event, TextEvent):
                 return
             # After the isinstance guard, we can safely treat event as TextEvent for type checkers
-            text_event = cast(TextEvent, event)
+            msg = self._text_event_to_message(cast(TextEvent, event))
+            write_behind = get_write_behind()
+            if write_behind is not None:
+                # Sequence, structured output and agent log are applied at flush time
+                await write_behind.enqueue_message(self, chat_id=chat_id, app_id=str(resolved_app_id), message=msg)
+                return
             coll = await self._coll()
+            layout = await self._prepare_message_layout(coll, chat_id, resolved_app_id)
             # Atomically bump per-session sequence counter and read new value
             try:
                 bump = await coll.find_one_and_update(
                     {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
                     {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": datetime.now(UTC)}},
+                    projection={"last_sequence": 1, "workflow_name": 1, "message_storage": 1},
                     return_document=ReturnDocument.AFTER,
                 )
                 seq = int(bump.get("last_sequence", 1)) if bump else 1
                 wf_name = bump.get("workflow_name") if bump else None
+                if session_uses_collection(bump):
+                    layout = MESSAGE_STORAGE_COLLECTION
             except Exception as e:
                 logger.warning(f"Failed to update sequence counter for {chat_id}: {e}")
                 seq = 1
                 wf_name = None
-            event_id = getattr(text_event, "id", None) or getattr(text_event, "event_id", None) or getattr(text_event, "event_uuid", None) or str(uuid4())
-            sender_obj = getattr(text_event, "sender", None)
-            raw_name = getattr(sender_obj, "name", None) if sender_obj else None
-            raw_content = getattr(text_event, "content", "")
+            msg["sequence"] = seq
+            # Structured output attachment (if agent registered for structured outputs in workflow)
+            self._attach_structured_output(msg, wf_name)
+            await self._store_message(
+                coll,
+                chat_id=chat_id,
+                app_id=resolved_app_id,
+                scope_filter=build_app_scope_filter(str(resolved_app_id)),
+                msg=msg,
+                layout=layout,
+            )
+            self._log_agent_message(msg, chat_id=chat_id, app_id=str(resolved_app_id))
+        except Exception as e:  # pragma: no cover
+            logger.error(f"Failed to save event for {chat_id}: {e}")
 
-            # Helper: attempt extraction from dict-like content
-            def _extract_name_from_content(rc: Any) -> Optional[str]:
-                try:
-                    if isinstance(rc, dict):
-                        for k in ("sender", "agent", "agent_name", "name"):
-                            v = rc.get(k)
-                            if isinstance(v, str) and v.strip():
-                                return v.strip()
-                    return None
-                except Exception:  # pragma: no cover
-                    return None
+    def _text_event_to_message(self, text_event: TextEvent) -> Dict[str, Any]:
+        """Normalize an AG2 TextEvent into a transcript message (without ``sequence``)."""
+        event_id = getattr(text_event, "id", None) or getattr(text_event, "event_id", None) or getattr(text_event, "event_uuid", None) or str(uuid4())
+        sender_obj = getattr(text_event, "sender", None)
+        raw_name = getattr(sender_obj, "name", None) if sender_obj else None
+        raw_content = getattr(text_event, "content", "")
 
-            if not raw_name:
-                # If the raw content is a pydantic / dataclass / object with dict method, attempt that
-                if hasattr(raw_content, "model_dump"):
-                    try:
-                        raw_name = _extract_name_from_content(raw_content.model_dump())  # type: ignore
-                    except Exception:
-                        pass
-                if not raw_name and hasattr(raw_content, "dict"):
-                    try:
-                        raw_name = _extract_name_from_content(raw_content.dict())  # type: ignore
-                    except Exception:
-                        pass
-                if not raw_name:
-                    raw_name = _extract_name_from_content(raw_content)
-            # Fallback: parse from string representation if still missing
-            if not raw_name:
+        # Helper: attempt extraction from dict-like content
+        def _extract_name_from_content(rc: Any) -> Optional[str]:
+            try:
+                if isinstance(rc, dict):
+                    for k in ("sender", "agent", "agent_name", "name"):
+                        v = rc.get(k)
+                        if isinstance(v, str) and v.strip():
+                            return v.strip()
+                return None
+            except Exception:  # pragma: no cover
+                return None
+
+        if not raw_name:
+            # If the raw content is a pydantic / dataclass / object with dict method, attempt that
+            if hasattr(raw_content, "model_dump"):
                 try:
-                    txt_for_parse = None
-                    if isinstance(raw_content, str):
-                        txt_for_parse = raw_content
-                    else:
-                        # Convert to str only if small to avoid huge dumps
-                        dumped = str(raw_content)
-                        if len(dumped) < 5000:
-                            txt_for_parse = dumped
-                    if txt_for_parse:
-                        import re
-                        # Try both sender='Name' and "sender": "Name" JSON style
-                        m = re.search(r"sender(?:=|\"\s*:)['\"](?P<sender>[^'\"\\]+)['\"]", txt_for_parse)
-                        if m:
-                            raw_name = m.group("sender").strip()
-                except Exception as e:
-                    logger.debug(f"Failed to parse sender from string content: {e}")
-            if not raw_name:
-                raw_name = "assistant"  # final fallback
-            name_lower = raw_name.lower()
-            role = "user" if name_lower in ("user", "userproxy", "userproxyagent") else "assistant"
-            # Preserve structured content when possible
-            if isinstance(raw_content, (dict, list)):
+                    raw_name = _extract_name_from_content(raw_content.model_dump())  # type: ignore
+                except Exception:
+                    pass
+            if not raw_name and hasattr(raw_content, "dict"):
                 try:
-                    content_str = json.dumps(raw_content)[:10000]
-                except (TypeError, ValueError) as e:
-                    logger.debug(f"Failed to serialize content as JSON: {e}")
-                    content_str = str(raw_content)
-            else:
-                content_str = str(raw_content)
-            # --------------------------------------------------
-            # Post-process: extract inner message content to avoid storing the
-            # verbose debug string: "uuid=UUID('...') content='...' sender='Agent' ..."
-            # We keep only the 'content' portion; if that portion looks like JSON
-            # we attempt to parse & re-dump for clean storage.
-            # --------------------------------------------------
+                    raw_name = _extract_name_from_content(raw_content.dict())  # type: ignore
+                except Exception:
+                    pass
+            if not raw_name:
+                raw_name = _extract_name_from_content(raw_content)
+        # Fallback: parse from string representation if still missing
+        if not raw_name:
             try:
-                # Fast check to avoid regex cost when pattern absent
-                if "content=" in content_str and " sender=" in content_str:
+                txt_for_parse = None
+                if isinstance(raw_content, str):
+                    txt_for_parse = raw_content
+                else:
+                    # Convert to str only if small to avoid huge dumps
+                    dumped = str(raw_content)
+                    if len(dumped) < 5000:
+                        txt_for_parse = dumped
+                if txt_for_parse:
                     import re
-                    import json as _json
-                    # Non-greedy capture between content=quote and the next quote before sender=
-                    m = re.search(r"content=(?:'|\")(?P<inner>.*?)(?:'|\")\s+sender=", content_str, re.DOTALL)
+                    # Try both sender='Name' and "sender": "Name" JSON style
+                    m = re.search(r"sender(?:=|\"\s*:)['\"](?P<sender>[^'\"\\]+)['\"]", txt_for_parse)
                     if m:
-                        inner = m.group("inner").strip()
-                        cleaned: Any = inner
-                        if inner.startswith("{") or inner.startswith("["):
-                            try:
-                                parsed = _json.loads(inner)
-                                # Re-dump to normalized string with no escaping issues
-                                cleaned = _json.dumps(parsed, ensure_ascii=False)
-                            except Exception:
-                                # leave as raw string if JSON parse fails
-                                pass
-                        content_str = cleaned if isinstance(cleaned, str) else _json.dumps(cleaned, ensure_ascii=False)
-            except Exception as _ce:  # pragma: no cover
-                logger.debug(f"Content clean failed: {_ce}")
-            ts = getattr(event, "timestamp", None)
-            evt_ts = datetime.fromtimestamp(ts) if isinstance(ts, (int, float)) else datetime.now(UTC)
-            msg = {
-                "role": role,
-                "content": content_str,
-                "timestamp": evt_ts,
-                "event_type": "message.created",
-                "event_id": event_id,
-                "sequence": seq,
-            }
-            if role == "assistant":
-                msg["agent_name"] = raw_name
-            else:
-                msg["agent_name"] = "user"
-            # Structured output attachment (if agent registered for structured outputs in workflow)
-            try:
-                if role == "assistant" and wf_name and raw_name and agent_has_structured_output(wf_name, raw_name):
-                    # Attempt to parse JSON from cleaned content
-                    parsed = self._extract_json_from_text(content_str, agent_name=raw_name)
-                    if parsed:
-                        normalized = self._normalize_structured_output(raw_name, parsed)
-                        if normalized != parsed:
-                            logger.warning(
-                                f"[SAVE_EVENT] Normalized structured output for {raw_name}"
-                            )
-                        msg["structured_output"] = normalized
-                        schema_fields = get_structured_output_model_fields(wf_name, raw_name) or {}
-                        if schema_fields:
-                            msg["structured_schema"] = schema_fields
-                        logger.info(f"[SAVE_EVENT] ✓ Added structured_output for {raw_name}")
-                    else:
-                        logger.warning(f"[SAVE_EVENT] ✗ Failed to parse JSON for {raw_name}, content_preview: {content_str[:200] if content_str else '(empty)'}")
-            except Exception as so_err:  # pragma: no cover
-                logger.debug(f"[SAVE_EVENT] Structured output parse skipped agent={raw_name}: {so_err}")
-            await coll.update_one(
-                {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
-                {"$push": {"messages": msg}, "$set": {"last_updated_at": datetime.now(UTC)}},
-            )
-            
-            # Log agent conversation to dedicated file with pretty formatting
+                        raw_name = m.group("sender").strip()
+            except Exception as e:
+                logger.debug(f"Failed to parse sender from string content: {e}")
+        if not raw_name:
+            raw_name = "assistant"  # final fallback
+        name_lower = raw_name.lower()
+        role = "user" if name_lower in ("user", "userproxy", "userproxyagent") else "assistant"
+        # Preserve structured content when possible
+        if isinstance(raw_content, (dict, list)):
             try:
-                import logging as _logging
+                content_str = json.dumps(raw_content)[:10000]
+            except (TypeError, ValueError) as e:
+                logger.debug(f"Failed to serialize content as JSON: {e}")
+                content_str = str(raw_content)
+        else:
+            content_str = str(raw_content)
+        # --------------------------------------------------
+        # Post-process: extract inner message content to avoid storing the
+        # verbose debug string: "uuid=UUID('...') content='...' sender='Agent' ..."
+        # We keep only the 'content' portion; if that portion looks like JSON
+        # we attempt to parse & re-dump for clean storage.
+        # --------------------------------------------------
+        try:
+            # Fast check to avoid regex cost when pattern absent
+            if "content=" in content_str and " sender=" in content_str:
+                import re
                 import json as _json
-                agent_conv_logger = _logging.getLogger("mozaiks.workflow.agent_messages")
-                agent_name = msg.get("agent_name", "unknown")
-                
-                # Try to parse and pretty-print JSON content
-                display_content = content_str
-                is_json = False
-                if content_str.strip().startswith('{') or content_str.strip().startswith('['):
-                    try:
-                        parsed = _json.loads(content_str)
-                        # Pretty print with indentation
-                        display_content = _json.dumps(parsed, indent=2, ensure_ascii=False)
-                        is_json = True
-                    except Exception:
-                        # Not valid JSON, use as-is
-                        pass
-                
-                # Optional truncation (controlled via env) and text wrapping
-                max_len = _AGENT_CONV_JSON_MAX_LEN if is_json else _AGENT_CONV_TEXT_MAX_LEN
-                truncated_suffix = ""
-                if max_len is not None and len(display_content) > max_len:
-                    display_content = display_content[:max_len]
-                    truncated_suffix = "\n... (truncated)"
-
-                if not is_json and display_content:
-                    wrapped_lines: list[str] = []
-                    split_lines = display_content.splitlines() or [display_content]
-                    for raw_line in split_lines:
-                        if not raw_line.strip():
-                            wrapped_lines.append("")
-                            continue
-                        wrapped_lines.extend(
-                            textwrap.wrap(
-                                raw_line,
-                                width=100,
-                                break_long_words=False,
-                                break_on_hyphens=False,
-                            )
+                # Non-greedy capture between content=quote and the next quote before sender=
+                m = re.search(r"content=(?:'|\")(?P<inner>.*?)(?:'|\")\s+sender=", content_str, re.DOTALL)
+                if m:
+                    inner = m.group("inner").strip()
+                    cleaned: Any = inner
+                    if inner.startswith("{") or inner.startswith("["):
+                        try:
+                            parsed = _json.loads(inner)
+                            # Re-dump to normalized string with no escaping issues
+                            cleaned = _json.dumps(parsed, ensure_ascii=False)
+                        except Exception:
+                            # leave as raw string if JSON parse fails
+                            pass
+                    content_str = cleaned if isinstance(cleaned, str) else _json.dumps(cleaned, ensure_ascii=False)
+        except Exception as _ce:  # pragma: no cover
+            logger.debug(f"Content clean failed: {_ce}")
+        ts = getattr(text_event, "timestamp", None)
+        evt_ts = datetime.fromtimestamp(ts) if isinstance(ts, (int, float)) else datetime.now(UTC)
+        msg = {
+            "role": role,
+            "content": content_str,
+            "timestamp": evt_ts,
+            "event_type": "message.created",
+            "event_id": event_id,
+        }
+        if role == "assistant":
+            msg["agent_name"] = raw_name
+        else:
+            msg["agent_name"] = "user"
+        return msg
+
+    def _attach_structured_output(self, msg: Dict[str, Any], wf_name: Optional[str]) -> None:
+        role = msg.get("role")
+        raw_name = msg.get("agent_name")
+        content_str = msg.get("content") or ""
+        try:
+            if role == "assistant" and wf_name and raw_name and agent_has_structured_output(wf_name, raw_name):
+                # Attempt to parse JSON from cleaned content
+                parsed = self._extract_json_from_text(content_str, agent_name=raw_name)
+                if parsed:
+                    normalized = self._normalize_structured_output(raw_name, parsed)
+                    if normalized != parsed:
+                        logger.warning(
+                            f"[SAVE_EVENT] Normalized structured output for {raw_name}"
                         )
-                    display_content = "\n".join(wrapped_lines)
-
-                if truncated_suffix:
-                    display_content = f"{display_content}{truncated_suffix}"
-
-                # Add visual separator and metadata block for readability
-                separator = "=" * 80
-                meta_lines = [
-                    f"agent: {agent_name}",
-                    f"chat_id: {chat_id}",
-                    f"app_id: {resolved_app_id}",
-                    f"app_id: {resolved_app_id}",
-                    f"sequence: {seq}",
-                    f"event_id: {event_id}",
-                ]
-                body = display_content if display_content else "(empty)"
-                log_message = (
-                    f"\n{separator}\n"
-                    + "\n".join(meta_lines)
-                    + f"\n{separator}\n{body}\n"
-                )
-                
-                agent_conv_logger.info(
-                    log_message,
-                    extra={
-                        "chat_id": chat_id,
-                        "app_id": resolved_app_id,
-                        "sequence": seq,
-                        "event_id": event_id,
-                    }
-                )
-            except Exception as log_err:  # pragma: no cover
-                logger.debug(f"Failed to log agent conversation: {log_err}")
-                
-        except Exception as e:  # pragma: no cover
-            logger.error(f"Failed to save event for {chat_id}: {e}")
+                    msg["structured_output"] = normalized
+                    schema_fields = get_structured_output_model_fields(wf_name, raw_name) or {}
+                    if schema_fields:
+                        msg["structured_schema"] = schema_fields
+                    logger.info(f"[SAVE_EVENT] ✓ Added structured_output for {raw_name}")
+                else:
+                    logger.warning(f"[SAVE_EVENT] ✗ Failed to parse JSON for {raw_name}, content_preview: {content_str[:200] if content_str else '(empty)'}")
+        except Exception as so_err:  # pragma: no cover
+            logger.debug(f"[SAVE_EVENT] Structured output parse skipped agent={raw_name}: {so_err}")
+
+    def _log_agent_message(self, msg: Dict[str, Any], *, chat_id: str, app_id: str) -> None:
+        """Log agent conversation to dedicated file with pretty formatting."""
+        content_str = str(msg.get("content") or "")
+        resolved_app_id = app_id
+        seq = msg.get("sequence")
+        event_id = msg.get("event_id")
+        try:
+            import logging as _logging
+            import json as _json
+            agent_conv_logger = _logging.getLogger("mozaiks.workflow.agent_messages")
+            agent_name = msg.get("agent_name", "unknown")
+
+            # Try to parse and pretty-print JSON content
+            display_content = content_str
+            is_json = False
+            if content_str.strip().startswith('{') or content_str.strip().startswith('['):
+                try:
+                    parsed = _json.loads(content_str)
+                    # Pretty print with indentation
+                    display_content = _json.dumps(parsed, indent=2, ensure_ascii=False)
+                    is_json = True
+                except Exception:
+                    # Not valid JSON, use as-is
+                    pass
+
+            # Optional truncation (controlled via env) and text wrapping
+            max_len = _AGENT_CONV_JSON_MAX_LEN if is_json else _AGENT_CONV_TEXT_MAX_LEN
+            truncated_suffix = ""
+            if max_len is not None and len(display_content) > max_len:
+                display_content = display_content[:max_len]
+                truncated_suffix = "\n... (truncated)"
+
+            if not is_json and display_content:
+                wrapped_lines: list[str] = []
+                split_lines = display_content.splitlines() or [display_content]
+                for raw_line in split_lines:
+                    if not raw_line.strip():
+                        wrapped_lines.append("")
+                        continue
+                    wrapped_lines.extend(
+                        textwrap.wrap(
+                            raw_line,
+                            width=100,
+                            break_long_words=False,
+                            break_on_hyphens=False,
+                        )
+                    )
+                display_content = "\n".join(wrapped_lines)
+
+            if truncated_suffix:
+                display_content = f"{display_content}{truncated_suffix}"
+
+            # Add visual separator and metadata block for readability
+            separator = "=" * 80
+            meta_lines = [
+                f"agent: {agent_name}",
+                f"chat_id: {chat_id}",
+                f"app_id: {resolved_app_id}",
+                f"app_id: {resolved_app_id}",
+                f"sequence: {seq}",
+                f"event_id: {event_id}",
+            ]
+            body = display_content if display_content else "(empty)"
+            log_message = (
+                f"\n{separator}\n"
+                + "\n".join(meta_lines)
+                + f"\n{separator}\n{body}\n"
+            )
+
+            agent_conv_logger.info(
+                log_message,
+                extra={
+                    "chat_id": chat_id,
+                    "app_id": resolved_app_id,
+                    "sequence": seq,
+                    "event_id": event_id,
+                }
+            )
+        except Exception as log_err:  # pragma: no cover
+            logger.debug(f"Failed to log agent conversation: {log_err}")
+
+    async def _flush_message_batches(self, batches: Dict[Tuple[str, str], List[PendingMessage]]) -> None:
+        """Persist write-behind message batches.
+
+        One ``$inc`` per chat reserves a contiguous sequence range for the
+        messages that do not have a sequence yet (so ordering matches enqueue
+        order); messages put back by an earlier failed flush keep the sequence
+        they were given. All embedded transcripts are then appended with a
+        single unordered ``bulk_write`` of ``$push $each`` and all
+        collection-layout rows with a single unordered ``bulk_write``.
+
+        A retry never writes a message twice: retried embedded messages whose
+        sequence is already in the transcript are skipped, and retried rows are
+        upserted on ``(app_id, chat_id, sequence)``. On a partial
+        ``BulkWriteError`` only the chats/rows named in ``writeErrors`` stay in
+        ``batches``; everything stored (or dropped because the session is gone)
+        is removed, so after an error ``batches`` holds exactly what still
+        needs writing.
+        """
+        coll = await self._coll()
+        now = datetime.now(UTC)
+        session_ops: List[UpdateOne] = []
+        session_items: List[Tuple[Tuple[str, str], List[PendingMessage]]] = []
+        row_batches: List[Tuple[str, str, List[Dict[str, Any]]]] = []
+        row_items: List[Tuple[Tuple[str, str], PendingMessage]] = []
+        rows_retried = False
+        written: List[Tuple[str, str, Dict[str, Any]]] = []
+        for key, pending in list(batches.items()):
+            chat_id, app_id = key
+            if not pending:
+                batches.pop(key)
+                continue
+            scope_filter = build_app_scope_filter(app_id)
+            layout = await self._prepare_message_layout(coll, chat_id, app_id)
+            fresh = [item for item in pending if item.sequence is None]
+            bump = await coll.find_one_and_update(
+                {"_id": chat_id, **scope_filter},
+                {"$inc": {"last_sequence": len(fresh)}, "$set": {"last_updated_at": now}},
+                projection={"last_sequence": 1, "workflow_name": 1, "message_storage": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not bump:
+                logger.warning(f"[WRITE_BEHIND] Chat {chat_id} not found; dropping {len(pending)} buffered messages")
+                batches.pop(key)
+                continue
+            if session_uses_collection(bump):
+                layout = MESSAGE_STORAGE_COLLECTION
+            first_seq = int(bump.get("last_sequence", len(fresh))) - len(fresh) + 1
+            for offset, item in enumerate(fresh):
+                item.sequence = first_seq + offset
+            retried = len(fresh) < len(pending)
+            if retried and layout != MESSAGE_STORAGE_COLLECTION:
+                # An earlier attempt may have landed without being acknowledged.
+                stored = await coll.find_one({"_id": chat_id, **scope_filter}, {"messages.sequence": 1})
+                present = {m.get("sequence") for m in (stored or {}).get("messages") or [] if isinstance(m, dict)}
+                pending = [item for item in pending if item.sequence not in present]
+                if not pending:
+                    batches.pop(key)
+                    continue
+            wf_name = bump.get("workflow_name")
+            msgs: List[Dict[str, Any]] = []
+            for item in pending:
+                msg = item.message
+                msg["sequence"] = item.sequence
+                self._attach_structured_output(msg, wf_name)
+                msgs.append(msg)
+            if layout == MESSAGE_STORAGE_COLLECTION:
+                row_batches.append((chat_id, app_id, msgs))
+                row_items.extend((key, item) for item in pending)
+                rows_retried = rows_retried or retried
+            else:
+                session_ops.append(UpdateOne(
+                    {"_id": chat_id, **scope_filter},
+                    {"$push": {"messages": {"$each": msgs}}, "$set": {"last_updated_at": now}},
+                ))
+                session_items.append((key, pending))
+
+        error: Optional[Exception] = None
+        if session_ops:
+            failed: set = set()
+            try:
+                await coll.bulk_write(session_ops, ordered=False)
+            except Exception as e:
+                error = e
+                failed = _failed_write_indexes(e, len(session_ops))
+            for index, (key, items) in enumerate(session_items):
+                if index in failed:
+                    batches[key] = items
+                else:
+                    batches.pop(key, None)
+                    written.extend((key[0], key[1], item.message) for item in items)
+        if row_batches:
+            failed = set()
+            try:
+                await self.message_store.append_batches(row_batches, idempotent=rows_retried)
+            except Exception as e:
+                error = error or e
+                failed = _failed_write_indexes(e, len(row_items))
+            for chat_id, app_id, _ in row_batches:
+                batches.pop((chat_id, app_id), None)
+            for index, (key, item) in enumerate(row_items):
+                if index in failed:
+                    batches.setdefault(key, []).append(item)
+                else:
+                    written.append((key[0], key[1], item.message))
+        for chat_id, app_id, msg in written:
+            self._log_agent_message(msg, chat_id=chat_id, app_id=app_id)
+        if error is not None:
+            raise error
+
+    async def flush_pending_writes(self, chat_id: Optional[str] = None) -> None:
+        """Drain write-behind buffers (all chats, or only if ``chat_id`` has pending writes)."""
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            await write_behind.flush(chat_id)
 
     async def save_usage_summary_event(
         self,
@@ -1450,24 +1673,105 @@ class AG2PersistenceManager:
 
         Replaces per-chat metrics document updates. We directly mutate the
         rollup doc (mon_{app_id}_{workflow_name}) so UI / analytics can read
-        a single authoritative structure during execution.
+        a single authoritative structure during execution. With write-behind
+        enabled, deltas are coalesced per chat/agent and applied on flush.
         """
         resolved_app_id = coalesce_app_id(app_id=app_id)
         if not resolved_app_id:
             raise ValueError("app_id is required")
+        if event_ts is None:
+            event_ts = datetime.now(UTC)
         try:
-            stats_coll = await self._workflow_stats_coll()
-            summary_id = f"mon_{resolved_app_id}_{workflow_name}"
-            total_tokens = prompt_tokens + completion_tokens
-            now = datetime.now(UTC)
-            if event_ts is None:
-                event_ts = now
+            write_behind = get_write_behind()
+            if write_behind is not None:
+                await write_behind.enqueue_metrics(
+                    self,
+                    chat_id=chat_id,
+                    app_id=str(resolved_app_id),
+                    user_id=user_id,
+                    workflow_name=workflow_name,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    cost_usd=cost_usd,
+                    agent_name=agent_name,
+                    event_ts=event_ts,
+                    duration_sec=duration_sec,
+                    session_type=session_type,
+                )
+                return
+            await self._apply_session_metrics(
+                chat_id=chat_id,
+                app_id=str(resolved_app_id),
+                workflow_name=workflow_name,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost_usd=cost_usd,
+                agent_name=agent_name,
+                event_ts=event_ts,
+                duration_sec=duration_sec,
+                session_type=session_type,
+            )
+        except Exception as e:  # pragma: no cover
+            logger.error(f"Failed to update session metrics for {chat_id}: {e}")
+
+    async def _apply_session_metrics(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        workflow_name: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+        agent_name: Optional[str],
+        event_ts: Optional[datetime],
+        duration_sec: float,
+        session_type: str,
+    ) -> None:
+        """Apply one (possibly coalesced) usage delta to the rollup document.
+
+        Round trips: previous timestamps read, one ordered ``bulk_write`` for
+        seeding + increments, the ChatSessions usage counters, and a single
+        read/write pair to refresh overall and per-agent averages.
+        """
+        stats_coll = await self._workflow_stats_coll()
+        summary_id = f"mon_{app_id}_{workflow_name}"
+        total_tokens = prompt_tokens + completion_tokens
+        now = datetime.now(UTC)
+        if event_ts is None:
+            event_ts = now
+        chat_path = f"chat_sessions.{chat_id}"
+        agent_path = f"agents.{agent_name}" if agent_name else None
+        agent_session_path = f"{agent_path}.sessions.{chat_id}" if agent_path else None
+
+        # Duration deltas: prefer provided duration_sec, else time since the stored last_event_ts
+        chat_duration_delta = max(0.0, duration_sec)
+        duration_delta = max(0.0, duration_sec)
+        if duration_delta <= 0:
+            try:
+                projection = {f"{chat_path}.last_event_ts": 1}
+                if agent_session_path:
+                    projection[f"{agent_session_path}.last_event_ts"] = 1
+                prev_ts_doc = await stats_coll.find_one({"_id": summary_id}, projection) or {}
+                prev_chat_ts = ((prev_ts_doc.get("chat_sessions") or {}).get(chat_id) or {}).get("last_event_ts")
+                if isinstance(prev_chat_ts, datetime):
+                    chat_duration_delta = max(0.0, (event_ts - prev_chat_ts).total_seconds())  # type: ignore
+                if agent_name:
+                    prev_agent = (prev_ts_doc.get("agents") or {}).get(agent_name) or {}
+                    prev_agent_ts = ((prev_agent.get("sessions") or {}).get(chat_id) or {}).get("last_event_ts")
+                    if isinstance(prev_agent_ts, datetime):
+                        duration_delta = max(0.0, (event_ts - prev_agent_ts).total_seconds())  # type: ignore
+            except Exception:
+                chat_duration_delta = 0.0
+                duration_delta = 0.0
+
+        ops: List[UpdateOne] = [
             # Ensure base summary & chat session containers exist
-            await stats_coll.update_one(
+            UpdateOne(
                 {"_id": summary_id},
                 {"$setOnInsert": {
                     "_id": summary_id,
-                    "app_id": resolved_app_id,
+                    "app_id": app_id,
                     "workflow_name": workflow_name,
                     "last_updated_at": now,
                     "overall_avg": {
@@ -1479,12 +1783,13 @@ class AG2PersistenceManager:
                     },
                     "chat_sessions": {},
                     "agents": {}
-                }}, upsert=True
-            )
+                }},
+                upsert=True,
+            ),
             # Seed chat session metrics if absent
-            await stats_coll.update_one(
-                {"_id": summary_id, f"chat_sessions.{chat_id}": {"$exists": False}},
-                {"$set": {f"chat_sessions.{chat_id}": {
+            UpdateOne(
+                {"_id": summary_id, chat_path: {"$exists": False}},
+                {"$set": {chat_path: {
                     "duration_sec": 0.0,
                     "prompt_tokens": 0,
                     "completion_tokens": 0,
@@ -1492,142 +1797,105 @@ class AG2PersistenceManager:
                     "cost_total_usd": 0.0,
                     # Track per-chat last event time to accumulate duration between usage deltas
                     "last_event_ts": event_ts
-                }}, "$setOnInsert": {"last_updated_at": now}}
-            )
-            # Increment per-chat metrics
-            inc_ops = {
-                f"chat_sessions.{chat_id}.prompt_tokens": prompt_tokens,
-                f"chat_sessions.{chat_id}.completion_tokens": completion_tokens,
-                f"chat_sessions.{chat_id}.total_tokens": total_tokens,
-                f"chat_sessions.{chat_id}.cost_total_usd": cost_usd,
+                }}},
+            ),
+        ]
+        inc_ops = {
+            f"{chat_path}.prompt_tokens": prompt_tokens,
+            f"{chat_path}.completion_tokens": completion_tokens,
+            f"{chat_path}.total_tokens": total_tokens,
+            f"{chat_path}.cost_total_usd": cost_usd,
+        }
+        if chat_duration_delta > 0:
+            inc_ops[f"{chat_path}.duration_sec"] = chat_duration_delta
+        ops.append(UpdateOne(
+            {"_id": summary_id},
+            {"$inc": inc_ops, "$set": {"last_updated_at": now, f"{chat_path}.last_event_ts": event_ts}},
+        ))
+
+        # Per-agent session metrics (with duration accumulation based on event timestamp)
+        if agent_path and agent_session_path:
+            ops.append(UpdateOne(
+                {"_id": summary_id, agent_path: {"$exists": False}},
+                {"$set": {agent_path: {
+                    "avg": {
+                        "avg_duration_sec": 0.0,
+                        "avg_prompt_tokens": 0,
+                        "avg_completion_tokens": 0,
+                        "avg_total_tokens": 0,
+                        "avg_cost_total_usd": 0.0,
+                    },
+                    "sessions": {}
+                }}},
+            ))
+            ops.append(UpdateOne(
+                {"_id": summary_id, agent_session_path: {"$exists": False}},
+                {"$set": {agent_session_path: {
+                    "duration_sec": 0.0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                    "cost_total_usd": 0.0
+                }}},
+            ))
+            agent_inc = {
+                f"{agent_session_path}.prompt_tokens": prompt_tokens,
+                f"{agent_session_path}.completion_tokens": completion_tokens,
+                f"{agent_session_path}.total_tokens": total_tokens,
+                f"{agent_session_path}.cost_total_usd": cost_usd,
             }
-            # Compute chat-level duration delta, prefer provided duration_sec
-            chat_duration_delta = max(0.0, duration_sec)
-            if chat_duration_delta <= 0:
-                try:
-                    prev_ts_doc = await stats_coll.find_one({"_id": summary_id}, {f"chat_sessions.{chat_id}.last_event_ts": 1})
-                    prev_session = None
-                    if prev_ts_doc:
-                        prev_cs_map = prev_ts_doc.get("chat_sessions") or {}
-                        prev_session = prev_cs_map.get(chat_id) or {}
-                    prev_ts_val = prev_session.get("last_event_ts") if prev_session else None  # type: ignore
-                    if isinstance(prev_ts_val, datetime):
-                        chat_duration_delta = max(0.0, (event_ts - prev_ts_val).total_seconds())  # type: ignore
-                except Exception:
-                    chat_duration_delta = 0.0
-            if chat_duration_delta > 0:
-                inc_ops[f"chat_sessions.{chat_id}.duration_sec"] = chat_duration_delta
-            await stats_coll.update_one({"_id": summary_id}, {"$inc": inc_ops, "$set": {"last_updated_at": now, f"chat_sessions.{chat_id}.last_event_ts": event_ts}})
-
-            # Also reflect usage counters directly inside ChatSessions doc so rollup recompute stays consistent
-            chat_coll = await (self._general_coll() if session_type == "general" else self._coll())
-            await chat_coll.update_one(
-                {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
-                {"$inc": {
-                    "usage_prompt_tokens_final": prompt_tokens,
-                    "usage_completion_tokens_final": completion_tokens,
-                    "usage_total_tokens_final": total_tokens,
-                    "usage_total_cost_final": cost_usd,
-                }, "$set": {"last_updated_at": now, "app_id": resolved_app_id}}
-            )
+            if duration_delta > 0:
+                agent_inc[f"{agent_session_path}.duration_sec"] = duration_delta
+            ops.append(UpdateOne(
+                {"_id": summary_id},
+                {"$inc": agent_inc, "$set": {f"{agent_session_path}.last_event_ts": event_ts}},
+            ))
+        await stats_coll.bulk_write(ops, ordered=True)
+
+        # Also reflect usage counters directly inside ChatSessions doc so rollup recompute stays consistent
+        chat_coll = await (self._general_coll() if session_type == "general" else self._coll())
+        await chat_coll.update_one(
+            {"_id": chat_id, **build_app_scope_filter(str(app_id))},
+            {"$inc": {
+                "usage_prompt_tokens_final": prompt_tokens,
+                "usage_completion_tokens_final": completion_tokens,
+                "usage_total_tokens_final": total_tokens,
+                "usage_total_cost_final": cost_usd,
+            }, "$set": {"last_updated_at": now, "app_id": app_id}}
+        )
 
-            # Per-agent session metrics (with duration accumulation based on event timestamp)
-            if agent_name:
-                # Seed agent container & agent.session container if absent
-                await stats_coll.update_one(
-                    {"_id": summary_id, f"agents.{agent_name}": {"$exists": False}},
-                    {"$set": {f"agents.{agent_name}": {
-                        "avg": {
-                            "avg_duration_sec": 0.0,
-                            "avg_prompt_tokens": 0,
-                            "avg_completion_tokens": 0,
-                            "avg_total_tokens": 0,
-                            "avg_cost_total_usd": 0.0,
-                        },
-                        "sessions": {}
-                    }}}
-                )
-                await stats_coll.update_one(
-                    {"_id": summary_id, f"agents.{agent_name}.sessions.{chat_id}": {"$exists": False}},
-                    {"$set": {f"agents.{agent_name}.sessions.{chat_id}": {
-                        "duration_sec": 0.0,
-                        "prompt_tokens": 0,
-                        "completion_tokens": 0,
-                        "total_tokens": 0,
-                        "cost_total_usd": 0.0
-                    }}}
-                )
-                agent_inc = {
-                    f"agents.{agent_name}.sessions.{chat_id}.prompt_tokens": prompt_tokens,
-                    f"agents.{agent_name}.sessions.{chat_id}.completion_tokens": completion_tokens,
-                    f"agents.{agent_name}.sessions.{chat_id}.total_tokens": total_tokens,
-                    f"agents.{agent_name}.sessions.{chat_id}.cost_total_usd": cost_usd,
-                }
-                # Compute duration delta using last_event_ts (stored per agent session)
-                duration_delta = max(0.0, duration_sec)
-                if duration_delta <= 0:
-                    try:
-                        prev_ts_doc = await stats_coll.find_one({"_id": summary_id}, {f"agents.{agent_name}.sessions.{chat_id}.last_event_ts": 1})
-                        prev_session = None
-                        if prev_ts_doc:
-                            prev_agents = prev_ts_doc.get("agents") or {}
-                            prev_agent = prev_agents.get(agent_name) or {}
-                            prev_sessions = prev_agent.get("sessions") or {}
-                            prev_session = prev_sessions.get(chat_id) or {}
-                        prev_ts_val = prev_session.get("last_event_ts") if prev_session else None  # type: ignore
-                        if isinstance(prev_ts_val, datetime):
-                            duration_delta = max(0.0, (event_ts - prev_ts_val).total_seconds())  # type: ignore
-                        else:
-                            duration_delta = 0.0
-                    except Exception:
-                        duration_delta = 0.0
-                if duration_delta > 0:
-                    agent_inc[f"agents.{agent_name}.sessions.{chat_id}.duration_sec"] = duration_delta
-                # Apply increments and set last_event_ts
-                await stats_coll.update_one({"_id": summary_id}, {"$inc": agent_inc, "$set": {f"agents.{agent_name}.sessions.{chat_id}.last_event_ts": event_ts}})
-
-            # Recompute averages (simple read & aggregate) -- small doc so acceptable.
-            doc = await stats_coll.find_one({"_id": summary_id}, {"chat_sessions": 1, "agents": 1})
-            if doc and isinstance(doc.get("chat_sessions"), dict):
-                cs = doc["chat_sessions"]
-                n = len(cs) if cs else 0
-                if n:
-                    total_prompt = sum(int(v.get("prompt_tokens", 0)) for v in cs.values())
-                    total_completion = sum(int(v.get("completion_tokens", 0)) for v in cs.values())
-                    total_total = sum(int(v.get("total_tokens", 0)) for v in cs.values())
-                    total_cost = sum(float(v.get("cost_total_usd", 0.0)) for v in cs.values())
-                    total_duration = sum(float(v.get("duration_sec", 0.0)) for v in cs.values())
-                    await stats_coll.update_one(
-                        {"_id": summary_id},
-                        {"$set": {
-                            "overall_avg.avg_prompt_tokens": int(total_prompt / n),
-                            "overall_avg.avg_completion_tokens": int(total_completion / n),
-                            "overall_avg.avg_total_tokens": int(total_total / n),
-                            "overall_avg.avg_cost_total_usd": (total_cost / n),
-                            "overall_avg.avg_duration_sec": (total_duration / n),
-                        }}
-                    )
-            if agent_name:
-                doc = await stats_coll.find_one({"_id": summary_id}, {f"agents.{agent_name}": 1})
-                ag = doc.get("agents", {}).get(agent_name) if doc else None
-                if ag and isinstance(ag.get("sessions"), dict):
-                    sess_map = ag["sessions"]
-                    an = len(sess_map)
-                    if an:
-                        ap = sum(int(v.get("prompt_tokens", 0)) for v in sess_map.values())
-                        ac = sum(int(v.get("completion_tokens", 0)) for v in sess_map.values())
-                        at = sum(int(v.get("total_tokens", 0)) for v in sess_map.values())
-                        acost = sum(float(v.get("cost_total_usd", 0.0)) for v in sess_map.values())
-                        adur = sum(float(v.get("duration_sec", 0.0)) for v in sess_map.values())
-                        await stats_coll.update_one({"_id": summary_id}, {"$set": {
-                            f"agents.{agent_name}.avg.avg_prompt_tokens": int(ap / an),
-                            f"agents.{agent_name}.avg.avg_completion_tokens": int(ac / an),
-                            f"agents.{agent_name}.avg.avg_total_tokens": int(at / an),
-                            f"agents.{agent_name}.avg.avg_cost_total_usd": (acost / an),
-                            f"agents.{agent_name}.avg.avg_duration_sec": (adur / an),
-                        }})
-        except Exception as e:  # pragma: no cover
-            logger.error(f"Failed to update session metrics for {chat_id}: {e}")
+        # Recompute averages (simple read & aggregate) -- small doc so acceptable.
+        projection = {"chat_sessions": 1}
+        if agent_path:
+            projection[agent_path] = 1
+        doc = await stats_coll.find_one({"_id": summary_id}, projection)
+        if not doc:
+            return
+        avg_set: Dict[str, Any] = {}
+        cs = doc.get("chat_sessions")
+        if isinstance(cs, dict) and cs:
+            n = len(cs)
+            avg_set.update({
+                "overall_avg.avg_prompt_tokens": int(sum(int(v.get("prompt_tokens", 0)) for v in cs.values()) / n),
+                "overall_avg.avg_completion_tokens": int(sum(int(v.get("completion_tokens", 0)) for v in cs.values()) / n),
+                "overall_avg.avg_total_tokens": int(sum(int(v.get("total_tokens", 0)) for v in cs.values()) / n),
+                "overall_avg.avg_cost_total_usd": sum(float(v.get("cost_total_usd", 0.0)) for v in cs.values()) / n,
+                "overall_avg.avg_duration_sec": sum(float(v.get("duration_sec", 0.0)) for v in cs.values()) / n,
+            })
+        if agent_name:
+            ag = (doc.get("agents") or {}).get(agent_name)
+            sess_map = ag.get("sessions") if isinstance(ag, dict) else None
+            if isinstance(sess_map, dict) and sess_map:
+                an = len(sess_map)
+                avg_set.update({
+                    f"{agent_path}.avg.avg_prompt_tokens": int(sum(int(v.get("prompt_tokens", 0)) for v in sess_map.values()) / an),
+                    f"{agent_path}.avg.avg_completion_tokens": int(sum(int(v.get("completion_tokens", 0)) for v in sess_map.values()) / an),
+                    f"{agent_path}.avg.avg_total_tokens": int(sum(int(v.get("total_tokens", 0)) for v in sess_map.values()) / an),
+                    f"{agent_path}.avg.avg_cost_total_usd": sum(float(v.get("cost_total_usd", 0.0)) for v in sess_map.values()) / an,
+                    f"{agent_path}.avg.avg_duration_sec": sum(float(v.get("duration_sec", 0.0)) for v in sess_map.values()) / an,
+                })
+        if avg_set:
+            await stats_coll.update_one({"_id": summary_id}, {"$set": avg_set})
 
 
 #############################################
@@ -1872,17 +2140,37 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            await self.flush_pending_writes(chat_id)
             coll = await self._coll()
+            layout = await self._prepare_message_layout(coll, chat_id, resolved_app_id)
             
             # Find the chat document first
+            projection: Dict[str, Any] = {"message_storage": 1}
+            if layout != MESSAGE_STORAGE_COLLECTION:
+                projection["messages"] = 1
             doc = await coll.find_one(
                 {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
-                {"messages": 1}
+                projection,
             )
             
             if not doc:
                 logger.warning(f"[UI_TOOL_METADATA] Chat {chat_id} not found")
                 return
+
+            if session_uses_collection(doc):
+                sequence = await self.message_store.set_last_assistant_metadata(
+                    chat_id=chat_id,
+                    app_id=str(resolved_app_id),
+                    metadata={"ui_tool": metadata},
+                )
+                if sequence is None:
+                    logger.warning(f"[UI_TOOL_METADATA] No assistant message found in {chat_id}")
+                else:
+                    logger.info(
+                        f"[UI_TOOL_METADATA] Attached ui_tool metadata to message seq={sequence} "
+                        f"in {chat_id} (tool={metadata.get('ui_tool_id')}, event={event_id})"
+                    )
+                return
             
             messages = doc.get("messages", [])
             if not messages:
@@ -1952,7 +2240,38 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            await self.flush_pending_writes(chat_id)
             coll = await self._coll()
+            layout = await self._prepare_message_layout(coll, chat_id, resolved_app_id)
+            if layout != MESSAGE_STORAGE_COLLECTION:
+                doc = await coll.find_one(
+                    {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
+                    {"message_storage": 1},
+                )
+                if session_uses_collection(doc):
+                    layout = MESSAGE_STORAGE_COLLECTION
+            if layout == MESSAGE_STORAGE_COLLECTION:
+                modified = await self.message_store.update_ui_tool_state(
+                    chat_id=chat_id,
+                    app_id=str(resolved_app_id),
+                    event_id=event_id,
+                    fields={
+                        "ui_tool_completed": completed,
+                        "ui_tool_status": status,
+                        "completed_at": datetime.now(UTC).isoformat(),
+                    },
+                )
+                if modified > 0:
+                    logger.info(
+                        f"[UI_TOOL_COMPLETE] Updated completion for event={event_id} "
+                        f"in {chat_id} (completed={completed}, status={status})"
+                    )
+                else:
+                    logger.warning(
+                        f"[UI_TOOL_COMPLETE] No message found with ui_tool.event_id={event_id} "
+                        f"in {chat_id}"
+                    )
+                return
             
             # Find the message with matching ui_tool.event_id
             result = await coll.update_one(
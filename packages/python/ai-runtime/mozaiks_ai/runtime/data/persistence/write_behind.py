@@ -0,0 +1,473 @@
+# ==============================================================================
+# FILE: write_behind.py
+# DESCRIPTION: Batched write-behind stage for transcript messages and usage metrics
+# ==============================================================================
+
+"""Write-behind persistence for chatty group chats.
+
+``save_event`` and ``update_session_metrics`` normally hit Mongo on every AG2
+event (2+ round trips per message, several per usage delta). When
+``PERSISTENCE_WRITE_BEHIND`` is enabled they enqueue here instead:
+
+  * messages are buffered per chat and flushed with one sequence bump per chat
+    (``$inc last_sequence`` by the number of messages not yet numbered, so
+    sequences follow enqueue order) followed by a single ``bulk_write`` per
+    collection;
+  * metric deltas are coalesced per (app, workflow, chat, agent) key, summing
+    tokens/cost and keeping the latest event timestamp, so a burst of usage
+    events becomes one rollup update.
+
+A flush runs after ``PERSISTENCE_FLUSH_INTERVAL_MS`` or as soon as
+``PERSISTENCE_FLUSH_BATCH_SIZE`` items are pending. The buffer is bounded by
+``PERSISTENCE_QUEUE_MAX``; producers that hit the bound flush inline
+(backpressure) instead of growing memory. Readers of a chat's transcript call
+``flush(chat_id)`` first, and the buffer is drained on chat completion and on
+server shutdown.
+
+A failed flush puts back only the messages that were not written (a partial
+``BulkWriteError`` is resolved per op) and its deltas, in front of anything
+queued since, and the flush loop backs off exponentially (from
+``PERSISTENCE_FLUSH_RETRY_BACKOFF_MS``) before trying again. A retried message
+keeps the sequence it was given on the first attempt and is not written twice,
+so retries neither duplicate nor renumber the transcript. Entries that fail
+``PERSISTENCE_FLUSH_MAX_RETRIES`` times in a row are dropped with an error
+log, leaving a gap at their sequences; ``shutdown`` raises if anything was
+dropped or is still buffered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from mozaiks_infra.logs.logging_config import get_workflow_logger
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .persistence_manager import AG2PersistenceManager
+
+logger = get_workflow_logger("persistence")
+
+_TRUE_FLAG_VALUES = {"1", "true", "yes", "on"}
+
+
+def _env_int(key: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(key)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return max(minimum, int(raw.strip()))
+    except ValueError:
+        logger.warning("Invalid %s value '%s'; using default %s", key, raw, default)
+        return default
+
+
+def write_behind_enabled() -> bool:
+    return os.getenv("PERSISTENCE_WRITE_BEHIND", "false").strip().lower() in _TRUE_FLAG_VALUES
+
+
+@dataclass
+class PendingMessage:
+    """A transcript message waiting for its sequence number."""
+
+    message: Dict[str, Any]
+    enqueued_at: float
+    attempts: int = 0
+    sequence: Optional[int] = None  # reserved by the first flush attempt, kept across retries
+
+
+@dataclass
+class MetricDelta:
+    """Coalesced usage increments for one (app, workflow, chat, agent) key."""
+
+    user_id: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    duration_sec: float = 0.0
+    event_ts: Optional[datetime] = None
+    updates: int = 0
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def add(
+        self,
+        *,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+        duration_sec: float,
+        event_ts: Optional[datetime],
+    ) -> None:
+        self.prompt_tokens += int(prompt_tokens)
+        self.completion_tokens += int(completion_tokens)
+        self.cost_usd += float(cost_usd)
+        self.duration_sec += max(0.0, float(duration_sec))
+        if event_ts is not None and (self.event_ts is None or event_ts > self.event_ts):
+            self.event_ts = event_ts
+        self.updates += 1
+
+    def absorb(self, earlier: "MetricDelta") -> None:
+        """Fold a delta that failed to flush back into this newer one."""
+        self.prompt_tokens += earlier.prompt_tokens
+        self.completion_tokens += earlier.completion_tokens
+        self.cost_usd += earlier.cost_usd
+        self.duration_sec += earlier.duration_sec
+        if earlier.event_ts is not None and (self.event_ts is None or earlier.event_ts > self.event_ts):
+            self.event_ts = earlier.event_ts
+        self.updates += earlier.updates
+        self.attempts = earlier.attempts
+        self.enqueued_at = min(self.enqueued_at, earlier.enqueued_at)
+
+
+# (chat_id, app_id)
+_ChatKey = Tuple[str, str]
+# (app_id, workflow_name, chat_id, agent_name, session_type)
+_MetricKey = Tuple[str, str, str, Optional[str], str]
+
+
+class PersistenceWriteBehind:
+    """Process-wide coalescing buffer in front of AG2PersistenceManager writes."""
+
+    def __init__(
+        self,
+        *,
+        flush_interval_ms: Optional[int] = None,
+        flush_batch_size: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff_ms: Optional[int] = None,
+    ):
+        self.flush_interval_s = (
+            flush_interval_ms if flush_interval_ms is not None else _env_int("PERSISTENCE_FLUSH_INTERVAL_MS", 50)
+        ) / 1000.0
+        self.flush_batch_size = flush_batch_size or _env_int("PERSISTENCE_FLUSH_BATCH_SIZE", 100)
+        self.max_pending = max_pending or _env_int("PERSISTENCE_QUEUE_MAX", 10_000)
+        self.max_retries = (
+            max_retries if max_retries is not None else _env_int("PERSISTENCE_FLUSH_MAX_RETRIES", 5, minimum=0)
+        )
+        self.retry_backoff_s = (
+            retry_backoff_ms if retry_backoff_ms is not None else _env_int("PERSISTENCE_FLUSH_RETRY_BACKOFF_MS", 200)
+        ) / 1000.0
+        self._failed_flushes = 0  # consecutive drains that left work behind
+        self._manager: Optional["AG2PersistenceManager"] = None
+        self._messages: Dict[_ChatKey, List[PendingMessage]] = {}
+        self._metrics: Dict[_MetricKey, MetricDelta] = {}
+        self._pending = 0
+        self._inflight_chats: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._has_work = asyncio.Event()
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._stats: Dict[str, float] = {
+            "flushes": 0,
+            "flushed_messages": 0,
+            "flushed_metric_updates": 0,
+            "coalesced_metric_updates": 0,
+            "flush_errors": 0,
+            "retried_messages": 0,
+            "retried_metric_updates": 0,
+            "dropped_messages": 0,
+            "dropped_metric_updates": 0,
+            "backpressure_waits": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "last_flush_lag_ms": 0.0,
+            "max_flush_lag_ms": 0.0,
+        }
+
+    # Producers ---------------------------------------------------------
+    def bind(self, manager: "AG2PersistenceManager") -> None:
+        if self._manager is None:
+            self._manager = manager
+
+    async def enqueue_message(
+        self,
+        manager: "AG2PersistenceManager",
+        *,
+        chat_id: str,
+        app_id: str,
+        message: Dict[str, Any],
+    ) -> None:
+        await self._reserve(manager)
+        self._messages.setdefault((chat_id, app_id), []).append(
+            PendingMessage(message=message, enqueued_at=time.monotonic())
+        )
+        self._added()
+
+    async def enqueue_metrics(
+        self,
+        manager: "AG2PersistenceManager",
+        *,
+        chat_id: str,
+        app_id: str,
+        user_id: str,
+        workflow_name: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+        agent_name: Optional[str],
+        event_ts: Optional[datetime],
+        duration_sec: float,
+        session_type: str,
+    ) -> None:
+        key: _MetricKey = (app_id, workflow_name, chat_id, agent_name, session_type)
+        delta = self._metrics.get(key)
+        if delta is None:
+            await self._reserve(manager)
+            # Re-check: another producer may have created the entry while we waited.
+            delta = self._metrics.get(key)
+            if delta is None:
+                delta = MetricDelta(user_id=user_id)
+                self._metrics[key] = delta
+                self._added()
+        else:
+            self._stats["coalesced_metric_updates"] += 1
+        delta.add(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=cost_usd,
+            duration_sec=duration_sec,
+            event_ts=event_ts,
+        )
+
+    async def _reserve(self, manager: "AG2PersistenceManager") -> None:
+        self.bind(manager)
+        self._ensure_task()
+        while self._pending >= self.max_pending:
+            self._stats["backpressure_waits"] += 1
+            await self.flush()
+            if self._failed_flushes:
+                await asyncio.sleep(self._retry_delay())
+
+    def _added(self) -> None:
+        self._pending += 1
+        self._has_work.set()
+        if self._pending >= self.flush_batch_size:
+            self._batch_ready.set()
+
+    def _ensure_task(self) -> None:
+        if self._closed or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run(), name="persistence-write-behind")
+
+    # Flushing ----------------------------------------------------------
+    def has_pending(self, chat_id: Optional[str] = None) -> bool:
+        if chat_id is None:
+            return self._pending > 0 or bool(self._inflight_chats)
+        if chat_id in self._inflight_chats:
+            return True
+        return any(key[0] == chat_id for key in self._messages) or any(
+            key[2] == chat_id for key in self._metrics
+        )
+
+    async def flush(self, chat_id: Optional[str] = None) -> None:
+        """Drain the buffer. With ``chat_id`` this is a no-op unless that chat has pending writes."""
+        if not self.has_pending(chat_id):
+            return
+        async with self._flush_lock:
+            await self._drain()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            await self._has_work.wait()
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._has_work.clear()
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # pragma: no cover
+                logger.error(f"[WRITE_BEHIND] Flush loop error: {e}")
+            if self._failed_flushes:
+                await asyncio.sleep(self._retry_delay())
+
+    def _retry_delay(self) -> float:
+        return min(30.0, self.retry_backoff_s * (2 ** max(0, self._failed_flushes - 1)))
+
+    def _restore_messages(self, failed: Dict[_ChatKey, List[PendingMessage]]) -> None:
+        """Put unwritten messages back ahead of anything enqueued since the swap."""
+        for key, batch in failed.items():
+            if not batch:
+                continue
+            attempts = batch[0].attempts + 1
+            if attempts > self.max_retries:
+                self._stats["dropped_messages"] += len(batch)
+                logger.error(
+                    f"[WRITE_BEHIND] Dropping {len(batch)} messages for chat {key[0]} after {attempts} failed flushes"
+                )
+                continue
+            for item in batch:
+                item.attempts = attempts
+            self._messages[key] = batch + self._messages.get(key, [])
+            self._pending += len(batch)
+            self._stats["retried_messages"] += len(batch)
+
+    def _restore_metrics(self, key: _MetricKey, delta: MetricDelta) -> None:
+        delta.attempts += 1
+        if delta.attempts > self.max_retries:
+            self._stats["dropped_metric_updates"] += delta.updates
+            logger.error(
+                f"[WRITE_BEHIND] Dropping {delta.updates} metric updates for chat {key[2]} "
+                f"after {delta.attempts} failed flushes"
+            )
+            return
+        newer = self._metrics.get(key)
+        if newer is None:
+            self._metrics[key] = delta
+            self._pending += 1
+        else:
+            newer.absorb(delta)
+        self._stats["retried_metric_updates"] += delta.updates
+
+    async def _drain(self) -> None:
+        if not self._messages and not self._metrics:
+            return
+        manager = self._manager
+        if manager is None:  # pragma: no cover
+            return
+        failed = False
+        messages, self._messages = self._messages, {}
+        metrics, self._metrics = self._metrics, {}
+        self._pending = 0
+        self._inflight_chats = {chat_id for chat_id, _ in messages} | {key[2] for key in metrics}
+
+        started = time.monotonic()
+        oldest = min(
+            [batch[0].enqueued_at for batch in messages.values() if batch]
+            + [delta.enqueued_at for delta in metrics.values()],
+            default=started,
+        )
+        lag_ms = (started - oldest) * 1000.0
+        try:
+            if messages:
+                total = sum(len(batch) for batch in messages.values())
+                try:
+                    await manager._flush_message_batches(messages)
+                except Exception as e:
+                    failed = True
+                    self._stats["flush_errors"] += 1
+                    logger.error(f"[WRITE_BEHIND] Message flush failed chats={len(messages)}: {e}")
+                    self._restore_messages(messages)
+                self._stats["flushed_messages"] += total - sum(len(batch) for batch in messages.values())
+            for (app_id, workflow_name, chat_id, agent_name, session_type), delta in metrics.items():
+                try:
+                    await manager._apply_session_metrics(
+                        chat_id=chat_id,
+                        app_id=app_id,
+                        workflow_name=workflow_name,
+                        prompt_tokens=delta.prompt_tokens,
+                        completion_tokens=delta.completion_tokens,
+                        cost_usd=delta.cost_usd,
+                        agent_name=agent_name,
+                        event_ts=delta.event_ts,
+                        duration_sec=delta.duration_sec,
+                        session_type=session_type,
+                    )
+                    self._stats["flushed_metric_updates"] += delta.updates
+                except Exception as e:
+                    failed = True
+                    self._stats["flush_errors"] += 1
+                    logger.error(f"[WRITE_BEHIND] Metrics flush failed for {chat_id}: {e}")
+                    self._restore_metrics((app_id, workflow_name, chat_id, agent_name, session_type), delta)
+        finally:
+            self._inflight_chats = set()
+            self._failed_flushes = self._failed_flushes + 1 if failed else 0
+            if failed and (self._messages or self._metrics):
+                self._has_work.set()
+            flush_ms = (time.monotonic() - started) * 1000.0
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = flush_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], flush_ms)
+            self._stats["last_flush_lag_ms"] = lag_ms
+            self._stats["max_flush_lag_ms"] = max(self._stats["max_flush_lag_ms"], lag_ms)
+
+    async def shutdown(self) -> None:
+        """Stop the flush loop and drain everything still buffered.
+
+        Failed flushes are retried with backoff; raises ``RuntimeError`` if any
+        buffered write could not be persisted.
+        """
+        self._closed = True
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        dropped_before = self._stats["dropped_messages"] + self._stats["dropped_metric_updates"]
+        async with self._flush_lock:
+            await self._drain()
+            # Every retry either succeeds or counts toward max_retries, so this ends.
+            while (self._messages or self._metrics) and self._manager is not None:
+                await asyncio.sleep(self._retry_delay())
+                await self._drain()
+        dropped = self._stats["dropped_messages"] + self._stats["dropped_metric_updates"] - dropped_before
+        if dropped:
+            raise RuntimeError(f"Write-behind shutdown lost {int(dropped)} buffered writes after retries")
+
+    # Introspection -----------------------------------------------------
+    def get_metrics(self) -> Dict[str, Any]:
+        pending_messages = sum(len(batch) for batch in self._messages.values())
+        return {
+            "enabled": True,
+            "pending_messages": pending_messages,
+            "pending_metric_keys": len(self._metrics),
+            "pending_chats": len(self._messages),
+            "max_pending": self.max_pending,
+            "flush_interval_ms": self.flush_interval_s * 1000.0,
+            "flush_batch_size": self.flush_batch_size,
+            **{k: (round(v, 3) if isinstance(v, float) else int(v)) for k, v in self._stats.items()},
+        }
+
+
+_write_behind: Optional[PersistenceWriteBehind] = None
+
+
+def get_write_behind() -> Optional[PersistenceWriteBehind]:
+    """Return the process-wide write-behind stage, or None when disabled."""
+    global _write_behind
+    if _write_behind is None and write_behind_enabled():
+        _write_behind = PersistenceWriteBehind()
+        logger.info(
+            "[WRITE_BEHIND] Enabled",
+            extra={
+                "flush_interval_ms": _write_behind.flush_interval_s * 1000.0,
+                "flush_batch_size": _write_behind.flush_batch_size,
+                "max_pending": _write_behind.max_pending,
+            },
+        )
+    return _write_behind
+
+
+async def shutdown_write_behind() -> None:
+    """Flush and stop the write-behind stage (no-op when it was never started)."""
+    global _write_behind
+    stage, _write_behind = _write_behind, None
+    if stage is not None:
+        await stage.shutdown()
+
+
+def get_write_behind_metrics() -> Dict[str, Any]:
+    stage = _write_behind
+    if stage is None:
+        return {"enabled": write_behind_enabled(), "pending_messages": 0, "pending_metric_keys": 0}
+    return stage.get_metrics()
+
+
+__all__ = [
+    "PersistenceWriteBehind",
+    "get_write_behind",
+    "get_write_behind_metrics",
+    "shutdown_write_behind",
+    "write_behind_enabled",
+]
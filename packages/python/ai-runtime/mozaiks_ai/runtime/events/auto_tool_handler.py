@@ -16,8 +16,9 @@ from typing import Any, Awaitable, Callable, Dict, Optional
 
 from pydantic import ValidationError
 
-from mozaiks_ai.runtime.workflow.agents.tools import load_agent_tool_functions
+from mozaiks_ai.runtime.workflow.bundle import get_workflow_bundle
 from mozaiks_ai.runtime.workflow.outputs.structured import get_structured_outputs_for_workflow
+from mozaiks_ai.runtime.events.dispatch_executor import awaits_input
 from mozaiks_ai.runtime.events.event_serialization import serialize_event_content
 from mozaiks_ai.runtime.transport.simple_transport import SimpleTransport
 from mozaiks_ai.runtime.workflow.context.adapter import create_context_container
@@ -50,6 +51,7 @@ class AutoToolEventHandler:
         self._processed_keys: set[str] = set()
         self._processed_order: asyncio.Queue[str] = asyncio.Queue()
 
+    @awaits_input  # UI tools wait for the user with no timeout
     async def handle_structured_output_ready(self, event: Dict[str, Any]) -> None:
         """Process a structured-output-ready event and trigger the corresponding tool."""
 
@@ -194,7 +196,7 @@ class AutoToolEventHandler:
             self._workflow_bindings[workflow_name] = mapping
             return mapping
 
-        tool_functions = load_agent_tool_functions(workflow_name)
+        tool_functions = get_workflow_bundle(workflow_name).tool_functions
         logger.debug("[AUTO_TOOL] Loaded tool functions for workflow=%s: agents=%s", workflow_name, list(tool_functions.keys()))
         agent_function_index: Dict[str, Dict[str, Callable[..., Any]]] = {}
         for agent, funcs in tool_functions.items():
@@ -0,0 +1,381 @@
+# ==============================================================================
+# FILE: core/events/dispatch_executor.py
+# DESCRIPTION: Bounded execution engine for UnifiedEventDispatcher listeners
+# ==============================================================================
+
+"""
+Execution engine for ``UnifiedEventDispatcher.emit``.
+
+``emit`` calls every listener inline, as it always has; sync listeners are
+done at that point. The awaitables returned by async listeners form a job and
+the executor decides when they run:
+
+- Ordered lanes: jobs whose payload carries a ``chat_id`` are queued on the lane
+  for that (chat, event type) and run one job at a time, in emit order. Other
+  event types of the same chat are not held up. A lane's task exits once its
+  queue is empty, so idle chats cost nothing.
+- Per-event-type concurrency limits: every listener invocation holds the
+  semaphore of its event type, so a burst of ``chat.usage_delta`` cannot occupy
+  more than its share of the loop (EVENT_DISPATCH_CONCURRENCY, overridable per
+  type with EVENT_DISPATCH_CONCURRENCY_OVERRIDES="chat.usage_delta=4,...").
+- Listeners marked with ``awaits_input`` (they wait for the user, e.g. a UI tool
+  with no timeout) run as their own tasks, outside lanes and limits, so pending
+  interactions never hold a slot other chats need.
+- Bounded backlog: at most EVENT_DISPATCH_QUEUE_MAX jobs wait at once; further
+  jobs are dropped and counted instead of growing memory without limit.
+- ``drain`` waits for the backlog to finish (used on shutdown); ``get_metrics``
+  reports queue depth and per-event-type handler latency histograms.
+
+Listeners keep their existing signature: ``listener(payload)`` may be sync or
+return an awaitable.
+"""
+
+import asyncio
+import inspect
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Sequence, Tuple
+
+from mozaiks_infra.logs.logging_config import get_core_logger
+
+logger = get_core_logger("dispatch_executor")
+
+Listener = Callable[[Dict[str, Any]], Awaitable[Any] | Any]
+
+# Upper bounds (ms) of the handler latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_DEFAULT_CONCURRENCY = 16
+_DEFAULT_QUEUE_MAX = 10000
+
+
+def awaits_input(listener: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark a listener that may wait on the user; it runs outside lanes and concurrency limits."""
+    listener.awaits_input = True  # type: ignore[attr-defined]
+    return listener
+
+
+def resolve_concurrency_settings() -> Tuple[int, Dict[str, int]]:
+    """(default per-event-type concurrency, per-event-type overrides) from the environment."""
+    try:
+        default = max(1, int(os.getenv("EVENT_DISPATCH_CONCURRENCY", str(_DEFAULT_CONCURRENCY))))
+    except ValueError:
+        default = _DEFAULT_CONCURRENCY
+    overrides: Dict[str, int] = {}
+    for item in (os.getenv("EVENT_DISPATCH_CONCURRENCY_OVERRIDES") or "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            overrides[name.strip()] = max(1, int(value))
+        except ValueError:
+            logger.warning(f"Invalid EVENT_DISPATCH_CONCURRENCY_OVERRIDES entry '{item.strip()}'; ignoring")
+    return default, overrides
+
+
+def resolve_queue_max(default: int = _DEFAULT_QUEUE_MAX) -> int:
+    try:
+        return max(1, int(os.getenv("EVENT_DISPATCH_QUEUE_MAX", str(default))))
+    except ValueError:
+        return default
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (bucket upper bounds in ``LATENCY_BUCKETS_MS``)."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+    def _quantile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 3)
+        return 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self._quantile(0.5),
+            "p95_ms": self._quantile(0.95),
+            "p99_ms": self._quantile(0.99),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class DispatchExecutor:
+    """Runs dispatcher listeners on per-(chat, event type) ordered lanes under per-event-type limits."""
+
+    def __init__(
+        self,
+        *,
+        concurrency: Optional[int] = None,
+        concurrency_overrides: Optional[Dict[str, int]] = None,
+        queue_max: Optional[int] = None,
+    ):
+        env_default, env_overrides = resolve_concurrency_settings()
+        self.concurrency = max(1, int(concurrency)) if concurrency else env_default
+        self.concurrency_overrides = dict(env_overrides if concurrency_overrides is None else concurrency_overrides)
+        self.queue_max = max(1, int(queue_max)) if queue_max else resolve_queue_max()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (chat_id, event_type) -> pending jobs; the lane task pops from the left.
+        self._lanes: Dict[Tuple[str, str], Deque[tuple]] = {}
+        self._lane_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._tasks: set = set()  # unordered jobs (no chat_id) and listeners awaiting input
+        self._pending = 0  # jobs submitted but not yet started
+        self._running = 0  # listener invocations in flight
+        self._started = 0  # jobs taken off the backlog and not finished (may wait for a slot)
+        self._awaiting_input = 0  # awaits_input listeners in flight (not drained)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats() -> Dict[str, Any]:
+        return {
+            "jobs_submitted": 0,
+            "jobs_dropped": 0,
+            "handlers_completed": 0,
+            "handlers_failed": 0,
+            "input_waits_started": 0,
+            "max_queue_depth": 0,
+            "pending_by_type": {},
+        }
+
+    def limit_for(self, event_type: str) -> int:
+        return self.concurrency_overrides.get(event_type, self.concurrency)
+
+    # Submission ----------------------------------------------------------
+    def submit(self, event_type: str, payload: Dict[str, Any], listeners: Sequence[Listener]) -> bool:
+        """Call ``listeners`` and queue their awaitables; returns False if the job was dropped."""
+        if self._closed:
+            logger.warning(f"Dispatch executor closed; dropping {event_type}")
+            self._stats["jobs_dropped"] += 1
+            return False
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # New loop (e.g. tests/asyncio.run): semaphores and lanes belong to the old one.
+            self._reset_loop_state(loop)
+
+        awaitables = []
+        for listener in listeners:
+            started = time.monotonic()
+            try:
+                result = listener(payload)
+            except Exception as exc:
+                self._stats["handlers_failed"] += 1
+                logger.error("Event handler failure for %s: %s", event_type, exc, exc_info=True)
+                self._observe(event_type, started)
+                continue
+            if not inspect.isawaitable(result):
+                self._stats["handlers_completed"] += 1
+                self._observe(event_type, started)
+            elif getattr(listener, "awaits_input", False):
+                self._stats["input_waits_started"] += 1
+                self._spawn(loop, self._invoke(event_type, result, bounded=False))
+            else:
+                awaitables.append(result)
+        if not awaitables:
+            return True
+
+        if self._pending >= self.queue_max:
+            for awaitable in awaitables:
+                close = getattr(awaitable, "close", None)
+                if close is not None:
+                    close()  # never started: avoid "coroutine was never awaited"
+            self._stats["jobs_dropped"] += 1
+            if self._stats["jobs_dropped"] % 100 == 1:
+                logger.warning(
+                    f"🚨 Event dispatch backlog full ({self.queue_max}); dropped {event_type} "
+                    f"({self._stats['jobs_dropped']} dropped so far)"
+                )
+            return False
+
+        job = (event_type, tuple(awaitables), time.monotonic())
+        self._pending += 1
+        self._stats["jobs_submitted"] += 1
+        pending_by_type = self._stats["pending_by_type"]
+        pending_by_type[event_type] = pending_by_type.get(event_type, 0) + 1
+        if self._pending > self._stats["max_queue_depth"]:
+            self._stats["max_queue_depth"] = self._pending
+        self._idle.clear()
+
+        chat_id = payload.get("chat_id") if isinstance(payload, dict) else None
+        if chat_id:
+            key = (chat_id, event_type)
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = deque()
+            lane.append(job)
+            task = self._lane_tasks.get(key)
+            if task is None or task.done():
+                self._lane_tasks[key] = loop.create_task(
+                    self._run_lane(key), name=f"dispatch-lane-{chat_id}-{event_type}"
+                )
+        else:
+            self._spawn(loop, self._run_job(job))
+        return True
+
+    def _spawn(self, loop: asyncio.AbstractEventLoop, coro: Awaitable[Any]) -> None:
+        task = loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _reset_loop_state(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._semaphores = {}
+        self._lanes = {}
+        self._lane_tasks = {}
+        self._tasks = set()
+        self._pending = 0
+        self._running = 0
+        self._started = 0
+        self._awaiting_input = 0
+        self._stats["pending_by_type"] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    # Execution -----------------------------------------------------------
+    async def _run_lane(self, key: Tuple[str, str]) -> None:
+        lane = self._lanes.get(key)
+        try:
+            while lane:
+                await self._run_job(lane.popleft())
+        finally:
+            if self._lanes.get(key) is lane and not lane:
+                del self._lanes[key]
+            if self._lane_tasks.get(key) is asyncio.current_task():
+                del self._lane_tasks[key]
+
+    async def _run_job(self, job: tuple) -> None:
+        event_type, awaitables, _submitted_at = job
+        self._pending -= 1
+        self._started += 1
+        pending_by_type = self._stats["pending_by_type"]
+        remaining = pending_by_type.get(event_type, 1) - 1
+        if remaining > 0:
+            pending_by_type[event_type] = remaining
+        else:
+            pending_by_type.pop(event_type, None)
+        try:
+            if len(awaitables) == 1:
+                await self._invoke(event_type, awaitables[0])
+            else:
+                # Listeners of one event are independent; the lane still waits for all of them.
+                await asyncio.gather(*(self._invoke(event_type, awaitable) for awaitable in awaitables))
+        finally:
+            self._started -= 1
+            if self._pending == 0 and self._started == 0:
+                self._idle.set()
+
+    async def _invoke(self, event_type: str, awaitable: Awaitable[Any], bounded: bool = True) -> None:
+        semaphore = None
+        if bounded:
+            semaphore = self._semaphores.get(event_type)
+            if semaphore is None:
+                semaphore = self._semaphores[event_type] = asyncio.Semaphore(self.limit_for(event_type))
+            await semaphore.acquire()
+            self._running += 1
+        else:
+            self._awaiting_input += 1
+        started = time.monotonic()
+        try:
+            await awaitable
+            self._stats["handlers_completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._stats["handlers_failed"] += 1
+            logger.error("Event handler failure for %s: %s", event_type, exc, exc_info=True)
+        finally:
+            if semaphore is not None:
+                self._running -= 1
+                semaphore.release()
+            else:
+                self._awaiting_input -= 1
+            self._observe(event_type, started)
+
+    def _observe(self, event_type: str, started: float) -> None:
+        histogram = self._latency.get(event_type)
+        if histogram is None:
+            histogram = self._latency[event_type] = LatencyHistogram()
+        histogram.observe((time.monotonic() - started) * 1000.0)
+
+    # Lifecycle -----------------------------------------------------------
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted job has finished (except listeners awaiting input); False on timeout."""
+        if self._loop is not asyncio.get_running_loop():
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def shutdown(self, timeout: Optional[float] = 10.0) -> bool:
+        """Stop accepting jobs, drain the backlog, then cancel whatever is still running.
+
+        Listeners awaiting user input are not waited for; they are cancelled.
+        """
+        self._closed = True
+        drained = await self.drain(timeout=timeout)
+        tasks = [task for task in list(self._lane_tasks.values()) + list(self._tasks) if not task.done()]
+        if not drained:
+            logger.warning(f"Event dispatch drain timed out; cancelling {len(tasks)} task(s) ({self._pending} job(s) pending)")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return drained
+
+    # Metrics -------------------------------------------------------------
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "pending_by_type": dict(self._stats["pending_by_type"]),
+            "queue_depth": self._pending,
+            "queue_max": self.queue_max,
+            "running": self._running,
+            "awaiting_input": self._awaiting_input,
+            "active_lanes": len(self._lane_tasks),
+            "unordered_tasks": len(self._tasks),
+            "concurrency": {"default": self.concurrency, "overrides": dict(self.concurrency_overrides)},
+            "handler_latency_ms": {event: h.snapshot() for event, h in list(self._latency.items())},
+        }
+
+    def reset_metrics(self) -> None:
+        pending_by_type = self._stats["pending_by_type"]
+        self._stats = self._new_stats()
+        self._stats["pending_by_type"] = pending_by_type
+        self._latency = {}
+
+
+__all__ = [
+    "DispatchExecutor",
+    "awaits_input",
+    "LatencyHistogram",
+    "LATENCY_BUCKETS_MS",
+    "resolve_concurrency_settings",
+    "resolve_queue_max",
+]
@@ -34,7 +34,9 @@ Public entry point: build_ui_event_payload(...)
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import json
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, UTC
 
@@ -190,353 +192,444 @@ def _safe_transition_target_label(target: Any) -> Optional[str]:
 
 
 # ---------------------------------------------------------------------------
-# Main builder
+# Structured output lookups (memoized per workflow/agent)
 # ---------------------------------------------------------------------------
-def build_ui_event_payload(*, ev: Any, ctx: EventBuildContext) -> Optional[Dict[str, Any]]:
-	"""Return a UI payload dict for a single AG2 event (or None if unsupported)."""
+_STRUCTURED_SCHEMAS: Dict[Tuple[str, str], Optional[Dict[str, str]]] = {}
+_structured_helpers: Optional[Tuple[Callable[[str, str], bool], Callable[[str, str], Dict[str, str]]]] = None
+_json_extractor: Any = None
+
+
+def _structured_schema_for(workflow_name: str, agent: str) -> Optional[Dict[str, str]]:
+	"""Schema fields when ``agent`` has a structured output model, else None."""
+	key = (workflow_name, agent)
 	try:
-		from autogen.events.agent_events import (
-			TextEvent as _T,
-			InputRequestEvent as _IR,
-			RunCompletionEvent as _RC,
-			ErrorEvent as _EE,
-			FunctionCallEvent as _FCe,
-			ToolCallEvent as _TCe,
-			FunctionResponseEvent as _FRe,
-			ToolResponseEvent as _TRe,
-			SelectSpeakerEvent as _SS,
-			GroupChatResumeEvent as _GR,
-			GroupChatRunChatEvent as _GRCE,
+		return _STRUCTURED_SCHEMAS[key]
+	except KeyError:
+		pass
+	global _structured_helpers
+	if _structured_helpers is None:
+		from mozaiks_ai.runtime.workflow.outputs.structured import (
+			agent_has_structured_output,
+			get_structured_output_model_fields,
 		)
-		from autogen.events.client_events import UsageSummaryEvent as _US
-		try:
-			from autogen.agentchat.group.events.transition_events import (
-				AfterWorksTransitionEvent as _AWT,
-				OnContextConditionTransitionEvent as _OCT,
-				OnConditionLLMTransitionEvent as _OLT,
-				ReplyResultTransitionEvent as _RRT,
-			)
-		except Exception:  # pragma: no cover
-			_AWT = object  # type: ignore
-			_OCT = object  # type: ignore
-			_OLT = object  # type: ignore
-			_RRT = object  # type: ignore
-		try:
-			from autogen.events.print_event import PrintEvent as _PE
-		except Exception:  # pragma: no cover
-			_PE = object  # type: ignore
-	except Exception:
-		return {"event_type": ev.__class__.__name__, "kind": "unknown"}
-
-	et_name = ev.__class__.__name__
-	payload: Dict[str, Any] = {"event_type": et_name}
-
-	# TextEvent -------------------------------------------------------
-	if isinstance(ev, _T):
-		sender = extract_agent_name(ev)
-		raw_content_obj = getattr(ev, "content", None)
-		clean_content = normalize_text_content(raw_content_obj)
-		serialized_raw = serialize_event_content(raw_content_obj) if raw_content_obj is not None else None
-		payload.update({"kind": "text", "agent": sender, "content": clean_content})
-		payload["source"] = payload.get("source") or "ag2_textevent"
-		if serialized_raw is not None and not isinstance(serialized_raw, str):
-			payload["raw_content"] = serialized_raw
-		if not payload.get("agent"):
-			fallback_agent = extract_agent_name(serialized_raw) if serialized_raw is not None else None
-			if not fallback_agent:
-				fallback_agent = extract_agent_name(getattr(ev, "sender", None))
-			if not fallback_agent:
-				fallback_agent = str(ctx.turn_agent) if ctx.turn_agent else None
-			payload["agent"] = fallback_agent or "Assistant"
-		# Structured outputs (best-effort)
-		try:
-			if sender and ctx.workflow_name:
-				from mozaiks_ai.runtime.workflow.outputs.structured import (
-					agent_has_structured_output,
-					get_structured_output_model_fields,
-				)
-				if agent_has_structured_output(ctx.workflow_name, sender):
-					ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] agent={sender} has_structured_output=True, clean_content_len={len(clean_content) if clean_content else 0}")
-					ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] clean_content_preview: {clean_content[:200] if clean_content else 'None'}...")
-					from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager as _PM  # lazy import
-					if hasattr(_PM, '_extract_json_from_text'):
-						structured = _PM._extract_json_from_text(clean_content)  # type: ignore
-						ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] _extract_json_from_text result: {structured is not None}")
-					else:
-						structured = None
-						ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] _PM._extract_json_from_text not available")
-					if structured:
-						payload["structured_output"] = structured
-						schema_fields = get_structured_output_model_fields(ctx.workflow_name, sender)
-						if schema_fields:
-							payload["structured_schema"] = schema_fields
-						try:
-							import json as _json
-							if isinstance(structured, dict):
-								so_keys = list(structured.keys())
-							elif isinstance(structured, (list, tuple)):
-								so_keys = [f"list[{len(structured)}]"]
-							else:
-								so_keys = [type(structured).__name__]
-							so_json = _json.dumps(structured, ensure_ascii=False)
-							max_len = 2000
-							if len(so_json) > max_len:
-								so_json = so_json[:max_len] + "...<truncated>"
-							ctx.wf_logger.info(f" [STRUCTURED_OUTPUT] agent={sender} keys={so_keys} json={so_json}")
-						except Exception as _so_log_err:  # pragma: no cover
-							ctx.wf_logger.debug(f"[STRUCTURED_OUTPUT] log skipped: {_so_log_err}")
+		_structured_helpers = (agent_has_structured_output, get_structured_output_model_fields)
+	has_structured, model_fields = _structured_helpers
+	schema = (model_fields(workflow_name, agent) or {}) if has_structured(workflow_name, agent) else None
+	_STRUCTURED_SCHEMAS[key] = schema
+	return schema
+
+
+def _extract_structured_json(text: str) -> Any:
+	global _json_extractor
+	if _json_extractor is None:
+		from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager as _PM  # lazy import
+		_json_extractor = getattr(_PM, "_extract_json_from_text", False)
+	return _json_extractor(text) if _json_extractor else None
+
+
+# ---------------------------------------------------------------------------
+# Per-event-class builders
+# ---------------------------------------------------------------------------
+def _build_text(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	sender = extract_agent_name(ev)
+	raw_content_obj = getattr(ev, "content", None)
+	clean_content = normalize_text_content(raw_content_obj)
+	serialized_raw = serialize_event_content(raw_content_obj) if raw_content_obj is not None else None
+	payload.update({"kind": "text", "agent": sender, "content": clean_content})
+	payload["source"] = payload.get("source") or "ag2_textevent"
+	if serialized_raw is not None and not isinstance(serialized_raw, str):
+		payload["raw_content"] = serialized_raw
+	if not payload.get("agent"):
+		fallback_agent = extract_agent_name(serialized_raw) if serialized_raw is not None else None
+		if not fallback_agent:
+			fallback_agent = extract_agent_name(getattr(ev, "sender", None))
+		if not fallback_agent:
+			fallback_agent = str(ctx.turn_agent) if ctx.turn_agent else None
+		payload["agent"] = fallback_agent or "Assistant"
+	# Structured outputs (best-effort)
+	try:
+		schema_fields = _structured_schema_for(ctx.workflow_name, sender) if sender and ctx.workflow_name else None
+		if schema_fields is not None:
+			ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] agent={sender} has_structured_output=True, clean_content_len={len(clean_content) if clean_content else 0}")
+			ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] clean_content_preview: {clean_content[:200] if clean_content else 'None'}...")
+			structured = _extract_structured_json(clean_content)
+			ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] _extract_json_from_text result: {structured is not None}")
+			if structured:
+				payload["structured_output"] = structured
+				if schema_fields:
+					payload["structured_schema"] = schema_fields
+				try:
+					if isinstance(structured, dict):
+						so_keys = list(structured.keys())
+					elif isinstance(structured, (list, tuple)):
+						so_keys = [f"list[{len(structured)}]"]
 					else:
-						ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] No structured output extracted for {sender}")
-		except Exception as so_err:  # pragma: no cover
-			ctx.wf_logger.debug(f"Structured output attach failed sender={sender}: {so_err}")
-		return payload
-
-	# PrintEvent ------------------------------------------------------
-	if isinstance(ev, _PE):
-		payload.update({
-			"kind": "print",
-			"agent": extract_agent_name(ev),
-			"content": normalize_text_content(getattr(ev, "content", None)),
-		})
-		return payload
-
-	# InputRequestEvent -----------------------------------------------
-	if isinstance(ev, _IR):
-		agent_name = extract_agent_name(ev)
-		request_obj = getattr(ev, "content", None)
-		prompt_text = getattr(ev, "_mozaiks_prompt", None) or getattr(ev, "prompt", None)
-		component_hint = None
-		raw_payload = None
-		if request_obj is not None:
-			try:
-				if prompt_text is None:
-					if hasattr(request_obj, "prompt"):
-						prompt_text = getattr(request_obj, "prompt")
-					elif isinstance(request_obj, dict):
-						prompt_text = request_obj.get("prompt") or request_obj.get("message")
-				if hasattr(request_obj, "ui_tool_id"):
-					component_hint = getattr(request_obj, "ui_tool_id")
-				elif isinstance(request_obj, dict):
-					component_hint = request_obj.get("ui_tool_id") or request_obj.get("component") or request_obj.get("component_type")
-				if hasattr(request_obj, "model_dump"):
-					raw_payload = request_obj.model_dump()  # type: ignore[attr-defined]
+						so_keys = [type(structured).__name__]
+					so_json = json.dumps(structured, ensure_ascii=False)
+					max_len = 2000
+					if len(so_json) > max_len:
+						so_json = so_json[:max_len] + "...<truncated>"
+					ctx.wf_logger.info(f" [STRUCTURED_OUTPUT] agent={sender} keys={so_keys} json={so_json}")
+				except Exception as _so_log_err:  # pragma: no cover
+					ctx.wf_logger.debug(f"[STRUCTURED_OUTPUT] log skipped: {_so_log_err}")
+			else:
+				ctx.wf_logger.debug(f" [STRUCTURED_DEBUG] No structured output extracted for {sender}")
+	except Exception as so_err:  # pragma: no cover
+		ctx.wf_logger.debug(f"Structured output attach failed sender={sender}: {so_err}")
+	return payload
+
+
+def _build_print(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	payload.update({
+		"kind": "print",
+		"agent": extract_agent_name(ev),
+		"content": normalize_text_content(getattr(ev, "content", None)),
+	})
+	return payload
+
+
+def _build_input_request(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	agent_name = extract_agent_name(ev)
+	request_obj = getattr(ev, "content", None)
+	prompt_text = getattr(ev, "_mozaiks_prompt", None) or getattr(ev, "prompt", None)
+	component_hint = None
+	raw_payload = None
+	if request_obj is not None:
+		try:
+			if prompt_text is None:
+				if hasattr(request_obj, "prompt"):
+					prompt_text = getattr(request_obj, "prompt")
 				elif isinstance(request_obj, dict):
-					raw_payload = request_obj
-			except Exception as prompt_err:
-				ctx.wf_logger.debug(f"InputRequest prompt extraction failed: {prompt_err}")
-		request_id = getattr(ev, "_mozaiks_request_id", None)
-		if not request_id:
-			request_id = getattr(ev, "uuid", None) or getattr(ev, "id", None)
-		if request_id:
-			request_id = str(request_id)
-		payload.update({
-			"kind": "input_request",
-			"agent": agent_name,
-			"request_id": request_id,
-			"prompt": (prompt_text or ""),
-		})
-		payload["password"] = bool(getattr(ev, "password", False))
-		if component_hint:
-			payload["component_type"] = component_hint
-		if raw_payload is not None:
-			payload["raw_payload"] = raw_payload
-		return payload
-
-
-	# ToolCallEvent / FunctionCallEvent -------------------------------
-	if isinstance(ev, (_TCe, _FCe)):
-		call_id = getattr(ev, "id", None) or getattr(ev, "call_id", None) or getattr(ev, "uuid", None)
-		if call_id:
-			call_id = str(call_id)
-		name = getattr(ev, "name", None) or getattr(ev, "function", None) or getattr(ev, "tool", None)
-		args_obj = getattr(ev, "arguments", None) or getattr(ev, "args", None)
-		serialized_args = serialize_event_content(args_obj) if args_obj is not None else None
-		initiator = ctx.tool_call_initiators.get(str(call_id), None)
-		if initiator is None:
-			initiator = extract_agent_name(ev) or ctx.turn_agent
-		payload.update({
-			"kind": "tool_call",
-			"call_id": call_id,
-			"name": name,
-			"agent": initiator,
-		})
-		if serialized_args is not None:
-			payload["arguments"] = serialized_args
-		return payload
-
-	# ToolResponseEvent / FunctionResponseEvent -----------------------
-	if isinstance(ev, (_TRe, _FRe)):
-		call_id = getattr(ev, "id", None) or getattr(ev, "call_id", None) or getattr(ev, "uuid", None)
-		if call_id:
-			call_id = str(call_id)
-		name = ctx.tool_names_by_id.get(str(call_id), None) or getattr(ev, "name", None)
-		result_obj = getattr(ev, "content", None) or getattr(ev, "result", None)
-		sentinel_info = None
-		clean_result_obj = result_obj
-		if isinstance(result_obj, dict) and result_obj.get(SENTINEL_FLAG):
-			sentinel_info = {
-				"message": result_obj.get(SENTINEL_MESSAGE_KEY),
-				"errors": result_obj.get(SENTINEL_ERRORS_KEY),
-				"expected_model": result_obj.get(SENTINEL_EXPECTED_MODEL_KEY),
-				"agent": result_obj.get(SENTINEL_AGENT_KEY),
-				"tool": result_obj.get(SENTINEL_TOOL_KEY),
-			}
-			clean_result_obj = {k: v for k, v in result_obj.items() if k != SENTINEL_FLAG}
-		serialized_result = serialize_event_content(clean_result_obj) if clean_result_obj is not None else None
-		origin = ctx.tool_call_initiators.get(str(call_id), None) or extract_agent_name(ev)
-		if sentinel_info:
-			sentinel_info.setdefault("agent", origin)
-			sentinel_info.setdefault("tool", name)
-		payload.update({
-			"kind": "tool_response",
-			"call_id": call_id,
-			"name": name,
-			"agent": origin,
-		})
-		if serialized_result is not None:
-			payload["result"] = serialized_result
-		if sentinel_info:
-			payload["status"] = SENTINEL_STATUS
-			payload["error"] = sentinel_info
-		else:
-			payload.setdefault("status", "ok")
-		return payload
-
-	# SelectSpeakerEvent ----------------------------------------------
-	if isinstance(ev, _SS):
-		selected = getattr(ev, "selected", None) or getattr(ev, "next", None)
-		current_agent = extract_agent_name(ev) or ctx.turn_agent
-		
-		# Orchestration v1.1: Agent transition as orchestration event
-		# Emit both select_speaker (for chat UI) and agent_started (for orchestration tracking)
-		payload.update({
-			"kind": "orchestration.agent_started",
-			"run_id": None,  # Will be set by transport layer from chat_id
-			"status": OrchestrationStatus.IN_PROGRESS,
-			"agent": selected,
-			"timestamp": datetime.now(UTC).isoformat() + "Z",
-			"previous_agent": current_agent,
-			"selected_speaker": selected,  # Backward compat
-		})
-		# Enhanced logging to trace handoffs
-		ctx.wf_logger.info(f"🎭 [SPEAKER_SELECT] {current_agent} → {selected} (turn handoff)")
-		return payload
-
-	# Transition (handoff) events -------------------------------------
-	if isinstance(ev, (_AWT, _OCT, _OLT, _RRT)):
-		if isinstance(ev, _AWT):
-			handoff_type = "after_work"
-		elif isinstance(ev, _OCT):
-			handoff_type = "context"
-		elif isinstance(ev, _OLT):
-			handoff_type = "llm"
-		else:
-			handoff_type = "reply_result"
-		source_agent = _safe_agent_label(getattr(ev, "source_agent", None)) or extract_agent_name(ev)
-		transition_target = getattr(ev, "transition_target", None)
-		target_label = _safe_transition_target_label(transition_target)
-		payload.update({
-			"kind": "handoff",
-			"handoff_type": handoff_type,
-			"agent": source_agent,
-			"source_agent": source_agent,
-			"target": target_label,
-			"target_type": transition_target.__class__.__name__ if transition_target is not None else None,
-		})
-		return payload
-
-	# GroupChatResumeEvent --------------------------------------------
-	if isinstance(ev, _GR):
-		payload.update({
-			"kind": "resume_boundary",
-			"agent": extract_agent_name(ev) or ctx.turn_agent,
-			"reason": normalize_text_content(getattr(ev, "content", None)),
-		})
-		return payload
-
-	# GroupChatRunChatEvent -------------------------------------------
-	if isinstance(ev, _GRCE):
-		# Orchestration v1.1: Semantic kind for deterministic UI spinner control
-		# Platform can stop spinners on run_completed/run_failed, not chat.text presence
-		payload.update({
-			"kind": "orchestration.run_started",
-			"run_id": None,  # Will be set by transport layer from chat_id
-			"status": OrchestrationStatus.IN_PROGRESS,
-			"agent": extract_agent_name(ev) or ctx.turn_agent,
-			"timestamp": datetime.now(UTC).isoformat() + "Z",
-			"message": "Workflow run initialized"
-		})
-		return payload
-
-	# UsageSummaryEvent ------------------------------------------------
-	if isinstance(ev, _US):
-		usage_obj = getattr(ev, "content", None) or getattr(ev, "usage", None)
-		normalized = serialize_event_content(usage_obj)
-		payload.update({
-			"kind": "usage_summary",
-			"agent": extract_agent_name(ev) or ctx.turn_agent,
-			"usage": normalized,
-		})
-		return payload
-
-	# RunCompletionEvent -----------------------------------------------
-	if isinstance(ev, _RC):
-		# Orchestration v1.1: Semantic kind for deterministic UI spinner control
-		# Extract comprehensive completion metadata from AG2's RunCompletionEvent
-		summary = getattr(ev, "summary", None)
-		history = getattr(ev, "history", None)
-		cost = getattr(ev, "cost", None)
-		last_speaker = getattr(ev, "last_speaker", None)
-		context_vars = getattr(ev, "context_variables", None)
-		
-		payload.update({
-			"kind": "orchestration.run_completed",
-			"run_id": None,  # Will be set by transport layer from chat_id
-			"status": OrchestrationStatus.COMPLETED,
-			"agent": last_speaker or extract_agent_name(ev) or ctx.turn_agent,
-			"timestamp": datetime.now(UTC).isoformat() + "Z",
-		})
-		
-		# Add optional metadata if available
-		if summary:
-			payload["summary"] = summary
-		if cost:
-			payload["cost"] = serialize_event_content(cost)
-		
-		# Extract duration and token usage from cost if available
-		if isinstance(cost, dict):
-			total_tokens = cost.get("total_tokens") or cost.get("usage", {}).get("total_tokens")
-			if total_tokens:
-				payload["total_tokens"] = total_tokens
-		
-		return payload
-
-	# ErrorEvent -------------------------------------------------------
-	if isinstance(ev, _EE):
-		err_msg = getattr(ev, "message", None) or normalize_text_content(getattr(ev, "content", None))
-		code = getattr(ev, "code", None) or getattr(ev, "error_code", None)
-		
-		# Orchestration v1.1: Run-level errors use orchestration namespace
-		# This allows UI to stop spinner deterministically on failures
-		payload.update({
-			"kind": "orchestration.run_failed",
-			"run_id": None,  # Will be set by transport layer from chat_id
-			"status": OrchestrationStatus.FAILED,
-			"agent": extract_agent_name(ev) or ctx.turn_agent,
-			"timestamp": datetime.now(UTC).isoformat() + "Z",
-			"message": err_msg,
-			"error": err_msg,
-			"code": code,
-		})
-		return payload
+					prompt_text = request_obj.get("prompt") or request_obj.get("message")
+			if hasattr(request_obj, "ui_tool_id"):
+				component_hint = getattr(request_obj, "ui_tool_id")
+			elif isinstance(request_obj, dict):
+				component_hint = request_obj.get("ui_tool_id") or request_obj.get("component") or request_obj.get("component_type")
+			if hasattr(request_obj, "model_dump"):
+				raw_payload = request_obj.model_dump()  # type: ignore[attr-defined]
+			elif isinstance(request_obj, dict):
+				raw_payload = request_obj
+		except Exception as prompt_err:
+			ctx.wf_logger.debug(f"InputRequest prompt extraction failed: {prompt_err}")
+	request_id = getattr(ev, "_mozaiks_request_id", None)
+	if not request_id:
+		request_id = getattr(ev, "uuid", None) or getattr(ev, "id", None)
+	if request_id:
+		request_id = str(request_id)
+	payload.update({
+		"kind": "input_request",
+		"agent": agent_name,
+		"request_id": request_id,
+		"prompt": (prompt_text or ""),
+	})
+	payload["password"] = bool(getattr(ev, "password", False))
+	if component_hint:
+		payload["component_type"] = component_hint
+	if raw_payload is not None:
+		payload["raw_payload"] = raw_payload
+	return payload
+
+
+def _build_tool_call(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	call_id = getattr(ev, "id", None) or getattr(ev, "call_id", None) or getattr(ev, "uuid", None)
+	if call_id:
+		call_id = str(call_id)
+	name = getattr(ev, "name", None) or getattr(ev, "function", None) or getattr(ev, "tool", None)
+	args_obj = getattr(ev, "arguments", None) or getattr(ev, "args", None)
+	serialized_args = serialize_event_content(args_obj) if args_obj is not None else None
+	initiator = ctx.tool_call_initiators.get(str(call_id), None)
+	if initiator is None:
+		initiator = extract_agent_name(ev) or ctx.turn_agent
+	payload.update({
+		"kind": "tool_call",
+		"call_id": call_id,
+		"name": name,
+		"agent": initiator,
+	})
+	if serialized_args is not None:
+		payload["arguments"] = serialized_args
+	return payload
+
+
+def _build_tool_response(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	call_id = getattr(ev, "id", None) or getattr(ev, "call_id", None) or getattr(ev, "uuid", None)
+	if call_id:
+		call_id = str(call_id)
+	name = ctx.tool_names_by_id.get(str(call_id), None) or getattr(ev, "name", None)
+	result_obj = getattr(ev, "content", None) or getattr(ev, "result", None)
+	sentinel_info = None
+	clean_result_obj = result_obj
+	if isinstance(result_obj, dict) and result_obj.get(SENTINEL_FLAG):
+		sentinel_info = {
+			"message": result_obj.get(SENTINEL_MESSAGE_KEY),
+			"errors": result_obj.get(SENTINEL_ERRORS_KEY),
+			"expected_model": result_obj.get(SENTINEL_EXPECTED_MODEL_KEY),
+			"agent": result_obj.get(SENTINEL_AGENT_KEY),
+			"tool": result_obj.get(SENTINEL_TOOL_KEY),
+		}
+		clean_result_obj = {k: v for k, v in result_obj.items() if k != SENTINEL_FLAG}
+	serialized_result = serialize_event_content(clean_result_obj) if clean_result_obj is not None else None
+	origin = ctx.tool_call_initiators.get(str(call_id), None) or extract_agent_name(ev)
+	if sentinel_info:
+		sentinel_info.setdefault("agent", origin)
+		sentinel_info.setdefault("tool", name)
+	payload.update({
+		"kind": "tool_response",
+		"call_id": call_id,
+		"name": name,
+		"agent": origin,
+	})
+	if serialized_result is not None:
+		payload["result"] = serialized_result
+	if sentinel_info:
+		payload["status"] = SENTINEL_STATUS
+		payload["error"] = sentinel_info
+	else:
+		payload.setdefault("status", "ok")
+	return payload
+
+
+def _build_select_speaker(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	selected = getattr(ev, "selected", None) or getattr(ev, "next", None)
+	current_agent = extract_agent_name(ev) or ctx.turn_agent
+
+	# Orchestration v1.1: Agent transition as orchestration event
+	# Emit both select_speaker (for chat UI) and agent_started (for orchestration tracking)
+	payload.update({
+		"kind": "orchestration.agent_started",
+		"run_id": None,  # Will be set by transport layer from chat_id
+		"status": OrchestrationStatus.IN_PROGRESS,
+		"agent": selected,
+		"timestamp": datetime.now(UTC).isoformat() + "Z",
+		"previous_agent": current_agent,
+		"selected_speaker": selected,  # Backward compat
+	})
+	# Enhanced logging to trace handoffs
+	ctx.wf_logger.info(f"🎭 [SPEAKER_SELECT] {current_agent} → {selected} (turn handoff)")
+	return payload
+
+
+def _build_handoff(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any], *, handoff_type: str) -> Dict[str, Any]:
+	source_agent = _safe_agent_label(getattr(ev, "source_agent", None)) or extract_agent_name(ev)
+	transition_target = getattr(ev, "transition_target", None)
+	target_label = _safe_transition_target_label(transition_target)
+	payload.update({
+		"kind": "handoff",
+		"handoff_type": handoff_type,
+		"agent": source_agent,
+		"source_agent": source_agent,
+		"target": target_label,
+		"target_type": transition_target.__class__.__name__ if transition_target is not None else None,
+	})
+	return payload
+
+
+def _build_resume_boundary(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	payload.update({
+		"kind": "resume_boundary",
+		"agent": extract_agent_name(ev) or ctx.turn_agent,
+		"reason": normalize_text_content(getattr(ev, "content", None)),
+	})
+	return payload
+
+
+def _build_run_started(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	# Orchestration v1.1: Semantic kind for deterministic UI spinner control
+	# Platform can stop spinners on run_completed/run_failed, not chat.text presence
+	payload.update({
+		"kind": "orchestration.run_started",
+		"run_id": None,  # Will be set by transport layer from chat_id
+		"status": OrchestrationStatus.IN_PROGRESS,
+		"agent": extract_agent_name(ev) or ctx.turn_agent,
+		"timestamp": datetime.now(UTC).isoformat() + "Z",
+		"message": "Workflow run initialized"
+	})
+	return payload
+
+
+def _build_usage_summary(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	usage_obj = getattr(ev, "content", None) or getattr(ev, "usage", None)
+	normalized = serialize_event_content(usage_obj)
+	payload.update({
+		"kind": "usage_summary",
+		"agent": extract_agent_name(ev) or ctx.turn_agent,
+		"usage": normalized,
+	})
+	return payload
+
+
+def _build_run_completed(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	# Orchestration v1.1: Semantic kind for deterministic UI spinner control
+	# Extract comprehensive completion metadata from AG2's RunCompletionEvent
+	summary = getattr(ev, "summary", None)
+	cost = getattr(ev, "cost", None)
+	last_speaker = getattr(ev, "last_speaker", None)
+
+	payload.update({
+		"kind": "orchestration.run_completed",
+		"run_id": None,  # Will be set by transport layer from chat_id
+		"status": OrchestrationStatus.COMPLETED,
+		"agent": last_speaker or extract_agent_name(ev) or ctx.turn_agent,
+		"timestamp": datetime.now(UTC).isoformat() + "Z",
+	})
+
+	# Add optional metadata if available
+	if summary:
+		payload["summary"] = summary
+	if cost:
+		payload["cost"] = serialize_event_content(cost)
+
+	# Extract duration and token usage from cost if available
+	if isinstance(cost, dict):
+		total_tokens = cost.get("total_tokens") or cost.get("usage", {}).get("total_tokens")
+		if total_tokens:
+			payload["total_tokens"] = total_tokens
+
+	return payload
+
+
+def _build_run_failed(ev: Any, ctx: EventBuildContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+	err_msg = getattr(ev, "message", None) or normalize_text_content(getattr(ev, "content", None))
+	code = getattr(ev, "code", None) or getattr(ev, "error_code", None)
+
+	# Orchestration v1.1: Run-level errors use orchestration namespace
+	# This allows UI to stop spinner deterministically on failures
+	payload.update({
+		"kind": "orchestration.run_failed",
+		"run_id": None,  # Will be set by transport layer from chat_id
+		"status": OrchestrationStatus.FAILED,
+		"agent": extract_agent_name(ev) or ctx.turn_agent,
+		"timestamp": datetime.now(UTC).isoformat() + "Z",
+		"message": err_msg,
+		"error": err_msg,
+		"code": code,
+	})
+	return payload
+
+
+# ---------------------------------------------------------------------------
+# Event class registry
+# ---------------------------------------------------------------------------
+_EventBuilder = Callable[[Any, EventBuildContext, Dict[str, Any]], Dict[str, Any]]
+
+# (AG2 event class, builder) in match order; None until resolved, () if AG2 is unavailable.
+_BUILDER_TABLE: Optional[Tuple[Tuple[type, _EventBuilder], ...]] = None
+# Concrete event class -> builder (None = unsupported), filled on first sight of each class.
+_BUILDERS_BY_CLASS: Dict[type, Optional[_EventBuilder]] = {}
+
+
+def _load_builder_table() -> Tuple[Tuple[type, _EventBuilder], ...]:
+	"""Import the AG2 event classes once and pair each with its builder."""
+	global _BUILDER_TABLE
+	if _BUILDER_TABLE is not None:
+		return _BUILDER_TABLE
+	try:
+		from autogen.events.agent_events import (
+			TextEvent,
+			InputRequestEvent,
+			RunCompletionEvent,
+			ErrorEvent,
+			FunctionCallEvent,
+			ToolCallEvent,
+			FunctionResponseEvent,
+			ToolResponseEvent,
+			SelectSpeakerEvent,
+			GroupChatResumeEvent,
+			GroupChatRunChatEvent,
+		)
+		from autogen.events.client_events import UsageSummaryEvent
+	except Exception:
+		_BUILDER_TABLE = ()
+		return _BUILDER_TABLE
+
+	table: List[Tuple[type, _EventBuilder]] = [(TextEvent, _build_text)]
+	try:
+		from autogen.events.print_event import PrintEvent
+		table.append((PrintEvent, _build_print))
+	except Exception:  # pragma: no cover
+		pass
+	table += [
+		(InputRequestEvent, _build_input_request),
+		(ToolCallEvent, _build_tool_call),
+		(FunctionCallEvent, _build_tool_call),
+		(ToolResponseEvent, _build_tool_response),
+		(FunctionResponseEvent, _build_tool_response),
+		(SelectSpeakerEvent, _build_select_speaker),
+	]
+	try:
+		from autogen.agentchat.group.events.transition_events import (
+			AfterWorksTransitionEvent,
+			OnContextConditionTransitionEvent,
+			OnConditionLLMTransitionEvent,
+			ReplyResultTransitionEvent,
+		)
+		table += [
+			(AfterWorksTransitionEvent, partial(_build_handoff, handoff_type="after_work")),
+			(OnContextConditionTransitionEvent, partial(_build_handoff, handoff_type="context")),
+			(OnConditionLLMTransitionEvent, partial(_build_handoff, handoff_type="llm")),
+			(ReplyResultTransitionEvent, partial(_build_handoff, handoff_type="reply_result")),
+		]
+	except Exception:  # pragma: no cover
+		pass
+	table += [
+		(GroupChatResumeEvent, _build_resume_boundary),
+		(GroupChatRunChatEvent, _build_run_started),
+		(UsageSummaryEvent, _build_usage_summary),
+		(RunCompletionEvent, _build_run_completed),
+		(ErrorEvent, _build_run_failed),
+	]
+	_BUILDER_TABLE = tuple(table)
+	return _BUILDER_TABLE
+
+
+def _builder_for(event_cls: type) -> Optional[_EventBuilder]:
+	try:
+		return _BUILDERS_BY_CLASS[event_cls]
+	except KeyError:
+		pass
+	builder = next((b for base, b in _load_builder_table() if issubclass(event_cls, base)), None)
+	_BUILDERS_BY_CLASS[event_cls] = builder
+	return builder
+
+
+def clear_event_builder_caches(workflow_name: Optional[str] = None) -> None:
+	"""Forget resolved builders and structured-output lookups (tests, workflow reloads).
+
+	With ``workflow_name`` only that workflow's structured-output lookups are dropped.
+	"""
+	if workflow_name is not None:
+		for key in [k for k in _STRUCTURED_SCHEMAS if k[0].lower() == workflow_name.lower()]:
+			_STRUCTURED_SCHEMAS.pop(key, None)
+		return
+	global _BUILDER_TABLE, _structured_helpers, _json_extractor
+	_BUILDER_TABLE = None
+	_BUILDERS_BY_CLASS.clear()
+	_STRUCTURED_SCHEMAS.clear()
+	_structured_helpers = None
+	_json_extractor = None
+
+
+# ---------------------------------------------------------------------------
+# Main builder
+# ---------------------------------------------------------------------------
+def build_ui_event_payload(*, ev: Any, ctx: EventBuildContext) -> Optional[Dict[str, Any]]:
+	"""Return a UI payload dict for a single AG2 event (or None if unsupported)."""
+	event_cls = ev.__class__
+	et_name = event_cls.__name__
+	builder = _builder_for(event_cls)
+	if builder is not None:
+		return builder(ev, ctx, {"event_type": et_name})
+	if not _BUILDER_TABLE:
+		# AG2 is not importable: nothing can be classified.
+		return {"event_type": et_name, "kind": "unknown"}
 
 	# Fallback marker - log for observability when AG2 adds new event types
 	ctx.wf_logger.warning(
 		f"⚠️ [UNKNOWN_EVENT] Unhandled AG2 event type: {et_name}. "
 		f"Consider adding handler in event_serialization.py"
 	)
-	payload.update({"kind": "unknown", "raw_type": et_name})
-	return payload
+	return {"event_type": et_name, "kind": "unknown", "raw_type": et_name}
+
 
 def build_structured_output_ready_event(
 	agent: str,
@@ -563,5 +656,6 @@ __all__ = [
 	"serialize_event_content",
 	"extract_agent_name",
 	"build_ui_event_payload",
+	"clear_event_builder_caches",
 	"build_structured_output_ready_event",
 ]
@@ -17,8 +17,6 @@ AG2 runtime events should already arrive normalized into dicts with a `kind` fie
 
 import logging
 import uuid
-import asyncio
-import inspect
 from typing import Dict, Any, Optional, Union, List, Callable, Awaitable
 from datetime import datetime, UTC
 from enum import Enum
@@ -26,6 +24,7 @@ from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 
 from mozaiks_ai.runtime.events.auto_tool_handler import AutoToolEventHandler
+from mozaiks_ai.runtime.events.dispatch_executor import DispatchExecutor
 from mozaiks_ai.runtime.events.usage_ingest import get_usage_ingest_client
 from mozaiks_ai.runtime.workflow.pack.workflow_pack_coordinator import WorkflowPackCoordinator
 from mozaiks_ai.runtime.workflow.pack.journey_orchestrator import JourneyOrchestrator
@@ -157,6 +156,8 @@ class UnifiedEventDispatcher:
             "events_by_category": {"business": 0, "ui_tool": 0},
             "created": datetime.now(UTC).isoformat(),
         }
+        # Listener execution: per-chat ordered lanes, per-event-type concurrency limits.
+        self.executor = DispatchExecutor()
         self._auto_tool_handler = AutoToolEventHandler()
         self._pack_coordinator = WorkflowPackCoordinator()
         self._journey_orchestrator = JourneyOrchestrator()
@@ -198,37 +199,29 @@ class UnifiedEventDispatcher:
         raise TypeError("Unsupported handler registration signature")
 
     async def emit(self, event_type: str, payload: Dict[str, Any]) -> None:
-        listeners = list(self._event_handlers.get(event_type, []))
+        """Queue ``payload`` for the listeners of ``event_type`` (see ``DispatchExecutor``)."""
+        listeners = self._event_handlers.get(event_type)
         if not listeners:
             logger.debug("No listeners registered for event_type=%s", event_type)
             return
 
-        # Avoid log spam for high-frequency runtime measurement events.
-        if event_type.startswith("chat.usage_"):
-            logger.debug("[DISPATCH] Emitting event %s to %s listener(s)", event_type, len(listeners))
-        else:
-            logger.info("[DISPATCH] Emitting event %s to %s listener(s) payload=%s", event_type, len(listeners), payload)
-
-        def _log_task_completion(task: asyncio.Future, evt: str) -> None:
-            try:
-                task.result()
-            except Exception as exc:  # pragma: no cover - logged for observability
-                logger.error("Async event handler failure for %s: %s", evt, exc, exc_info=True)
-
-        for listener in listeners:
-            try:
-                result = listener(payload)
-                if inspect.isawaitable(result):
-                    task = asyncio.create_task(result)
-                    task.add_done_callback(lambda t, evt=event_type: _log_task_completion(t, evt))
-            except Exception as exc:
-                logger.error("Event handler raised for %s: %s", event_type, exc, exc_info=True)
+        # Payloads can be large (structured outputs, context refs); only format them when debugging.
+        logger.debug("[DISPATCH] Emitting event %s to %s listener(s) payload=%s", event_type, len(listeners), payload)
+        self.executor.submit(event_type, payload, listeners)
 
         self.metrics.setdefault("custom_events_emitted", 0)
         self.metrics["custom_events_emitted"] += 1
         emitted_by_type = self.metrics.setdefault("custom_events_by_type", {})
         emitted_by_type[event_type] = emitted_by_type.get(event_type, 0) + 1
 
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every emitted event's listeners to finish."""
+        return await self.executor.drain(timeout=timeout)
+
+    async def shutdown(self, timeout: Optional[float] = 10.0) -> bool:
+        """Drain queued listener work and stop accepting new events."""
+        return await self.executor.shutdown(timeout=timeout)
+
     async def dispatch(self, event: EventType) -> bool:
         start_time = datetime.now(UTC)
         try:
@@ -255,7 +248,13 @@ class UnifiedEventDispatcher:
             return False
 
     def get_metrics(self) -> Dict[str, Any]:
-        return {**self.metrics, "handler_count": len(self.handlers), "timestamp": datetime.now(UTC).isoformat()}
+        return {
+            **self.metrics,
+            "handler_count": len(self.handlers),
+            "executor": self.executor.get_metrics(),
+            "usage_ingest": self._usage_ingest.get_metrics(),
+            "timestamp": datetime.now(UTC).isoformat(),
+        }
 
     async def emit_business_event(
         self,
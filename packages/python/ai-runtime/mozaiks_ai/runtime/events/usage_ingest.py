@@ -1,9 +1,46 @@
+"""Control-plane usage ingest (measurement only).
+
+``handle_usage_summary`` only appends to an in-memory buffer; a background
+batcher POSTs ``{"events": [...], "batch_id": ...}`` arrays over one pooled ``aiohttp`` session,
+flushing when ``batch_max`` summaries are buffered or every
+``flush_interval_ms``.
+
+Batches that still fail after the retry budget (network errors, 429, 5xx) are
+appended to a local JSON-lines spool instead of being dropped, and new batches
+go straight to the spool for ``retry_interval_sec`` while the control plane is
+down. The spool is replayed after the next successful POST. Every summary
+carries an ``event_id`` and every request an ``Idempotency-Key`` derived from
+the batch's event ids. The spool keeps each batch together with its
+``batch_id``, so a replayed batch is sent under the same key and the control
+plane answers 2xx/409 instead of counting it twice.
+
+Workers never share a spool file. Each process locks a numbered slot next to
+the configured path (slot 0 is the path itself) and uses that slot's file.
+The lock is released when the process exits, so the next worker to start
+takes over the slot and replays whatever a crashed worker left behind.
+"""
+
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
 import os
 import random
-from typing import Any, Dict, Optional
+import tempfile
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 import aiohttp
 
@@ -11,6 +48,9 @@ from mozaiks_infra.logs.logging_config import get_core_logger
 
 logger = get_core_logger("usage_ingest")
 
+_DELIVERED_STATUSES = (200, 201, 202, 204, 409)
+_SPOOL_SLOTS = 64
+
 
 def _env_bool(name: str, default: bool) -> bool:
     raw = os.getenv(name)
@@ -19,6 +59,37 @@ def _env_bool(name: str, default: bool) -> bool:
     return str(raw).strip().lower() in ("1", "true", "yes", "y", "on")
 
 
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _default_spool_path() -> str:
+    return os.path.join(tempfile.gettempdir(), "mozaiksai_usage_ingest_spool.jsonl")
+
+
+def _slot_path(path: str, slot: Any) -> str:
+    if slot == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{slot}{ext}"
+
+
+def _try_lock(fh: Any) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            return False
+        return True
+    except OSError:
+        return False
+
+
 class UsageIngestClient:
     """Best-effort control-plane usage ingest (measurement only)."""
 
@@ -31,6 +102,13 @@ class UsageIngestClient:
         max_attempts: int = 3,
         backoff_base_sec: float = 0.5,
         backoff_max_sec: float = 5.0,
+        batch_max: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None,
+        queue_max: Optional[int] = None,
+        spool_path: Optional[str] = None,
+        spool_max_bytes: Optional[int] = None,
+        retry_interval_sec: Optional[float] = None,
+        max_connections: int = 4,
     ) -> None:
         self._enabled = (
             _env_bool("CONTROL_PLANE_USAGE_INGEST_ENABLED", False)
@@ -42,6 +120,49 @@ class UsageIngestClient:
         self._max_attempts = max(1, int(max_attempts))
         self._backoff_base = max(0.05, float(backoff_base_sec))
         self._backoff_max = max(self._backoff_base, float(backoff_max_sec))
+        self._batch_max = max(1, int(batch_max or _env_number("CONTROL_PLANE_USAGE_INGEST_BATCH_MAX", 100)))
+        self._flush_interval = max(
+            0.001,
+            float(flush_interval_ms if flush_interval_ms is not None else _env_number("CONTROL_PLANE_USAGE_INGEST_FLUSH_INTERVAL_MS", 1000))
+            / 1000.0,
+        )
+        self._queue_max = max(self._batch_max, int(queue_max or _env_number("CONTROL_PLANE_USAGE_INGEST_QUEUE_MAX", 10000)))
+        self._spool_base = (
+            spool_path if spool_path is not None else os.getenv("CONTROL_PLANE_USAGE_INGEST_SPOOL_PATH", _default_spool_path())
+        ).strip()
+        self._spool_path = ""  # this process's slot, claimed by the batcher before first use
+        self._spool_lock: Optional[Any] = None
+        self._spool_max_bytes = int(
+            spool_max_bytes if spool_max_bytes is not None
+            else _env_number("CONTROL_PLANE_USAGE_INGEST_SPOOL_MAX_BYTES", 50 * 1024 * 1024)
+        )
+        self._retry_interval = max(
+            0.0,
+            float(retry_interval_sec if retry_interval_sec is not None else _env_number("CONTROL_PLANE_USAGE_INGEST_RETRY_INTERVAL_SEC", 30)),
+        )
+        self._max_connections = max(1, int(max_connections))
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stopping = False
+        self._sending = False
+        self._down_until = 0.0  # monotonic time before which batches go straight to the spool
+        self._spool_checked = False
+        self._spool_events = 0
+        self._stats: Dict[str, Any] = {
+            "events_queued": 0,
+            "events_sent": 0,
+            "events_rejected": 0,
+            "events_dropped": 0,
+            "events_spooled": 0,
+            "events_replayed": 0,
+            "batches_sent": 0,
+            "batch_failures": 0,
+            "last_error": None,
+        }
 
     def enabled(self) -> bool:
         return bool(self._enabled) and bool(self._url)
@@ -52,50 +173,317 @@ class UsageIngestClient:
         if not isinstance(payload, dict):
             return
 
+        event = dict(payload)
+        if not event.get("event_id"):
+            event["event_id"] = uuid.uuid4().hex[:12]
+        if len(self._buffer) >= self._queue_max:
+            self._buffer.popleft()
+            self._stats["events_dropped"] += 1
+            if self._stats["events_dropped"] % 100 == 1:
+                logger.warning(
+                    f"🚨 Usage ingest buffer full ({self._queue_max}); dropped oldest summary "
+                    f"({self._stats['events_dropped']} dropped so far)"
+                )
+        self._buffer.append(event)
+        self._stats["events_queued"] += 1
+        self._ensure_started()
+        if len(self._buffer) >= self._batch_max:
+            self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        if self._loop is not loop:
+            # New loop (e.g. tests/asyncio.run): the old session belongs to the old one.
+            self._session = None
+        self._loop = loop
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._run(), name="usage-ingest-batcher")
+
+    async def start(self) -> None:
+        """Start the batcher (also started lazily by the first summary) and replay any spool."""
+        if not self.enabled():
+            return
+        self._ensure_started()
+        self._wake.set()
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the buffer has been sent or spooled."""
+        if self._task is None or self._task.done():
+            return not self._buffer
+        self._wake.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._buffer or self._sending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Send (or spool) buffered summaries and close the pooled session."""
+        task = self._task
+        if task is not None and not task.done():
+            self._stopping = True
+            self._wake.set()
+            try:
+                await asyncio.wait_for(task, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Usage ingest did not flush within {timeout}s; {len(self._buffer)} summaries pending")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        if self._buffer:
+            if not self._spool_checked:
+                self._spool_checked = True
+                self._spool_path = await asyncio.to_thread(self._claim_spool)
+            pending = list(self._buffer)
+            self._buffer.clear()
+            for start in range(0, len(pending), self._batch_max):
+                await asyncio.to_thread(self._spool_append, pending[start:start + self._batch_max])
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._release_spool()
+
+    # ------------------------------------------------------------------
+    # Batcher
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        if not self._spool_checked:
+            self._spool_checked = True
+            self._spool_path = await asyncio.to_thread(self._claim_spool)
+            self._spool_events = await asyncio.to_thread(self._spool_count)
+        while True:
+            if not self._stopping and len(self._buffer) < self._batch_max:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            stopping = self._stopping
+            while self._buffer:
+                count = min(self._batch_max, len(self._buffer))
+                batch = [self._buffer.popleft() for _ in range(count)]
+                self._sending = True
+                try:
+                    if time.monotonic() < self._down_until or not await self._post_batch(batch):
+                        await asyncio.to_thread(self._spool_append, batch)
+                finally:
+                    self._sending = False
+            if self._spool_events and not stopping and time.monotonic() >= self._down_until:
+                await self._replay_spool()
+            if stopping:
+                return
+
+    def _idempotency_key(self, batch: List[Dict[str, Any]]) -> str:
+        digest = hashlib.sha256("\n".join(str(e.get("event_id")) for e in batch).encode()).hexdigest()
+        return f"usage-{digest[:32]}"
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self._timeout,
+                connector=aiohttp.TCPConnector(limit=self._max_connections, keepalive_timeout=30),
+            )
+        return self._session
+
+    async def _post_batch(self, batch: List[Dict[str, Any]], batch_id: Optional[str] = None) -> bool:
+        """POST one batch; True once it is delivered or permanently rejected, False to spool it."""
+        batch_id = batch_id or self._idempotency_key(batch)
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/json",
+            "Idempotency-Key": batch_id,
         }
+        body = {"events": batch, "batch_id": batch_id}
 
         last_err: Optional[str] = None
         last_status: Optional[int] = None
 
         for attempt in range(self._max_attempts):
             try:
-                async with aiohttp.ClientSession(timeout=self._timeout) as session:
-                    async with session.post(self._url, json=payload, headers=headers) as resp:
-                        last_status = int(resp.status)
-                        if resp.status in (200, 201, 202, 204) or resp.status == 409:
-                            return
-
-                        body = (await resp.text()).strip()
-                        if len(body) > 2000:
-                            body = body[:2000] + "..."
-                        last_err = f"http_{resp.status}: {body}"
-
-                        # Retry on transient errors only.
-                        if resp.status == 429 or resp.status >= 500:
-                            raise RuntimeError(last_err)
-
-                        logger.debug(
-                            "control_plane_usage_ingest_rejected",
-                            extra={"status": last_status, "error": last_err},
-                        )
-                        return
+                async with self._get_session().post(self._url, json=body, headers=headers) as resp:
+                    last_status = int(resp.status)
+                    if resp.status in _DELIVERED_STATUSES:
+                        self._stats["events_sent"] += len(batch)
+                        self._stats["batches_sent"] += 1
+                        self._down_until = 0.0
+                        return True
+
+                    text = (await resp.text()).strip()
+                    if len(text) > 2000:
+                        text = text[:2000] + "..."
+                    last_err = f"http_{resp.status}: {text}"
+
+                    # Retry on transient errors only.
+                    if resp.status == 429 or resp.status >= 500:
+                        raise RuntimeError(last_err)
+
+                    self._stats["events_rejected"] += len(batch)
+                    logger.debug(
+                        "control_plane_usage_ingest_rejected",
+                        extra={"status": last_status, "error": last_err, "events": len(batch)},
+                    )
+                    return True
             except asyncio.CancelledError:
                 raise
             except Exception as exc:
                 last_err = str(exc) or last_err or "request_failed"
-                if attempt >= self._max_attempts - 1:
+                if attempt >= self._max_attempts - 1 or self._stopping:
                     break
                 base = min(self._backoff_max, self._backoff_base * (2**attempt))
                 delay = base + random.uniform(0.0, min(0.25, base / 2))
                 await asyncio.sleep(delay)
 
-        logger.debug(
-            "control_plane_usage_ingest_failed",
-            extra={"status": last_status, "error": last_err},
+        self._stats["batch_failures"] += 1
+        self._stats["last_error"] = last_err
+        self._down_until = time.monotonic() + self._retry_interval
+        logger.warning(
+            f"Control-plane usage ingest unavailable ({last_err}); spooling {len(batch)} summaries, "
+            f"retrying in {self._retry_interval:.0f}s"
         )
+        return False
+
+    # ------------------------------------------------------------------
+    # Spool (JSON lines, one batch per line; only touched by the batcher task)
+    # ------------------------------------------------------------------
+    def _claim_spool(self) -> str:
+        """Lock the first free spool slot; its file is this process's spool."""
+        if not self._spool_base:
+            return ""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self._spool_base)), exist_ok=True)
+            for slot in range(_SPOOL_SLOTS):
+                path = _slot_path(self._spool_base, slot)
+                fh = open(f"{path}.lock", "a+b")
+                if _try_lock(fh):
+                    self._spool_lock = fh
+                    return path
+                fh.close()
+        except OSError as exc:
+            logger.warning(f"Could not lock a usage ingest spool slot next to {self._spool_base}: {exc}")
+        # No lock available: a per-process file is still never shared.
+        return _slot_path(self._spool_base, f"pid{os.getpid()}")
+
+    def _release_spool(self) -> None:
+        if self._spool_lock is not None:
+            self._spool_lock.close()  # closing the file drops the lock
+            self._spool_lock = None
+            self._spool_checked = False
+
+    def _spool_count(self) -> int:
+        if not self._spool_path:
+            return 0
+        try:
+            return sum(len(events) for _, events in self._spool_read())
+        except OSError as exc:
+            logger.warning(f"Could not read usage ingest spool {self._spool_path}: {exc}")
+            return 0
+
+    @staticmethod
+    def _spool_line(batch_id: str, events: List[Dict[str, Any]]) -> str:
+        return json.dumps({"batch_id": batch_id, "events": events}, separators=(",", ":"), default=str) + "\n"
+
+    def _spool_append(self, batch: List[Dict[str, Any]]) -> None:
+        if not self._spool_path:
+            self._stats["events_dropped"] += len(batch)
+            return
+        data = self._spool_line(self._idempotency_key(batch), batch)
+        try:
+            try:
+                size = os.path.getsize(self._spool_path)
+            except FileNotFoundError:
+                size = 0
+            if size + len(data) > self._spool_max_bytes:
+                self._stats["events_dropped"] += len(batch)
+                logger.error(f"❌ Usage ingest spool full ({self._spool_max_bytes} bytes); dropped {len(batch)} summaries")
+                return
+            with open(self._spool_path, "a", encoding="utf-8") as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+        except OSError as exc:
+            self._stats["events_dropped"] += len(batch)
+            logger.error(f"❌ Could not spool {len(batch)} usage summaries to {self._spool_path}: {exc}")
+            return
+        self._spool_events += len(batch)
+        self._stats["events_spooled"] += len(batch)
+
+    def _spool_read(self) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Spooled (batch_id, events) pairs, oldest first."""
+        batches: List[Tuple[Optional[str], List[Dict[str, Any]]]] = []
+        loose: List[Dict[str, Any]] = []  # one summary per line, written by older versions
+        try:
+            with open(self._spool_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write from a crash mid-append; the rest of the file is still valid.
+                        logger.warning("Skipping malformed usage ingest spool line")
+                        continue
+                    if isinstance(record.get("events"), list):
+                        batches.append((record.get("batch_id"), record["events"]))
+                    else:
+                        loose.append(record)
+        except FileNotFoundError:
+            pass
+        for start in range(0, len(loose), self._batch_max):
+            batches.append((None, loose[start:start + self._batch_max]))
+        return batches
+
+    def _spool_rewrite(self, remaining: List[Tuple[Optional[str], List[Dict[str, Any]]]]) -> None:
+        if not remaining:
+            try:
+                os.remove(self._spool_path)
+            except FileNotFoundError:
+                pass
+            return
+        tmp_path = f"{self._spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.writelines(
+                self._spool_line(batch_id or self._idempotency_key(events), events) for batch_id, events in remaining
+            )
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self._spool_path)
+
+    async def _replay_spool(self) -> None:
+        batches = await asyncio.to_thread(self._spool_read)
+        done = sent = 0
+        for batch_id, events in batches:
+            if not await self._post_batch(events, batch_id):
+                break
+            done += 1
+            sent += len(events)
+        if done:
+            try:
+                await asyncio.to_thread(self._spool_rewrite, batches[done:])
+            except OSError as exc:
+                # Leave the spool as is; replayed batches keep their batch ids and are deduplicated.
+                logger.error(f"❌ Could not compact usage ingest spool {self._spool_path}: {exc}")
+                return
+            self._stats["events_replayed"] += sent
+            logger.info(f"Replayed {sent} spooled usage summaries to the control plane")
+        self._spool_events = sum(len(events) for _, events in batches[done:])
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "enabled": self.enabled(),
+            "running": self._task is not None and not self._task.done(),
+            "buffered": len(self._buffer),
+            "spooled_pending": self._spool_events,
+            "spool_path": self._spool_path,
+            "control_plane_down": time.monotonic() < self._down_until,
+        }
 
 
 _global_client: Optional[UsageIngestClient] = None
@@ -106,4 +494,3 @@ def get_usage_ingest_client() -> UsageIngestClient:
     if _global_client is None:
         _global_client = UsageIngestClient()
     return _global_client
-
@@ -0,0 +1,515 @@
+# ==============================================================================
+# FILE: chat_router.py
+# DESCRIPTION: Routes chat events to the worker that holds the chat's WebSocket
+# ==============================================================================
+
+"""
+Cross-worker routing for SimpleTransport.
+
+SimpleTransport is a per-process singleton: a chat's socket, writer queue and
+replay ring live in the worker that accepted the connection. With several
+uvicorn workers behind a plain load balancer, a workflow can run in one worker
+while its client is connected to another. ChatRouter closes that gap:
+
+- the worker holding a chat's socket owns the chat through a lease
+  (``owner:<chat_id>`` = worker id), renewed while the socket is open and
+  released when it closes; the newest connection always wins.
+- events produced for a chat this worker does not hold are encoded once and
+  appended to the owner's inbox; each worker reads its own inbox and delivers
+  the events to its local sockets.
+- a worker waiting on a client reply (an input request, a UI tool response)
+  holds a lease on ``owner:reply:<request_id>`` for as long as it waits, so a
+  reply that arrives at another worker's socket or REST endpoint is forwarded
+  to the waiter through the same inboxes.
+
+Backends:
+- RedisRouteBackend : leases are Redis keys with a PX expiry, inboxes are
+  per-worker streams read with ``XREAD BLOCK`` (same RESP client as the event bus).
+- MemoryRouteBackend: process-local stand-in; routers sharing one instance
+  behave like separate workers (tests, single-process experiments).
+
+TRANSPORT_ROUTING_BACKEND    : ``local`` (default, no routing) or ``redis``
+TRANSPORT_ROUTING_REDIS_URL  : shared server URL (falls back to REDIS_URL)
+TRANSPORT_OWNER_LEASE_SEC    : chat ownership lease; renewed every third of it (default 30)
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from mozaiks_infra.logs.logging_config import get_core_logger
+from mozaiks_infra.utils.resp_client import RespClient, RespError
+
+logger = get_core_logger("chat_router")
+
+# (chat_id, hops, encoded envelope)
+RoutedEvent = Tuple[str, int, bytes]
+DeliverCallback = Callable[[str, bytes, int], Awaitable[None]]
+
+MAX_ROUTE_HOPS = 2  # producer -> stale owner -> current owner
+_REPLY_PREFIX = "reply:"
+REPLY_FRAME_TYPE = "transport.reply"  # routed client reply, resolved by the waiting worker (never sent to a socket)
+
+_OWNER_CACHE_S = 1.0
+_OWNER_CACHE_MAX = 10_000
+_OUTBOX_MAX = 10_000
+_SEND_BATCH_MAX = 256
+_BACKOFF_MAX_S = 5.0
+
+# Renew a lease only while it is still ours (or vacant); never steal a newer connection's claim.
+_RENEW_SCRIPT = (
+    "local v = redis.call('GET', KEYS[1]) "
+    "if (not v) or v == ARGV[1] then return redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2]) end "
+    "return 0"
+)
+_RELEASE_SCRIPT = (
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end return 0"
+)
+
+_ROUTE_ERRORS = (OSError, ConnectionError, RespError)
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class MemoryRouteBackend:
+    """Leases and inboxes in this process; every method is safe to call from worker threads."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._owners: Dict[str, Tuple[str, float]] = {}
+        self._inboxes: Dict[str, Deque[RoutedEvent]] = {}
+
+    def claim(self, chat_id: str, worker_id: str, lease_s: float) -> None:
+        with self._cond:
+            self._owners[chat_id] = (worker_id, time.monotonic() + lease_s)
+
+    def renew(self, chat_ids: Iterable[str], worker_id: str, lease_s: float) -> None:
+        now = time.monotonic()
+        with self._cond:
+            for chat_id in chat_ids:
+                current = self._owners.get(chat_id)
+                if current is None or current[0] == worker_id or current[1] <= now:
+                    self._owners[chat_id] = (worker_id, now + lease_s)
+
+    def release(self, chat_id: str, worker_id: str) -> None:
+        with self._cond:
+            current = self._owners.get(chat_id)
+            if current is not None and current[0] == worker_id:
+                del self._owners[chat_id]
+
+    def owner(self, chat_id: str) -> Optional[str]:
+        with self._cond:
+            current = self._owners.get(chat_id)
+            if current is None or current[1] <= time.monotonic():
+                return None
+            return current[0]
+
+    def open_inbox(self, worker_id: str) -> None:
+        with self._cond:
+            self._inboxes.setdefault(worker_id, deque())
+
+    def close_inbox(self, worker_id: str) -> None:
+        with self._cond:
+            self._inboxes.pop(worker_id, None)
+            self._cond.notify_all()
+
+    def send(self, worker_id: str, events: List[RoutedEvent]) -> None:
+        with self._cond:
+            inbox = self._inboxes.get(worker_id)
+            if inbox is None:
+                return  # worker is gone; like an inbox stream nobody reads
+            inbox.extend(events)
+            self._cond.notify_all()
+
+    def receive(self, worker_id: str, block_ms: int) -> List[RoutedEvent]:
+        with self._cond:
+            inbox = self._inboxes.get(worker_id)
+            if inbox is not None and not inbox:
+                self._cond.wait(block_ms / 1000.0)
+                inbox = self._inboxes.get(worker_id)
+            if not inbox:
+                return []
+            events = list(inbox)
+            inbox.clear()
+            return events
+
+
+class RedisRouteBackend:
+    """Leases as Redis keys, inboxes as per-worker streams (blocking calls; run them off the loop)."""
+
+    def __init__(
+        self,
+        client: RespClient,
+        *,
+        read_client: Optional[RespClient] = None,
+        prefix: str = "mozaiks:transport:",
+        inbox_maxlen: int = 10_000,
+    ) -> None:
+        self._client = client
+        self._read_client = read_client or client
+        self._prefix = prefix
+        self._inbox_maxlen = int(inbox_maxlen)
+        self._inbox_ttl_ms = 60_000
+        self._last_id = "0-0"
+
+    @classmethod
+    def from_url(cls, url: str, *, timeout_s: float = 1.0, block_ms: int = 1000, **kwargs: Any) -> "RedisRouteBackend":
+        return cls(
+            RespClient.from_url(url, timeout_s=timeout_s),
+            read_client=RespClient.from_url(url, timeout_s=timeout_s + block_ms / 1000.0),
+            **kwargs,
+        )
+
+    def _owner_key(self, chat_id: str) -> str:
+        return f"{self._prefix}owner:{chat_id}"
+
+    def _inbox_key(self, worker_id: str) -> str:
+        return f"{self._prefix}inbox:{worker_id}"
+
+    def claim(self, chat_id: str, worker_id: str, lease_s: float) -> None:
+        self._client.execute("SET", self._owner_key(chat_id), worker_id, "PX", max(1, int(lease_s * 1000)))
+
+    def renew(self, chat_ids: Iterable[str], worker_id: str, lease_s: float) -> None:
+        lease_ms = max(1, int(lease_s * 1000))
+        # The worker's own inbox lives as long as its leases do.
+        self._inbox_ttl_ms = 2 * lease_ms
+        commands: List[Tuple[Any, ...]] = [("PEXPIRE", self._inbox_key(worker_id), self._inbox_ttl_ms)]
+        commands.extend(("EVAL", _RENEW_SCRIPT, 1, self._owner_key(cid), worker_id, lease_ms) for cid in chat_ids)
+        for reply in self._client.pipeline(commands):
+            if isinstance(reply, RespError):
+                raise reply
+
+    def release(self, chat_id: str, worker_id: str) -> None:
+        self._client.execute("EVAL", _RELEASE_SCRIPT, 1, self._owner_key(chat_id), worker_id)
+
+    def owner(self, chat_id: str) -> Optional[str]:
+        raw = self._client.execute("GET", self._owner_key(chat_id))
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    def open_inbox(self, worker_id: str) -> None:
+        # Worker ids are unique per process start, so the inbox holds nothing older than this worker.
+        self._last_id = "0-0"
+
+    def close_inbox(self, worker_id: str) -> None:
+        self._client.execute("DEL", self._inbox_key(worker_id))
+
+    def send(self, worker_id: str, events: List[RoutedEvent]) -> None:
+        key = self._inbox_key(worker_id)
+        commands: List[Tuple[Any, ...]] = [
+            ("XADD", key, "MAXLEN", "~", self._inbox_maxlen, "*", "chat", chat_id, "hops", hops, "frame", frame)
+            for chat_id, hops, frame in events
+        ]
+        # Inboxes of workers that died without cleaning up expire on their own.
+        commands.append(("PEXPIRE", key, self._inbox_ttl_ms))
+        replies = self._client.pipeline(commands)
+        rejected = [reply for reply in replies if isinstance(reply, RespError)]
+        if rejected:
+            raise rejected[0]
+
+    def receive(self, worker_id: str, block_ms: int) -> List[RoutedEvent]:
+        reply = self._read_client.execute(
+            "XREAD", "COUNT", _SEND_BATCH_MAX, "BLOCK", block_ms, "STREAMS", self._inbox_key(worker_id), self._last_id
+        )
+        if not reply:
+            return []
+        events: List[RoutedEvent] = []
+        for raw_id, fields in reply[0][1]:
+            self._last_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            message = {fields[i].decode(): fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+            try:
+                events.append((message["chat"].decode("utf-8"), int(message["hops"]), message["frame"]))
+            except (KeyError, ValueError):
+                logger.warning("Dropping malformed routed event")
+        return events
+
+
+class ChatRouter:
+    """Chat ownership leases plus event forwarding between workers.
+
+    Backend calls are blocking and run in threads. Forwarded events go through
+    one outbox drained by a single sender task, so events for a chat reach
+    the owner in the order they were produced.
+    """
+
+    def __init__(
+        self,
+        backend: Any = None,
+        *,
+        worker_id: Optional[str] = None,
+        lease_s: Optional[float] = None,
+        block_ms: int = 1000,
+        owner_cache_s: float = _OWNER_CACHE_S,
+    ) -> None:
+        self.backend = backend
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_s = float(lease_s) if lease_s is not None else _resolve_lease_s()
+        self.block_ms = max(1, int(block_ms))
+        self.owner_cache_s = float(owner_cache_s)
+        self._owner_cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._outbox: Deque[Tuple[str, RoutedEvent]] = deque()
+        self._outbox_ready = asyncio.Event()
+        self._deliver: Optional[DeliverCallback] = None
+        self._tasks: List[asyncio.Task] = []
+        # Request ids this worker is waiting on a reply for; their leases renew with the chats'.
+        self._waits: Set[str] = set()
+        self._lease_tasks: Set[asyncio.Task] = set()
+        self._running = False
+        self._stats = {
+            "forwarded": 0,
+            "received": 0,
+            "send_batches": 0,
+            "send_errors": 0,
+            "receive_errors": 0,
+            "lease_errors": 0,
+            "outbox_dropped": 0,
+            "owner_lookups": 0,
+            "owner_cache_hits": 0,
+            "reply_lookups": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    # Lifecycle ---------------------------------------------------------
+    async def start(self, deliver: DeliverCallback) -> None:
+        """Open this worker's inbox and start the sender and receiver tasks."""
+        if not self.enabled or self._running:
+            return
+        self._deliver = deliver
+        self._outbox_ready = asyncio.Event()
+        await asyncio.to_thread(self.backend.open_inbox, self.worker_id)
+        self._running = True
+        self._tasks = [
+            asyncio.create_task(self._send_loop(), name="chat-router-send"),
+            asyncio.create_task(self._receive_loop(), name="chat-router-receive"),
+        ]
+        logger.info(f"Chat routing enabled for worker {self.worker_id} (lease={self.lease_s}s)")
+
+    async def close(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._outbox_ready.set()
+        try:
+            await asyncio.to_thread(self.backend.close_inbox, self.worker_id)
+        except _ROUTE_ERRORS as e:
+            logger.debug(f"Could not remove routing inbox for {self.worker_id}: {e}")
+        tasks, self._tasks = self._tasks, []
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Ownership ---------------------------------------------------------
+    async def claim(self, chat_id: str) -> None:
+        if not self.enabled:
+            return
+        self._owner_cache[chat_id] = (self.worker_id, time.monotonic() + self.owner_cache_s)
+        try:
+            await asyncio.to_thread(self.backend.claim, chat_id, self.worker_id, self.lease_s)
+        except _ROUTE_ERRORS as e:
+            self._lease_failed("claim", e)
+
+    async def renew(self, chat_ids: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        keys = list(chat_ids) + [_REPLY_PREFIX + request_id for request_id in self._waits]
+        try:
+            await asyncio.to_thread(self.backend.renew, keys, self.worker_id, self.lease_s)
+        except _ROUTE_ERRORS as e:
+            self._lease_failed("renew", e)
+
+    async def release(self, chat_id: str) -> None:
+        if not self.enabled:
+            return
+        self._owner_cache.pop(chat_id, None)
+        try:
+            await asyncio.to_thread(self.backend.release, chat_id, self.worker_id)
+        except _ROUTE_ERRORS as e:
+            self._lease_failed("release", e)
+
+    async def owner(self, chat_id: str, *, fresh: bool = False) -> Optional[str]:
+        """Worker currently holding ``chat_id``'s socket (None when nobody holds it)."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        cached = self._owner_cache.get(chat_id)
+        if cached is not None and not fresh and cached[1] > now:
+            self._stats["owner_cache_hits"] += 1
+            return cached[0]
+        self._stats["owner_lookups"] += 1
+        try:
+            owner = await asyncio.to_thread(self.backend.owner, chat_id)
+        except _ROUTE_ERRORS as e:
+            self._lease_failed("lookup", e)
+            return None
+        self._owner_cache[chat_id] = (owner, now + self.owner_cache_s)
+        if len(self._owner_cache) > _OWNER_CACHE_MAX:
+            self._owner_cache = {k: v for k, v in self._owner_cache.items() if v[1] > now}
+        return owner
+
+    def peek_owner(self, chat_id: str) -> Tuple[bool, Optional[str]]:
+        """``(known, owner)`` from the owner cache alone; ``known`` is False when a lookup is due."""
+        cached = self._owner_cache.get(chat_id)
+        if cached is None or cached[1] <= time.monotonic():
+            return False, None
+        self._stats["owner_cache_hits"] += 1
+        return True, cached[0]
+
+    # Replies -----------------------------------------------------------
+    def expect_reply(self, request_id: str) -> None:
+        """Have replies to ``request_id`` routed to this worker until :meth:`reply_settled`."""
+        if not self.enabled or request_id in self._waits:
+            return
+        self._waits.add(request_id)
+        self._spawn_lease(self.claim(_REPLY_PREFIX + request_id))
+
+    def reply_settled(self, request_id: str) -> None:
+        if request_id not in self._waits:
+            return
+        self._waits.discard(request_id)
+        self._spawn_lease(self.release(_REPLY_PREFIX + request_id))
+
+    async def reply_owner(self, request_id: str) -> Optional[str]:
+        """Worker waiting on ``request_id`` (None when no worker registered the wait)."""
+        if not self.enabled:
+            return None
+        self._stats["reply_lookups"] += 1
+        try:
+            return await asyncio.to_thread(self.backend.owner, _REPLY_PREFIX + request_id)
+        except _ROUTE_ERRORS as e:
+            self._lease_failed("reply lookup", e)
+            return None
+
+    def _spawn_lease(self, coro: Awaitable[None]) -> None:
+        try:
+            task = asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()  # no loop (sync caller at startup): the next renewal claims the lease
+            return
+        self._lease_tasks.add(task)
+        task.add_done_callback(self._lease_tasks.discard)
+
+    def _lease_failed(self, operation: str, error: BaseException) -> None:
+        self._stats["lease_errors"] += 1
+        if self._stats["lease_errors"] % 100 == 1:
+            logger.warning(f"Chat routing {operation} failed ({error}); events stay on this worker")
+
+    # Forwarding --------------------------------------------------------
+    def forward(self, owner: str, chat_id: str, frame: bytes, hops: int = 0) -> None:
+        """Queue an encoded envelope for delivery by ``owner`` (never blocks)."""
+        self._outbox.append((owner, (chat_id, hops + 1, frame)))
+        if len(self._outbox) > _OUTBOX_MAX:
+            self._outbox.popleft()
+            self._stats["outbox_dropped"] += 1
+            if self._stats["outbox_dropped"] % 100 == 1:
+                logger.warning(f"Chat routing outbox full ({_OUTBOX_MAX}); dropped oldest event")
+        self._outbox_ready.set()
+
+    async def _send_loop(self) -> None:
+        failures = 0
+        while self._running or self._outbox:
+            if not self._outbox:
+                self._outbox_ready.clear()
+                if not self._running:
+                    return
+                await self._outbox_ready.wait()
+                continue
+            # Group consecutive events per owner; order within each owner is preserved.
+            batch: Dict[str, List[RoutedEvent]] = {}
+            taken: List[Tuple[str, RoutedEvent]] = []
+            while self._outbox and len(taken) < _SEND_BATCH_MAX:
+                item = self._outbox.popleft()
+                taken.append(item)
+                batch.setdefault(item[0], []).append(item[1])
+            sent = set()
+            try:
+                for owner, events in batch.items():
+                    await asyncio.to_thread(self.backend.send, owner, events)
+                    sent.add(owner)
+                    self._stats["forwarded"] += len(events)
+                self._stats["send_batches"] += 1
+                failures = 0
+            except _ROUTE_ERRORS as e:
+                # Put back what did not reach its owner, ahead of anything queued since.
+                self._outbox.extendleft(reversed([item for item in taken if item[0] not in sent]))
+                failures += 1
+                self._stats["send_errors"] += 1
+                if failures == 1 or failures % 100 == 0:
+                    logger.warning(f"Chat routing send failed ({e}); {len(self._outbox)} event(s) waiting")
+                if not self._running:
+                    return
+                await asyncio.sleep(min(_BACKOFF_MAX_S, 0.05 * (2 ** min(failures, 7))))
+
+    async def _receive_loop(self) -> None:
+        failures = 0
+        while self._running:
+            try:
+                events = await asyncio.to_thread(self.backend.receive, self.worker_id, self.block_ms)
+                failures = 0
+            except _ROUTE_ERRORS as e:
+                failures += 1
+                self._stats["receive_errors"] += 1
+                if failures == 1 or failures % 100 == 0:
+                    logger.warning(f"Chat routing receive failed ({e}); retrying")
+                await asyncio.sleep(min(_BACKOFF_MAX_S, 0.05 * (2 ** min(failures, 7))))
+                continue
+            for chat_id, hops, frame in events:
+                self._stats["received"] += 1
+                try:
+                    await self._deliver(chat_id, frame, hops)
+                except Exception as e:
+                    logger.error(f"❌ Failed to deliver routed event for {chat_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "worker_id": self.worker_id,
+            "lease_s": self.lease_s,
+            "running": self._running,
+            "outbox_depth": len(self._outbox),
+            "pending_replies": len(self._waits),
+            **self._stats,
+        }
+
+
+def _resolve_lease_s() -> float:
+    try:
+        return max(1.0, float(os.getenv("TRANSPORT_OWNER_LEASE_SEC", "30")))
+    except ValueError:
+        return 30.0
+
+
+def build_chat_router() -> ChatRouter:
+    """``TRANSPORT_ROUTING_BACKEND=redis`` routes chat events across workers; anything else stays local."""
+    if (os.getenv("TRANSPORT_ROUTING_BACKEND") or "local").strip().lower() != "redis":
+        return ChatRouter()
+    url = (os.getenv("TRANSPORT_ROUTING_REDIS_URL") or os.getenv("REDIS_URL") or "").strip()
+    if not url:
+        logger.warning("TRANSPORT_ROUTING_BACKEND=redis but no TRANSPORT_ROUTING_REDIS_URL set; chat routing disabled")
+        return ChatRouter()
+    try:
+        return ChatRouter(RedisRouteBackend.from_url(url))
+    except ValueError as e:
+        logger.warning(f"Invalid TRANSPORT_ROUTING_REDIS_URL ({e}); chat routing disabled")
+        return ChatRouter()
+
+
+__all__ = [
+    "MAX_ROUTE_HOPS",
+    "ChatRouter",
+    "MemoryRouteBackend",
+    "REPLY_FRAME_TYPE",
+    "RedisRouteBackend",
+    "build_chat_router",
+]
@@ -0,0 +1,208 @@
+# ==============================================================================
+# FILE: frames.py
+# DESCRIPTION: Encode-once WebSocket frames with a pluggable JSON backend
+# ==============================================================================
+
+"""
+Pre-serialized outbound frames for SimpleTransport.
+
+A WireFrame wraps one normalized envelope and encodes it at most once; every
+socket that receives the event reuses the same bytes (or decoded text). The
+JSON backend is chosen via TRANSPORT_JSON_BACKEND:
+
+- auto    : orjson if installed, else msgspec, else stdlib (default)
+- orjson / msgspec / stdlib : force a backend (falls back to stdlib if missing)
+
+Frames are sent as text by default so browser clients keep receiving strings;
+TRANSPORT_BINARY_FRAMES=true sends the encoded bytes as binary frames instead.
+Output matches Starlette's send_json (compact separators, UTF-8, no ASCII escaping).
+
+Protocol v2 clients (``?protocol=2`` on the WebSocket URL) may additionally
+receive batch frames: ``{"type": "transport.batch", "events": [...]}`` where
+each element is an ordinary envelope (with its own ``seq``), in send order.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from mozaiks_infra.logs.logging_config import get_core_logger
+
+try:  # optional fast encoders
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+try:
+    import msgspec  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None  # type: ignore
+
+logger = get_core_logger("transport_frames")
+
+BACKEND_AUTO = "auto"
+BACKEND_ORJSON = "orjson"
+BACKEND_MSGSPEC = "msgspec"
+BACKEND_STDLIB = "stdlib"
+
+_TRUE_FLAG_VALUES = {"1", "true", "yes", "on"}
+
+# WebSocket protocol versions: 1 = one envelope per frame, 2 = batch frames allowed
+PROTOCOL_VERSION_LEGACY = 1
+PROTOCOL_VERSION_BATCH = 2
+PROTOCOL_VERSION_MAX = PROTOCOL_VERSION_BATCH
+BATCH_FRAME_TYPE = "transport.batch"
+PROTOCOL_FRAME_TYPE = "transport.protocol"
+
+
+def _default(obj: Any) -> Any:
+    """Last-resort conversion for values the encoder does not understand."""
+    isoformat = getattr(obj, "isoformat", None)
+    if callable(isoformat):
+        try:
+            return isoformat()
+        except Exception:
+            pass
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _encode_stdlib(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _build_orjson_encoder() -> Optional[Callable[[Any], bytes]]:
+    if orjson is None:
+        return None
+    option = orjson.OPT_NON_STR_KEYS
+
+    def _encode(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_default, option=option)
+        except (TypeError, ValueError):
+            # e.g. integers beyond 64 bits; keep stdlib semantics for the odd payload
+            return _encode_stdlib(obj)
+
+    return _encode
+
+
+def _build_msgspec_encoder() -> Optional[Callable[[Any], bytes]]:
+    if msgspec is None:
+        return None
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+
+    def _encode(obj: Any) -> bytes:
+        try:
+            return encoder.encode(obj)
+        except (TypeError, ValueError, OverflowError):
+            return _encode_stdlib(obj)
+
+    return _encode
+
+
+def _resolve_encoder(requested: str) -> tuple[str, Callable[[Any], bytes]]:
+    requested = (requested or BACKEND_AUTO).strip().lower()
+    builders = {BACKEND_ORJSON: _build_orjson_encoder, BACKEND_MSGSPEC: _build_msgspec_encoder}
+    if requested in builders:
+        encoder = builders[requested]()
+        if encoder is not None:
+            return requested, encoder
+        logger.warning(f"TRANSPORT_JSON_BACKEND={requested} requested but not installed; using stdlib")
+        return BACKEND_STDLIB, _encode_stdlib
+    if requested not in (BACKEND_AUTO, BACKEND_STDLIB):
+        logger.warning(f"Invalid TRANSPORT_JSON_BACKEND '{requested}'; using auto")
+        requested = BACKEND_AUTO
+    if requested == BACKEND_AUTO:
+        for name in (BACKEND_ORJSON, BACKEND_MSGSPEC):
+            encoder = builders[name]()
+            if encoder is not None:
+                return name, encoder
+    return BACKEND_STDLIB, _encode_stdlib
+
+
+_backend_name, _encode = _resolve_encoder(os.getenv("TRANSPORT_JSON_BACKEND", BACKEND_AUTO))
+_binary_frames = os.getenv("TRANSPORT_BINARY_FRAMES", "false").strip().lower() in _TRUE_FLAG_VALUES
+
+
+def get_encoder_backend() -> str:
+    return _backend_name
+
+
+def set_encoder_backend(name: str) -> str:
+    """Switch the JSON backend at runtime (tests/benchmarks); returns the backend in effect."""
+    global _backend_name, _encode
+    _backend_name, _encode = _resolve_encoder(name)
+    return _backend_name
+
+
+def encode_json(obj: Any) -> bytes:
+    return _encode(obj)
+
+
+class WireFrame:
+    """One outbound envelope, encoded lazily and at most once."""
+
+    __slots__ = ("envelope", "_bytes", "_text")
+
+    def __init__(self, envelope: Any):
+        self.envelope = envelope
+        self._bytes: Optional[bytes] = None
+        self._text: Optional[str] = None
+
+    @property
+    def type(self) -> Optional[str]:
+        return self.envelope.get("type") if isinstance(self.envelope, dict) else None
+
+    def encode(self) -> bytes:
+        if self._bytes is None:
+            self._bytes = _encode(self.envelope)
+        return self._bytes
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.encode().decode("utf-8")
+        return self._text
+
+
+def build_batch_frame(frames: List[WireFrame]) -> WireFrame:
+    """Pack already-encoded frames into one batch frame without re-encoding them."""
+    batch = WireFrame({"type": BATCH_FRAME_TYPE, "count": len(frames)})
+    batch._bytes = (
+        b'{"type":"' + BATCH_FRAME_TYPE.encode("ascii") + b'","events":['
+        + b",".join(frame.encode() for frame in frames)
+        + b"]}"
+    )
+    return batch
+
+
+async def send_frame(websocket, frame: WireFrame, *, binary: Optional[bool] = None) -> None:
+    """Send a pre-encoded frame, reusing its bytes/text across sockets."""
+    if binary if binary is not None else _binary_frames:
+        await websocket.send_bytes(frame.encode())
+    else:
+        await websocket.send_text(frame.text())
+
+
+def get_frame_settings() -> Dict[str, Any]:
+    return {"json_backend": _backend_name, "binary_frames": _binary_frames}
+
+
+__all__ = [
+    "BATCH_FRAME_TYPE",
+    "PROTOCOL_FRAME_TYPE",
+    "PROTOCOL_VERSION_BATCH",
+    "PROTOCOL_VERSION_LEGACY",
+    "PROTOCOL_VERSION_MAX",
+    "BACKEND_AUTO",
+    "BACKEND_MSGSPEC",
+    "BACKEND_ORJSON",
+    "BACKEND_STDLIB",
+    "WireFrame",
+    "build_batch_frame",
+    "encode_json",
+    "get_encoder_backend",
+    "get_frame_settings",
+    "send_frame",
+    "set_encoder_backend",
+]
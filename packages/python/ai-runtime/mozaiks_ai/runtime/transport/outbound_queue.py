@@ -0,0 +1,392 @@
+# ==============================================================================
+# FILE: outbound_queue.py
+# DESCRIPTION: Per-connection outbound queue + dedicated WebSocket writer task
+# ==============================================================================
+
+"""
+Outbound delivery for SimpleTransport connections.
+
+Producers (agent coroutines, dispatcher handlers) only append to a bounded
+deque; a dedicated writer task per connection performs the network I/O. A slow
+or stalled client therefore never blocks the workflow that emits events.
+
+Overflow handling is selected with TRANSPORT_SEND_POLICY:
+- drop_oldest : evict the oldest queued message (default; matches legacy H1 behaviour)
+- coalesce    : merge streaming/state deltas into an already-queued message of the
+                same kind, falling back to drop_oldest when nothing can be merged.
+                Merged or superseding messages always move to the tail, so the
+                queue (and the transport ``seq`` stamped on each frame) stays in
+                emit order.
+- block       : producers wait for queue space (never for the send itself)
+
+Optional batching (``batch_max`` > 1 with a ``send_batch`` callback): the writer
+lingers up to ``batch_window_ms`` after the oldest queued message arrived and then
+hands up to ``batch_max`` messages to ``send_batch`` as one frame, in queue order.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from mozaiks_infra.logs.logging_config import get_core_logger
+from mozaiks_ai.runtime.transport.frames import WireFrame
+
+logger = get_core_logger("outbound_queue")
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_COALESCE = "coalesce"
+POLICY_BLOCK = "block"
+SEND_POLICIES = (POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_BLOCK)
+
+# Snapshot envelopes: a newer one supersedes queued snapshots and deltas for the same target.
+_REPLACEABLE_TYPES = {"agui.state.StateSnapshot", "agui.state.MessagesSnapshot"}
+# Patch envelopes: queued patches for the same artifact are concatenated.
+_PATCH_TYPES = {"agui.state.StateDelta"}
+# Snapshots and deltas of one artifact form a single ordered stream.
+_STATE_STREAMS = {
+    "agui.state.StateSnapshot": "agui.state",
+    "agui.state.StateDelta": "agui.state",
+    "agui.state.MessagesSnapshot": "agui.messages",
+}
+# Streaming text chunks: appended to the queued chunk when it is the tail of the queue.
+_STREAM_TYPES = {"chat.print"}
+
+_RETRY_DELAY_S = 0.5
+_MAX_SEND_ATTEMPTS = 3
+
+SendCallback = Callable[[Any], Awaitable[None]]
+BatchSendCallback = Callable[[List[Any]], Awaitable[None]]
+
+
+def resolve_send_policy() -> str:
+    raw = os.getenv("TRANSPORT_SEND_POLICY", POLICY_DROP_OLDEST).strip().lower()
+    if raw in SEND_POLICIES:
+        return raw
+    logger.warning(f"Invalid TRANSPORT_SEND_POLICY '{raw}'; using {POLICY_DROP_OLDEST}")
+    return POLICY_DROP_OLDEST
+
+
+def resolve_send_queue_size(default: int = 100) -> int:
+    try:
+        return max(1, int(os.getenv("TRANSPORT_SEND_QUEUE_MAX", str(default))))
+    except ValueError:
+        return default
+
+
+def resolve_batch_settings() -> Tuple[bool, int, float]:
+    """(enabled, max events per frame, linger window in ms) for protocol v2 connections."""
+    enabled = os.getenv("TRANSPORT_FRAME_BATCHING", "false").strip().lower() in {"1", "true", "yes", "on"}
+    try:
+        max_events = max(1, int(os.getenv("TRANSPORT_BATCH_MAX_EVENTS", "32")))
+    except ValueError:
+        max_events = 32
+    try:
+        window_ms = max(0.0, float(os.getenv("TRANSPORT_BATCH_WINDOW_MS", "5")))
+    except ValueError:
+        window_ms = 5.0
+    return enabled, max_events, window_ms
+
+
+def _envelope(message: Any) -> Any:
+    return message.envelope if isinstance(message, WireFrame) else message
+
+
+def _rewrap(original: Any, envelope: Dict[str, Any]) -> Any:
+    # Merged envelopes need a fresh frame: the original's encoded bytes are stale.
+    return WireFrame(envelope) if isinstance(original, WireFrame) else envelope
+
+
+def _coalesce_key(message: Any) -> Optional[Tuple[str, Any]]:
+    message = _envelope(message)
+    if not isinstance(message, dict):
+        return None
+    msg_type = message.get("type")
+    data = message.get("data")
+    if not isinstance(data, dict):
+        return None
+    if msg_type in _STATE_STREAMS:
+        return (msg_type, data.get("artifact_id"))
+    if msg_type in _STREAM_TYPES:
+        return (msg_type, data.get("agent") or data.get("sender"))
+    return None
+
+
+class OutboundQueue:
+    """Bounded FIFO of outbound envelopes drained by a single writer task."""
+
+    def __init__(
+        self,
+        chat_id: str,
+        send: SendCallback,
+        *,
+        max_size: int = 100,
+        policy: str = POLICY_DROP_OLDEST,
+        batch_max: int = 1,
+        batch_window_ms: float = 0.0,
+        send_batch: Optional[BatchSendCallback] = None,
+    ):
+        self.chat_id = chat_id
+        self._send = send
+        self._send_batch = send_batch
+        self.max_size = max(1, int(max_size))
+        self.policy = policy if policy in SEND_POLICIES else POLICY_DROP_OLDEST
+        self.batch_max = max(1, int(batch_max)) if send_batch is not None else 1
+        self.batch_window_s = max(0.0, float(batch_window_ms)) / 1000.0
+        # Entries are [message, enqueued_at, attempts]; lists so coalescing can update in place.
+        self._queue: Deque[list] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        # Entries currently being written (by id); never coalesced into (their bytes are already on the way).
+        self._inflight: set = set()
+        self._stats: Dict[str, float] = {
+            "enqueued": 0,
+            "sent": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "send_errors": 0,
+            "blocked_puts": 0,
+            "max_depth": 0,
+            "frames": 0,
+            "batches": 0,
+            "batched_messages": 0,
+            "send_ms_total": 0.0,
+            "send_ms_max": 0.0,
+            "last_send_ms": 0.0,
+            "queue_wait_ms_max": 0.0,
+        }
+
+    # Producer side -----------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"ws-writer-{self.chat_id}")
+
+    async def put(self, message: Any) -> bool:
+        """Queue ``message`` for delivery. Only the block policy ever waits (for space, not I/O)."""
+        if self._closed:
+            return False
+        enqueued_at = time.monotonic()
+        if self.policy == POLICY_COALESCE:
+            message, enqueued_at = self._coalesce(message, enqueued_at)
+        if len(self._queue) >= self.max_size:
+            if self.policy == POLICY_BLOCK:
+                self._stats["blocked_puts"] += 1
+                while len(self._queue) >= self.max_size and not self._closed:
+                    self._space.clear()
+                    await self._space.wait()
+                if self._closed:
+                    return False
+            else:
+                self._queue.popleft()
+                self._stats["dropped"] += 1
+                if self._stats["dropped"] % 50 == 1:
+                    logger.warning(
+                        f"🚨 Backpressure for {self.chat_id}: queue full ({self.max_size}), "
+                        f"dropped {int(self._stats['dropped'])} message(s) so far"
+                    )
+        self._queue.append([message, enqueued_at, 0])
+        self._stats["enqueued"] += 1
+        if len(self._queue) > self._stats["max_depth"]:
+            self._stats["max_depth"] = len(self._queue)
+        self._idle.clear()
+        self._ready.set()
+        if self._task is None:
+            self.start()
+        return True
+
+    def _coalesce(self, message: Any, enqueued_at: float) -> Tuple[Any, float]:
+        """Fold queued messages that ``message`` merges with or supersedes into it.
+
+        Absorbed entries are removed and the result is appended at the tail by
+        the caller. The scan stops at the first queued message of the same
+        stream, so a delta never merges across a snapshot (or vice versa).
+        """
+        key = _coalesce_key(message)
+        if key is None or not self._queue:
+            return message, enqueued_at
+        msg_type = key[0]
+        if msg_type in _STREAM_TYPES:
+            tail = self._queue[-1]
+            if id(tail) in self._inflight or _coalesce_key(tail[0]) != key:
+                return message, enqueued_at
+            new_env = _envelope(message)
+            tail_data, new_data = _envelope(tail[0])["data"], new_env["data"]
+            if not isinstance(tail_data.get("content"), str) or not isinstance(new_data.get("content"), str):
+                return message, enqueued_at
+            merged = dict(new_data)
+            merged["content"] = tail_data["content"] + new_data["content"]
+            self._queue.pop()
+            self._stats["coalesced"] += 1
+            return _rewrap(message, {**new_env, "data": merged}), tail[1]
+
+        stream = (_STATE_STREAMS[msg_type], key[1])
+        absorbed: List[int] = []
+        for index in range(len(self._queue) - 1, -1, -1):
+            entry = self._queue[index]
+            if id(entry) in self._inflight:
+                break
+            queued_key = _coalesce_key(entry[0])
+            if queued_key is None or queued_key[0] not in _STATE_STREAMS:
+                continue
+            if (_STATE_STREAMS[queued_key[0]], queued_key[1]) != stream:
+                continue
+            if msg_type in _REPLACEABLE_TYPES:
+                # A snapshot carries the full state: every queued update for the target is obsolete.
+                absorbed.append(index)
+                continue
+            if queued_key[0] in _PATCH_TYPES:
+                new_env = _envelope(message)
+                old_patch = _envelope(entry[0])["data"].get("patch") or []
+                new_patch = new_env["data"].get("patch") or []
+                merged = dict(new_env["data"])
+                merged["patch"] = list(old_patch) + list(new_patch)
+                message = _rewrap(message, {**new_env, "data": merged})
+                enqueued_at = entry[1]
+                absorbed.append(index)
+            break
+        for index in absorbed:  # descending, so earlier indices stay valid
+            del self._queue[index]
+        self._stats["coalesced"] += len(absorbed)
+        if absorbed and len(self._queue) < self.max_size:
+            self._space.set()
+        return message, enqueued_at
+
+    # Writer side -------------------------------------------------------
+    async def _run(self) -> None:
+        while not self._closed:
+            if not self._queue:
+                self._idle.set()
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if self.batch_max > 1 and len(self._queue) < self.batch_max and self.batch_window_s > 0:
+                # Linger so events emitted within the window share one frame.
+                remaining = self.batch_window_s - (time.monotonic() - self._queue[0][1])
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    if not self._queue:
+                        continue
+            count = min(self.batch_max, len(self._queue))
+            entries = [self._queue[i] for i in range(count)]
+            enqueued_at = entries[0][1]
+            self._inflight = {id(entry) for entry in entries}
+            started = time.monotonic()
+            try:
+                if count == 1:
+                    await self._send(entries[0][0])
+                else:
+                    await self._send_batch([entry[0] for entry in entries])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["send_errors"] += 1
+                head = entries[0]
+                head[2] += 1
+                attempts = head[2]
+                if attempts >= _MAX_SEND_ATTEMPTS:
+                    logger.error(
+                        f"Giving up on {count} queued message(s) for {self.chat_id} after {attempts} attempts: {e}"
+                    )
+                    self._discard_head(entries)
+                    self._stats["dropped"] += count
+                else:
+                    logger.error(f"Failed to send queued message to {self.chat_id}: {e}. Will retry shortly.")
+                    await asyncio.sleep(_RETRY_DELAY_S)
+                continue
+            finally:
+                self._inflight = set()
+            finished = time.monotonic()
+            self._discard_head(entries)
+            send_ms = (finished - started) * 1000.0
+            self._stats["sent"] += count
+            self._stats["frames"] += 1
+            if count > 1:
+                self._stats["batches"] += 1
+                self._stats["batched_messages"] += count
+            self._stats["last_send_ms"] = send_ms
+            self._stats["send_ms_total"] += send_ms
+            self._stats["send_ms_max"] = max(self._stats["send_ms_max"], send_ms)
+            self._stats["queue_wait_ms_max"] = max(self._stats["queue_wait_ms_max"], (started - enqueued_at) * 1000.0)
+
+    def _discard_head(self, entries: List[list]) -> None:
+        # Head entries may have been evicted by drop_oldest while the send was in flight.
+        sent_ids = {id(entry) for entry in entries}
+        while self._queue and id(self._queue[0]) in sent_ids:
+            self._queue.popleft()
+        if len(self._queue) < self.max_size:
+            self._space.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been handed to the socket."""
+        if self._closed or not self._queue:
+            return not self._queue
+        self.start()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self) -> None:
+        """Stop the writer; queued messages are discarded (resume replays from persistence)."""
+        self._closed = True
+        self._space.set()
+        self._ready.set()
+        task, self._task = self._task, None
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._queue.clear()
+        self._idle.set()
+
+    # Introspection -----------------------------------------------------
+    def get_metrics(self) -> Dict[str, Any]:
+        frames = self._stats["frames"]
+        batches = self._stats["batches"]
+        return {
+            "depth": len(self._queue),
+            "max_size": self.max_size,
+            "policy": self.policy,
+            "enqueued": int(self._stats["enqueued"]),
+            "sent": int(self._stats["sent"]),
+            "dropped": int(self._stats["dropped"]),
+            "coalesced": int(self._stats["coalesced"]),
+            "send_errors": int(self._stats["send_errors"]),
+            "blocked_puts": int(self._stats["blocked_puts"]),
+            "max_depth": int(self._stats["max_depth"]),
+            "frames": int(frames),
+            "batch_max": self.batch_max,
+            "batches": int(batches),
+            "avg_batch_size": round(self._stats["batched_messages"] / batches, 2) if batches else 0.0,
+            "avg_send_ms": round(self._stats["send_ms_total"] / frames, 3) if frames else 0.0,
+            "max_send_ms": round(self._stats["send_ms_max"], 3),
+            "last_send_ms": round(self._stats["last_send_ms"], 3),
+            "max_queue_wait_ms": round(self._stats["queue_wait_ms_max"], 3),
+        }
+
+
+__all__ = [
+    "OutboundQueue",
+    "POLICY_BLOCK",
+    "POLICY_COALESCE",
+    "POLICY_DROP_OLDEST",
+    "resolve_batch_settings",
+    "resolve_send_policy",
+    "resolve_send_queue_size",
+]
@@ -0,0 +1,211 @@
+# ==============================================================================
+# FILE: replay_buffer.py
+# DESCRIPTION: Per-chat ring of recently sent frames for reconnect replay
+# ==============================================================================
+
+"""
+Reconnect replay for SimpleTransport chats.
+
+Every chat-targeted envelope is stamped with a per-chat transport sequence
+(top-level ``seq``, the field the shell already tracks in ``ws_idx_<chat>``)
+and its prepared WireFrame is kept in a bounded ring. A client that reconnects
+with the last ``seq`` it processed is re-sent only the frames it missed, straight
+from memory and without re-encoding. When the ring no longer covers the gap
+(frames evicted, chat idle past the TTL, process restarted) the caller falls
+back to the persisted transcript.
+
+A new ring restarts at ``seq`` 1, so frames also carry the ring's ``seq_epoch``
+(this buffer's origin, the worker id under SimpleTransport, plus a per-ring
+counter). Clients send it back with the
+``seq`` and a different epoch is always a miss: a ``seq`` from a ring that was
+pruned, forgotten or lived in another process never selects frames by accident.
+
+TRANSPORT_REPLAY_BUFFER_SIZE : frames kept per chat (default 512; 0 disables stamping and replay)
+TRANSPORT_REPLAY_TTL_SEC     : drop a chat's ring after this long without new frames (default 600)
+"""
+
+import itertools
+import os
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from mozaiks_infra.logs.logging_config import get_core_logger
+from mozaiks_ai.runtime.transport.frames import WireFrame
+
+logger = get_core_logger("replay_buffer")
+
+MISS_UNKNOWN = "unknown"  # nothing recorded for the chat in this process
+MISS_EVICTED = "evicted"  # the oldest missing frame already left the ring
+MISS_AHEAD = "ahead"      # client reports a seq this process never issued (e.g. after a restart)
+MISS_EPOCH = "epoch"      # client's seq belongs to another ring (pruned, forgotten or another process)
+
+_LATENCY_SAMPLES = 512
+
+
+def resolve_replay_settings() -> Tuple[int, float]:
+    """(frames kept per chat, idle TTL in seconds)."""
+    try:
+        size = max(0, int(os.getenv("TRANSPORT_REPLAY_BUFFER_SIZE", "512")))
+    except ValueError:
+        size = 512
+    try:
+        ttl_s = max(1.0, float(os.getenv("TRANSPORT_REPLAY_TTL_SEC", "600")))
+    except ValueError:
+        ttl_s = 600.0
+    return size, ttl_s
+
+
+def _percentile(samples: Deque[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3)
+
+
+class _ChatRing:
+    __slots__ = ("epoch", "frames", "head", "touched")
+
+    def __init__(self, size: int, epoch: str):
+        self.epoch = epoch
+        self.frames: Deque[Tuple[int, WireFrame]] = deque(maxlen=size)
+        self.head = 0
+        self.touched = time.monotonic()
+
+
+class ReplayBuffer:
+    """Per-chat sequence stamping plus a bounded ring of the stamped frames."""
+
+    def __init__(self, size: Optional[int] = None, ttl_s: Optional[float] = None, origin: Optional[str] = None):
+        default_size, default_ttl = resolve_replay_settings()
+        self.size = default_size if size is None else max(0, int(size))
+        self.ttl_s = default_ttl if ttl_s is None else float(ttl_s)
+        self._rings: Dict[str, _ChatRing] = {}
+        # Unique per buffer (so per worker); the counter tells rings of one chat apart.
+        self.origin = origin or uuid.uuid4().hex[:12]
+        self._ring_ids = itertools.count(1)
+        self._last_prune = time.monotonic()
+        self._hits = 0
+        self._misses: Dict[str, int] = {MISS_UNKNOWN: 0, MISS_EPOCH: 0, MISS_EVICTED: 0, MISS_AHEAD: 0}
+        self._replayed_frames = 0
+        self._replay_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._fallback_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def record(self, chat_id: str, frame: WireFrame) -> WireFrame:
+        """Stamp ``frame`` with the chat's next ``seq`` and ring ``seq_epoch`` and keep it for replay.
+
+        Returns the frame to send. Non-dict envelopes are passed through unstamped.
+        """
+        if not self.enabled or not isinstance(frame.envelope, dict):
+            return frame
+        now = time.monotonic()
+        ring = self._rings.get(chat_id)
+        if ring is None:
+            ring = self._rings[chat_id] = _ChatRing(self.size, f"{self.origin}.{next(self._ring_ids)}")
+        ring.head += 1
+        stamped = WireFrame({**frame.envelope, "seq": ring.head, "seq_epoch": ring.epoch})
+        ring.frames.append((ring.head, stamped))
+        ring.touched = now
+        if now - self._last_prune > min(60.0, self.ttl_s):
+            self._prune(now)
+        return stamped
+
+    def head(self, chat_id: str) -> int:
+        """Last ``seq`` issued for ``chat_id`` (0 when nothing is recorded)."""
+        ring = self._rings.get(chat_id)
+        return ring.head if ring is not None else 0
+
+    def epoch(self, chat_id: str) -> Optional[str]:
+        """``seq_epoch`` of the chat's current ring (None when nothing is recorded)."""
+        ring = self._rings.get(chat_id)
+        return ring.epoch if ring is not None else None
+
+    def frames_since(self, chat_id: str, last_seq: int, epoch: Optional[str]) -> Optional[List[WireFrame]]:
+        """Frames with ``seq > last_seq`` in send order, or None when the ring cannot cover the gap.
+
+        ``epoch`` is the ``seq_epoch`` the client saw with ``last_seq``; any
+        other epoch (or none) is a miss.
+        """
+        ring = self._rings.get(chat_id)
+        if ring is None or not ring.frames:
+            reason = MISS_UNKNOWN
+        elif epoch != ring.epoch:
+            reason = MISS_EPOCH
+        elif last_seq > ring.head:
+            reason = MISS_AHEAD
+        elif last_seq + 1 < ring.frames[0][0]:
+            reason = MISS_EVICTED
+        else:
+            self._hits += 1
+            # Seqs in the ring are contiguous, so the first missing frame sits at a fixed offset.
+            offset = max(0, last_seq + 1 - ring.frames[0][0])
+            return [frame for _, frame in islice(ring.frames, offset, None)]
+        self._misses[reason] += 1
+        logger.debug(f"Replay buffer miss for {chat_id}: {reason} (last_seq={last_seq}, epoch={epoch})")
+        return None
+
+    def observe_replay(self, elapsed_ms: float, frames: int) -> None:
+        self._replayed_frames += frames
+        self._replay_ms.append(elapsed_ms)
+
+    def observe_fallback(self, elapsed_ms: float) -> None:
+        self._fallback_ms.append(elapsed_ms)
+
+    def is_recorded(self, chat_id: str, message: Any) -> bool:
+        """True when ``message`` is still held in the chat's current ring (so a replay re-sent it)."""
+        ring = self._rings.get(chat_id)
+        if ring is None or not ring.frames or not isinstance(message, WireFrame):
+            return False
+        envelope = message.envelope
+        if not isinstance(envelope, dict) or envelope.get("seq_epoch") != ring.epoch:
+            return False
+        seq = envelope.get("seq")
+        return isinstance(seq, int) and seq >= ring.frames[0][0]
+
+    def forget(self, chat_id: str) -> None:
+        self._rings.pop(chat_id, None)
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        expired = [cid for cid, ring in self._rings.items() if now - ring.touched > self.ttl_s]
+        for cid in expired:
+            del self._rings[cid]
+        if expired:
+            logger.debug(f"Dropped {len(expired)} idle replay ring(s)")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        misses = sum(self._misses.values())
+        lookups = self._hits + misses
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "ttl_s": self.ttl_s,
+            "origin": self.origin,
+            "chats": len(self._rings),
+            "buffered_frames": sum(len(ring.frames) for ring in self._rings.values()),
+            "hits": self._hits,
+            "misses": misses,
+            "misses_by_reason": dict(self._misses),
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "replayed_frames": self._replayed_frames,
+            "replay_ms_p50": _percentile(self._replay_ms, 0.5),
+            "replay_ms_p95": _percentile(self._replay_ms, 0.95),
+            "fallback_ms_p50": _percentile(self._fallback_ms, 0.5),
+            "fallback_ms_p95": _percentile(self._fallback_ms, 0.95),
+        }
+
+
+__all__ = [
+    "MISS_AHEAD",
+    "MISS_EPOCH",
+    "MISS_EVICTED",
+    "MISS_UNKNOWN",
+    "ReplayBuffer",
+    "resolve_replay_settings",
+]
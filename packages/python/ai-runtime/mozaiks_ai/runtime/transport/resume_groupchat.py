@@ -8,7 +8,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from mozaiks_infra.logs.logging_config import get_core_logger
 
@@ -35,7 +35,7 @@ class GroupChatResumer:
             self.logger.debug("[AUTO_RESUME] Missing app_id for %s; skipping", chat_id)
             return None
 
-        doc = await self._fetch_chat_doc(chat_id, app_id, projection={"status": 1, "messages": 1})
+        doc = await self._fetch_chat_doc(chat_id, app_id)
         if not doc:
             self.logger.debug("[AUTO_RESUME] No persisted chat found for %s", chat_id)
             return None
@@ -82,24 +82,25 @@ class GroupChatResumer:
         if not app_id:
             raise RuntimeError("Missing app_id for resume flow")
 
-        doc = await self._fetch_chat_doc(chat_id, app_id, projection={"status": 1, "messages": 1})
-        messages: List[Dict[str, Any]] = doc.get("messages", []) or []
-        status = doc.get("status", "unknown")
-
         if last_client_index < -1:
             last_client_index = -1
         start_index = last_client_index + 1
 
-        if start_index >= len(messages):
+        doc, offset = await self._fetch_resume_tail(chat_id, app_id, start_index)
+        messages: List[Dict[str, Any]] = doc.get("messages", []) or []
+        status = doc.get("status", "unknown")
+        total_messages = offset + len(messages)
+
+        if start_index >= total_messages:
             summary = {
                 "replayed_messages": 0,
                 "last_message_index": last_client_index,
-                "total_messages": len(messages),
+                "total_messages": total_messages,
             }
             await send_event(
                 self._build_boundary_event(
                     chat_id=chat_id,
-                    total_messages=len(messages),
+                    total_messages=total_messages,
                     replayed=0,
                     last_index=last_client_index,
                     mode="client",
@@ -118,14 +119,15 @@ class GroupChatResumer:
             send_event=send_event,
             mode="client",
             chat_status=status,
-            start_index=start_index,
+            start_index=start_index - offset,
             context={"reason": "client_resume", "last_client_index": last_client_index},
             startup_mode=None,  # Client resume doesn't need filtering (they already saw it)
+            index_offset=offset,
         )
         return {
-            "replayed_messages": len(messages[start_index:]) if last_index is not None else 0,
+            "replayed_messages": total_messages - start_index if last_index is not None else 0,
             "last_message_index": last_index if last_index is not None else last_client_index,
-            "total_messages": len(messages),
+            "total_messages": total_messages,
         }
 
     # ------------------------------------------------------------------
@@ -142,13 +144,17 @@ class GroupChatResumer:
         start_index: int,
         context: Optional[Dict[str, Any]],
         startup_mode: Optional[str] = None,
+        index_offset: int = 0,
     ) -> Optional[int]:
+        # ``messages`` may be a transcript tail whose first entry is index ``index_offset``.
         slice_messages = messages[start_index:]
+        total_messages = index_offset + len(messages)
+        start_index += index_offset
         if not slice_messages:
             await send_event(
                 self._build_boundary_event(
                     chat_id=chat_id,
-                    total_messages=len(messages),
+                    total_messages=total_messages,
                     replayed=0,
                     last_index=start_index - 1,
                     mode=mode,
@@ -191,7 +197,7 @@ class GroupChatResumer:
         await send_event(
             self._build_boundary_event(
                 chat_id=chat_id,
-                total_messages=len(messages),
+                total_messages=total_messages,
                 replayed=len(slice_messages),
                 last_index=last_index,
                 mode=mode,
@@ -295,19 +301,34 @@ class GroupChatResumer:
         }
 
     async def _fetch_chat_doc(
-        self,
-        chat_id: str,
-        app_id: str,
-        projection: Optional[Dict[str, int]] = None,
+        self, chat_id: str, app_id: str, after_sequence: Optional[int] = None
     ) -> Dict[str, Any]:
+        """Return ``{"status", "last_sequence", "messages"}`` independent of transcript layout."""
         try:
             pm = await self._ensure_persistence_manager()
-            coll = await pm._coll()
-            return await coll.find_one({"_id": chat_id, "app_id": app_id}, projection) or {}
+            return await pm.load_chat_transcript(chat_id=chat_id, app_id=app_id, after_sequence=after_sequence) or {}
         except Exception as exc:
             self.logger.warning("Failed to fetch chat doc for %s: %s", chat_id, exc)
             return {}
 
+    async def _fetch_resume_tail(self, chat_id: str, app_id: str, start_index: int) -> Tuple[Dict[str, Any], int]:
+        """Load the transcript from ``start_index`` on; returns ``(doc, index of doc["messages"][0])``.
+
+        Sequences are allocated from 1, one per message, so index ``i`` is
+        sequence ``i + 1`` and the tail can come from the sequence index. If the
+        tail is not exactly ``start_index + 1 .. last_sequence`` (legacy rows
+        without sequences) the whole transcript is loaded instead.
+        """
+        if start_index > 0:
+            doc = await self._fetch_chat_doc(chat_id, app_id, after_sequence=start_index)
+            tail = doc.get("messages", []) or []
+            contiguous = all(
+                isinstance(msg, dict) and msg.get("sequence") == start_index + 1 + i for i, msg in enumerate(tail)
+            )
+            if doc and contiguous and int(doc.get("last_sequence", 0) or 0) == start_index + len(tail):
+                return doc, start_index
+        return await self._fetch_chat_doc(chat_id, app_id), 0
+
     async def _ensure_persistence_manager(self):
         if self._persistence_manager is None:
             from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager
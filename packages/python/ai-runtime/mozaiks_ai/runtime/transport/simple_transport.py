@@ -10,6 +10,8 @@ import uuid
 import traceback
 import os
 import importlib
+import functools
+import time
 from typing import Dict, Any, Optional, Union, Tuple, List
 from fastapi import WebSocket
 from datetime import datetime, timezone
@@ -31,6 +33,24 @@ from mozaiks_infra.logs.logging_config import get_core_logger
 # Session manager for multi-workflow navigation
 from mozaiks_ai.runtime.workflow import session_manager
 from mozaiks_ai.runtime.transport.session_registry import session_registry
+from mozaiks_ai.runtime.transport.outbound_queue import (
+    OutboundQueue,
+    resolve_batch_settings,
+    resolve_send_policy,
+    resolve_send_queue_size,
+)
+from mozaiks_ai.runtime.transport.frames import (
+    PROTOCOL_FRAME_TYPE,
+    PROTOCOL_VERSION_BATCH,
+    PROTOCOL_VERSION_LEGACY,
+    PROTOCOL_VERSION_MAX,
+    WireFrame,
+    build_batch_frame,
+    get_frame_settings,
+    send_frame,
+)
+from mozaiks_ai.runtime.transport.replay_buffer import ReplayBuffer
+from mozaiks_ai.runtime.transport.chat_router import MAX_ROUTE_HOPS, REPLY_FRAME_TYPE, build_chat_router
 
 # Runtime extensions (workflow-declared lifecycle hooks)
 from mozaiks_ai.runtime.runtime.extensions import get_workflow_lifecycle_hooks
@@ -73,6 +93,30 @@ def _load_general_agent_service():
 # Use get_workflow_lifecycle_hooks(workflow_name) from mozaiks_ai.runtime.runtime.extensions instead.
 
 
+@functools.lru_cache(maxsize=1)
+def _resolve_ag2_event_types() -> Tuple[Any, Any]:
+    """Resolve optional AG2 event classes once (lazy so absence of autogen doesn't break app start)."""
+    try:
+        from autogen.events.agent_events import InputRequestEvent  # type: ignore
+    except Exception:  # pragma: no cover - autogen optional
+        InputRequestEvent = tuple()  # type: ignore
+
+    # Optional tool events (some versions place them elsewhere)
+    ToolResponseEvent = None  # default
+    for mod_path in [
+        "autogen.events.tool_events",
+        "autogen.events.agent_events",  # fallback if class relocated
+    ]:
+        if ToolResponseEvent:
+            break
+        try:  # pragma: no cover - defensive import paths
+            mod = __import__(mod_path, fromlist=["ToolResponseEvent"])
+            ToolResponseEvent = getattr(mod, "ToolResponseEvent", None)
+        except Exception:
+            continue
+    return InputRequestEvent, ToolResponseEvent
+
+
 # Module-level content cleaner to allow reuse without constructing SimpleTransport
 def _extract_clean_content(message: Union[str, Dict[str, Any], Any]) -> str:
     """Extract clean content from AG2 UUID-formatted messages or other formats.
@@ -144,15 +188,35 @@ class SimpleTransport:
         self._sequence_counters: Dict[str, int] = {}          # T3
 
         # H1-H2: Hardening features
-        self._message_queues: Dict[str, List[Dict[str, Any]]] = {}  # H1
-        self._heartbeat_tasks: Dict[str, asyncio.Task] = {}         # H2
-        self._max_queue_size = 100
+        self._message_queues: Dict[str, OutboundQueue] = {}  # H1: per-connection writer queues
+        self._heartbeat_tasks: Dict[str, asyncio.Task] = {}  # H2
+        self._max_queue_size = resolve_send_queue_size(100)
+        self._send_policy = resolve_send_policy()
+        # Opt-in frame batching (only for clients that negotiate protocol v2)
+        self._batch_frames, self._batch_max_events, self._batch_window_ms = resolve_batch_settings()
         self._heartbeat_interval = 120
 
         # H4: Pre-connection buffering (delivery reliability)
-        self._pre_connection_buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._pre_connection_buffers: Dict[str, List[Any]] = {}
         self._max_pre_connection_buffer = 200
-        self._scheduled_flush_tasks: Dict[str, asyncio.Task] = {}
+
+        # Multi-worker routing: events for chats whose socket lives in another worker are forwarded there,
+        # and client replies to the worker waiting on them
+        self._router = build_chat_router()
+        # Messages waiting on an owner lookup, per chat, in production order
+        self._route_pending: Dict[str, List[Tuple[Any, int]]] = {}
+
+        # Reconnect replay: chat-targeted frames carry a per-chat ``seq`` and stay in a bounded ring.
+        # Rings are per worker, so their epochs carry the worker id.
+        self._replay = ReplayBuffer(origin=self._router.worker_id)
+        # Per-chat state of chats with no local socket, run or pending input is swept after this idle time
+        self._chat_activity: Dict[str, float] = {}
+        try:
+            self._chat_state_ttl_s = max(1.0, float(os.environ.get("TRANSPORT_CHAT_STATE_TTL_SEC", "900")))
+        except ValueError:
+            self._chat_state_ttl_s = 900.0
+        self._swept_chats = 0
+        self._maintenance_task: Optional[asyncio.Task] = None
 
         # UI tool response correlation
         self.pending_ui_tool_responses: Dict[str, asyncio.Future] = {}
@@ -205,11 +269,13 @@ class SimpleTransport:
     # USER INPUT COLLECTION (Production-Ready)
     # ==================================================================================
     
-    async def submit_user_input(self, input_request_id: str, user_input: str) -> bool:
+    async def submit_user_input(self, input_request_id: str, user_input: str, *, route: bool = True) -> bool:
         """
         Submit user input response for a pending input request.
         
         This method is called by the API endpoint when the frontend submits user input.
+        When the request is pending in another worker, the input is routed there
+        (unless ``route`` is False, as for input that was already routed here).
         """
         logger.info(f"🔍 [INPUT_SUBMIT] Looking for request_id={input_request_id} in {len(self._input_request_registries)} chat registries")
         for cid, reg in self._input_request_registries.items():
@@ -240,6 +306,7 @@ class SimpleTransport:
                         del reg[input_request_id]
                     except Exception:
                         pass
+                    self._router.reply_settled(input_request_id)
                 break
         if handled:
             # Emit chat.input_ack for B9/B10 protocol compliance
@@ -253,7 +320,9 @@ class SimpleTransport:
                 except Exception as e:
                     logger.warning(f"Failed to emit input_ack: {e}")
             return True
-        
+
+        if route and await self._route_reply("input", input_request_id, {"text": user_input}):
+            return True
         logger.error(f"❌ [INPUT] No active request found for {input_request_id}")
         return False
 
@@ -271,6 +340,8 @@ class SimpleTransport:
         if chat_id not in self._input_request_registries:
             self._input_request_registries[chat_id] = {}
         self._input_request_registries[chat_id][normalized_id] = respond_cb
+        # The reply may arrive at another worker's socket or endpoint
+        self._router.expect_reply(normalized_id)
         logger.debug(f"Registered input request {normalized_id} for chat {chat_id}")
         return normalized_id
 
@@ -384,25 +455,21 @@ class SimpleTransport:
             if not pm:
                 pm = AG2PersistenceManager()
                 self._persistence_manager = pm
-            coll = await pm._coll()  # type: ignore[attr-defined]
             now_dt = datetime.now(timezone.utc)
-            bump = await coll.find_one_and_update(
-                {"_id": chat_id},
-                {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": now_dt}},
-                return_document=ReturnDocument.AFTER,
-            )
-            seq = int(bump.get('last_sequence', 1)) if bump else 1
-            index = seq - 1  # zero-based index for UI
             msg_doc = {
                 'role': 'user',
                 'name': 'user',
                 'content': content,
                 'timestamp': now_dt,
                 'event_type': 'message.created',
-                'sequence': seq,
                 'source': source,
             }
-            await coll.update_one({"_id": chat_id}, {"$push": {"messages": msg_doc}})
+            seq = await pm.append_chat_message(
+                chat_id=chat_id,
+                app_id=(self.connections.get(chat_id) or {}).get('app_id'),
+                message=msg_doc,
+            )
+            index = (seq or 1) - 1  # zero-based index for UI
         except Exception as e:
             # Persistence failure should not block UI emission; fall back to in-memory sequence
             logger.error(f"Failed to persist user message for {chat_id}: {e}")
@@ -441,16 +508,14 @@ class SimpleTransport:
                     from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager
                     pm = getattr(self, '_persistence_manager', None) or AG2PersistenceManager()
                     self._persistence_manager = pm
-                    coll = await pm._coll()  # type: ignore[attr-defined]
-                    now = datetime.now(timezone.utc)
                     snapshot_doc = {
                         'role': 'system',
                         'name': 'context',
                         'content': {'updated': applied, 'component_id': component_id, 'action_type': action_type},
-                        'timestamp': now,
+                        'timestamp': datetime.now(timezone.utc),
                         'event_type': 'context.updated',
                     }
-                    await coll.update_one({"_id": chat_id, "app_id": app_id}, {"$push": {"messages": snapshot_doc}, "$set": {"last_updated_at": now}})
+                    await pm.append_chat_message(chat_id=chat_id, app_id=app_id, message=snapshot_doc)
                 except Exception as pe:
                     logger.debug(f"Context snapshot persistence failed: {pe}")
             # Emit acknowledgement event
@@ -665,32 +730,115 @@ class SimpleTransport:
         """Broadcast event data to relevant WebSocket connections."""
         active_connections = list(self.connections.items())
         
-        # If a chat_id is specified, only send to that connection
+        # If a chat_id is specified, only send to that connection.
+        # H1: messages are handed to the connection's writer task; the caller never
+        # awaits the websocket send itself.
+        # The event is normalized and encoded once; every recipient reuses the frame.
         if target_chat_id:
-            connection_info = self.connections.get(target_chat_id)
-            if connection_info and connection_info.get("websocket"):
-                # H1: Use message queuing with backpressure control
-                await self._queue_message_with_backpressure(target_chat_id, event_data)
-                await self._flush_message_queue(target_chat_id)
-            else:
-                # H4: Buffer message until the websocket connects
-                buf = self._pre_connection_buffers.setdefault(target_chat_id, [])
-                buf.append(event_data)
-                if len(buf) > self._max_pre_connection_buffer:
-                    # Drop oldest while keeping newest insight
-                    overflow = len(buf) - self._max_pre_connection_buffer
-                    del buf[0:overflow]
-                    logger.warning(f"🧹 Dropped {overflow} pre-connection buffered messages for {target_chat_id}")
-                logger.debug(f"🕑 Buffered pre-connection message for {target_chat_id} (size={len(buf)})")
+            await self._send_to_chat(target_chat_id, event_data)
             return
 
         # Otherwise, broadcast to all connections
+        frame: Optional[WireFrame] = None
         for chat_id, info in active_connections:
             websocket = info.get("websocket")
             if websocket:
-                # H1: Use message queuing with backpressure control
-                await self._queue_message_with_backpressure(chat_id, event_data)
-                await self._flush_message_queue(chat_id)
+                if frame is None:
+                    frame = self._prepare_frame(event_data)
+                await self._queue_message_with_backpressure(chat_id, frame)
+
+    async def _send_to_chat(self, chat_id: str, message: Any, hops: int = 0) -> None:
+        """Deliver to the chat's socket: locally, via the worker that owns it, or into the pre-connection buffer."""
+        self._chat_activity[chat_id] = time.monotonic()
+        pending = self._route_pending.get(chat_id)
+        if pending is not None:
+            # An owner lookup for this chat is in flight; queue behind it to keep production order.
+            pending.append((message, hops))
+            return
+        if self._is_local(chat_id) or not self._router.running or hops >= MAX_ROUTE_HOPS:
+            await self._dispatch_to_chat(chat_id, message, hops, None)
+            return
+        # A routed event that missed its socket here re-checks the lease instead of the cache.
+        known, owner = self._router.peek_owner(chat_id) if hops == 0 else (False, None)
+        if known:
+            await self._dispatch_to_chat(chat_id, message, hops, owner)
+            return
+        self._route_pending[chat_id] = pending = [(message, hops)]
+        try:
+            owner = await self._router.owner(chat_id, fresh=hops > 0)
+            while pending:
+                queued, queued_hops = pending.pop(0)
+                await self._dispatch_to_chat(chat_id, queued, queued_hops, owner)
+        finally:
+            self._route_pending.pop(chat_id, None)
+
+    def _is_local(self, chat_id: str) -> bool:
+        connection_info = self.connections.get(chat_id)
+        return bool(connection_info and connection_info.get("websocket"))
+
+    async def _dispatch_to_chat(self, chat_id: str, message: Any, hops: int, owner: Optional[str]) -> None:
+        if owner is not None and owner != self._router.worker_id and hops < MAX_ROUTE_HOPS and not self._is_local(chat_id):
+            # Anything buffered while no worker owned the chat goes first, in order.
+            for buffered in self._pre_connection_buffers.pop(chat_id, None) or []:
+                self._router.forward(owner, chat_id, self._as_frame(buffered).encode(), hops)
+            self._router.forward(owner, chat_id, self._as_frame(message).encode(), hops)
+            return
+        if self._replay.enabled:
+            message = self._replay.record(chat_id, self._as_frame(message))
+        if self._is_local(chat_id):
+            await self._queue_message_with_backpressure(chat_id, message)
+        else:
+            self._buffer_pre_connection(chat_id, message)
+
+    def _as_frame(self, message: Any) -> WireFrame:
+        return message if isinstance(message, WireFrame) else self._prepare_frame(message)
+
+    async def _deliver_routed(self, chat_id: str, frame: bytes, hops: int) -> None:
+        """Router callback: an event another worker produced for a chat whose socket is (or was) here,
+        or a client reply to a request this worker is waiting on."""
+        envelope = json.loads(frame)
+        if isinstance(envelope, dict) and envelope.get("type") == REPLY_FRAME_TYPE:
+            await self._resolve_routed_reply(envelope.get("data") or {})
+            return
+        # The producer already normalized the envelope; wrap it without re-preparing.
+        await self._send_to_chat(chat_id, WireFrame(envelope), hops)
+
+    async def _route_reply(self, kind: str, request_id: str, payload: Dict[str, Any], chat_id: Optional[str] = None) -> bool:
+        """Forward a client reply this worker has no waiter for to the worker that registered the wait."""
+        if not self._router.running:
+            return False
+        owner = await self._router.reply_owner(request_id)
+        if owner is None or owner == self._router.worker_id:
+            return False
+        envelope = {"type": REPLY_FRAME_TYPE, "data": {"kind": kind, "request_id": request_id, "payload": payload}}
+        self._router.forward(owner, chat_id or "", WireFrame(envelope).encode())
+        logger.info(f"↪️ Routed {kind} reply {request_id} to worker {owner}")
+        return True
+
+    async def _resolve_routed_reply(self, data: Dict[str, Any]) -> None:
+        kind, request_id, payload = data.get("kind"), data.get("request_id"), data.get("payload") or {}
+        if not isinstance(request_id, str):
+            return
+        if kind == "input":
+            ok = await self.submit_user_input(request_id, str(payload.get("text") or ""), route=False)
+        elif kind == "ui_tool":
+            ok = await self.submit_ui_tool_response(request_id, payload.get("response") or {}, route=False)
+        else:
+            logger.warning(f"Dropping routed reply of unknown kind {kind!r}")
+            return
+        if not ok:
+            logger.warning(f"⚠️ Routed {kind} reply {request_id} found no pending request on this worker")
+
+    def _buffer_pre_connection(self, chat_id: str, event_data: Any) -> None:
+        """H4: Buffer a message until the websocket for ``chat_id`` connects."""
+        buf = self._pre_connection_buffers.setdefault(chat_id, [])
+        buf.append(event_data)
+        if len(buf) > self._max_pre_connection_buffer:
+            # Drop oldest while keeping newest insight
+            overflow = len(buf) - self._max_pre_connection_buffer
+            del buf[0:overflow]
+            logger.warning(f"🧹 Dropped {overflow} pre-connection buffered messages for {chat_id}")
+        logger.debug(f"🕑 Buffered pre-connection message for {chat_id} (size={len(buf)})")
 
     def _stringify_unknown(self, obj: Any) -> str:
         """Safely convert any object to a string for logging/transport."""
@@ -710,26 +858,6 @@ class SimpleTransport:
     def _serialize_ag2_events(self, obj: Any) -> Any:
         """Convert AG2 event objects to JSON-serializable format."""
         try:
-            # Lazy import so absence of autogen doesn't break app start.
-            try:
-                from autogen.events.agent_events import InputRequestEvent  # type: ignore
-            except Exception:  # pragma: no cover - autogen optional
-                InputRequestEvent = tuple()  # type: ignore
-
-            # Optional tool events (some versions place them elsewhere)
-            ToolResponseEvent = None  # default
-            for mod_path in [
-                "autogen.events.tool_events",
-                "autogen.events.agent_events",  # fallback if class relocated
-            ]:
-                if ToolResponseEvent:
-                    break
-                try:  # pragma: no cover - defensive import paths
-                    mod = __import__(mod_path, fromlist=["ToolResponseEvent"])
-                    ToolResponseEvent = getattr(mod, "ToolResponseEvent", None)
-                except Exception:
-                    continue
-
             # Primitive fast-path
             if obj is None or isinstance(obj, (str, int, float, bool)):
                 return obj
@@ -740,6 +868,8 @@ class SimpleTransport:
             if isinstance(obj, (list, tuple, set)):
                 return [self._serialize_ag2_events(v) for v in list(obj)]
 
+            InputRequestEvent, ToolResponseEvent = _resolve_ag2_event_types()
+
             # Specific AG2 event shapes
             def _extract_sender(o):
                 s = getattr(o, "sender", None)
@@ -868,7 +998,7 @@ class SimpleTransport:
             
             if not is_valid:
                 logger.warning(f"⚠️ Prerequisite validation failed for {target_workflow}: {error_msg}")
-                await websocket.send_json({
+                await self._send_reply(chat_id, websocket, {
                     "type": "chat.prereq_blocked",
                     "data": {
                         "workflow_name": target_workflow,
@@ -896,7 +1026,7 @@ class SimpleTransport:
             logger.info(f"✅ Created new session {new_session['_id']} with artifact {artifact['_id']}")
             
             # Notify frontend to navigate to new chat
-            await websocket.send_json({
+            await self._send_reply(chat_id, websocket, {
                 "type": "chat.navigate",
                 "data": {
                     "chat_id": new_session["_id"],
@@ -945,7 +1075,7 @@ class SimpleTransport:
                 logger.debug("Artifact state delta emission failed for %s", artifact_id, exc_info=True)
             
             # Broadcast state update to all connections for this artifact
-            await websocket.send_json({
+            await self._send_reply(chat_id, websocket, {
                 "type": "artifact.state.updated",
                 "data": {
                     "artifact_id": artifact_id,
@@ -959,7 +1089,7 @@ class SimpleTransport:
         # Route: other actions (forward to agent as tool_call or handle directly)
         logger.info(f"🔄 Artifact action {action} received for chat {chat_id}")
         # Future: route to agent or handle other action types
-        await websocket.send_json({
+        await self._send_reply(chat_id, websocket, {
             "type": "ack.artifact_action",
             "data": {
                 "action": action,
@@ -1066,15 +1196,33 @@ class SimpleTransport:
             await self._broadcast_to_websockets(failed_envelope, chat_id)
             logger.error("artifact.action failed: %s", exc, exc_info=True)
 
-    async def _handle_resume_request(self, chat_id: str, last_client_index: int, websocket) -> None:
+    async def _handle_resume_request(
+        self,
+        chat_id: str,
+        last_client_index: Optional[int],
+        websocket,
+        last_seq: Optional[int] = None,
+        seq_epoch: Optional[str] = None,
+    ) -> None:
         """Resume protocol aligned with AG2 GroupChat resume semantics.
 
-        We DO NOT compute sequence diffs via a bespoke diff endpoint anymore.
+        A socket that was already resumed when it connected (``?last_seq=``
+        replay or the auto-resume of an IN_PROGRESS chat) only gets the
+        chat.resume_boundary for its first client.resume, so a reconnect loads
+        the transcript at most once.
+
+        Fast path: when the client also reports the last transport ``seq`` it
+        processed (``lastSeq`` with its ``seqEpoch``) and the replay ring still
+        holds every frame after it, those frames are re-sent from memory followed
+        by a chat.resume_boundary with ``resume_mode="buffer"``; nothing is
+        loaded from persistence.
+
+        Otherwise we DO NOT compute sequence diffs via a bespoke diff endpoint.
         Instead we:
           1. Load the authoritative persisted message list for the chat.
           2. Determine the slice of messages the client is missing based on the
              last message *index* the client reports it has (last_client_index).
-             The client sends -1 if it has none.
+             The client sends -1 (or omits it) if it has none.
           3. Re-emit each missing message to the client as chat.text with a
              replay flag and a stable index. We keep an internal sequence counter
              but its primary purpose is ordering of new live events; indexes are
@@ -1091,6 +1239,36 @@ class SimpleTransport:
             if not app_id:
                 raise RuntimeError("Missing app_id for resume")
 
+            connect_resume = conn_meta.pop("connect_resume", None)
+            if connect_resume is not None:
+                await self.send_event_to_ui({
+                    "kind": "resume_boundary",
+                    "chat_id": chat_id,
+                    "resume_mode": connect_resume["mode"],
+                    "replayed_events": connect_resume["replayed_events"],
+                    "last_seq": last_seq,
+                    "head_seq": self._replay.head(chat_id),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                }, chat_id)
+                logger.info(f"✅ Resume for chat={chat_id} already served on connect ({connect_resume['mode']})")
+                return
+
+            if last_seq is not None and self._replay.enabled:
+                replayed = await self._replay_from_buffer(chat_id, last_seq, seq_epoch)
+                if replayed is not None:
+                    await self.send_event_to_ui({
+                        "kind": "resume_boundary",
+                        "chat_id": chat_id,
+                        "resume_mode": "buffer",
+                        "replayed_events": replayed,
+                        "last_seq": last_seq,
+                        "head_seq": self._replay.head(chat_id),
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                    }, chat_id)
+                    logger.info(f"✅ Resume served from replay buffer chat={chat_id} replayed={replayed} after_seq={last_seq}")
+                    return
+
+            started = time.perf_counter()
             # Use the AG2-aligned resumer so visibility filtering and UI tool replay
             # semantics stay consistent with live events (no leaking hidden agents).
             from mozaiks_ai.runtime.transport.resume_groupchat import GroupChatResumer
@@ -1099,7 +1277,7 @@ class SimpleTransport:
             summary = await resumer.handle_resume_request(
                 chat_id=str(chat_id),
                 app_id=str(app_id),
-                last_client_index=int(last_client_index),
+                last_client_index=-1 if last_client_index is None else int(last_client_index),
                 send_event=self.send_event_to_ui,
             )
 
@@ -1114,6 +1292,7 @@ class SimpleTransport:
                 await self._emit_messages_snapshot(chat_id=chat_id, app_id=app_id, mode="client")
             except Exception:
                 logger.debug("MessagesSnapshot emission failed for %s", chat_id, exc_info=True)
+            self._replay.observe_fallback((time.perf_counter() - started) * 1000.0)
 
             logger.info(
                 "✅ Resume complete chat=%s replayed=%s missing_from>%s now_at_index=%s total=%s",
@@ -1127,6 +1306,32 @@ class SimpleTransport:
             logger.error(f"❌ Resume failed chat={chat_id}: {e}")
             raise
 
+    async def _replay_from_buffer(self, chat_id: str, last_seq: int, seq_epoch: Optional[str]) -> Optional[int]:
+        """Re-send frames after ``last_seq`` of ring ``seq_epoch`` from the replay ring.
+
+        Returns how many frames were queued, or None when the ring cannot cover
+        the gap and the caller has to fall back to the persisted transcript.
+        """
+        started = time.perf_counter()
+        conn = self.connections.get(chat_id) or {}
+        # Frames up to replay_floor were already re-sent on this socket (e.g. on connect).
+        floor_epoch, floor = conn.get("replay_floor") or (None, 0)
+        if floor_epoch == seq_epoch:
+            last_seq = max(last_seq, floor)
+        frames = self._replay.frames_since(chat_id, last_seq, seq_epoch)
+        if frames is None:
+            return None
+        # Drain between chunks so a long replay is not trimmed by the queue's overflow policy.
+        chunk = max(1, self._max_queue_size // 2)
+        for i, frame in enumerate(frames, 1):
+            await self._queue_message_with_backpressure(chat_id, frame)
+            if i % chunk == 0 and i < len(frames):
+                await self._flush_message_queue(chat_id)
+        if chat_id in self.connections:
+            self.connections[chat_id]["replay_floor"] = (self._replay.epoch(chat_id), self._replay.head(chat_id))
+        self._replay.observe_replay((time.perf_counter() - started) * 1000.0, len(frames))
+        return len(frames)
+
     def _validate_inbound_message(self, message_data: dict) -> bool:
         """H3: Validate inbound WebSocket message schema"""
         if not isinstance(message_data, dict):
@@ -1151,8 +1356,14 @@ class SimpleTransport:
             return ("ui_tool_id" in message_data or "eventId" in message_data)
         
         elif msg_type == "client.resume":
-            # Canonical resume field: lastClientIndex (0-based index of last message the client has)
-            return all(field in message_data for field in ["chat_id", "lastClientIndex"]) and isinstance(message_data.get("lastClientIndex"), int)
+            # lastClientIndex: 0-based index of the last message the client has;
+            # lastSeq/seqEpoch: last transport frame it processed. One of the two is required.
+            if "chat_id" not in message_data:
+                return False
+            return any(
+                isinstance(message_data.get(field), int) and not isinstance(message_data.get(field), bool)
+                for field in ("lastClientIndex", "lastSeq")
+            )
 
         elif msg_type == "artifact.action":
             # Artifact action invocation (stateless tool execution)
@@ -1215,6 +1426,10 @@ class SimpleTransport:
         # Store ws_id for session registry lookups
         if ws_id is None:
             ws_id = id(websocket)
+
+        # Protocol negotiation: clients advertise ?protocol=N; legacy clients get v1 (one event per frame)
+        client_protocol = self._requested_protocol(websocket)
+        protocol_version = min(client_protocol or PROTOCOL_VERSION_LEGACY, PROTOCOL_VERSION_MAX)
         
         self.connections[chat_id] = {
             "websocket": websocket,
@@ -1223,27 +1438,75 @@ class SimpleTransport:
             "app_id": app_id,
             "active": True,
             "ws_id": ws_id,  # Track WebSocket ID for session switching
+            "protocol_version": protocol_version,
         }
-        logger.info(f"🔌 WebSocket connected for chat_id: {chat_id} (ws_id={ws_id})")
+        logger.info(f"🔌 WebSocket connected for chat_id: {chat_id} (ws_id={ws_id}, protocol=v{protocol_version})")
+        self._chat_activity[chat_id] = time.monotonic()
+        await self._ensure_maintenance()
+        # Other workers now forward this chat's events here
+        await self._router.claim(chat_id)
         
         # H2: Start heartbeat for connection
         await self._start_heartbeat(chat_id, websocket)
         
-        # H1: Initialize message queue for backpressure control
-        self._message_queues[chat_id] = []
+        # H1: Start the per-connection writer queue
+        queue = await self._open_outbound_queue(chat_id, websocket)
+        if client_protocol is not None:
+            # Tell negotiating clients what this server will send before any events
+            await queue.put(WireFrame({
+                "type": PROTOCOL_FRAME_TYPE,
+                "data": {
+                    "version": protocol_version,
+                    "batching": queue.batch_max > 1,
+                    "max_batch_events": queue.batch_max,
+                    "batch_window_ms": self._batch_window_ms if queue.batch_max > 1 else 0,
+                },
+            }))
+
+        # Reconnect replay: a client advertising ?last_seq=N&seq_epoch=E gets the frames
+        # it missed from the in-memory ring instead of a transcript reload
+        replayed: Optional[int] = None
+        last_seq = self._requested_last_seq(websocket)
+        seq_epoch = self._requested_seq_epoch(websocket)
+        last_client_index = self._requested_last_client_index(websocket)
+        if last_seq is not None and self._replay.enabled:
+            replayed = await self._replay_from_buffer(chat_id, last_seq, seq_epoch)
 
         # H4: Flush any pre-connection buffered messages (if orchestration
         # started emitting before the UI finished the handshake)
         if chat_id in self._pre_connection_buffers:
             buffered = self._pre_connection_buffers.pop(chat_id)
+            if buffered and replayed is not None:
+                # Stamped frames were already re-sent from the replay ring
+                buffered = [msg for msg in buffered if not self._replay.is_recorded(chat_id, msg)]
             if buffered:
                 logger.info(f"📤 Flushing {len(buffered)} pre-connection buffered messages for {chat_id}")
                 for msg in buffered:
                     await self._queue_message_with_backpressure(chat_id, msg)
-                await self._flush_message_queue(chat_id)
 
         # H5: Auto-resume for IN_PROGRESS chats (check status and restore chat history)
-        await self._auto_resume_if_needed(chat_id, websocket, app_id)
+        resumed = replayed is not None
+        if replayed is None and last_seq is not None and last_client_index is not None:
+            # Ring miss, but the client said which messages it has (?last_client_index=):
+            # send only the transcript tail after it, as for client.resume
+            try:
+                await self._handle_resume_request(chat_id, last_client_index, websocket)
+                resumed = True
+            except Exception:
+                logger.debug(f"Incremental reconnect resume failed for {chat_id}", exc_info=True)
+        if not resumed:
+            started = time.perf_counter()
+            resumed = await self._auto_resume_if_needed(chat_id, websocket, app_id)
+            if last_seq is not None:
+                self._replay.observe_fallback((time.perf_counter() - started) * 1000.0)
+        else:
+            logger.info(f"⏩ Replayed {replayed} buffered frame(s) for {chat_id} after seq {last_seq}")
+        if (resumed or last_seq is not None) and chat_id in self.connections:
+            # The client's client.resume handshake for this reconnect is answered without a second load.
+            self.connections[chat_id]["connect_resume"] = {
+                "mode": "buffer" if replayed is not None else "transcript",
+                "replayed_events": replayed or 0,
+            }
         
         try:
             # Inbound loop: receive JSON control messages from client
@@ -1263,7 +1526,7 @@ class SimpleTransport:
                     continue
                 # H3: Validate message schema
                 if not self._validate_inbound_message(data):
-                    await websocket.send_json({
+                    await self._send_reply(chat_id, websocket, {
                         "type": "chat.error",
                         "data": {
                             "message": "Invalid message schema",
@@ -1290,7 +1553,7 @@ class SimpleTransport:
 
                     if not req_id and is_general_mode:
                         if not text:
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                     "type": "chat.error",
                                     "data": {
                                         "message": "Message cannot be empty in general mode",
@@ -1306,14 +1569,14 @@ class SimpleTransport:
                                 user_message=text,
                                 ui_context=ui_context_payload,
                             )
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "chat.input_ack",
                                 "data": {"chat_id": chat_id, "status": "accepted"},
                                 "timestamp": datetime.now(timezone.utc).isoformat()
                             })
                         except Exception as general_err:
                             logger.error(f"Failed to process general-mode message for {chat_id}: {general_err}")
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "chat.error",
                                 "data": {
                                     "message": "General mode is unavailable right now. Please try again.",
@@ -1329,7 +1592,7 @@ class SimpleTransport:
                         try:
                             ok = await self.submit_user_input(req_id, text)
                             logger.info(f"✅ [INPUT] submit_user_input returned: {ok} for req_id={req_id}")
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "ack.input",
                                 "data": {"input_request_id": req_id, "status": "accepted" if ok else "rejected"},
                                 "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1353,14 +1616,14 @@ class SimpleTransport:
                                 content=text,
                                 source='ws'
                             )
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "chat.input_ack",
                                 "data": {"chat_id": target_chat_id, "status": "accepted"},
                                 "timestamp": datetime.now(timezone.utc).isoformat()
                             })
                         except Exception as e:
                             logger.error(f"Failed to process free-form user message for {chat_id}: {e}")
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "chat.error",
                                 "data": {"message": "User message failed", "error_code": "USER_MESSAGE_FAILED"},
                                 "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1375,14 +1638,14 @@ class SimpleTransport:
                         try:
                             ok = await self.submit_ui_tool_response(event_id, response_data)
                             logger.info(f"✅ UI tool response received for event {event_id}: {ok}")
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "ack.ui_tool_response",
                                 "data": {"eventId": event_id, "status": "accepted" if ok else "rejected"},
                                 "timestamp": datetime.now(timezone.utc).isoformat()
                             })
                         except Exception as uie:
                             logger.error(f"❌ Failed to process UI tool response {event_id}: {uie}")
-                            await websocket.send_json({
+                            await self._send_reply(chat_id, websocket, {
                                 "type": "chat.error",
                                 "data": {"message": "UI tool response failed", "error_code": "UI_TOOL_RESPONSE_FAILED"},
                                 "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1395,7 +1658,7 @@ class SimpleTransport:
                         await self._handle_artifact_action_message(data, chat_id)
                     except Exception as ae:
                         logger.error(f"❌ Failed to process artifact.action for chat {chat_id}: {ae}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {"message": "Artifact action failed", "error_code": "ARTIFACT_ACTION_FAILED"},
                             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1408,7 +1671,7 @@ class SimpleTransport:
                         await self._handle_artifact_action(data, chat_id, websocket)
                     except Exception as ae:
                         logger.error(f"❌ Failed to process artifact action for chat {chat_id}: {ae}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {"message": "Artifact action failed", "error_code": "ARTIFACT_ACTION_FAILED"},
                             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1444,7 +1707,7 @@ class SimpleTransport:
                         logger.info(f"🔄 Switched from {chat_id} to {target_chat_id} (ws_id={ws_id})")
                         
                         # Notify frontend of successful switch
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.context_switched",
                             "data": {
                                 "from_chat_id": chat_id,
@@ -1457,7 +1720,7 @@ class SimpleTransport:
                         })
                     except Exception as se:
                         logger.error(f"❌ Failed to switch workflow: {se}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {"message": f"Workflow switch failed: {str(se)}", "error_code": "SWITCH_WORKFLOW_FAILED"},
                             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1482,7 +1745,7 @@ class SimpleTransport:
                         )
 
                         # Notify frontend
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.mode_changed",
                             "data": {
                                 "mode": "general",
@@ -1494,7 +1757,7 @@ class SimpleTransport:
                         })
                     except Exception as ge:
                         logger.error(f"❌ Failed to enter general mode: {ge}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {"message": f"General mode failed: {str(ge)}", "error_code": "GENERAL_MODE_FAILED"},
                             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1511,7 +1774,7 @@ class SimpleTransport:
                         session_registry.enter_general_mode(ws_id)
                         general_ctx = await self._ensure_general_chat_context(chat_id=chat_id, force_new=True)
 
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.general_session_created",
                             "data": {
                                 "general_chat_id": general_ctx.get("chat_id"),
@@ -1525,7 +1788,7 @@ class SimpleTransport:
                         )
                     except Exception as gc_err:
                         logger.error(f"❌ Failed to start new general chat: {gc_err}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {
                                 "message": f"General chat creation failed: {gc_err}",
@@ -1562,7 +1825,9 @@ class SimpleTransport:
                             persistence=pm,
                         )
                         if not ok:
-                            await websocket.send_json(
+                            await self._send_reply(
+                                chat_id,
+                                websocket,
                                 {
                                     "type": "chat.prereq_blocked",
                                     "data": {
@@ -1607,7 +1872,7 @@ class SimpleTransport:
                         logger.info(f"🚀 Started new workflow {target_workflow} (chat_id={new_chat_id}, ws_id={ws_id})")
                         
                         # Notify frontend
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.workflow_started",
                             "data": {
                                 "chat_id": new_chat_id,
@@ -1633,7 +1898,7 @@ class SimpleTransport:
                             )
                     except Exception as we:
                         logger.error(f"❌ Failed to start workflow: {we}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {"message": f"Workflow start failed: {str(we)}", "error_code": "START_WORKFLOW_FAILED"},
                             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -1685,7 +1950,9 @@ class SimpleTransport:
                                         "reason": prereq_error or "Prerequisites not met",
                                     }
                                 )
-                                await websocket.send_json(
+                                await self._send_reply(
+                                    chat_id,
+                                    websocket,
                                     {
                                         "type": "chat.prereq_blocked",
                                         "data": {
@@ -1729,7 +1996,9 @@ class SimpleTransport:
                             )
 
                             # Notify frontend using the existing single-start event (so tabs can appear)
-                            await websocket.send_json(
+                            await self._send_reply(
+                                chat_id,
+                                websocket,
                                 {
                                     "type": "chat.workflow_started",
                                     "data": {
@@ -1757,7 +2026,9 @@ class SimpleTransport:
                                 )
 
                         # Summary ack (best-effort)
-                        await websocket.send_json(
+                        await self._send_reply(
+                            chat_id,
+                            websocket,
                             {
                                 "type": "chat.workflow_batch_started",
                                 "data": {
@@ -1770,7 +2041,9 @@ class SimpleTransport:
                         )
                     except Exception as be:
                         logger.error(f"❌ Failed to start workflow batch: {be}")
-                        await websocket.send_json(
+                        await self._send_reply(
+                            chat_id,
+                            websocket,
                             {
                                 "type": "chat.error",
                                 "data": {
@@ -1786,12 +2059,18 @@ class SimpleTransport:
                 if mtype == "client.resume":
                     try:
                         last_client_index = data.get("lastClientIndex")
-                        if not isinstance(last_client_index, int):
-                            raise ValueError("lastClientIndex must be int")
-                        await self._handle_resume_request(chat_id, last_client_index, websocket)
+                        last_seq = data.get("lastSeq")
+                        seq_epoch = data.get("seqEpoch")
+                        await self._handle_resume_request(
+                            chat_id,
+                            last_client_index if isinstance(last_client_index, int) else None,
+                            websocket,
+                            last_seq=last_seq if isinstance(last_seq, int) and not isinstance(last_seq, bool) else None,
+                            seq_epoch=seq_epoch if isinstance(seq_epoch, str) else None,
+                        )
                     except Exception as re:
                         logger.error(f"❌ Failed to process client.resume for chat {chat_id}: {re}")
-                        await websocket.send_json({
+                        await self._send_reply(chat_id, websocket, {
                             "type": "chat.error",
                             "data": {"message": f"Resume failed: {str(re)}", "error_code": "RESUME_FAILED"},
                             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -2334,6 +2613,7 @@ class SimpleTransport:
         workflow_name: Optional[str],
         state: Any,
         source: str = "ui_tool",
+        version: Optional[int] = None,
     ) -> None:
         if not artifact_id or not chat_id:
             return
@@ -2343,6 +2623,8 @@ class SimpleTransport:
             "workflow_name": workflow_name,
             "source": source,
         }
+        if version is not None:
+            data["version"] = version
         envelope = self._build_agui_state_envelope(
             "agui.state.StateSnapshot",
             chat_id=chat_id,
@@ -2361,6 +2643,7 @@ class SimpleTransport:
         patch_ops: Optional[List[Dict[str, Any]]],
         state: Optional[Any] = None,
         source: str = "action",
+        version: Optional[int] = None,
     ) -> None:
         if not artifact_id or not chat_id:
             return
@@ -2374,6 +2657,9 @@ class SimpleTransport:
         }
         if state is not None:
             data["state"] = state
+        if version is not None:
+            # Clients that applied this version can resync with /api/artifacts/{id}/cached?since_version=
+            data["version"] = version
         envelope = self._build_agui_state_envelope(
             "agui.state.StateDelta",
             chat_id=chat_id,
@@ -2426,35 +2712,38 @@ class SimpleTransport:
         ttl_seconds = self._resolve_state_ttl_seconds()
         patch_ops: Optional[List[Dict[str, Any]]] = None
         next_state: Optional[Any] = None
+        version: Optional[int] = None
 
         if isinstance(artifact_update, list):
             patch_ops = artifact_update
-            next_state = await pm.apply_artifact_patch(
+            next_state, version = await pm.apply_artifact_patch(
                 artifact_id=artifact_id,
                 chat_id=chat_id,
                 app_id=app_id,
                 patch_ops=patch_ops,
                 workflow_name=workflow_name,
                 ttl_seconds=ttl_seconds,
+                with_version=True,
             )
         elif isinstance(artifact_update, dict):
             mode = artifact_update.get("mode")
             payload = artifact_update.get("payload")
             if mode == "patch" or isinstance(payload, list) or isinstance(artifact_update.get("patch"), list):
                 patch_ops = payload if isinstance(payload, list) else artifact_update.get("patch")
-                next_state = await pm.apply_artifact_patch(
+                next_state, version = await pm.apply_artifact_patch(
                     artifact_id=artifact_id,
                     chat_id=chat_id,
                     app_id=app_id,
                     patch_ops=patch_ops,
                     workflow_name=workflow_name,
                     ttl_seconds=ttl_seconds,
+                    with_version=True,
                 )
             else:
                 if payload is None and mode is None:
                     payload = artifact_update
                 next_state = self._sanitize_payload_for_state(payload)
-                await pm.upsert_artifact_state(
+                head = await pm.upsert_artifact_state(
                     artifact_id=artifact_id,
                     chat_id=chat_id,
                     app_id=app_id,
@@ -2462,6 +2751,7 @@ class SimpleTransport:
                     workflow_name=workflow_name,
                     ttl_seconds=ttl_seconds,
                 )
+                version = head.get("version") if head else None
                 patch_ops = [{"op": "replace", "path": "", "value": next_state}]
 
         if patch_ops:
@@ -2473,6 +2763,7 @@ class SimpleTransport:
                 patch_ops=patch_ops,
                 state=next_state,
                 source=source,
+                version=version,
             )
         return next_state
 
@@ -2889,7 +3180,7 @@ class SimpleTransport:
                 workflow_name = conn_meta.get("workflow_name") or payload.get("workflow_name")
                 artifact_id = self._resolve_artifact_id(payload, event_id)
                 sanitized_payload = self._sanitize_payload_for_state(payload)
-                await self._persist_artifact_state(
+                head = await self._persist_artifact_state(
                     artifact_id=artifact_id,
                     chat_id=chat_id,
                     app_id=app_id,
@@ -2903,6 +3194,7 @@ class SimpleTransport:
                     workflow_name=workflow_name,
                     state=sanitized_payload,
                     source="ui_tool",
+                    version=head.get("version") if head else None,
                 )
         except Exception:
             logger.debug("State snapshot emission failed for ui_tool", exc_info=True)
@@ -2921,6 +3213,8 @@ class SimpleTransport:
 
         if event_id not in instance.pending_ui_tool_responses:
             instance.pending_ui_tool_responses[event_id] = asyncio.Future()
+        # The response may arrive at another worker's socket or endpoint
+        instance._router.expect_reply(event_id)
 
         fut = instance.pending_ui_tool_responses[event_id]
         try:
@@ -2933,13 +3227,15 @@ class SimpleTransport:
             raise
         finally:
             instance.pending_ui_tool_responses.pop(event_id, None)
+            instance._router.reply_settled(event_id)
 
-    async def submit_ui_tool_response(self, event_id: str, response_data: Dict[str, Any]) -> bool:
+    async def submit_ui_tool_response(self, event_id: str, response_data: Dict[str, Any], *, route: bool = True) -> bool:
         """
         Submit response data for a pending UI tool event.
         
         This method is called by an API endpoint when the frontend submits data
-        from an interactive UI component.
+        from an interactive UI component. When the event is pending in another
+        worker, the response is routed there (unless ``route`` is False).
         """
         if event_id in self.pending_ui_tool_responses:
             future = self.pending_ui_tool_responses[event_id]
@@ -2980,6 +3276,8 @@ class SimpleTransport:
                 self._ui_tool_metadata.pop(event_id, None)
                 logger.warning(f"⚠️ [UI_TOOL] Event {event_id} already completed")
                 return False
+        elif route and await self._route_reply("ui_tool", event_id, {"response": response_data}):
+            return True
         else:
             logger.warning(f"⚠️ [UI_TOOL] No pending event found for {event_id}")
             return False
@@ -3005,103 +3303,203 @@ class SimpleTransport:
         self._sequence_counters[chat_id] += 1
         return self._sequence_counters[chat_id]
     
-    # H1: Server backpressure implementation
-    async def _check_backpressure(self, chat_id: str) -> bool:
-        """Check if connection should be throttled due to backpressure."""
-        if chat_id not in self._message_queues:
-            self._message_queues[chat_id] = []
-        
-        queue_size = len(self._message_queues[chat_id])
-        if queue_size >= self._max_queue_size:
-            logger.warning(f"🚨 Backpressure triggered for {chat_id}: queue size {queue_size}")
-            # Drop oldest messages to make room
-            dropped = queue_size - self._max_queue_size + 10  # Keep some buffer
-            self._message_queues[chat_id] = self._message_queues[chat_id][dropped:]
-            logger.info(f"📉 Dropped {dropped} queued messages for {chat_id}")
-            return True
-        return False
+    # H1: Per-connection outbound queues (dedicated writer task per websocket)
+    async def _open_outbound_queue(self, chat_id: str, websocket) -> OutboundQueue:
+        """Create (or replace, on reconnect) the writer queue for a connection."""
+        previous = self._message_queues.pop(chat_id, None)
+        if previous is not None:
+            await previous.close()
 
-    async def _queue_message_with_backpressure(self, chat_id: str, message_data: Dict[str, Any]) -> bool:
-        """Queue message with backpressure control."""
-        if await self._check_backpressure(chat_id):
-            # Connection is under backpressure - message may have been dropped
-            pass
+        async def _send(message: Any) -> None:
+            await self._send_envelope(websocket, chat_id, message)
+
+        async def _send_batch(messages: List[Any]) -> None:
+            await self._send_batch_envelopes(websocket, chat_id, messages)
+
+        batching = self._batch_frames and self._socket_protocol(websocket) >= PROTOCOL_VERSION_BATCH
+        queue = OutboundQueue(
+            chat_id,
+            _send,
+            max_size=self._max_queue_size,
+            policy=self._send_policy,
+            batch_max=self._batch_max_events if batching else 1,
+            batch_window_ms=self._batch_window_ms,
+            send_batch=_send_batch if batching else None,
+        )
+        queue.start()
+        self._message_queues[chat_id] = queue
+        return queue
+
+    async def _queue_message_with_backpressure(self, chat_id: str, message_data: Any) -> bool:
+        """Hand a message (raw envelope or prepared WireFrame) to the connection's writer task.
+
+        Never awaits network I/O; with the ``block`` send policy it may wait for
+        queue space. Returns False when the message was buffered or rejected.
+        """
+        queue = self._message_queues.get(chat_id)
+        if queue is None or queue.closed:
+            # Aliased chats (workflow switches on a shared socket) get their queue lazily.
+            conn = self.connections.get(chat_id)
+            websocket = conn.get("websocket") if isinstance(conn, dict) else None
+            if websocket is None:
+                self._buffer_pre_connection(chat_id, message_data)
+                return False
+            queue = await self._open_outbound_queue(chat_id, websocket)
+        frame = message_data if isinstance(message_data, WireFrame) else self._prepare_frame(message_data)
+        return await queue.put(frame)
+
+    async def _send_reply(self, chat_id: str, websocket, message: Dict[str, Any]) -> None:
+        """Send a control reply (ack, error, ping) behind the events already queued for the socket.
+
+        Going through the writer task keeps a single writer per socket, so a reply
+        never interleaves with or overtakes queued frames. Replies are not stamped
+        with a replay ``seq``.
+        """
+        queue = self._message_queues.get(chat_id)
+        conn = self.connections.get(chat_id)
+        if queue is not None and not queue.closed and isinstance(conn, dict) and conn.get("websocket") is websocket:
+            await queue.put(WireFrame(message))
+            return
+        await websocket.send_json(message)
+
+    async def _flush_message_queue(self, chat_id: str, timeout: Optional[float] = 5.0) -> None:
+        """Wait (bounded) until the writer has sent everything queued for ``chat_id``."""
+        queue = self._message_queues.get(chat_id)
+        if queue is not None:
+            await queue.drain(timeout)
+
+    def _prepare_frame(self, message: Any) -> WireFrame:
+        """Normalize an outbound message into its wire shape and wrap it for encode-once sends."""
         # Early serialization guard: ensure no raw AG2 objects linger in queue.
-        if not isinstance(message_data, (dict, list, tuple, str, int, float, bool, type(None))):
+        if not isinstance(message, (dict, list, tuple, str, int, float, bool, type(None))):
+            try:
+                message = self._serialize_ag2_events(message)
+            except Exception:
+                message = {"type": "log", "data": {"message": self._stringify_unknown(message)}}
+        # Check if message is already in proper format for WebSocket
+        if isinstance(message, dict) and 'type' in message and 'data' in message:
+            # Ensure the 'data' payload is JSON-serializable (may contain AG2 objects)
             try:
-                message_data = self._serialize_ag2_events(message_data)
+                safe_message = message.copy()
+                safe_message['data'] = self._serialize_ag2_events(message['data'])
+
+                # Extract agent name from data payload and add to top-level envelope for frontend attribution
+                if isinstance(safe_message.get('data'), dict):
+                    agent_from_data = safe_message['data'].get('agent') or safe_message['data'].get('sender')
+                    if agent_from_data and isinstance(agent_from_data, str):
+                        safe_message['agent'] = agent_from_data
+                    elif 'agent' not in safe_message:
+                        # Fallback to generic if no agent in data
+                        safe_message['agent'] = 'Agent'
+
+                if safe_message.get('type') == 'chat.tool_call':
+                    payload_obj = safe_message.get('data', {}).get('payload', {})
+                    payload_keys = list(payload_obj.keys()) if isinstance(payload_obj, dict) else []
+                    logger.info('TRANSPORT payload keys before send: %s', payload_keys[:12])
+                return WireFrame(safe_message)
             except Exception:
-                message_data = {"type": "log", "data": {"message": self._stringify_unknown(message_data)}}
+                # Fallback: attempt to serialize whole message as a last resort
+                pass
+        return WireFrame(self._serialize_ag2_events(message))
 
-        self._message_queues[chat_id].append(message_data)
-        return True
+    @staticmethod
+    def _requested_protocol(websocket) -> Optional[int]:
+        """Protocol version the client advertised via ``?protocol=N`` (None if absent/invalid)."""
+        try:
+            raw = websocket.query_params.get("protocol")
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        try:
+            return max(PROTOCOL_VERSION_LEGACY, int(str(raw).strip()))
+        except ValueError:
+            logger.debug(f"Ignoring invalid WebSocket protocol parameter: {raw!r}")
+            return None
 
-    async def _flush_message_queue(self, chat_id: str) -> None:
-        """Flush queued messages for a connection."""
-        if chat_id not in self._message_queues or not self._message_queues[chat_id]:
-            return
-        
-        logger.info(f"🔄 [TRANSPORT] Flushing message queue for chat_id={chat_id}, queue_size={len(self._message_queues[chat_id])}")
-        
-        if chat_id in self.connections:
-            websocket = self.connections[chat_id]["websocket"]
-            messages_to_send = self._message_queues[chat_id].copy()
-            self._message_queues[chat_id].clear()
-            
-            for message in messages_to_send:
-                try:
-                    # Check if message is already in proper format for WebSocket
-                    if isinstance(message, dict) and 'type' in message and 'data' in message:
-                        # Ensure the 'data' payload is JSON-serializable (may contain AG2 objects)
-                        try:
-                            safe_message = message.copy()
-                            safe_message['data'] = self._serialize_ag2_events(message['data'])
-                            
-                            # Extract agent name from data payload and add to top-level envelope for frontend attribution
-                            if isinstance(safe_message.get('data'), dict):
-                                agent_from_data = safe_message['data'].get('agent') or safe_message['data'].get('sender')
-                                if agent_from_data and isinstance(agent_from_data, str):
-                                    safe_message['agent'] = agent_from_data
-                                elif 'agent' not in safe_message:
-                                    # Fallback to generic if no agent in data
-                                    safe_message['agent'] = 'Agent'
-                            
-                            if safe_message.get('type') == 'chat.tool_call':
-                                payload_obj = safe_message.get('data', {}).get('payload', {})
-                                payload_keys = list(payload_obj.keys()) if isinstance(payload_obj, dict) else []
-                                logger.info('TRANSPORT payload keys before send: %s', payload_keys[:12])
-                            await websocket.send_json(safe_message)
-                            logger.info(f"✅ [TRANSPORT] WebSocket send_json completed for envelope type={safe_message.get('type')}, chat_id={chat_id}")
-                        except Exception:
-                            # Fallback: attempt to serialize whole message as a last resort
-                            try:
-                                await websocket.send_json(self._serialize_ag2_events(message))
-                            except Exception:
-                                raise
-                    else:
-                        serialized_message = self._serialize_ag2_events(message)
-                        await websocket.send_json(serialized_message)
-                except Exception as e:
-                    logger.error(f"Failed to send queued message to {chat_id}: {e}. Will retry shortly.")
-                    # Re-queue remaining (including current) for retry
-                    remaining = [message] + messages_to_send[messages_to_send.index(message)+1:]
-                    self._message_queues[chat_id] = remaining + self._message_queues[chat_id]
-                    # Schedule a retry flush with small backoff
-                    self._schedule_flush_retry(chat_id)
-                    break
+    @staticmethod
+    def _requested_last_seq(websocket) -> Optional[int]:
+        """Last transport ``seq`` a reconnecting client advertised via ``?last_seq=N`` (None if absent/invalid)."""
+        try:
+            raw = websocket.query_params.get("last_seq")
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        try:
+            return max(0, int(str(raw).strip()))
+        except ValueError:
+            logger.debug(f"Ignoring invalid WebSocket last_seq parameter: {raw!r}")
+            return None
 
-    def _schedule_flush_retry(self, chat_id: str, delay: float = 0.5) -> None:
-        """Schedule a single retry flush if not already pending."""
-        if chat_id in self._scheduled_flush_tasks and not self._scheduled_flush_tasks[chat_id].done():
-            return  # already scheduled
-        async def _delayed():
-            try:
-                await asyncio.sleep(delay)
-                await self._flush_message_queue(chat_id)
-            finally:
-                # Clear handle so future retries can be scheduled
-                self._scheduled_flush_tasks.pop(chat_id, None)
-        self._scheduled_flush_tasks[chat_id] = asyncio.create_task(_delayed())
+    @staticmethod
+    def _requested_last_client_index(websocket) -> Optional[int]:
+        """0-based index of the last message the client has (``?last_client_index=``), -1 for none."""
+        try:
+            raw = websocket.query_params.get("last_client_index")
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        try:
+            return max(-1, int(str(raw).strip()))
+        except ValueError:
+            logger.debug(f"Ignoring invalid WebSocket last_client_index parameter: {raw!r}")
+            return None
+
+    @staticmethod
+    def _requested_seq_epoch(websocket) -> Optional[str]:
+        """Replay ring epoch (``?seq_epoch=``) the advertised ``last_seq`` belongs to."""
+        try:
+            raw = websocket.query_params.get("seq_epoch")
+        except Exception:
+            return None
+        return (str(raw).strip() or None) if raw is not None else None
+
+    def _socket_protocol(self, websocket) -> int:
+        """Negotiated protocol for a socket; aliased chats share their primary connection's version."""
+        for conn in list(self.connections.values()):
+            if isinstance(conn, dict) and conn.get("websocket") is websocket and conn.get("protocol_version"):
+                return int(conn["protocol_version"])
+        return PROTOCOL_VERSION_LEGACY
+
+    async def _send_envelope(self, websocket, chat_id: str, frame: WireFrame) -> None:
+        """Send one prepared frame (runs on the connection's writer task)."""
+        await send_frame(websocket, frame)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"✅ [TRANSPORT] WebSocket send completed for envelope type={frame.type}, chat_id={chat_id}")
+
+    async def _send_batch_envelopes(self, websocket, chat_id: str, frames: List[WireFrame]) -> None:
+        """Send several prepared frames as one ``transport.batch`` frame (protocol v2 only)."""
+        await send_frame(websocket, build_batch_frame(frames))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"✅ [TRANSPORT] WebSocket batch send completed: {len(frames)} envelope(s), chat_id={chat_id}")
+
+    def get_outbound_metrics(self, chat_id: Optional[str] = None) -> Dict[str, Any]:
+        """Per-connection queue depth / send latency, plus totals across connections."""
+        queues = self._message_queues
+        if chat_id is not None:
+            queue = queues.get(chat_id)
+            return queue.get_metrics() if queue is not None else {}
+        per_chat = {cid: q.get_metrics() for cid, q in list(queues.items())}
+        return {
+            "policy": self._send_policy,
+            "max_queue_size": self._max_queue_size,
+            **get_frame_settings(),
+            "frame_batching": self._batch_frames,
+            "batch_max_events": self._batch_max_events,
+            "batch_window_ms": self._batch_window_ms,
+            "connections": len(per_chat),
+            "total_depth": sum(m["depth"] for m in per_chat.values()),
+            "total_dropped": sum(m["dropped"] for m in per_chat.values()),
+            "total_coalesced": sum(m["coalesced"] for m in per_chat.values()),
+            "max_send_ms": max((m["max_send_ms"] for m in per_chat.values()), default=0.0),
+            "replay": self._replay.get_metrics(),
+            "routing": self._router.get_metrics(),
+            "tracked_chats": len(self._chat_activity),
+            "swept_chats": self._swept_chats,
+            "chats": per_chat,
+        }
 
     # H2: Heartbeat implementation
     async def _start_heartbeat(self, chat_id: str, websocket) -> None:
@@ -3127,7 +3525,7 @@ class SimpleTransport:
                 }
                 
                 try:
-                    await websocket.send_json(ping_data)
+                    await self._send_reply(chat_id, websocket, ping_data)
                     logger.debug(f"📡 Sent ping to {chat_id}")
                 except Exception as e:
                     logger.warning(f"💔 Heartbeat failed for {chat_id}: {e}")
@@ -3146,12 +3544,15 @@ class SimpleTransport:
             del self._heartbeat_tasks[chat_id]
             logger.debug(f"💔 Stopped heartbeat for {chat_id}")
 
-    async def _auto_resume_if_needed(self, chat_id: str, websocket, app_id: Optional[str]) -> None:
-        """Automatically restore chat history for IN_PROGRESS chats on WebSocket connection."""
+    async def _auto_resume_if_needed(self, chat_id: str, websocket, app_id: Optional[str]) -> bool:
+        """Automatically restore chat history for IN_PROGRESS chats on WebSocket connection.
+
+        Returns True when the history was restored.
+        """
         try:
             if not app_id:
                 logger.debug(f"[AUTO_RESUME] No app_id for {chat_id}, skipping auto-resume")
-                return
+                return False
 
             # Get workflow name and startup_mode from connection
             workflow_name = None
@@ -3199,7 +3600,7 @@ class SimpleTransport:
                     })
             
             # Call the resumer with startup_mode filtering
-            await resumer.auto_resume_if_needed(
+            last_index = await resumer.auto_resume_if_needed(
                 chat_id=chat_id,
                 app_id=app_id,
                 send_event=send_event_wrapper,
@@ -3211,20 +3612,121 @@ class SimpleTransport:
                 await self._emit_messages_snapshot(chat_id=chat_id, app_id=app_id, mode="auto")
             except Exception:
                 logger.debug("MessagesSnapshot emission failed for %s", chat_id, exc_info=True)
+            return last_index is not None
 
         except Exception as e:
             logger.warning(f"[AUTO_RESUME] Failed to auto-resume chat {chat_id}: {e}")
+            return False
 
     async def _cleanup_connection(self, chat_id: str) -> None:
         """Clean up connection resources."""
         if chat_id in self.connections:
             del self.connections[chat_id]
+        self._chat_activity[chat_id] = time.monotonic()
+        await self._router.release(chat_id)
 
-        if chat_id in self._message_queues:
-            del self._message_queues[chat_id]
+        queue = self._message_queues.pop(chat_id, None)
+        if queue is not None:
+            await queue.close()
 
         await self._stop_heartbeat(chat_id)
         logger.info(f"🧹 Cleaned up connection resources for {chat_id}")
-    
 
+    # ==================================================================================
+    # MULTI-WORKER ROUTING & PER-CHAT STATE HOUSEKEEPING
+    # ==================================================================================
+
+    async def start_maintenance(self) -> None:
+        """Start cross-worker routing (when configured) and per-chat state housekeeping.
+
+        Called on app startup so workers without sockets can still forward
+        events; connections also call it lazily.
+        """
+        await self._ensure_maintenance()
+
+    async def stop_maintenance(self) -> None:
+        task, self._maintenance_task = self._maintenance_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._router.close()
+
+    async def _ensure_maintenance(self) -> None:
+        """Start routing and the housekeeping loop on the running event loop (idempotent)."""
+        if self._router.enabled and not self._router.running:
+            await self._router.start(self._deliver_routed)
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def _maintenance_loop(self) -> None:
+        interval = min(self._router.lease_s / 3.0, self._chat_state_ttl_s / 4.0, 30.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._run_maintenance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Transport housekeeping failed: {e}")
+
+    async def _run_maintenance(self) -> None:
+        """Renew chat leases, hand stranded buffers to their owners and sweep orphaned chat state."""
+        if self._router.running:
+            await self._router.renew(
+                [cid for cid, conn in list(self.connections.items()) if isinstance(conn, dict) and conn.get("websocket")]
+            )
+            # Events buffered while a chat had no owner follow the client to whichever worker it reconnected to.
+            for chat_id in [cid for cid in list(self._pre_connection_buffers) if cid not in self.connections]:
+                owner = await self._router.owner(chat_id, fresh=True)
+                if owner is not None and owner != self._router.worker_id:
+                    for pending in self._pre_connection_buffers.pop(chat_id, None) or []:
+                        self._router.forward(owner, chat_id, self._as_frame(pending).encode())
+        await self._sweep_orphaned_chat_state()
+
+    async def _sweep_orphaned_chat_state(self, now: Optional[float] = None) -> int:
+        """Drop per-chat state of chats idle past TRANSPORT_CHAT_STATE_TTL_SEC.
+
+        Chats with a local socket, a running background workflow or a pending
+        input request are kept. Returns the number of chats swept.
+        """
+        now = time.monotonic() if now is None else now
+        chat_ids = (
+            set(self._chat_activity) | set(self._sequence_counters) | set(self._pre_connection_buffers)
+            | set(self._input_request_registries) | set(self._message_queues) | set(self._heartbeat_tasks)
+            | set(self._background_tasks) | set(self.connections)
+        )
+        swept = 0
+        for chat_id in chat_ids:
+            conn = self.connections.get(chat_id)
+            if isinstance(conn, dict) and conn.get("websocket"):
+                continue
+            task = self._background_tasks.get(chat_id)
+            if (task is not None and not task.done()) or self._input_request_registries.get(chat_id):
+                continue
+            if chat_id in self._derived_context_managers:
+                continue  # workflow run still active in this worker
+            last_seen = self._chat_activity.setdefault(chat_id, now)
+            if now - last_seen < self._chat_state_ttl_s:
+                continue
+            self._chat_activity.pop(chat_id, None)
+            self._sequence_counters.pop(chat_id, None)
+            self._pre_connection_buffers.pop(chat_id, None)
+            self._input_request_registries.pop(chat_id, None)
+            self._background_tasks.pop(chat_id, None)
+            self.connections.pop(chat_id, None)  # alias entries that only carried frontend_context
+            self._replay.forget(chat_id)
+            heartbeat = self._heartbeat_tasks.pop(chat_id, None)
+            if heartbeat is not None:
+                heartbeat.cancel()
+            queue = self._message_queues.pop(chat_id, None)
+            if queue is not None:
+                await queue.close()
+            swept += 1
+        if swept:
+            self._swept_chats += swept
+            logger.info(f"🧹 Swept per-chat state of {swept} idle chat(s)")
+        return swept
 
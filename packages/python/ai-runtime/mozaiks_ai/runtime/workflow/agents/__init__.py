@@ -6,12 +6,15 @@ Provides agent creation, tool registration, and handoff logic.
 
 from .factory import create_agents
 from .tools import load_agent_tool_functions, clear_tool_cache
+from .templates import get_agent_templates, get_agent_template_metrics
 from .handoffs import wire_handoffs, wire_handoffs_with_debugging, handoff_manager
 
 __all__ = [
     'create_agents',
     'load_agent_tool_functions',
     'clear_tool_cache',
+    'get_agent_templates',
+    'get_agent_template_metrics',
     'wire_handoffs',
     'wire_handoffs_with_debugging',
     'handoff_manager',
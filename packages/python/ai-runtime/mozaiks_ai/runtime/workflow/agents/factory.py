@@ -9,8 +9,8 @@ from typing import Any, Dict, List, Optional, Callable, Sequence
 
 from autogen import ConversableAgent, UpdateSystemMessage
 
-from ..outputs import get_structured_outputs_for_workflow
-from ..workflow_manager import WORKFLOWS_ROOT, workflow_manager
+from .templates import get_agent_templates, record_agents_stamped
+from ..bundle import WorkflowBundle
 
 # Import context utilities (extracted for modularity)
 from ..context.context_utils import (
@@ -186,59 +186,40 @@ async def create_agents(
     workflow_name: str,
     context_variables=None,
     cache_seed: Optional[int] = None,
+    *,
+    bundle: Optional[WorkflowBundle] = None,
 ) -> Dict[str, ConversableAgent]:
-    """Create ConversableAgent instances for a workflow."""
+    """Create ConversableAgent instances for a workflow.
+
+    ``bundle`` is the run's workflow bundle; without it the current one is used.
+    """
 
     logger.info(f"[AGENTS] Creating agents for workflow: {workflow_name}")
     from time import perf_counter
 
     start_time = perf_counter()
-    workflow_config = workflow_manager.get_config(workflow_name) or {}
-    agent_configs = workflow_config.get("agents", {})
-    if "agents" in agent_configs:
-        agent_configs = agent_configs["agents"]
-
-    # Support the canonical JSON form used by most workflows:
-    #   {"agents": [{"name": "AgentA", ...}, {"name": "AgentB", ...}]}
-    # Internally we normalize to a mapping of agent_name -> agent_config.
-    if isinstance(agent_configs, list):
-        normalized: Dict[str, Any] = {}
-        for item in agent_configs:
-            if not isinstance(item, dict):
-                continue
-            name = item.get("name")
-            if not isinstance(name, str) or not name.strip():
-                continue
-            normalized[name.strip()] = item
-        agent_configs = normalized
-
-    if not isinstance(agent_configs, dict):
-        logger.warning(f"[AGENTS] Invalid agents config shape for '{workflow_name}': {type(agent_configs)}")
-        agent_configs = {}
 
+    # Chat-independent parts (normalized config, composed prompts, bound tools, hooks)
+    # come from templates built once per workflow bundle; only the LLM config (per-chat
+    # cache seed), context exposures and ConversableAgent construction run per chat.
+    templates = get_agent_templates(workflow_name, bundle)
+    bundle = templates.bundle
+    if "tools" in bundle.errors:
+        logger.warning(f"[AGENTS] Failed loading agent tool functions: {bundle.errors['tools']}")
+    if "structured_outputs" in bundle.errors:
+        logger.debug(
+            f"[AGENTS] Structured outputs unavailable for '{workflow_name}': {bundle.errors['structured_outputs']}"
+        )
+
+    from ..validation.llm_config import get_llm_config as _get_llm_config
+
+    extra = {"cache_seed": cache_seed} if cache_seed is not None else None
     try:
-        from ..validation.llm_config import get_llm_config as _get_base_llm_config
-
-        extra = {"cache_seed": cache_seed} if cache_seed is not None else None
-        _, base_llm_config = await _get_base_llm_config(stream=True, extra_config=extra)
+        _, base_llm_config = await _get_llm_config(stream=True, extra_config=extra)
     except Exception as err:
         logger.error(f"[AGENTS] Failed to load base LLM config: {err}")
         return {}
 
-    try:
-        from .tools import load_agent_tool_functions
-
-        agent_tool_functions = load_agent_tool_functions(workflow_name)
-    except Exception as tool_err:
-        logger.warning(f"[AGENTS] Failed loading agent tool functions: {tool_err}")
-        agent_tool_functions = {}
-
-    try:
-        structured_registry = get_structured_outputs_for_workflow(workflow_name)
-    except Exception as so_err:
-        structured_registry = {}
-        logger.debug(f"[AGENTS] Structured outputs unavailable for '{workflow_name}': {so_err}")
-
     if context_variables is not None:
         try:
             context_dict: Dict[str, Any] = _context_to_dict(context_variables)
@@ -257,54 +238,26 @@ async def create_agents(
 
     agents: Dict[str, ConversableAgent] = {}
 
-    for agent_name, agent_config in agent_configs.items():
+    for agent_name, template in templates.agents.items():
+        agent_config = template.config
+        auto_tool_mode = template.auto_tool_mode
+        structured_model_cls = template.structured_model_cls
+        prompt_sections = template.prompt_sections
         try:
-            from ..outputs.structured import get_llm_for_workflow as _get_structured_llm
-
-            extra = {"cache_seed": cache_seed} if cache_seed is not None else None
-            _, llm_config = await _get_structured_llm(
-                workflow_name,
-                "base",
-                agent_name=agent_name,
+            _, llm_config = await _get_llm_config(
+                response_format=structured_model_cls,
+                stream=True,
                 extra_config=extra,
             )
         except Exception:
             llm_config = base_llm_config
 
-        auto_tool_mode = bool(agent_config.get("auto_tool_mode"))
-        structured_model_cls = structured_registry.get(agent_name) if structured_registry else None
-        if auto_tool_mode and structured_model_cls is None:
-            raise ValueError(
-                f"[AGENTS] auto_tool_mode enabled for '{agent_name}' but no structured output model is registered"
-            )
-
-        agent_functions = [] if auto_tool_mode else agent_tool_functions.get(agent_name, [])
-        for idx, fn in enumerate(agent_functions):
-            if not callable(fn):
-                logger.error(
-                    f"[AGENTS] Tool function at index {idx} for agent '{agent_name}' is not callable: {fn}"
-                )
-
         if isinstance(llm_config, dict):
             if "tools" not in llm_config:
                 llm_config["tools"] = []
             elif auto_tool_mode:
                 llm_config["tools"] = []
 
-        # Try prompt_sections first (fixed structure - enforces standardization)
-        prompt_sections = agent_config.get("prompt_sections")
-        # Fallback to prompt_sections_custom (flexible array - adapts to any structure)
-        if not prompt_sections:
-            prompt_sections = agent_config.get("prompt_sections_custom")
-        
-        system_message: str
-        if prompt_sections:
-            # Handles both dict (PromptSections) and list (PromptSectionContent[])
-            # Runtime adapts to whatever structure is provided
-            system_message = _compose_prompt_sections(prompt_sections)
-        else:
-            # Final fallback for agents still using system_message string directly
-            system_message = agent_config.get("system_message", "You are a helpful AI assistant.")
         agent_exposures = []
         if isinstance(exposures_map, dict):
             agent_exposures = exposures_map.get(agent_name, []) or []
@@ -314,7 +267,7 @@ async def create_agents(
             agent_plan = agent_plan_map.get(agent_name)
         agent_variables = list(getattr(agent_plan, "variables", []) or [])
 
-        base_system_message = system_message
+        base_system_message = template.base_system_message
         update_hooks: List[Callable[..., Any] | UpdateSystemMessage] = []
         if agent_exposures:
             system_message = _apply_context_exposures(
@@ -334,34 +287,9 @@ async def create_agents(
         else:
             system_message = base_system_message
 
-        # Load update_agent_state hooks from hooks.json for this agent
+        # update_agent_state hooks from hooks.json (resolved once in the template)
         # CRITICAL: These must be added BEFORE agent construction to work with AG2's update_agent_state_before_reply
-        try:
-            from ..execution.hooks import _resolve_import
-            
-            hooks_json_path = WORKFLOWS_ROOT / workflow_name / "hooks.json"
-            if hooks_json_path.exists():
-                import json
-                with open(hooks_json_path, 'r', encoding='utf-8') as f:
-                    hooks_data = json.load(f) or {}
-                hooks_entries = hooks_data.get("hooks") or []
-                
-                for entry in hooks_entries:
-                    if (isinstance(entry, dict) and 
-                        entry.get("hook_type") == "update_agent_state" and 
-                        entry.get("hook_agent") == agent_name):
-                        
-                        file_value = entry.get("filename")
-                        fn_value = entry.get("function")
-                        
-                        if file_value and fn_value:
-                            workflow_path = WORKFLOWS_ROOT / workflow_name
-                            fn, qual = _resolve_import(workflow_name, file_value, fn_value, workflow_path)
-                            if fn:
-                                update_hooks.append(fn)
-                                logger.debug(f"[AGENTS] Pre-loaded update_agent_state hook {qual} for {agent_name}")
-        except Exception as hook_load_err:
-            logger.debug(f"[AGENTS] Failed to pre-load update_agent_state hooks for {agent_name}: {hook_load_err}")
+        update_hooks.extend(template.state_hooks)
 
         # ##INTERVIEWAGENT## TESTING MODE - Build auto-NEXT hook (REMOVE FOR PRODUCTION)
         interview_message_hook = None
@@ -383,8 +311,8 @@ async def create_agents(
                 system_message=system_message,
                 llm_config=llm_config,
                 human_input_mode=human_input_mode,
-                max_consecutive_auto_reply=agent_config.get("max_consecutive_auto_reply", 2),
-                functions=agent_functions,
+                max_consecutive_auto_reply=template.max_consecutive_auto_reply,
+                functions=list(template.functions),
                 context_variables=context_variables,
                 update_agent_state_before_reply=update_hooks or None,
             )
@@ -407,7 +335,7 @@ async def create_agents(
         # ==============================================================================
         # IMAGE GENERATION CAPABILITY (AG2 addon)
         # ==============================================================================
-        if agent_config.get("image_generation_enabled", False):
+        if template.image_generation_enabled:
             logger.info(f"[AGENTS][CAPABILITY] Image generation enabled for {agent_name} - attaching AG2 capability")
             
             try:
@@ -487,24 +415,21 @@ async def create_agents(
         from mozaiks_infra.logs.logging_config import get_workflow_session_logger
 
         workflow_logger = get_workflow_session_logger(workflow_name)
-        total_tools = sum(len(tools) for tools in agent_tool_functions.values())
-        workflow_logger.log_tool_binding_summary("ALL_AGENTS", total_tools, list(agent_tool_functions.keys()))
+        workflow_logger.log_tool_binding_summary("ALL_AGENTS", bundle.tool_count, list(bundle.tool_functions.keys()))
     except Exception:
         logger.debug("[AGENTS] Tool binding summary skipped")
 
+    # hooks.json hooks are registered on every chat's agents (specs resolved once per template)
     try:
-        from ..workflow_manager import get_workflow_manager
+        from ..execution.hooks import apply_hook_specs
 
-        wm = get_workflow_manager()
-        already_loaded = workflow_name in getattr(wm, "_hooks_loaded_workflows", set())
-        registered = wm.register_hooks(workflow_name, agents, force=False)
+        registered = apply_hook_specs(workflow_name, list(templates.hook_specs), agents)
         if registered:
-            logger.info(
-                f"[HOOKS] Registered {len(registered)} hooks for '{workflow_name}' (already_loaded={already_loaded})"
-            )
+            logger.info(f"[HOOKS] Registered {len(registered)} hooks for '{workflow_name}'")
     except Exception as hook_err:  # pragma: no cover
         logger.warning(f"[HOOKS] Failed to register hooks for '{workflow_name}': {hook_err}")
 
+    record_agents_stamped(len(agents))
     return agents
 
 
@@ -0,0 +1,239 @@
+# ==============================================================================
+# FILE: core/workflow/agents/templates.py
+# DESCRIPTION: Per-workflow agent templates - the chat-independent half of create_agents
+# ==============================================================================
+"""Agent templates for ``create_agents``.
+
+Everything about an agent that does not depend on the chat is computed once
+per compiled workflow bundle and kept in an :class:`AgentTemplate`:
+
+- the normalized agent config and composed base system prompt,
+- the bound tool callables (already wrapped with validation, from the bundle),
+- the structured-output model / auto-tool mode,
+- the ``update_agent_state`` hooks and the resolved ``hooks.json`` entries.
+
+``create_agents`` then only does the per-chat work: LLM config with the chat's
+cache seed, context exposures, and constructing the ``ConversableAgent``
+(AG2 agents hold conversation state, so instances themselves are never
+shared). Templates follow the bundle: a ``reload_workflow`` produces a new
+bundle and the next lookup rebuilds the templates.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from time import perf_counter
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from ..bundle import WorkflowBundle, get_workflow_bundle
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_SYSTEM_MESSAGE = "You are a helpful AI assistant."
+
+
+@dataclass(frozen=True)
+class AgentTemplate:
+    name: str
+    config: Dict[str, Any]
+    prompt_sections: Any
+    base_system_message: str
+    auto_tool_mode: bool
+    structured_model_cls: Optional[type]
+    functions: Tuple[Callable[..., Any], ...]
+    state_hooks: Tuple[Callable[..., Any], ...]
+    max_consecutive_auto_reply: int
+    image_generation_enabled: bool
+
+
+@dataclass(frozen=True)
+class WorkflowAgentTemplates:
+    workflow_name: str
+    bundle: WorkflowBundle
+    agents: Mapping[str, AgentTemplate]
+    hook_specs: Tuple[Any, ...]
+    build_ms: float
+
+
+_TEMPLATES: Dict[str, WorkflowAgentTemplates] = {}
+_LOCK = threading.Lock()
+_STATS = {"builds": 0, "reuses": 0, "agents_stamped": 0}
+
+
+def _normalize_agent_configs(workflow_name: str, config: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    agent_configs = config.get("agents", {})
+    if "agents" in agent_configs:
+        agent_configs = agent_configs["agents"]
+
+    # Support the canonical JSON form used by most workflows:
+    #   {"agents": [{"name": "AgentA", ...}, {"name": "AgentB", ...}]}
+    # Internally we normalize to a mapping of agent_name -> agent_config.
+    if isinstance(agent_configs, list):
+        normalized: Dict[str, Any] = {}
+        for item in agent_configs:
+            if not isinstance(item, dict):
+                continue
+            name = item.get("name")
+            if not isinstance(name, str) or not name.strip():
+                continue
+            normalized[name.strip()] = item
+        agent_configs = normalized
+
+    if not isinstance(agent_configs, dict):
+        logger.warning(f"[AGENTS] Invalid agents config shape for '{workflow_name}': {type(agent_configs)}")
+        agent_configs = {}
+    return agent_configs
+
+
+def _load_hook_specs(workflow_name: str) -> Tuple[Any, ...]:
+    from ..execution.hooks import load_hook_specs
+    from ..workflow_manager import get_workflow_manager
+
+    base_path = getattr(get_workflow_manager(), "workflows_base_path", None)
+    if base_path is None:
+        return ()
+    try:
+        return tuple(load_hook_specs(workflow_name, base_path=str(base_path)))
+    except Exception as hook_err:  # pragma: no cover
+        logger.warning(f"[HOOKS] Failed to load hooks for '{workflow_name}': {hook_err}")
+        return ()
+
+
+def _build(workflow_name: str, bundle: WorkflowBundle) -> WorkflowAgentTemplates:
+    from .factory import _compose_prompt_sections
+
+    start = perf_counter()
+    hook_specs = _load_hook_specs(workflow_name)
+    templates: Dict[str, AgentTemplate] = {}
+
+    for agent_name, agent_config in _normalize_agent_configs(workflow_name, bundle.config).items():
+        auto_tool_mode = bool(agent_config.get("auto_tool_mode"))
+        structured_model_cls = bundle.structured_registry.get(agent_name)
+        if auto_tool_mode and structured_model_cls is None:
+            raise ValueError(
+                f"[AGENTS] auto_tool_mode enabled for '{agent_name}' but no structured output model is registered"
+            )
+
+        functions = () if auto_tool_mode else tuple(bundle.tool_functions.get(agent_name, ()))
+        for idx, fn in enumerate(functions):
+            if not callable(fn):
+                logger.error(
+                    f"[AGENTS] Tool function at index {idx} for agent '{agent_name}' is not callable: {fn}"
+                )
+
+        # Try prompt_sections first (fixed structure - enforces standardization)
+        prompt_sections = agent_config.get("prompt_sections")
+        # Fallback to prompt_sections_custom (flexible array - adapts to any structure)
+        if not prompt_sections:
+            prompt_sections = agent_config.get("prompt_sections_custom")
+        if prompt_sections:
+            base_system_message = _compose_prompt_sections(prompt_sections)
+        else:
+            base_system_message = agent_config.get("system_message", _DEFAULT_SYSTEM_MESSAGE)
+
+        # update_agent_state hooks must be passed at construction time to work with
+        # AG2's update_agent_state_before_reply, so they are split out per agent here.
+        state_hooks = tuple(
+            spec.function
+            for spec in hook_specs
+            if spec.hook_type == "update_agent_state" and spec.hook_agent == agent_name
+        )
+
+        templates[agent_name] = AgentTemplate(
+            name=agent_name,
+            config=agent_config,
+            prompt_sections=prompt_sections,
+            base_system_message=base_system_message,
+            auto_tool_mode=auto_tool_mode,
+            structured_model_cls=structured_model_cls,
+            functions=functions,
+            state_hooks=state_hooks,
+            max_consecutive_auto_reply=agent_config.get("max_consecutive_auto_reply", 2),
+            image_generation_enabled=bool(agent_config.get("image_generation_enabled", False)),
+        )
+
+    # Hooks already passed to the constructor are not registered a second time.
+    post_construction_hooks = tuple(
+        spec
+        for spec in hook_specs
+        if not (spec.hook_type == "update_agent_state" and spec.hook_agent in templates)
+    )
+    result = WorkflowAgentTemplates(
+        workflow_name=workflow_name,
+        bundle=bundle,
+        agents=MappingProxyType(templates),
+        hook_specs=post_construction_hooks,
+        build_ms=(perf_counter() - start) * 1000.0,
+    )
+    logger.info(
+        f"[AGENTS] Built {len(templates)} agent templates for '{workflow_name}' "
+        f"(bundle v{bundle.version}) in {result.build_ms:.1f}ms"
+    )
+    return result
+
+
+def get_agent_templates(workflow_name: str, bundle: Optional[WorkflowBundle] = None) -> WorkflowAgentTemplates:
+    """Return the agent templates for ``bundle`` (default: the workflow's current one), building them if needed.
+
+    A run passes the bundle it started with, so a reload mid-run cannot hand it
+    agents from a newer version. Templates for an older bundle are not cached
+    over those of a newer one.
+    """
+    if bundle is None:
+        bundle = get_workflow_bundle(workflow_name)
+    key = workflow_name.lower()
+    with _LOCK:
+        cached = _TEMPLATES.get(key)
+        if cached is not None and cached.bundle is bundle:
+            _STATS["reuses"] += 1
+            return cached
+        templates = _build(workflow_name, bundle)
+        if cached is None or bundle.version >= cached.bundle.version:
+            _TEMPLATES[key] = templates
+        _STATS["builds"] += 1
+        return templates
+
+
+def record_agents_stamped(count: int) -> None:
+    """Count agents constructed from templates (reported by get_agent_template_metrics)."""
+    with _LOCK:
+        _STATS["agents_stamped"] += count
+
+
+def clear_agent_templates(workflow_name: Optional[str] = None) -> None:
+    with _LOCK:
+        if workflow_name is None:
+            _TEMPLATES.clear()
+        else:
+            _TEMPLATES.pop(workflow_name.lower(), None)
+
+
+def get_agent_template_metrics() -> Dict[str, Any]:
+    """Pool size (workflows / agent templates held) and build vs reuse counters."""
+    with _LOCK:
+        return {
+            **_STATS,
+            "workflows": len(_TEMPLATES),
+            "agent_templates": sum(len(t.agents) for t in _TEMPLATES.values()),
+            "by_workflow": {
+                name: {
+                    "bundle_version": t.bundle.version,
+                    "agents": len(t.agents),
+                    "hooks": len(t.hook_specs),
+                    "build_ms": round(t.build_ms, 2),
+                }
+                for name, t in _TEMPLATES.items()
+            },
+        }
+
+
+__all__ = [
+    "AgentTemplate",
+    "WorkflowAgentTemplates",
+    "get_agent_templates",
+    "record_agents_stamped",
+    "clear_agent_templates",
+    "get_agent_template_metrics",
+]
@@ -0,0 +1,230 @@
+# ==============================================================================
+# FILE: core/workflow/bundle.py
+# DESCRIPTION: Compiled, immutable per-workflow bundles shared across chat runs
+# ==============================================================================
+
+"""Pre-compiled workflow bundles.
+
+Everything ``run_workflow_orchestration`` needs that depends only on the
+workflow definition (not on the chat) is compiled once into a
+:class:`WorkflowBundle` and reused by every chat of that workflow:
+
+- the normalized workflow config,
+- the structured-output Pydantic models and agent registry,
+- the per-agent tool callables (``tools.yaml`` modules are executed once),
+- the parsed context-variables plan.
+
+Bundles are keyed by ``(workflow_name, version)``. The version is bumped by
+``UnifiedWorkflowManager.reload_workflow`` / ``unload_workflow`` /
+``refresh_all`` (via :func:`invalidate_workflow_bundle`), so a hot reload
+swaps in a fresh bundle for new runs while in-flight runs keep the one they
+started with.
+
+Per-chat state (cache seed, context values, agent instances) is never stored
+on a bundle. Set ``WORKFLOW_BUNDLE_CACHE=false`` to rebuild on every run.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from mozaiks_infra.logs.logging_config import get_workflow_logger
+
+logger = get_workflow_logger(workflow_name="workflow_bundle")
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def _cache_enabled() -> bool:
+    return os.getenv("WORKFLOW_BUNDLE_CACHE", "true").strip().lower() in _TRUE_VALUES
+
+
+@dataclass(frozen=True)
+class WorkflowBundle:
+    """Immutable, chat-independent artifacts for one workflow version.
+
+    ``config`` and ``context_section`` stay plain dicts (callers type-check
+    them) but are shared by every run and must be treated as read-only.
+    """
+
+    workflow_name: str
+    version: int
+    config: Dict[str, Any]
+    structured_models: Mapping[str, type]
+    structured_registry: Mapping[str, type]
+    tool_functions: Mapping[str, Tuple[Callable[..., Any], ...]]
+    context_plan: Any
+    context_section: Dict[str, Any]
+    build_ms: float
+    errors: Mapping[str, str] = field(default_factory=dict)
+
+    @property
+    def tool_count(self) -> int:
+        return sum(len(funcs) for funcs in self.tool_functions.values())
+
+
+_BUNDLES: Dict[Tuple[str, int], WorkflowBundle] = {}
+_VERSIONS: Dict[str, int] = {}
+_LOCK = threading.RLock()
+_STATS = {"hits": 0, "builds": 0, "invalidations": 0}
+
+
+def _key(workflow_name: str) -> str:
+    return workflow_name.lower()
+
+
+# ---------------------------------------------------------------------------
+# Component loaders (each is best-effort; failures are recorded on the bundle)
+# ---------------------------------------------------------------------------
+
+def _load_config(workflow_name: str) -> Dict[str, Any]:
+    from .workflow_manager import workflow_manager
+
+    return workflow_manager.get_config(workflow_name) or {}
+
+
+def _load_structured(workflow_name: str) -> Tuple[Dict[str, type], Dict[str, type]]:
+    from .outputs.structured import load_workflow_structured_outputs
+
+    return load_workflow_structured_outputs(workflow_name)
+
+
+def _load_tools(workflow_name: str) -> Dict[str, list]:
+    from .agents.tools import load_agent_tool_functions
+
+    return load_agent_tool_functions(workflow_name)
+
+
+def _load_context_plan(workflow_name: str) -> Tuple[Any, Dict[str, Any]]:
+    from .context.variables import _load_workflow_plan
+
+    return _load_workflow_plan(workflow_name)
+
+
+def _build(workflow_name: str, version: int) -> WorkflowBundle:
+    start = perf_counter()
+    errors: Dict[str, str] = {}
+
+    config = _load_config(workflow_name)
+
+    try:
+        models, registry = _load_structured(workflow_name)
+    except Exception as err:
+        models, registry = {}, {}
+        errors["structured_outputs"] = str(err)
+
+    try:
+        tools = _load_tools(workflow_name)
+    except Exception as err:
+        tools = {}
+        errors["tools"] = str(err)
+
+    try:
+        plan, section = _load_context_plan(workflow_name)
+    except Exception as err:
+        plan, section = None, {}
+        errors["context_plan"] = str(err)
+
+    bundle = WorkflowBundle(
+        workflow_name=workflow_name,
+        version=version,
+        config=config,
+        structured_models=MappingProxyType(dict(models)),
+        structured_registry=MappingProxyType(dict(registry)),
+        tool_functions=MappingProxyType({agent: tuple(funcs) for agent, funcs in tools.items()}),
+        context_plan=plan,
+        context_section=dict(section or {}),
+        build_ms=(perf_counter() - start) * 1000.0,
+        errors=MappingProxyType(errors),
+    )
+    logger.info(
+        f"[BUNDLE] Compiled {workflow_name} v{version} in {bundle.build_ms:.1f}ms "
+        f"(models={len(models)} tools={bundle.tool_count} errors={sorted(errors)})"
+    )
+    return bundle
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def get_workflow_bundle(workflow_name: str) -> WorkflowBundle:
+    """Return the compiled bundle for the current version of ``workflow_name``.
+
+    The first caller builds it; concurrent callers for the same workflow wait
+    for that build instead of compiling their own copy.
+    """
+    name = _key(workflow_name)
+    if not _cache_enabled():
+        return _build(workflow_name, _VERSIONS.get(name, 0))
+
+    with _LOCK:
+        version = _VERSIONS.get(name, 0)
+        bundle = _BUNDLES.get((name, version))
+        if bundle is not None:
+            _STATS["hits"] += 1
+            return bundle
+        bundle = _build(workflow_name, version)
+        _BUNDLES[(name, version)] = bundle
+        _STATS["builds"] += 1
+        return bundle
+
+
+def peek_workflow_bundle(workflow_name: str) -> Optional[WorkflowBundle]:
+    """Return the current bundle if it has already been compiled, else None."""
+    name = _key(workflow_name)
+    with _LOCK:
+        return _BUNDLES.get((name, _VERSIONS.get(name, 0)))
+
+
+def invalidate_workflow_bundle(workflow_name: Optional[str] = None) -> None:
+    """Drop compiled bundles and bump the version so the next run recompiles.
+
+    Also clears the structured-output model cache the bundle was built from
+    and the event serializer's structured-output lookups for the workflow.
+    ``workflow_name=None`` invalidates every workflow.
+    """
+    with _LOCK:
+        if workflow_name is None:
+            names = {name for name, _ in _BUNDLES} | set(_VERSIONS)
+        else:
+            names = {_key(workflow_name)}
+        for name in names:
+            _VERSIONS[name] = _VERSIONS.get(name, 0) + 1
+        for bundle_key in [k for k in _BUNDLES if k[0] in names]:
+            del _BUNDLES[bundle_key]
+        _STATS["invalidations"] += 1
+
+    try:
+        from .outputs.structured import clear_structured_outputs_cache
+        from ..events.event_serialization import clear_event_builder_caches
+    except ImportError:
+        return
+    clear_structured_outputs_cache(workflow_name)
+    clear_event_builder_caches(workflow_name)
+
+
+def get_bundle_metrics() -> Dict[str, Any]:
+    """Cache counters plus per-workflow build times for the compiled bundles."""
+    with _LOCK:
+        return {
+            **_STATS,
+            "bundles": {
+                name: {"version": version, "build_ms": round(bundle.build_ms, 2), "tools": bundle.tool_count}
+                for (name, version), bundle in _BUNDLES.items()
+            },
+        }
+
+
+__all__ = [
+    "WorkflowBundle",
+    "get_workflow_bundle",
+    "peek_workflow_bundle",
+    "invalidate_workflow_bundle",
+    "get_bundle_metrics",
+]
@@ -168,6 +168,111 @@ def _extract_text(event: TextEvent) -> str:
     return _dig(raw) or ""
 
 
+# The regex parser is a CPython internal (``re._parser`` since 3.11, ``sre_parse``
+# before); without it every regex trigger simply runs without the literal prefilter.
+try:  # Python 3.11+
+    from re import _constants as _sre_constants, _parser as _sre_parse  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover
+    try:
+        import sre_constants as _sre_constants  # type: ignore[no-redef]
+        import sre_parse as _sre_parse  # type: ignore[no-redef]
+    except ImportError:
+        _sre_constants = _sre_parse = None  # type: ignore[assignment]
+
+
+def _required_literal(pattern: re.Pattern[str], min_length: int = 3) -> Optional[str]:
+    """Longest literal run every match of ``pattern`` must contain, lowercased.
+
+    Only top-level literals are considered (anything inside a branch, group or
+    repeat may be skipped by a match). Returns ``None`` when there is no ASCII
+    run of at least ``min_length`` characters, or when the interpreter's regex
+    parser is unavailable or not shaped as expected (the caller then always
+    runs the regex).
+    """
+    literal_op = getattr(_sre_constants, "LITERAL", None)
+    if _sre_parse is None or literal_op is None:
+        return None
+    best = ""
+    run: List[str] = []
+    try:
+        parsed = _sre_parse.parse(pattern.pattern, pattern.flags)
+        for op, arg in list(parsed) + [(None, None)]:
+            if op is literal_op:
+                run.append(chr(arg))
+                continue
+            if len(run) > len(best):
+                best = "".join(run)
+            run = []
+    except Exception:
+        return None
+    if len(best) < min_length or not best.isascii():
+        return None
+    return best.lower()
+
+
+class TriggerMatcher:
+    """All of one agent's text triggers, compiled once for the pre-send hook.
+
+    ``match`` strips and lowercases the message a single time and returns every
+    firing ``(variable, trigger, regex_match)`` in declaration order:
+
+    - ``equals`` triggers are one dict lookup on the normalized message,
+    - ``contains`` literals are deduplicated and lowercased up front (a C-level
+      substring scan per distinct literal beats a pure-Python Aho-Corasick
+      automaton or a combined alternation regex in CPython, and unlike a single
+      alternation pass it also reports overlapping literals),
+    - regexes only run for triggers that have not already fired, or whose value
+      is ``"$1"`` and therefore needs the match object, and are skipped outright
+      when an ASCII message lacks the literal the pattern requires (non-ASCII
+      messages always run the regex, since IGNORECASE folding differs from
+      ``str.lower`` there).
+    """
+
+    __slots__ = ("pairs", "_equals", "_contains", "_regexes")
+
+    def __init__(self, pairs: List[Tuple["DerivedVariableSpec", AgentTextTrigger]]) -> None:
+        self.pairs = list(pairs)
+        self._equals: Dict[str, List[int]] = {}
+        self._contains: Dict[str, List[int]] = {}
+        self._regexes: List[Tuple[int, re.Pattern[str], bool, Optional[str]]] = []
+        for idx, (_var, trigger) in enumerate(self.pairs):
+            if trigger.equals:
+                self._equals.setdefault(trigger.equals.strip().lower(), []).append(idx)
+            if trigger.contains:
+                self._contains.setdefault(trigger.contains.lower(), []).append(idx)
+            if trigger._compiled:
+                self._regexes.append(
+                    (idx, trigger._compiled, trigger.value == "$1", _required_literal(trigger._compiled))
+                )
+
+    def match(self, text: str) -> List[Tuple["DerivedVariableSpec", AgentTextTrigger, Optional[re.Match[str]]]]:
+        candidate = text.strip()
+        if not candidate:
+            return []
+        lowered = candidate.lower()
+        fired: Dict[int, Optional[re.Match[str]]] = {}
+        for idx in self._equals.get(lowered, ()):
+            fired[idx] = None
+        for literal, indices in self._contains.items():
+            if literal in lowered:
+                for idx in indices:
+                    fired[idx] = None
+        ascii_only = lowered.isascii()
+        for idx, pattern, wants_group, literal in self._regexes:
+            if idx in fired and not wants_group:
+                continue
+            if literal is not None and ascii_only and literal not in lowered:
+                found = None
+            else:
+                found = pattern.search(candidate)
+            if found is not None or idx in fired:
+                fired[idx] = found
+        return [(*self.pairs[idx], fired[idx]) for idx in sorted(fired)]
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+
 @dataclass
 class DerivedVariableSpec:
     name: str
@@ -405,7 +510,7 @@ class DerivedContextManager:
             try:
                 agent_obj.register_hook(
                     "process_message_before_send",
-                    self._make_pre_send_hook(agent_name, trigger_pairs),
+                    self._make_pre_send_hook(agent_name, TriggerMatcher(trigger_pairs)),
                 )
                 self._agent_hook_registry.add(agent_id)
                 logger.debug(f"[DERIVED_CONTEXT] Registered pre-send hook for {agent_name}")
@@ -415,7 +520,7 @@ class DerivedContextManager:
     def _make_pre_send_hook(
         self,
         agent_name: str,
-        trigger_pairs: List[Tuple[DerivedVariableSpec, AgentTextTrigger]],
+        matcher: TriggerMatcher,
     ) -> Callable[[Any, Any, Any, bool], Any]:
         def _hook(sender=None, message=None, recipient=None, silent: bool = False):
             # Hooks must accept the AG2 signature, but we only care about the message payload.
@@ -429,38 +534,35 @@ class DerivedContextManager:
                 return message
 
             should_hide = False
-            for var, trigger in trigger_pairs:
-                if self._matches_trigger(trigger, candidate):
-                    # Determine value to set (handle dynamic extraction)
-                    value_to_set = trigger.value
-                    if value_to_set == "$1" and trigger._compiled:
-                        m = trigger._compiled.search(candidate)
-                        if m and m.groups():
-                            value_to_set = m.group(1)
-
-                    updated = False
-                    for provider in self.providers:
-                        if hasattr(provider, "set"):
-                            if trigger.from_state is not None:
-                                current = None
-                                if hasattr(provider, "get"):
-                                    try:
-                                        current = provider.get(var.name)
-                                    except Exception:  # pragma: no cover
-                                        current = None
-                                if current != trigger.from_state:
-                                    continue
-                            try:
-                                provider.set(var.name, value_to_set)  # type: ignore[attr-defined]
-                                updated = True
-                            except Exception as err:  # pragma: no cover
-                                logger.debug(f"[DERIVED_CONTEXT] pre-send update failed: {err}")
-                    if updated:
-                        logger.info(
-                            f"[DERIVED_CONTEXT] {self.workflow_name}: {var.name} -> {value_to_set!r} (pre-send, agent={agent_name})"
-                        )
-                    if trigger.ui_hidden:
-                        should_hide = True
+            for var, trigger, m in matcher.match(candidate):
+                # Determine value to set (handle dynamic extraction)
+                value_to_set = trigger.value
+                if value_to_set == "$1" and m and m.groups():
+                    value_to_set = m.group(1)
+
+                updated = False
+                for provider in self.providers:
+                    if hasattr(provider, "set"):
+                        if trigger.from_state is not None:
+                            current = None
+                            if hasattr(provider, "get"):
+                                try:
+                                    current = provider.get(var.name)
+                                except Exception:  # pragma: no cover
+                                    current = None
+                            if current != trigger.from_state:
+                                continue
+                        try:
+                            provider.set(var.name, value_to_set)  # type: ignore[attr-defined]
+                            updated = True
+                        except Exception as err:  # pragma: no cover
+                            logger.debug(f"[DERIVED_CONTEXT] pre-send update failed: {err}")
+                if updated:
+                    logger.info(
+                        f"[DERIVED_CONTEXT] {self.workflow_name}: {var.name} -> {value_to_set!r} (pre-send, agent={agent_name})"
+                    )
+                if trigger.ui_hidden:
+                    should_hide = True
             if should_hide:
                 if isinstance(message, dict):
                     updated_message = dict(message)
@@ -522,4 +624,4 @@ class DerivedContextManager:
                             continue
 
 
-__all__ = ["DerivedContextManager"]
+__all__ = ["DerivedContextManager", "TriggerMatcher"]
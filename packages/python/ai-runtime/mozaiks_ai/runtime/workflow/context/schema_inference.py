@@ -0,0 +1,233 @@
+# ==============================================================================
+# FILE: core/workflow/context/schema_inference.py
+# DESCRIPTION: Cached, concurrently sampled database schema overviews for context loading
+# ==============================================================================
+
+"""Schema inference for the ``schema_overview`` context variable.
+
+Context loading used to run one ``find_one()`` per collection, serially, on
+every chat start, and typed each field from that single document. This
+service instead:
+
+- samples ``CONTEXT_SCHEMA_SAMPLE_SIZE`` documents per collection, with at
+  most ``CONTEXT_SCHEMA_CONCURRENCY`` collections in flight,
+- merges field types across the samples (``status: str | null``),
+- caches one snapshot per database for ``CONTEXT_SCHEMA_TTL_SEC``; an expired
+  snapshot is still served while a single background task refreshes it.
+
+Only the first context load for a database waits on Mongo; concurrent first
+loads share the same build.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from mozaiks_infra.logs.logging_config import get_workflow_logger
+
+business_logger = get_workflow_logger("context_schema")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default)) or default))
+    except ValueError:
+        return default
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+@dataclass
+class SchemaSnapshot:
+    database: str
+    collections: Dict[str, Dict[str, str]]  # analyzable collections only
+    skipped: Dict[str, str]  # empty or failed collections -> reason
+    app_collections: List[str]
+    first_docs: Dict[str, Any]
+    built_at: float = field(default_factory=time.monotonic)
+    build_ms: float = 0.0
+
+    def overview(self) -> str:
+        lines: List[str] = [
+            f"DATABASE: {self.database}",
+            f"TOTAL COLLECTIONS: {len(self.collections) + len(self.skipped)}",
+            "",
+        ]
+        for name, fields in self.collections.items():
+            is_app = " [app-specific]" if name in self.app_collections else ""
+            lines.append(f"{name.upper()}{is_app}:")
+            lines.append("  Fields:")
+            for field_name, field_type in fields.items():
+                lines.append(f"    - {field_name}: {field_type}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+def merge_field_types(docs: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Union of field types across sampled documents, most common type first.
+
+    Fields keep the order in which they were first seen; a field missing from
+    some samples is reported as nullable.
+    """
+    seen: Dict[str, Counter] = {}
+    for doc in docs:
+        for name, value in doc.items():
+            if name == "_id":
+                continue
+            seen.setdefault(name, Counter())[_type_name(value)] += 1
+    merged: Dict[str, str] = {}
+    for name, counts in seen.items():
+        if sum(counts.values()) < len(docs):
+            counts["null"] += len(docs) - sum(counts.values())
+        ordered = sorted(counts, key=lambda t: (t == "null", -counts[t], t))
+        merged[name] = " | ".join(ordered)
+    return merged
+
+
+class SchemaInferenceService:
+    def __init__(
+        self,
+        *,
+        client_factory: Optional[Callable[[], Any]] = None,
+        ttl_sec: Optional[int] = None,
+        sample_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self._client_factory = client_factory
+        self._client: Any = None
+        self.ttl_sec = ttl_sec if ttl_sec is not None else _env_int("CONTEXT_SCHEMA_TTL_SEC", 300)
+        self.sample_size = sample_size if sample_size is not None else _env_int("CONTEXT_SCHEMA_SAMPLE_SIZE", 5)
+        self.concurrency = concurrency if concurrency is not None else _env_int("CONTEXT_SCHEMA_CONCURRENCY", 8)
+        self._snapshots: Dict[str, SchemaSnapshot] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "builds": 0, "build_errors": 0}
+
+    def _db(self, database_name: str):
+        if self._client is None:
+            factory = self._client_factory
+            if factory is None:
+                from mozaiks_ai.runtime.core_config import get_mongo_client
+
+                factory = get_mongo_client
+            self._client = factory()
+        return self._client[database_name]
+
+    async def _sample_collection(self, db, name: str, sem: asyncio.Semaphore) -> tuple:
+        async with sem:
+            try:
+                docs = await db[name].find({}).limit(self.sample_size).to_list(length=self.sample_size)
+            except Exception as err:
+                business_logger.debug(f"Could not analyze {name}: {err}")
+                return name, f"Analysis failed: {err}", {"_error": str(err)}, False
+        if not docs:
+            return name, "No sample data available", {"_note": "empty_collection"}, False
+        first = {k: v for k, v in docs[0].items() if k != "_id"}
+        is_app = any("app_id" in doc for doc in docs)
+        return name, merge_field_types(docs), first, is_app
+
+    async def _build(self, database_name: str) -> SchemaSnapshot:
+        start = time.perf_counter()
+        db = self._db(database_name)
+        names = await db.list_collection_names()
+        sem = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._sample_collection(db, name, sem) for name in names))
+
+        snapshot = SchemaSnapshot(
+            database=database_name,
+            collections={name: fields for name, fields, _, _ in results if isinstance(fields, dict)},
+            skipped={name: reason for name, reason, _, _ in results if isinstance(reason, str)},
+            app_collections=[name for name, _, _, is_app in results if is_app],
+            first_docs={name: first for name, _, first, _ in results},
+        )
+        snapshot.build_ms = (time.perf_counter() - start) * 1000.0
+        self._snapshots[database_name] = snapshot
+        self._stats["builds"] += 1
+        business_logger.info(
+            "Schema loaded",
+            extra={
+                "database": database_name,
+                "collections": len(names),
+                "app_collections": len(snapshot.app_collections),
+                "build_ms": round(snapshot.build_ms, 1),
+            },
+        )
+        return snapshot
+
+    def _start_build(self, database_name: str) -> asyncio.Task:
+        task = self._inflight.get(database_name)
+        if task is None or task.done():
+            task = asyncio.create_task(self._build(database_name))
+            self._inflight[database_name] = task
+            task.add_done_callback(lambda t, db=database_name: self._on_build_done(db, t))
+        return task
+
+    def _on_build_done(self, database_name: str, task: asyncio.Task) -> None:
+        if self._inflight.get(database_name) is task:
+            self._inflight.pop(database_name, None)
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["build_errors"] += 1
+            business_logger.warning(f"Schema refresh failed for {database_name}: {task.exception()}")
+
+    async def get_snapshot(self, database_name: str) -> SchemaSnapshot:
+        """Return the cached snapshot, building it on first use.
+
+        An expired snapshot is returned immediately and refreshed in the
+        background. Raises if the first build for a database fails.
+        """
+        snapshot = self._snapshots.get(database_name)
+        if snapshot is None:
+            return await asyncio.shield(self._start_build(database_name))
+        if time.monotonic() - snapshot.built_at >= self.ttl_sec:
+            self._stats["stale_hits"] += 1
+            self._start_build(database_name)
+        else:
+            self._stats["hits"] += 1
+        return snapshot
+
+    def invalidate(self, database_name: Optional[str] = None) -> None:
+        if database_name is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(database_name, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self._stats,
+            "refreshing": sorted(self._inflight),
+            "databases": {
+                name: {
+                    "collections": len(s.collections) + len(s.skipped),
+                    "age_sec": round(now - s.built_at, 1),
+                    "build_ms": round(s.build_ms, 1),
+                }
+                for name, s in self._snapshots.items()
+            },
+        }
+
+
+_service: Optional[SchemaInferenceService] = None
+
+
+def get_schema_inference_service() -> SchemaInferenceService:
+    global _service
+    if _service is None:
+        _service = SchemaInferenceService()
+    return _service
+
+
+__all__ = [
+    "SchemaSnapshot",
+    "SchemaInferenceService",
+    "merge_field_types",
+    "get_schema_inference_service",
+]
@@ -5,6 +5,7 @@
 
 from __future__ import annotations
 
+import copy
 import os
 import json
 from pathlib import Path
@@ -13,6 +14,7 @@ from typing import Any, Dict, List, Optional, Tuple
 from .adapter import create_context_container
 from .data_entity import DataEntityManager
 from .db_adapters import get_db_adapter
+from .schema_inference import get_schema_inference_service
 from .schema import (
     ContextVariablesPlan,
     ContextVariableDefinition,
@@ -341,112 +343,41 @@ def _load_workflow_plan(workflow_name: str) -> Tuple[ContextVariablesPlan, Dict[
 # ---------------------------------------------------------------------------
 
 async def _get_all_collections_first_docs(database_name: str) -> Dict[str, Any]:
-    from mozaiks_ai.runtime.core_config import get_mongo_client  # local import
-
-    result: Dict[str, Any] = {}
     try:
-        client = get_mongo_client()
-        db = client[database_name]
-        try:
-            names = await db.list_collection_names()
-        except Exception as err:  # pragma: no cover
-            business_logger.error(f"list_collection_names failed for {database_name}: {err}")
-            return result
-        for cname in names:
-            try:
-                doc = await db[cname].find_one()
-                if not doc:
-                    result[cname] = {"_note": "empty_collection"}
-                else:
-                    cleaned = {k: v for k, v in doc.items() if k != "_id"}
-                    result[cname] = cleaned
-            except Exception as ce:
-                result[cname] = {"_error": str(ce)}
-    except Exception as outer:
-        business_logger.error(f"Failed collecting first docs for {database_name}: {outer}")
-    return result
+        snapshot = await get_schema_inference_service().get_snapshot(database_name)
+    except Exception as err:
+        business_logger.error(f"Failed collecting first docs for {database_name}: {err}")
+        return {}
+    # Copied: the snapshot is shared by every context load until it is refreshed
+    return copy.deepcopy(snapshot.first_docs)
 
 
 async def _get_database_schema_async(database_name: str) -> Dict[str, Any]:
-    schema_info: Dict[str, Any] = {}
-
+    """Schema overview text from the cached, sampled snapshot (see schema_inference.py)."""
     try:
-        from mozaiks_ai.runtime.core_config import get_mongo_client
-
-        client = get_mongo_client()
-        db = client[database_name]
-        collection_names = await db.list_collection_names()
-
-        schema_lines: List[str] = []
-        schema_lines.append(f"DATABASE: {database_name}")
-        schema_lines.append(f"TOTAL COLLECTIONS: {len(collection_names)}")
-        schema_lines.append("")
-
-        app_collections: List[str] = []
-        collection_schemas: Dict[str, Dict[str, str]] = {}
-
-        for collection_name in collection_names:
-            try:
-                collection = db[collection_name]
-                sample_doc = await collection.find_one()
-                if not sample_doc:
-                    collection_schemas[collection_name] = {"note": "No sample data available"}
-                    continue
-
-                field_types: Dict[str, str] = {}
-                for field_name, value in sample_doc.items():
-                    if field_name == "_id":
-                        continue
-                    field_type = type(value).__name__
-                    if field_type == "ObjectId":
-                        field_type = "ObjectId"
-                    field_types[field_name] = field_type
-                collection_schemas[collection_name] = field_types
-
-                if "app_id" in sample_doc:
-                    app_collections.append(collection_name)
-            except Exception as err:
-                business_logger.debug(f"Could not analyze {collection_name}: {err}")
-                collection_schemas[collection_name] = {"error": f"Analysis failed: {err}"}
-
-        for collection_name, fields in collection_schemas.items():
-            note = fields.get("note") if isinstance(fields, dict) else None
-            error = fields.get("error") if isinstance(fields, dict) else None
-            if note or error:
-                continue
-            is_app = " [app-specific]" if collection_name in app_collections else ""
-            schema_lines.append(f"{collection_name.upper()}{is_app}:")
-            schema_lines.append("  Fields:")
-            for field_name, field_type in fields.items():
-                schema_lines.append(f"    - {field_name}: {field_type}")
-            schema_lines.append("")
-
-        schema_info["schema_overview"] = "\n".join(schema_lines)
-        business_logger.info(
-            "Schema loaded",
-            extra={
-                "database": database_name,
-                "collections": len(collection_names),
-                "app_collections": len(app_collections),
-            },
-        )
+        snapshot = await get_schema_inference_service().get_snapshot(database_name)
     except Exception as err:
         business_logger.error(f"Database schema loading failed: {err}")
-        schema_info["error"] = f"Could not load schema: {err}"
-
-    return schema_info
+        return {"error": f"Could not load schema: {err}"}
+    return {"schema_overview": snapshot.overview()}
 
 
 # ---------------------------------------------------------------------------
 # Main loader
 # ---------------------------------------------------------------------------
 
-async def _load_context_async(workflow_name: str, app_id: Optional[str]):
+async def _load_context_async(workflow_name: str, app_id: Optional[str], bundle=None):
     business_logger.info(f"Loading context for workflow={workflow_name}")
     context = _create_minimal_context(workflow_name, app_id)
     internal_app_id = app_id or ""
 
-    plan, raw_context_section = _load_workflow_plan(workflow_name)
+    if bundle is None:  # callers inside a run pass the bundle the run started with
+        from ..bundle import get_workflow_bundle
+
+        bundle = get_workflow_bundle(workflow_name)
+    plan, raw_context_section = bundle.context_plan, bundle.context_section
+    if plan is None:
+        plan, raw_context_section = _load_workflow_plan(workflow_name)
 
     # Optional schema overview (gated by env)
     schema_capability_enabled = False
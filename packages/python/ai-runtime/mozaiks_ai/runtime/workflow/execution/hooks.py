@@ -126,19 +126,20 @@ def _validate_signature(hook_type: str, fn: Callable) -> None:
         logger.warning(f"Hook {fn.__name__} signature may be invalid for {hook_type}: expected 1 param, got {len(params)}")
 
 
-def register_hooks_for_workflow(workflow_name: str, agents: Dict[str, Any], *, base_path: str = str(WORKFLOWS_ROOT)) -> List[RegisteredHook]:
-    """Load hooks.json for `workflow_name` and register hooks on provided agents.
+@dataclass(frozen=True)
+class HookSpec:
+    """A resolved hooks.json entry, ready to be registered on agents."""
+    hook_type: str
+    hook_agent: str  # agent name or "all"
+    function: Callable
+    qualname: str
 
-    Parameters
-    ----------
-    workflow_name: Name of the workflow directory under `base_path`.
-    agents: Mapping of agent names to ConversableAgent instances.
-    base_path: Root workflows directory.
 
-    Returns
-    -------
-    list[RegisteredHook]
-        Hooks successfully registered.
+def load_hook_specs(workflow_name: str, *, base_path: str = str(WORKFLOWS_ROOT)) -> List[HookSpec]:
+    """Read hooks.json for `workflow_name` and import every declared hook function.
+
+    Agent names are not checked here (see `apply_hook_specs`), so the result
+    can be computed once per workflow and applied to each chat's agents.
     """
     workflow_path = Path(base_path) / workflow_name
     hooks_json = workflow_path / "hooks.json"
@@ -159,7 +160,7 @@ def register_hooks_for_workflow(workflow_name: str, agents: Dict[str, Any], *, b
         logger.warning(f"hooks.json invalid structure (hooks not list) for {workflow_name}")
         return []
 
-    registered: List[RegisteredHook] = []
+    specs: List[HookSpec] = []
     # Counters for summary
     total = 0
     skipped_invalid_entry = 0
@@ -190,17 +191,6 @@ def register_hooks_for_workflow(workflow_name: str, agents: Dict[str, Any], *, b
                 logger.warning(f"Missing hook_agent for hook_type '{hook_type}' in workflow {workflow_name}; skipping entry")
                 continue
 
-            # Support "all" to apply hook to every agent in the workflow
-            if hook_agent.lower() == "all":
-                target_agents = list(agents.items())
-            else:
-                agent_obj = agents.get(hook_agent)
-                if agent_obj is None:
-                    skipped_missing_agent += 1
-                    logger.warning(f"Hook agent '{hook_agent}' not found for workflow {workflow_name}; skipping entry")
-                    continue
-                target_agents = [(hook_agent, agent_obj)]
-
             if not fn_value:
                 skipped_missing_function += 1
                 logger.warning(f"Missing function for hook_type '{hook_type}' (agent={hook_agent}) in workflow {workflow_name}; skipping entry")
@@ -212,79 +202,109 @@ def register_hooks_for_workflow(workflow_name: str, agents: Dict[str, Any], *, b
                 continue
 
             _validate_signature(hook_type, fn)
-
-            # ------------------------------------------------------------------
-            # Register hook on each target agent (single agent or all agents)
-            # ------------------------------------------------------------------
-            for target_agent_name, target_agent_obj in target_agents:
-                # ------------------------------------------------------------------
-                # Instrument hook execution with timing + error logging.
-                # We wrap only once (idempotent) to avoid stacking decorators if
-                # register_hooks is forced multiple times.
-                # ------------------------------------------------------------------
-                if getattr(fn, "_mozaiks_hook_wrapped", False):
-                    wrapped_fn = getattr(fn, "_mozaiks_hook_wrapper", fn)
-                else:
-                    orig_fn = fn
-
-                    @wraps(orig_fn)
-                    def _wrapped_hook(*args, __wf=workflow_name, __agent=target_agent_name, __type=hook_type, __orig=orig_fn, **kwargs):  # type: ignore[override]
-                        start = time.perf_counter()
-                        logger.info(
-                            "🪝 [HOOK_EXEC] status=start type=%s agent=%s workflow=%s function=%s",
-                            __type,
-                            __agent,
-                            __wf,
-                            f"{__orig.__module__}.{__orig.__name__}",
-                        )
-                        try:
-                            result = __orig(*args, **kwargs)
-                            duration = (time.perf_counter() - start) * 1000.0
-                            logger.info(
-                                "🪝 [HOOK_EXEC] status=done type=%s agent=%s workflow=%s duration_ms=%.2f",
-                                __type,
-                                __agent,
-                                __wf,
-                                duration,
-                            )
-                            return result
-                        except Exception as hook_err:  # pragma: no cover
-                            duration = (time.perf_counter() - start) * 1000.0
-                            logger.error(
-                                "🪝 [HOOK_EXEC] status=error type=%s agent=%s workflow=%s duration_ms=%.2f err=%s",
-                                __type,
-                                __agent,
-                                __wf,
-                                duration,
-                                hook_err,
-                                exc_info=True,
-                            )
-                            raise
-
-                    setattr(_wrapped_hook, "_mozaiks_hook_wrapped", True)
-                    try:
-                        setattr(orig_fn, "_mozaiks_hook_wrapped", True)
-                        setattr(orig_fn, "_mozaiks_hook_wrapper", _wrapped_hook)
-                    except Exception:  # pragma: no cover - some callables may deny attribute assignment
-                        pass
-                    wrapped_fn = _wrapped_hook
-
-                try:
-                    target_agent_obj.register_hook(hook_type, wrapped_fn)  # type: ignore[attr-defined]
-                    registered.append(RegisteredHook(workflow=workflow_name, agent=target_agent_name, hook_type=hook_type, function_qualname=qual))
-                    logger.debug(f"Registered hook {hook_type} -> {qual} for agent {target_agent_name}")
-                except Exception as e:  # pragma: no cover
-                    logger.error(f"Failed registering hook {hook_type} for {target_agent_name}: {e}")
-                    continue
+            specs.append(HookSpec(hook_type=hook_type, hook_agent=hook_agent, function=fn, qualname=qual))
         except Exception as e:  # pragma: no cover
             logger.error(f"Unexpected error processing hook entry for {workflow_name}: {e}", exc_info=True)
 
     skipped_total = skipped_invalid_entry + skipped_unknown_type + skipped_missing_agent + skipped_missing_function + import_failures
     logger.debug(
-        f"Hook loading summary for '{workflow_name}': processed={total}, registered={len(registered)}, skipped={skipped_total} "
+        f"Hook loading summary for '{workflow_name}': processed={total}, resolved={len(specs)}, skipped={skipped_total} "
         f"(invalid_entry={skipped_invalid_entry}, unknown_type={skipped_unknown_type}, missing_agent={skipped_missing_agent}, missing_fn={skipped_missing_function}, import_failures={import_failures})"
     )
-    
+    return specs
+
+
+def _instrument_hook(fn: Callable, workflow_name: str, agent_name: str, hook_type: str) -> Callable:
+    """Wrap a hook with timing + error logging.
+
+    We wrap only once (idempotent) to avoid stacking decorators when the same
+    function is registered on many agents or chats.
+    """
+    if getattr(fn, "_mozaiks_hook_wrapped", False):
+        return getattr(fn, "_mozaiks_hook_wrapper", fn)
+
+    orig_fn = fn
+
+    @wraps(orig_fn)
+    def _wrapped_hook(*args, __wf=workflow_name, __agent=agent_name, __type=hook_type, __orig=orig_fn, **kwargs):  # type: ignore[override]
+        start = time.perf_counter()
+        logger.info(
+            "🪝 [HOOK_EXEC] status=start type=%s agent=%s workflow=%s function=%s",
+            __type,
+            __agent,
+            __wf,
+            f"{__orig.__module__}.{__orig.__name__}",
+        )
+        try:
+            result = __orig(*args, **kwargs)
+            duration = (time.perf_counter() - start) * 1000.0
+            logger.info(
+                "🪝 [HOOK_EXEC] status=done type=%s agent=%s workflow=%s duration_ms=%.2f",
+                __type,
+                __agent,
+                __wf,
+                duration,
+            )
+            return result
+        except Exception as hook_err:  # pragma: no cover
+            duration = (time.perf_counter() - start) * 1000.0
+            logger.error(
+                "🪝 [HOOK_EXEC] status=error type=%s agent=%s workflow=%s duration_ms=%.2f err=%s",
+                __type,
+                __agent,
+                __wf,
+                duration,
+                hook_err,
+                exc_info=True,
+            )
+            raise
+
+    setattr(_wrapped_hook, "_mozaiks_hook_wrapped", True)
+    try:
+        setattr(orig_fn, "_mozaiks_hook_wrapped", True)
+        setattr(orig_fn, "_mozaiks_hook_wrapper", _wrapped_hook)
+    except Exception:  # pragma: no cover - some callables may deny attribute assignment
+        pass
+    return _wrapped_hook
+
+
+def apply_hook_specs(workflow_name: str, specs: List[HookSpec], agents: Dict[str, Any]) -> List[RegisteredHook]:
+    """Register resolved hooks on a set of agents.
+
+    Parameters
+    ----------
+    workflow_name: Workflow the hooks belong to (for logging).
+    specs: Output of `load_hook_specs`.
+    agents: Mapping of agent names to ConversableAgent instances.
+    """
+    registered: List[RegisteredHook] = []
+    skipped_missing_agent = 0
+
+    for spec in specs:
+        # Support "all" to apply hook to every agent in the workflow
+        if spec.hook_agent.lower() == "all":
+            target_agents = list(agents.items())
+        else:
+            agent_obj = agents.get(spec.hook_agent)
+            if agent_obj is None:
+                skipped_missing_agent += 1
+                logger.warning(f"Hook agent '{spec.hook_agent}' not found for workflow {workflow_name}; skipping entry")
+                continue
+            target_agents = [(spec.hook_agent, agent_obj)]
+
+        for target_agent_name, target_agent_obj in target_agents:
+            wrapped_fn = _instrument_hook(spec.function, workflow_name, target_agent_name, spec.hook_type)
+            try:
+                target_agent_obj.register_hook(spec.hook_type, wrapped_fn)  # type: ignore[attr-defined]
+                registered.append(RegisteredHook(workflow=workflow_name, agent=target_agent_name, hook_type=spec.hook_type, function_qualname=spec.qualname))
+                logger.debug(f"Registered hook {spec.hook_type} -> {spec.qualname} for agent {target_agent_name}")
+            except Exception as e:  # pragma: no cover
+                logger.error(f"Failed registering hook {spec.hook_type} for {target_agent_name}: {e}")
+                continue
+
+    if skipped_missing_agent:
+        logger.debug(f"Hook registration for '{workflow_name}' skipped {skipped_missing_agent} entries with unknown agents")
+
     # Use consolidated logging for summary
     if registered:
         from mozaiks_infra.logs.logging_config import get_workflow_session_logger
@@ -298,6 +318,23 @@ def register_hooks_for_workflow(workflow_name: str, agents: Dict[str, Any], *, b
     return registered
 
 
+def register_hooks_for_workflow(workflow_name: str, agents: Dict[str, Any], *, base_path: str = str(WORKFLOWS_ROOT)) -> List[RegisteredHook]:
+    """Load hooks.json for `workflow_name` and register hooks on provided agents.
+
+    Parameters
+    ----------
+    workflow_name: Name of the workflow directory under `base_path`.
+    agents: Mapping of agent names to ConversableAgent instances.
+    base_path: Root workflows directory.
+
+    Returns
+    -------
+    list[RegisteredHook]
+        Hooks successfully registered.
+    """
+    return apply_hook_specs(workflow_name, load_hook_specs(workflow_name, base_path=base_path), agents)
+
+
 def summarize_hooks(workflow_name: str) -> List[Dict[str, Any]]:
     """Return raw hook declarations (without importing) for inspection."""
     workflow_path = WORKFLOWS_ROOT / workflow_name
@@ -313,6 +350,9 @@ def summarize_hooks(workflow_name: str) -> List[Dict[str, Any]]:
         return []
 
 __all__ = [
+    "HookSpec",
+    "load_hook_specs",
+    "apply_hook_specs",
     "register_hooks_for_workflow",
     "summarize_hooks",
     "RegisteredHook",
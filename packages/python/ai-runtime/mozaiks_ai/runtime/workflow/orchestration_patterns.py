@@ -50,6 +50,7 @@ from mozaiks_ai.runtime.events.event_serialization import (
 from ..data.persistence import AG2PersistenceManager
 from .execution import create_termination_handler, LifecycleTrigger
 from .context import DerivedContextManager
+from .bundle import WorkflowBundle, get_workflow_bundle
 from mozaiks_infra.logs.logging_config import get_workflow_logger
 from mozaiks_ai.runtime.observability.ag2_runtime_logger import ag2_logging_session
 from mozaiks_ai.runtime.observability.performance_manager import get_performance_manager
@@ -141,9 +142,12 @@ def _normalize_human_in_the_loop(value) -> bool:
     return False
 
 """Internal helper: load workflow config block."""
-def _load_workflow_config(workflow_name: str):
-    from .workflow_manager import workflow_manager
-    config = workflow_manager.get_config(workflow_name)
+def _load_workflow_config(workflow_name: str, bundle=None):
+    if bundle is not None:
+        config = bundle.config
+    else:
+        from .workflow_manager import workflow_manager
+        config = workflow_manager.get_config(workflow_name)
     return {
         "config": config,
         "max_turns": config.get("max_turns", 50),
@@ -310,6 +314,7 @@ async def _build_context_blocking(
     wf_logger,
     workflow_name_upper: str,
     frontend_context: Optional[Dict[str, Any]] = None,
+    bundle: Optional[WorkflowBundle] = None,
 ):
     """Build context and wait for it to be fully populated before first turn.
 
@@ -326,7 +331,7 @@ async def _build_context_blocking(
         else:
             from .context.variables import _load_context_async
             # Use the internal async loader directly to ensure blocking population
-            ctx = await _load_context_async(workflow_name, app_id)
+            ctx = await _load_context_async(workflow_name, app_id, bundle)
         
         # Merge frontend context with ui_ prefix (avoids collisions with backend context)
         if frontend_context and isinstance(frontend_context, dict) and ctx is not None:
@@ -348,7 +353,14 @@ async def _build_context_blocking(
         return None
 
 
-async def _create_agents(agents_factory: Optional[Callable], workflow_name: str, context_variables=None, *, cache_seed: Optional[int] = None):
+async def _create_agents(
+    agents_factory: Optional[Callable],
+    workflow_name: str,
+    context_variables=None,
+    *,
+    cache_seed: Optional[int] = None,
+    bundle: Optional[WorkflowBundle] = None,
+):
     """Create agents for the workflow following AG2 patterns.
 
     Clean API: agents_factory(workflow_name, context_variables, cache_seed)
@@ -356,7 +368,7 @@ async def _create_agents(agents_factory: Optional[Callable], workflow_name: str,
     if agents_factory:
         return await agents_factory(workflow_name, context_variables, cache_seed)
     from .agents import create_agents
-    return await create_agents(workflow_name, context_variables=context_variables, cache_seed=cache_seed)
+    return await create_agents(workflow_name, context_variables=context_variables, cache_seed=cache_seed, bundle=bundle)
 
 
 def _ensure_user_proxy(
@@ -1660,7 +1672,9 @@ async def run_workflow_orchestration(
             # -----------------------------------------------------------------
             # 1) Load configuration
             # -----------------------------------------------------------------
-            cfg = _load_workflow_config(workflow_name)
+            # Compiled once per workflow version and shared across chats (see bundle.py)
+            bundle = get_workflow_bundle(workflow_name)
+            cfg = _load_workflow_config(workflow_name, bundle)
             config = cfg["config"]
             max_turns = cfg["max_turns"]
             orchestration_pattern = cfg["orchestration_pattern"]
@@ -1713,13 +1727,12 @@ async def run_workflow_orchestration(
             # -----------------------------------------------------------------
             # 3.5) Structured outputs preload (blocking)
             # -----------------------------------------------------------------
-            try:
-                from .outputs.structured import load_workflow_structured_outputs as _preload_so
-                _preload_so(workflow_name)
-                wf_logger.info(f" [{workflow_name_upper}] Structured outputs preloaded")
-            except Exception as so_err:
+            so_err = bundle.errors.get("structured_outputs")
+            if so_err:
                 # Do not fail the run, but surface misconfiguration early
                 wf_logger.warning(f" [{workflow_name_upper}] Structured outputs preload failed: {so_err}")
+            else:
+                wf_logger.info(f" [{workflow_name_upper}] Structured outputs preloaded (bundle v{bundle.version})")
 
             # Log start
             chat_logger.info(f"[{workflow_name_upper}] WORKFLOW_STARTED chat_id={chat_id} pattern={orchestration_pattern}")
@@ -1761,6 +1774,7 @@ async def run_workflow_orchestration(
                 wf_logger=wf_logger,
                 workflow_name_upper=workflow_name_upper,
                 frontend_context=frontend_context,
+                bundle=bundle,
             )
 
             # Merge persisted session metadata (extra_fields) into context.
@@ -1818,7 +1832,9 @@ async def run_workflow_orchestration(
             # -----------------------------------------------------------------
             # 6) Agents creation following AG2 patterns
             # -----------------------------------------------------------------
-            agents = await _create_agents(agents_factory, workflow_name, context_variables=context, cache_seed=cache_seed)
+            agents = await _create_agents(
+                agents_factory, workflow_name, context_variables=context, cache_seed=cache_seed, bundle=bundle
+            )
             agents = agents or {}
             if not agents:
                 raise RuntimeError(f"No agents defined for workflow '{workflow_name}'")
@@ -1859,8 +1875,7 @@ async def run_workflow_orchestration(
                     wf_logger.debug(f"Failed registering derived context manager with transport: {_reg_err}")
 
             # Get tool binding data for summary
-            from .agents.tools import load_agent_tool_functions
-            agent_tools = load_agent_tool_functions(workflow_name)
+            agent_tools = bundle.tool_functions
 
             try:
                 # Produce a concise debug summary of loaded tools per agent
@@ -270,6 +270,15 @@ def load_workflow_structured_outputs(workflow_name: str) -> tuple[Dict[str, type
     
     return models, registry
 
+def clear_structured_outputs_cache(workflow_name: Optional[str] = None) -> None:
+    """Forget built models so the next load re-reads the workflow config."""
+    for cache in (_workflow_models, _workflow_registries, _workflow_structured_agents):
+        if workflow_name is None:
+            cache.clear()
+            continue
+        for key in [k for k in cache if k.lower() == workflow_name.lower()]:
+            cache.pop(key, None)
+
 def get_structured_outputs_for_workflow(workflow_name: str) -> Dict[str, type]:
     """Get structured outputs registry for a specific workflow."""
     _, registry = load_workflow_structured_outputs(workflow_name)
@@ -28,6 +28,7 @@ import logging
 import hashlib
 import json
 import tempfile
+import weakref
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Type, Set
 from pydantic import BaseModel
@@ -101,6 +102,8 @@ def _attach_autogen_cache(llm_config: Dict[str, Any]) -> None:
 # ---------------------------------------------------------------------------
 _RAW_CONFIG_CACHE: Dict[str, Any] = {"config_list": None, "loaded_at": 0}
 _LLM_CONFIG_CACHE: Dict[str, Dict[str, Any]] = {}
+# response_format model -> schema hash (models are immutable once built; reloads build new classes)
+_SCHEMA_HASHES: "weakref.WeakKeyDictionary[type, str]" = weakref.WeakKeyDictionary()
 _RAW_LOCK = asyncio.Lock()
 _LLM_LOCK = asyncio.Lock()
 
@@ -300,11 +303,14 @@ def _build_llm_cache_key(*, response_format: Optional[Type[BaseModel]], stream:
     parts = ["stream" if stream else "no-stream"]
     if response_format:
         # Include schema hash so structural changes to model invalidate cache automatically
-        try:
-            schema_json = json.dumps(response_format.model_json_schema(), sort_keys=True)
-            schema_hash = hashlib.sha256(schema_json.encode()).hexdigest()[:10]
-        except Exception:
-            schema_hash = "unknown"
+        schema_hash = _SCHEMA_HASHES.get(response_format)
+        if schema_hash is None:
+            try:
+                schema_json = json.dumps(response_format.model_json_schema(), sort_keys=True)
+                schema_hash = hashlib.sha256(schema_json.encode()).hexdigest()[:10]
+                _SCHEMA_HASHES[response_format] = schema_hash
+            except Exception:
+                schema_hash = "unknown"
         parts.append(f"rf:{response_format.__name__}:{schema_hash}")
     if extra_config:
         # Deterministic ordering (avoid giant keys; only include primitive scalars)
@@ -55,6 +55,15 @@ def _get_workflows_base_path() -> Optional[str]:
     logger.info(f"Using workflows path: {resolved}")
     return str(resolved)
 
+def _invalidate_bundle(workflow_name: Optional[str]) -> None:
+    """Drop compiled run bundles (see bundle.py) after a config change."""
+    try:
+        from .bundle import invalidate_workflow_bundle
+        invalidate_workflow_bundle(workflow_name)
+    except Exception as e:  # pragma: no cover
+        logger.warning(f"Could not invalidate workflow bundle for {workflow_name}: {e}")
+
+
 @dataclass
 class WorkflowInfo:
     """Container for complete workflow information"""
@@ -659,6 +668,9 @@ class UnifiedWorkflowManager:
         except Exception as e:
             logger.error(f"Failed to reload workflow {workflow_name}: {e}")
             return {"error": str(e)}
+        finally:
+            # After the new config is in place, so no run can compile the old one under the new version
+            _invalidate_bundle(workflow_name)
     
     def unload_workflow(self, workflow_name: str) -> None:
         """Unload a workflow (remove from active workflows)"""
@@ -669,6 +681,7 @@ class UnifiedWorkflowManager:
         
         if normalized_name in self._config_cache:
             del self._config_cache[normalized_name]
+        _invalidate_bundle(workflow_name)
         
         logger.info(f"Unloaded workflow: {workflow_name}")
     
@@ -782,6 +795,7 @@ class UnifiedWorkflowManager:
         self._workflows.clear()
         self._config_cache.clear()
         self._hooks_loaded_workflows.clear()
+        _invalidate_bundle(None)
         self._load_all_workflows()
         return self.get_status_summary()
 
@@ -1040,6 +1054,7 @@ def initialize_workflows(base_path: str = None) -> Dict[str, Dict[str, Any]]:
     new_manager._initialized = True
     
     _unified_workflow_manager = new_manager
+    _invalidate_bundle(None)
     logger.info(f"Workflows initialized from: {resolved_path}")
     return {
         name: info.to_dict() 
@@ -0,0 +1,285 @@
+"""Minimal in-memory stand-in for the Motor collections used by the persistence tests.
+
+Supports the query/update operators the persistence layer issues: equality on
+(dotted) fields, ``$gt/$gte/$lt/$lte/$ne/$in/$size``, and
+``$set/$unset/$inc/$max/$push`` updates (plus ``$setOnInsert`` on upsert). Hooks let a test fail or pause a specific operation,
+or reject single ``bulk_write`` ops the way a partial ``BulkWriteError`` does.
+"""
+
+import copy
+import itertools
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+_MISSING = object()
+_ids = itertools.count(1)
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _parent(doc, path, create):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        if isinstance(doc, list):
+            doc = doc[int(part)]
+        elif create:
+            doc = doc.setdefault(part, {})
+        else:
+            doc = doc.get(part, {})
+    return doc, parts[-1]
+
+
+def _set(doc, path, value):
+    parent, last = _parent(doc, path, create=True)
+    if isinstance(parent, list):
+        parent[int(last)] = value
+    else:
+        parent[last] = value
+
+
+def _unset(doc, path):
+    parent, last = _parent(doc, path, create=False)
+    if isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def matches(doc, query):
+    for key, expected in query.items():
+        actual = _get(doc, key)
+        if isinstance(expected, dict) and expected and all(k.startswith("$") for k in expected):
+            for op, operand in expected.items():
+                if op == "$gt" and not (actual is not _MISSING and actual > operand):
+                    return False
+                if op == "$gte" and not (actual is not _MISSING and actual >= operand):
+                    return False
+                if op == "$lt" and not (actual is not _MISSING and actual < operand):
+                    return False
+                if op == "$lte" and not (actual is not _MISSING and actual <= operand):
+                    return False
+                if op == "$ne" and actual == operand:
+                    return False
+                if op == "$in" and (None if actual is _MISSING else actual) not in operand:
+                    return False
+                if op == "$size" and not (isinstance(actual, list) and len(actual) == operand):
+                    return False
+        elif actual is _MISSING:
+            if expected is not None:
+                return False
+        elif actual != expected:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    if any(not v for v in projection.values()):
+        return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+    out = {}
+    for key in projection:
+        top, _, rest = key.partition(".")
+        if top not in doc:
+            continue
+        if rest and isinstance(doc[top], list):  # e.g. {"messages.sequence": 1}
+            out[top] = [{rest: item[rest]} for item in doc[top] if isinstance(item, dict) and rest in item]
+        else:
+            out[top] = copy.deepcopy(doc[top])
+    if "_id" in doc and projection.get("_id", 1):
+        out["_id"] = doc["_id"]
+    return out
+
+
+def apply_update(doc, update):
+    for path, value in (update.get("$set") or {}).items():
+        _set(doc, path, copy.deepcopy(value))
+    for path in (update.get("$unset") or {}):
+        _unset(doc, path)
+    for path, value in (update.get("$inc") or {}).items():
+        current = _get(doc, path)
+        _set(doc, path, (0 if current is _MISSING else current) + value)
+    for path, value in (update.get("$max") or {}).items():
+        current = _get(doc, path)
+        _set(doc, path, value if current is _MISSING else max(current, value))
+    for path, value in (update.get("$push") or {}).items():
+        current = _get(doc, path)
+        items = [] if current is _MISSING else current
+        items.extend(copy.deepcopy(value["$each"]) if isinstance(value, dict) and "$each" in value else [copy.deepcopy(value)])
+        _set(doc, path, items)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        self._docs.sort(key=lambda d: _get(d, key), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self._docs if length is None else self._docs[:length])
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self._docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, name="coll"):
+        self.name = name
+        self.docs = []
+        self.calls = []
+        self.fail = {}  # op name -> exception raised on the next call
+        self.gates = {}  # op name -> asyncio.Event awaited before the op runs
+        self.reject = None  # predicate(bulk op) -> True to fail that op with a write error
+
+    async def _enter(self, op):
+        self.calls.append(op)
+        gate = self.gates.get(op)
+        if gate is not None:
+            await gate.wait()
+        error = self.fail.pop(op, None)
+        if error is not None:
+            raise error
+
+    def _find(self, query):
+        return [d for d in self.docs if matches(d, query or {})]
+
+    def find(self, query=None, projection=None):
+        self.calls.append("find")
+        return FakeCursor([_project(d, projection) for d in self._find(query)])
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        await self._enter("find_one")
+        found = self._find(query)
+        for key, direction in reversed(sort or []):
+            found.sort(key=lambda d: _get(d, key), reverse=direction < 0)
+        return _project(found[0], projection) if found else None
+
+    async def count_documents(self, query):
+        await self._enter("count_documents")
+        return len(self._find(query))
+
+    async def distinct(self, field, query=None):
+        values = []
+        for doc in self._find(query):
+            value = _get(doc, field)
+            if value is not _MISSING and value not in values:
+                values.append(value)
+        return values
+
+    async def insert_one(self, doc):
+        await self._enter("insert_one")
+        doc.setdefault("_id", f"oid{next(_ids)}")
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        await self._enter("insert_many")
+        for doc in docs:
+            doc.setdefault("_id", f"oid{next(_ids)}")
+            self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_ids=[d["_id"] for d in docs])
+
+    async def bulk_write(self, ops, ordered=True):
+        await self._enter("bulk_write")
+        modified = 0
+        write_errors = []
+        for index, op in enumerate(ops):
+            if self.reject is not None and self.reject(op):
+                write_errors.append({"index": index, "code": 2, "errmsg": "rejected by test"})
+                if ordered:
+                    break
+                continue
+            if not hasattr(op, "_filter"):  # InsertOne
+                doc = copy.deepcopy(op._doc)
+                doc.setdefault("_id", f"oid{next(_ids)}")
+                self.docs.append(doc)
+                continue
+            found = self._find(op._filter)[:1]
+            if not found and getattr(op, "_upsert", False):
+                doc = {k: v for k, v in op._filter.items() if not isinstance(v, dict)}
+                doc.update(copy.deepcopy(op._doc.get("$setOnInsert") or {}))
+                doc.setdefault("_id", f"oid{next(_ids)}")
+                self.docs.append(doc)
+            for target in found:
+                apply_update(target, op._doc)
+                modified += 1
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "writeConcernErrors": [], "nModified": modified})
+        return SimpleNamespace(modified_count=modified)
+
+    async def delete_many(self, query):
+        await self._enter("delete_many")
+        keep = [d for d in self.docs if not matches(d, query)]
+        deleted, self.docs = len(self.docs) - len(keep), keep
+        return SimpleNamespace(deleted_count=deleted)
+
+    async def update_one(self, query, update, upsert=False):
+        await self._enter("update_one")
+        found = self._find(query)[:1]
+        if not found and upsert:
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            doc.update(copy.deepcopy(update.get("$setOnInsert") or {}))
+            doc.setdefault("_id", f"oid{next(_ids)}")
+            self.docs.append(doc)
+            apply_update(doc, update)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        for doc in found:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found), upserted_id=None)
+
+    async def update_many(self, query, update):
+        await self._enter("update_many")
+        found = self._find(query)
+        for doc in found:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None, upsert=False):
+        await self._enter("find_one_and_update")
+        found = self._find(query)[:1]
+        if not found:
+            return None
+        apply_update(found[0], update)
+        return _project(found[0], projection)
+
+    def list_indexes(self):
+        return FakeCursor([])
+
+    async def create_index(self, *args, **kwargs):
+        return kwargs.get("name")
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection(name)
+        return self[name]
+
+
+class FakeClient(dict):
+    def __missing__(self, name):
+        self[name] = FakeDatabase()
+        return self[name]
+
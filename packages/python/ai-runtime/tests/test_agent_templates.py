@@ -0,0 +1,155 @@
+import sys
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import pytest
+
+from mozaiks_ai.runtime.workflow.agents import templates as templates_mod
+from mozaiks_ai.runtime.workflow.bundle import WorkflowBundle
+from mozaiks_ai.runtime.workflow.execution.hooks import HookSpec, apply_hook_specs
+
+
+def _state_hook(agent, messages):
+    return None
+
+
+def _before_send(sender, message, recipient, silent):
+    return message
+
+
+class _Planner:
+    pass
+
+
+def _bundle(version=0, agents=None, registry=None):
+    agents = agents if agents is not None else [
+        {"name": "Planner", "prompt_sections_custom": [{"heading": "[ROLE]", "content": "You plan."}]},
+        {"name": "Writer", "system_message": "You write.", "max_consecutive_auto_reply": 5},
+    ]
+    return WorkflowBundle(
+        workflow_name="Demo",
+        version=version,
+        config={"agents": agents},
+        structured_models={},
+        structured_registry=registry or {},
+        tool_functions={"Writer": (len,)},
+        context_plan=None,
+        context_section={},
+        build_ms=0.0,
+    )
+
+
+@pytest.fixture
+def env(monkeypatch):
+    state = {"bundle": _bundle()}
+    specs = (
+        HookSpec("update_agent_state", "Planner", _state_hook, "hooks._state_hook"),
+        HookSpec("process_message_before_send", "all", _before_send, "hooks._before_send"),
+    )
+    monkeypatch.setattr(templates_mod, "get_workflow_bundle", lambda name: state["bundle"])
+    monkeypatch.setattr(templates_mod, "_load_hook_specs", lambda name: specs)
+    monkeypatch.setattr(templates_mod, "_STATS", {"builds": 0, "reuses": 0, "agents_stamped": 0})
+    templates_mod.clear_agent_templates()
+    yield state
+    templates_mod.clear_agent_templates()
+
+
+def test_templates_precompute_prompts_tools_and_hooks(env):
+    tpl = templates_mod.get_agent_templates("Demo")
+
+    planner, writer = tpl.agents["Planner"], tpl.agents["Writer"]
+    assert planner.base_system_message == "[ROLE]\nYou plan."
+    assert writer.base_system_message == "You write."
+    assert writer.functions == (len,)
+    assert writer.max_consecutive_auto_reply == 5
+    # update_agent_state hooks are passed at construction, so they are not re-registered afterwards.
+    assert planner.state_hooks == (_state_hook,)
+    assert [spec.hook_type for spec in tpl.hook_specs] == ["process_message_before_send"]
+
+
+def test_templates_are_reused_until_the_bundle_changes(env):
+    first = templates_mod.get_agent_templates("Demo")
+    assert templates_mod.get_agent_templates("demo") is first
+
+    env["bundle"] = _bundle(version=1)
+    second = templates_mod.get_agent_templates("Demo")
+    assert second is not first
+
+    metrics = templates_mod.get_agent_template_metrics()
+    assert metrics["builds"] == 2
+    assert metrics["reuses"] == 1
+    assert metrics["workflows"] == 1
+    assert metrics["agent_templates"] == 2
+    assert metrics["by_workflow"]["demo"]["bundle_version"] == 1
+
+
+def test_auto_tool_mode_requires_a_structured_model(env):
+    env["bundle"] = _bundle(agents=[{"name": "Planner", "auto_tool_mode": True}])
+    with pytest.raises(ValueError):
+        templates_mod.get_agent_templates("Demo")
+
+    env["bundle"] = _bundle(agents=[{"name": "Planner", "auto_tool_mode": True}], registry={"Planner": _Planner})
+    planner = templates_mod.get_agent_templates("Demo").agents["Planner"]
+    assert planner.structured_model_cls is _Planner
+    assert planner.functions == ()
+
+
+def test_hook_specs_apply_to_each_chats_agents():
+    class Agent:
+        def __init__(self):
+            self.hooks = []
+
+        def register_hook(self, hook_type, fn):
+            self.hooks.append((hook_type, fn))
+
+    specs = [
+        HookSpec("process_message_before_send", "all", _before_send, "hooks._before_send"),
+        HookSpec("process_last_received_message", "Missing", _before_send, "hooks._before_send"),
+    ]
+    for _chat in range(2):
+        agents = {"Planner": Agent(), "Writer": Agent()}
+        registered = apply_hook_specs("Demo", specs, agents)
+        assert [(r.agent, r.hook_type) for r in registered] == [
+            ("Planner", "process_message_before_send"),
+            ("Writer", "process_message_before_send"),
+        ]
+        assert all(len(agent.hooks) == 1 for agent in agents.values())
+
+
+def test_a_run_keeps_the_templates_of_its_own_bundle(env):
+    run_bundle = env["bundle"]
+    env["bundle"] = _bundle(version=1, agents=[{"name": "Reviewer", "system_message": "You review."}])
+    current = templates_mod.get_agent_templates("Demo")
+
+    # A run that started before the reload still gets agents from its bundle ...
+    tpl = templates_mod.get_agent_templates("Demo", run_bundle)
+    assert tpl.bundle is run_bundle
+    assert sorted(tpl.agents) == ["Planner", "Writer"]
+    # ... without evicting the newer templates new runs are served from.
+    assert templates_mod.get_agent_templates("Demo") is current
+    assert sorted(current.agents) == ["Reviewer"]
+
+
+@pytest.mark.asyncio
+async def test_create_agents_builds_from_the_bundle_it_is_given(env, monkeypatch):
+    from mozaiks_ai.runtime.workflow.agents import factory
+    from mozaiks_ai.runtime.workflow.validation import llm_config
+
+    async def no_llm(**kwargs):
+        return None, False
+
+    monkeypatch.setattr(llm_config, "get_llm_config", no_llm)
+    run_bundle = _bundle(agents=[{"name": "Planner", "system_message": "You plan."}])
+    env["bundle"] = _bundle(version=1, agents=[{"name": "Reviewer", "system_message": "You review."}])
+
+    agents = await factory.create_agents("Demo", bundle=run_bundle)
+    assert sorted(agents) == ["Planner"]
+    assert sorted(await factory.create_agents("Demo")) == ["Reviewer"]
@@ -0,0 +1,216 @@
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from fake_mongo import FakeClient, FakeCollection
+from mozaiks_ai.runtime.data.persistence import artifact_state
+from mozaiks_ai.runtime.data.persistence.artifact_state import (
+    ArtifactStateStore,
+    _apply_json_patch,
+    patch_to_mongo_update,
+)
+
+
+class _HeadCollection(FakeCollection):
+    """Keeps the update documents, to check what was actually sent."""
+
+    def __init__(self, name="ArtifactStates"):
+        super().__init__(name)
+        self.writes = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.writes.append(update)
+        return await super().update_one(query, update, upsert=upsert)
+
+
+class _Persistence:
+    def __init__(self):
+        self.client = FakeClient()
+        self.head = _HeadCollection()
+        self.ops = self.client["MozaiksAI"]["ArtifactStateOps"]
+
+    async def _ensure_client(self):
+        return None
+
+    def store(self, **settings):
+        async def head_coll():
+            return self.head
+
+        store = ArtifactStateStore(self, head_coll)
+        for name, value in settings.items():
+            setattr(store, name, value)
+        return store
+
+
+KEY = {"app_id": "app1", "artifact_id": "art1", "chat_id": "chat1"}
+
+
+def test_patches_translate_to_targeted_updates():
+    base = {"title": "Plan", "meta": {"owner": "a", "tags": ["x"]}, "items": [{"done": False}, {"done": False}]}
+
+    assert patch_to_mongo_update(base, [
+        {"op": "replace", "path": "/items/1/done", "value": True},
+        {"op": "add", "path": "/meta/reviewer", "value": "b"},
+        {"op": "remove", "path": "/title"},
+    ]) == {"$set": {"state.items.1.done": True, "state.meta.reviewer": "b"}, "$unset": {"state.title": ""}}
+
+    for ops in (
+        [{"op": "replace", "path": "", "value": {}}],  # root replace
+        [{"op": "add", "path": "/items/0", "value": {}}],  # list insert shifts elements
+        [{"op": "remove", "path": "/meta/tags/0"}],  # list removal
+        [{"op": "add", "path": "/missing/child", "value": 1}],  # parent created on the fly
+        [{"op": "add", "path": "/a.b", "value": 1}],  # not addressable in Mongo
+        [{"op": "add", "path": "/meta/x", "value": 1}, {"op": "remove", "path": "/meta"}],  # overlapping paths
+        [{"op": "move", "from": "/title", "path": "/name"}],
+    ):
+        assert patch_to_mongo_update(base, ops) is None, ops
+
+
+@pytest.mark.asyncio
+async def test_random_patch_sequences_match_the_reference_apply():
+    rng = random.Random(3)
+    pers = _Persistence()
+    store = pers.store()
+    expected = {"sections": {f"s{i}": {"body": "x" * 50, "n": i} for i in range(20)}, "items": [{"v": i} for i in range(5)]}
+
+    def random_op():
+        section = f"s{rng.randrange(25)}"
+        return rng.choice([
+            {"op": "replace", "path": f"/sections/{section}/n", "value": rng.randrange(100)},
+            {"op": "add", "path": f"/sections/{section}", "value": {"body": "y", "n": 0}},
+            {"op": "remove", "path": f"/sections/{section}"},
+            {"op": "replace", "path": f"/items/{rng.randrange(6)}/v", "value": rng.randrange(100)},
+            {"op": "add", "path": "/items/-", "value": {"v": -1}},
+        ])
+
+    await store.write_state(**KEY, state=expected)
+    for _ in range(150):
+        ops = [random_op() for _ in range(rng.randint(1, 3))]
+        expected = _apply_json_patch(expected, ops)
+        state, _version = await store.apply_patch(**KEY, patch_ops=ops)
+        assert state == expected
+        assert pers.head.docs[0]["state"] == expected
+
+    metrics = store.get_metrics()
+    assert metrics["targeted_writes"] > metrics["full_writes"] > 0
+    assert pers.head.docs[0]["version"] == 151
+    sets = [w.get("$set", {}) for w in pers.head.writes]
+    assert not any("state" in fields for fields in sets if "state.sections.s1.n" in fields)
+
+
+@pytest.mark.asyncio
+async def test_clients_get_deltas_until_the_log_is_compacted():
+    pers = _Persistence()
+    store = pers.store(compact_every=10, log_retain=5)
+
+    await store.write_state(**KEY, state={"count": 0})  # v1
+    for i in range(1, 10):
+        await store.apply_patch(**KEY, patch_ops=[{"op": "replace", "path": "/count", "value": i}])  # v2..v10
+
+    sync = await store.get_sync(**KEY, since_version=5)
+    assert sync["mode"] == "delta" and sync["version"] == 10
+    assert [d["version"] for d in sync["deltas"]] == list(range(6, 11))
+    assert _apply_json_patch({"count": 4}, [op for d in sync["deltas"] for op in d["patch"]]) == {"count": 9}
+    assert (await store.get_sync(**KEY, since_version=10))["deltas"] == []
+
+    # v10 triggered compaction down to the last 5 versions.
+    assert sorted(d["version"] for d in pers.ops.docs) == [6, 7, 8, 9, 10]
+    snapshot = await store.get_sync(**KEY, since_version=4)
+    assert snapshot["mode"] == "snapshot" and snapshot["state"] == {"count": 9}
+
+    await store.write_state(**KEY, state={"count": 100})  # v11: new snapshot drops the log
+    assert pers.ops.docs == []
+    snapshot = await store.get_sync(**KEY, since_version=9)
+    assert snapshot["mode"] == "snapshot" and snapshot["state"] == {"count": 100}
+    assert (await store.get_sync(**KEY, since_version=11))["mode"] == "delta"
+
+
+@pytest.mark.asyncio
+async def test_stale_cached_head_retries_after_another_writer():
+    pers = _Persistence()
+    first, second = pers.store(), pers.store()  # two processes sharing one database
+
+    await first.write_state(**KEY, state={"a": 1, "b": 1})
+    await second.apply_patch(**KEY, patch_ops=[{"op": "replace", "path": "/b", "value": 2}])
+    state, version = await first.apply_patch(**KEY, patch_ops=[{"op": "replace", "path": "/a", "value": 3}])
+
+    assert state == {"a": 3, "b": 2}
+    assert version == 3
+    assert first.get_metrics()["version_conflicts"] == 1
+    assert pers.head.docs[0]["state"] == {"a": 3, "b": 2}
+
+
+@pytest.mark.asyncio
+async def test_expired_cached_head_is_not_patched(monkeypatch):
+    pers = _Persistence()
+    store = pers.store()
+
+    await store.write_state(**KEY, state={"a": 1, "b": 1}, ttl_seconds=60)
+    state, version = await store.apply_patch(**KEY, patch_ops=[{"op": "replace", "path": "/a", "value": 2}], ttl_seconds=60)
+    assert (state, version) == ({"a": 2, "b": 1}, 2)
+    assert store.get_metrics()["head_cache_hits"] == 1
+
+    class _Clock(type):
+        def __instancecheck__(cls, obj):
+            return isinstance(obj, datetime)
+
+    class _Later(datetime, metaclass=_Clock):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(minutes=5)
+
+    monkeypatch.setattr(artifact_state, "datetime", _Later)
+    state, version = await store.apply_patch(**KEY, patch_ops=[{"op": "add", "path": "/c", "value": 3}], ttl_seconds=60)
+
+    # The head expired while cached: it is rewritten from ``{}`` like an expired Mongo read.
+    assert (state, version) == ({"c": 3}, 3)
+    assert pers.head.docs[0]["state"] == {"c": 3}
+    assert "state" in pers.head.writes[-1]["$set"]
+    assert (await store.get_sync(**KEY))["state"] == {"c": 3}
+
+
+@pytest.mark.asyncio
+async def test_clients_resync_from_a_snapshot_after_the_head_expires(monkeypatch):
+    pers = _Persistence()
+    writer = pers.store()
+
+    await writer.write_state(**KEY, state={"a": 1}, ttl_seconds=60)  # v1
+    await writer.apply_patch(**KEY, patch_ops=[{"op": "replace", "path": "/a", "value": 2}], ttl_seconds=60)  # v2
+    assert (await writer.get_sync(**KEY, since_version=1))["mode"] == "delta"
+
+    class _Clock(type):
+        def __instancecheck__(cls, obj):
+            return isinstance(obj, datetime)
+
+    class _Later(datetime, metaclass=_Clock):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(minutes=5)
+
+    monkeypatch.setattr(artifact_state, "datetime", _Later)
+    # Another process (no cached head) finds the head expired in Mongo.
+    state, version = await pers.store().apply_patch(**KEY, patch_ops=[{"op": "add", "path": "/b", "value": 3}], ttl_seconds=60)
+    assert (state, version) == ({"b": 3}, 3)
+    assert pers.ops.docs == []
+
+    # Clients still holding the dead head must not replay anything onto it.
+    for since in (1, 2):
+        sync = await writer.get_sync(**KEY, since_version=since)
+        assert sync["mode"] == "snapshot" and sync["state"] == {"b": 3}
+
+    await writer.apply_patch(**KEY, patch_ops=[{"op": "add", "path": "/c", "value": 4}], ttl_seconds=60)  # v4
+    sync = await writer.get_sync(**KEY, since_version=3)
+    assert sync["mode"] == "delta" and [d["version"] for d in sync["deltas"]] == [4]
+    assert _apply_json_patch({"b": 3}, sync["deltas"][0]["patch"]) == {"b": 3, "c": 4}
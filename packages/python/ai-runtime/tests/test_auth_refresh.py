@@ -0,0 +1,195 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import algorithms
+
+from mozaiks_ai.runtime.auth import discovery as discovery_module
+from mozaiks_ai.runtime.auth import jwt_validator as jwt_validator_module
+from mozaiks_ai.runtime.auth.config import AuthConfig
+from mozaiks_ai.runtime.auth.discovery import OIDCDiscoveryClient
+from mozaiks_ai.runtime.auth.jwks import JWKSClient
+from mozaiks_ai.runtime.auth.jwt_validator import JWTValidator
+from mozaiks_ai.runtime.auth.refresh import close_http_session
+
+
+class _IdP:
+    """Local stand-in for an OIDC provider: discovery document plus JWKS."""
+
+    def __init__(self):
+        self.keys = [{"kid": "k1", "kty": "RSA"}]
+        self.status = 200
+        self.delay = 0.0
+        self.hits = {"discovery": 0, "keys": 0}
+        self.ports = set()
+        idp = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def do_GET(self):
+                kind = "discovery" if self.path.endswith("openid-configuration") else "keys"
+                idp.hits[kind] += 1
+                idp.ports.add(self.client_address[1])
+                time.sleep(idp.delay)
+                if kind == "discovery":
+                    body = {"issuer": idp.base, "jwks_uri": f"{idp.base}/keys"}
+                else:
+                    body = {"keys": list(idp.keys)}
+                payload = json.dumps(body).encode() if idp.status == 200 else b"unavailable"
+                self.send_response(idp.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.discovery_url = f"{self.base}/.well-known/openid-configuration"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def idp():
+    server = _IdP()
+    yield server
+    server.close()
+
+
+async def _until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting for background refresh"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_cold_start_is_single_flight_over_one_pooled_connection(idp, monkeypatch):
+    monkeypatch.setenv("MOZAIKS_OIDC_DISCOVERY_URL", idp.discovery_url)
+    monkeypatch.setattr(discovery_module, "_discovery_client", None)
+    idp.delay = 0.05
+    client = JWKSClient(jwks_url=None, use_discovery=True)
+
+    found = await asyncio.gather(*(client.get_signing_key("k1") for _ in range(20)))
+    assert all(key == {"kid": "k1", "kty": "RSA"} for key in found)
+    client._refresh.fetched_at -= client._refresh.ttl_seconds + client._refresh.stale_grace_seconds
+    await client.get_signing_key("k1")  # expired: fetched again, on the pooled connection
+    await close_http_session()
+
+    assert idp.hits == {"discovery": 1, "keys": 2}
+    assert len(idp.ports) == 1
+
+
+@pytest.mark.asyncio
+async def test_keys_refresh_ahead_of_expiry_and_are_served_stale_while_the_idp_is_down(idp):
+    client = JWKSClient(jwks_url=f"{idp.base}/keys", cache_ttl=100, stale_grace=50, min_refresh_interval=5)
+    schedule = client._refresh
+
+    await client.get_signing_key("k1")
+    assert idp.hits["keys"] == 1
+
+    schedule.fetched_at -= 85  # inside the refresh-ahead window
+    assert await client.get_signing_key("k1")  # answered from cache, refresh runs behind it
+    await _until(lambda: idp.hits["keys"] == 2 and not schedule.get_metrics()["refreshing"])
+    assert schedule.age() < 1
+
+    idp.status = 503
+    schedule.fetched_at -= 120  # past the TTL, inside the grace period
+    for _ in range(5):
+        assert await client.get_signing_key("k1") == {"kid": "k1", "kty": "RSA"}
+    await _until(lambda: schedule.get_metrics()["failures"] == 1)
+    assert await client.get_signing_key("k1")
+    assert idp.hits["keys"] == 3  # failed refresh is not retried until min interval passes
+
+    schedule.fetched_at -= 40  # past the grace period: fail closed
+    with pytest.raises(RuntimeError):
+        await client.get_signing_key("k1")
+
+    idp.status = 200
+    assert await client.get_signing_key("k1")
+    await close_http_session()
+
+    metrics = schedule.get_metrics()
+    assert metrics["stale_served"] == 6
+    assert metrics["failures"] == 2 and metrics["last_error"] is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refresh_is_rate_limited(idp):
+    client = JWKSClient(jwks_url=f"{idp.base}/keys", cache_ttl=3600, min_refresh_interval=30)
+
+    await client.get_signing_key("k1")
+    idp.keys = [{"kid": "k2", "kty": "RSA"}]
+    for i in range(10):
+        assert await client.get_signing_key(f"bogus-{i}") is None
+    assert idp.hits["keys"] == 1
+
+    client._refresh._last_attempt -= 31
+    assert await client.get_signing_key("k2") == {"kid": "k2", "kty": "RSA"}
+    assert await client.get_signing_key("bogus") is None
+    await close_http_session()
+
+    assert idp.hits["keys"] == 2
+    assert client.get_metrics()["forced_refreshes_skipped"] == 11
+
+
+@pytest.mark.asyncio
+async def test_discovery_is_served_stale_while_the_idp_is_down(idp):
+    client = OIDCDiscoveryClient(discovery_url=idp.discovery_url, cache_ttl=100, stale_grace=50)
+
+    assert await client.get_issuer() == idp.base
+    idp.status = 500
+    client._refresh.fetched_at -= 110
+    assert await client.get_jwks_uri() == f"{idp.base}/keys"
+    await _until(lambda: client.get_metrics()["failures"] == 1)
+    await close_http_session()
+
+    assert idp.hits["discovery"] == 2
+
+
+@pytest.mark.asyncio
+async def test_tokens_validate_through_discovery_while_the_idp_is_down(idp, monkeypatch):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    idp.keys = [{**algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True), "kid": "k1"}]
+    monkeypatch.setenv("MOZAIKS_OIDC_DISCOVERY_URL", idp.discovery_url)
+    monkeypatch.setattr(discovery_module, "_discovery_client", None)
+    client = JWKSClient(jwks_url=None, use_discovery=True, cache_ttl=100, stale_grace=50)
+    monkeypatch.setattr(jwt_validator_module, "get_jwks_client", lambda: client)
+    validator = JWTValidator(AuthConfig(audience="api://test", token_cache_ttl_seconds=0))
+
+    def token(sub):
+        claims = {"sub": sub, "iss": idp.base, "aud": "api://test", "exp": int(time.time()) + 600}
+        return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "k1"})
+
+    assert (await validator.validate_token(token("user-1"))).user_id == "user-1"
+    assert idp.hits == {"discovery": 1, "keys": 1}
+
+    idp.status = 503
+    client._refresh.fetched_at -= 120  # keys past the TTL, inside the grace period
+    assert (await validator.validate_token(token("user-2"))).user_id == "user-2"
+    await _until(lambda: client._refresh.get_metrics()["failures"] == 1)
+    await close_http_session()
+    assert client._refresh.get_metrics()["stale_served"] == 1
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from mozaiks_ai.runtime.transport.chat_router import ChatRouter, MemoryRouteBackend
+from mozaiks_ai.runtime.transport.replay_buffer import ReplayBuffer
+from mozaiks_ai.runtime.transport.simple_transport import SimpleTransport
+
+
+def _worker(backend, worker_id, **kwargs):
+    return ChatRouter(backend, worker_id=worker_id, lease_s=kwargs.pop("lease_s", 5), block_ms=20, **kwargs)
+
+
+async def _ignore(chat_id, frame, hops):
+    return None
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting for routed events"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_events_reach_the_worker_holding_the_socket_in_order():
+    backend = MemoryRouteBackend()
+    producer, owner = _worker(backend, "a"), _worker(backend, "b")
+    received = []
+
+    async def deliver(chat_id, frame, hops):
+        received.append((chat_id, json.loads(frame)["n"], hops))
+
+    await producer.start(_ignore)
+    await owner.start(deliver)
+    await owner.claim("chat1")
+    assert await producer.owner("chat1") == "b"
+    for n in range(300):
+        producer.forward("b", "chat1", json.dumps({"n": n}).encode())
+    await _wait_for(lambda: len(received) == 300)
+    await producer.close()
+    await owner.close()
+
+    assert received == [("chat1", n, 1) for n in range(300)]
+    assert producer.get_metrics()["forwarded"] == 300
+    assert owner.get_metrics()["received"] == 300
+
+
+@pytest.mark.asyncio
+async def test_newest_connection_owns_the_chat_until_its_lease_lapses():
+    backend = MemoryRouteBackend()
+    a, b = _worker(backend, "a"), _worker(backend, "b", lease_s=0.05)
+
+    await a.claim("chat1")
+    await b.claim("chat1")  # client reconnected to b
+    await a.renew(["chat1"])  # a's stale renewal must not steal it back
+    await a.release("chat1")  # nor may a's late cleanup drop b's lease
+    assert await a.owner("chat1", fresh=True) == "b"
+
+    await asyncio.sleep(0.1)  # b died without releasing
+    assert await a.owner("chat1", fresh=True) is None
+    await a.renew(["chat1"])  # vacant leases can be taken over
+    assert await b.owner("chat1", fresh=True) == "a"
+
+    await a.release("chat1")
+    assert await b.owner("chat1") == "a"  # cached for owner_cache_s
+    assert await b.owner("chat1", fresh=True) is None
+    assert b.get_metrics()["owner_cache_hits"] == 1
+
+
+class _FlakyBackend(MemoryRouteBackend):
+    def __init__(self, failing_worker):
+        super().__init__()
+        self.failing_worker = failing_worker
+        self.failures = 0
+
+    def send(self, worker_id, events):
+        if worker_id == self.failing_worker and self.failures == 0:
+            self.failures += 1
+            raise ConnectionError("inbox unreachable")
+        super().send(worker_id, events)
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_are_retried_without_duplicating_delivered_events():
+    backend = _FlakyBackend("c")
+    producer, b, c = _worker(backend, "a"), _worker(backend, "b"), _worker(backend, "c")
+    got = {"b": [], "c": []}
+
+    def collector(name):
+        async def deliver(chat_id, frame, hops):
+            got[name].append(json.loads(frame)["n"])
+        return deliver
+
+    await producer.start(_ignore)
+    await b.start(collector("b"))
+    await c.start(collector("c"))
+    for n in range(20):
+        producer.forward("b" if n % 2 else "c", f"chat{n % 2}", json.dumps({"n": n}).encode())
+    await _wait_for(lambda: len(got["b"]) == 10 and len(got["c"]) == 10)
+    for router in (producer, b, c):
+        await router.close()
+
+    assert got == {"b": list(range(1, 20, 2)), "c": list(range(0, 20, 2))}
+    assert producer.get_metrics()["send_errors"] == 1
+
+
+class _SlowLookupBackend(MemoryRouteBackend):
+    """The first owner lookup is slow, so later producers would overtake it."""
+
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def owner(self, chat_id):
+        self.lookups += 1
+        if self.lookups == 1:
+            time.sleep(0.05)
+        return super().owner(chat_id)
+
+
+async def _transport(backend, worker_id):
+    transport = SimpleTransport()
+    transport._router = _worker(backend, worker_id)
+    transport._replay = ReplayBuffer(origin=worker_id)
+    await transport._router.start(transport._deliver_routed)
+    return transport
+
+
+@pytest.mark.asyncio
+async def test_concurrent_producers_keep_event_order_during_the_owner_lookup():
+    backend = _SlowLookupBackend()
+    owner = _worker(backend, "b")
+    received = []
+
+    async def deliver(chat_id, frame, hops):
+        received.append(json.loads(frame)["data"]["n"])
+
+    await owner.start(deliver)
+    await owner.claim("chat1")
+    producer = await _transport(backend, "a")
+    await asyncio.gather(*(
+        producer._send_to_chat("chat1", {"type": "chat.print", "data": {"n": n}}) for n in range(20)
+    ))
+    await _wait_for(lambda: len(received) == 20)
+    await producer._router.close()
+    await owner.close()
+
+    assert received == list(range(20))
+    assert backend.lookups == 1  # one lookup for the whole burst
+
+
+@pytest.mark.asyncio
+async def test_replies_reach_the_worker_waiting_on_them():
+    backend = MemoryRouteBackend()
+    socket_worker, run_worker = await _transport(backend, "a"), await _transport(backend, "b")
+    answers = []
+
+    async def respond(text):
+        answers.append(text)
+
+    # The workflow runs on b; the client's socket (and REST calls) land on a.
+    run_worker.register_input_request("chat1", "req1", respond)
+    ui_future = asyncio.get_running_loop().create_future()
+    run_worker.pending_ui_tool_responses["evt1"] = ui_future
+    run_worker._router.expect_reply("evt1")
+    await _wait_for(lambda: backend.owner("reply:req1") == "b" and backend.owner("reply:evt1") == "b")
+
+    assert await socket_worker.submit_user_input("req1", "yes please")
+    assert await socket_worker.submit_ui_tool_response("evt1", {"approved": True})
+    assert await asyncio.wait_for(ui_future, 2) == {"approved": True}
+    await _wait_for(lambda: answers == ["yes please"])
+
+    # Settled waits give up their leases; unknown replies are still rejected.
+    await _wait_for(lambda: backend.owner("reply:req1") is None)
+    assert not await socket_worker.submit_ui_tool_response("evt-unknown", {})
+    assert run_worker._router.get_metrics()["pending_replies"] == 1  # evt1 until its waiter returns
+    run_worker._router.reply_settled("evt1")
+    await _wait_for(lambda: backend.owner("reply:evt1") is None)
+    for transport in (socket_worker, run_worker):
+        await transport._router.close()
@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from mozaiks_ai.runtime.workflow.context import derived
+from mozaiks_ai.runtime.workflow.context.derived import (
+    AgentTextTrigger,
+    DerivedContextManager,
+    DerivedVariableSpec,
+    TriggerMatcher,
+)
+
+
+class _Context:
+    def __init__(self, definitions):
+        self._mozaiks_context_definitions = definitions
+        self.data = {}
+
+    def contains(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class _Agent:
+    def __init__(self):
+        self.hooks = []
+
+    def register_hook(self, hook_type, fn):
+        self.hooks.append((hook_type, fn))
+
+
+def _definition(agent, ui_hidden=False, equals=None, contains=None, regex=None):
+    match = SimpleNamespace(equals=equals, contains=contains, regex=regex)
+    trigger = SimpleNamespace(type="agent_text", agent=agent, match=match, ui_hidden=ui_hidden)
+    return SimpleNamespace(source=SimpleNamespace(type="state", default=False, triggers=[trigger]))
+
+
+def _pairs(*triggers):
+    return [(DerivedVariableSpec(name=f"v{i}", default=False, triggers=[t]), t) for i, t in enumerate(triggers)]
+
+
+def test_matcher_returns_every_firing_trigger_in_declaration_order():
+    matcher = TriggerMatcher(_pairs(
+        AgentTextTrigger(agent="A", contains="plan approved"),
+        AgentTextTrigger(agent="A", equals="  DONE "),
+        AgentTextTrigger(agent="A", contains="approved"),  # overlaps the first literal
+        AgentTextTrigger(agent="A", regex=r"ticket #(\d+)", value="$1"),
+        AgentTextTrigger(agent="A", contains="rejected"),
+        AgentTextTrigger(agent="A", contains="Plan Approved"),  # same literal, different variable
+    ))
+
+    fired = matcher.match("  The PLAN APPROVED, see Ticket #42.  ")
+    assert [var.name for var, _, _ in fired] == ["v0", "v2", "v3", "v5"]
+    assert fired[2][2].group(1) == "42"
+
+    assert [var.name for var, _, _ in matcher.match("done")] == ["v1"]
+    assert matcher.match("   ") == []
+
+
+def test_regex_literal_prefilter_never_drops_a_match():
+    matcher = TriggerMatcher(_pairs(
+        AgentTextTrigger(agent="A", regex=r"\border[- ]id[:=]\s*(\d+)", value="$1"),
+        AgentTextTrigger(agent="A", regex=r"status"),
+    ))
+
+    assert matcher.match("nothing to see") == []
+    fired = matcher.match("ORDER-ID: 991 shipped")
+    assert [(var.name, m.group(1)) for var, _, m in fired] == [("v0", "991")]
+    # IGNORECASE folds the long s to "s", which str.lower() does not; non-ASCII text skips the prefilter.
+    assert [var.name for var, _, _ in matcher.match("\u017ftatus")] == ["v1"]
+
+
+def test_regex_triggers_fall_back_to_plain_search_without_the_regex_parser(monkeypatch):
+    monkeypatch.setattr(derived, "_sre_parse", None)
+    matcher = TriggerMatcher(_pairs(AgentTextTrigger(agent="A", regex=r"ticket #(\d+)", value="$1")))
+    assert matcher._regexes[0][3] is None
+    assert [m.group(1) for _, _, m in matcher.match("see Ticket #7")] == ["7"]
+
+    class _ChangedParser:
+        @staticmethod
+        def parse(pattern, flags):
+            raise AttributeError("internal API changed")
+
+    monkeypatch.setattr(derived, "_sre_parse", _ChangedParser)
+    matcher = TriggerMatcher(_pairs(AgentTextTrigger(agent="A", regex=r"ticket #(\d+)", value="$1")))
+    assert matcher._regexes[0][3] is None
+    assert [m.group(1) for _, _, m in matcher.match("see Ticket #8")] == ["8"]
+
+
+def test_pre_send_hook_updates_providers_and_hides_messages():
+    context = _Context({
+        "plan_ready": _definition("Planner", contains="plan is ready"),
+        "ticket_logged": _definition("Planner", ui_hidden=True, regex=r"ticket #\d+"),
+        "writer_done": _definition("Writer", equals="done"),
+    })
+    planner, writer = _Agent(), _Agent()
+    DerivedContextManager("Demo", {"Planner": planner, "Writer": writer}, context)
+
+    assert context.data == {"plan_ready": False, "ticket_logged": False, "writer_done": False}
+    assert [hook_type for hook_type, _ in planner.hooks] == ["process_message_before_send"]
+    hook = planner.hooks[0][1]
+
+    message = {"content": "The plan is ready, tracked as Ticket #7", "role": "assistant"}
+    result = hook(sender=None, message=message, recipient=None, silent=False)
+
+    assert context.data == {"plan_ready": True, "ticket_logged": True, "writer_done": False}
+    assert result == {**message, "_mozaiks_hide": True}
+    assert hook(message="nothing relevant") == "nothing relevant"
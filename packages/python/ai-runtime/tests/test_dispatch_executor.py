@@ -0,0 +1,234 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from mozaiks_ai.runtime.events.auto_tool_handler import AutoToolEventHandler
+from mozaiks_ai.runtime.events.dispatch_executor import DispatchExecutor, awaits_input
+from mozaiks_ai.runtime.events.unified_event_dispatcher import UnifiedEventDispatcher
+from mozaiks_ai.runtime.workflow.pack.workflow_pack_coordinator import WorkflowPackCoordinator
+
+
+@pytest.mark.asyncio
+async def test_events_for_one_chat_run_in_emit_order():
+    executor = DispatchExecutor(concurrency=8, queue_max=100)
+    seen = []
+
+    async def slow_first(payload):
+        # Earlier events sleep longer; lane ordering must still hold.
+        await asyncio.sleep(0.01 * (5 - payload["i"]))
+        seen.append((payload["chat_id"], payload["i"]))
+
+    for i in range(5):
+        for chat_id in ("a", "b"):
+            executor.submit("chat.usage_delta", {"chat_id": chat_id, "i": i}, [slow_first])
+    assert await executor.drain(timeout=2)
+    metrics = executor.get_metrics()
+
+    assert [i for chat, i in seen if chat == "a"] == [0, 1, 2, 3, 4]
+    assert [i for chat, i in seen if chat == "b"] == [0, 1, 2, 3, 4]
+    assert metrics["handlers_completed"] == 10
+    assert metrics["queue_depth"] == 0
+    assert metrics["active_lanes"] == 0
+    assert metrics["handler_latency_ms"]["chat.usage_delta"]["count"] == 10
+
+
+@pytest.mark.asyncio
+async def test_event_types_of_one_chat_do_not_wait_for_each_other():
+    executor = DispatchExecutor(concurrency=8)
+    release = asyncio.Event()
+    finished = []
+
+    async def blocked(payload):
+        await release.wait()
+        finished.append("run_complete")
+
+    async def quick(payload):
+        finished.append("usage_delta")
+
+    executor.submit("chat.run_complete", {"chat_id": "c1"}, [blocked])
+    executor.submit("chat.usage_delta", {"chat_id": "c1"}, [quick])
+    await asyncio.sleep(0.01)
+    assert finished == ["usage_delta"]
+
+    release.set()
+    assert await executor.drain(timeout=1)
+    assert finished == ["usage_delta", "run_complete"]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_per_event_type():
+    executor = DispatchExecutor(concurrency=8, concurrency_overrides={"chat.structured_output_ready": 2})
+    running = {"chat.structured_output_ready": 0, "chat.run_complete": 0}
+    peak = dict(running)
+
+    def make_listener(event_type):
+        async def listener(payload):
+            running[event_type] += 1
+            peak[event_type] = max(peak[event_type], running[event_type])
+            await asyncio.sleep(0.01)
+            running[event_type] -= 1
+        return listener
+
+    for i in range(10):
+        for event_type in running:
+            executor.submit(event_type, {"chat_id": f"{event_type}-{i}"}, [make_listener(event_type)])
+    assert await executor.drain(timeout=2)
+
+    assert peak["chat.structured_output_ready"] == 2
+    assert peak["chat.run_complete"] > 2
+
+
+@pytest.mark.asyncio
+async def test_sync_listeners_run_inline():
+    executor = DispatchExecutor(queue_max=1)
+    calls = []
+
+    executor.submit("chat.usage_summary", {"chat_id": "c1"}, [lambda payload: calls.append(payload["chat_id"])])
+
+    assert calls == ["c1"]  # before the loop gets a chance to run anything
+    assert executor.get_metrics()["jobs_submitted"] == 0
+    assert executor.get_metrics()["handlers_completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_backlog_is_bounded_and_failures_are_isolated():
+    executor = DispatchExecutor(concurrency=1, queue_max=3)
+    calls = []
+
+    def sync_listener(payload):
+        calls.append(payload["i"])
+
+    async def failing_listener(payload):
+        raise RuntimeError("boom")
+
+    accepted = [
+        executor.submit("chat.usage_summary", {"i": i}, [sync_listener, failing_listener]) for i in range(5)
+    ]
+    assert await executor.drain(timeout=1)
+    metrics = executor.get_metrics()
+
+    assert accepted == [True, True, True, False, False]
+    assert calls == [0, 1, 2, 3, 4]  # the backlog only bounds async work
+    assert metrics["jobs_dropped"] == 2
+    assert metrics["handlers_failed"] == 3
+    assert metrics["max_queue_depth"] == 3
+
+
+@pytest.mark.asyncio
+async def test_listeners_awaiting_input_hold_no_slot_or_lane():
+    executor = DispatchExecutor(concurrency=1)
+    answered = asyncio.Event()
+    done = []
+
+    @awaits_input
+    async def ui_tool(payload):
+        await answered.wait()
+        done.append(("ui_tool", payload["chat_id"]))
+
+    async def other(payload):
+        done.append(("other", payload["chat_id"]))
+
+    executor.submit("chat.structured_output_ready", {"chat_id": "c1"}, [ui_tool])
+    executor.submit("chat.structured_output_ready", {"chat_id": "c1"}, [other])
+    executor.submit("chat.structured_output_ready", {"chat_id": "c2"}, [other])
+    assert await executor.drain(timeout=1)  # does not wait for the user
+    assert sorted(done) == [("other", "c1"), ("other", "c2")]
+    assert executor.get_metrics()["awaiting_input"] == 1
+
+    answered.set()
+    await asyncio.sleep(0.01)
+    assert done[-1] == ("ui_tool", "c1")
+    assert executor.get_metrics()["awaiting_input"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_then_rejects_new_events():
+    executor = DispatchExecutor()
+    done = []
+    never = asyncio.Event()
+
+    async def listener(payload):
+        await asyncio.sleep(0.02)
+        done.append(payload["chat_id"])
+
+    @awaits_input
+    async def waiting(payload):
+        await never.wait()
+
+    executor.submit("chat.run_complete", {"chat_id": "c1"}, [listener])
+    executor.submit("chat.structured_output_ready", {"chat_id": "c1"}, [waiting])
+    drained = await executor.shutdown(timeout=1)
+    accepted_after = executor.submit("chat.run_complete", {"chat_id": "c2"}, [listener])
+
+    assert drained is True
+    assert done == ["c1"]
+    assert accepted_after is False
+    assert executor.get_metrics()["unordered_tasks"] == 0  # the input wait was cancelled
+
+
+class _PlanModel(BaseModel):
+    title: str
+
+
+@pytest.mark.asyncio
+async def test_pending_auto_tool_does_not_block_the_dispatcher(monkeypatch):
+    answered = asyncio.Event()
+    calls = []
+
+    async def ui_tool(**kwargs):
+        await answered.wait()  # the user has not answered yet
+        calls.append("answered")
+
+    binding = SimpleNamespace(
+        tool_name="plan_ui", model_name="PlanModel", agent_name="Planner", model_cls=_PlanModel, function=ui_tool
+    )
+
+    async def resolve_binding(self, workflow_name, model_name, agent_name):
+        return binding
+
+    async def noop(self, *args, **kwargs):
+        return None
+
+    monkeypatch.setattr(AutoToolEventHandler, "_resolve_binding", resolve_binding)
+    monkeypatch.setattr(AutoToolEventHandler, "_build_tool_kwargs", lambda self, *args: {})
+    monkeypatch.setattr(AutoToolEventHandler, "_emit_tool_call", noop)
+    monkeypatch.setattr(AutoToolEventHandler, "_emit_tool_result", noop)
+    monkeypatch.setattr(WorkflowPackCoordinator, "handle_structured_output_ready", noop)
+    dispatcher = UnifiedEventDispatcher()
+    dispatcher.executor.concurrency_overrides = {"chat.structured_output_ready": 1}
+    usage = []
+    dispatcher.register_handler("chat.usage_delta", lambda payload: usage.append(payload["chat_id"]))
+
+    for i in range(3):
+        await dispatcher.emit("chat.structured_output_ready", {
+            "chat_id": f"c{i}",
+            "agent_name": "Planner",
+            "model_name": "PlanModel",
+            "structured_data": {"title": "Plan"},
+            "auto_tool_mode": True,
+            "context": {"workflow_name": "wf", "chat_id": f"c{i}"},
+            "turn_idempotency_key": "t1",
+        })
+    await dispatcher.emit("chat.usage_delta", {"chat_id": "c0"})
+
+    assert usage == ["c0"]
+    assert await dispatcher.drain(timeout=1)  # three chats waiting on the user block nothing
+    assert dispatcher.executor.get_metrics()["awaiting_input"] == 3
+
+    answered.set()
+    await asyncio.sleep(0.05)
+    assert calls == ["answered"] * 3
+    assert dispatcher.executor.get_metrics()["awaiting_input"] == 0
@@ -0,0 +1,173 @@
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import algorithms
+
+from mozaiks_ai.runtime.auth import jwt_validator as jwt_validator_module
+from mozaiks_ai.runtime.auth.config import AuthConfig
+from mozaiks_ai.runtime.auth.jwks import JWKSClient
+from mozaiks_ai.runtime.auth.jwt_validator import AuthError, JWTValidator
+
+ISSUER = "https://issuer.test"
+AUDIENCE = "api://test"
+
+
+def _keypair(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = {**algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True), "kid": kid}
+    return private_key, jwk
+
+
+class _StaticJWKS(JWKSClient):
+    """JWKS client serving an in-memory key set through the real indexing path."""
+
+    def __init__(self, *jwks):
+        super().__init__(jwks_url="https://issuer.test/keys", cache_ttl=3600, min_refresh_interval=0)
+        self.jwks = list(jwks)
+        self.parses = 0
+
+    async def _fetch_keys(self):
+        self._store_keys({"keys": list(self.jwks)}, "https://issuer.test/keys")
+
+    async def get_public_key(self, kid):
+        known = kid in self._public_keys
+        key = await super().get_public_key(kid)
+        self.parses += key is not None and not known
+        return key
+
+
+def _token(private_key, kid, **claims):
+    payload = {"sub": "user-1", "iss": ISSUER, "aud": AUDIENCE, "exp": int(time.time()) + 600, "scp": "access_as_user"}
+    payload.update(claims)
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def validator_factory(monkeypatch):
+    def build(jwks, **settings):
+        monkeypatch.setattr(jwt_validator_module, "get_jwks_client", lambda: jwks)
+        config = AuthConfig(issuer_override=ISSUER, audience=AUDIENCE, required_scope="access_as_user")
+        return JWTValidator(replace(config, **settings))
+
+    return build
+
+
+@pytest.mark.asyncio
+async def test_repeat_tokens_skip_verification_and_reuse_parsed_keys(validator_factory, monkeypatch):
+    private_key, jwk = _keypair("k1")
+    jwks = _StaticJWKS(jwk)
+    validator = validator_factory(jwks)
+    tokens = [_token(private_key, "k1", sub=f"user-{i}") for i in range(3)]
+
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt_validator_module.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    first = [await validator.validate_token(t) for t in tokens]
+    again = [await validator.validate_token(f" {t} ") for t in tokens]
+    assert [c.user_id for c in first] == ["user-0", "user-1", "user-2"]
+    assert all(a is b for a, b in zip(first, again))
+    assert len(decodes) == 3
+    assert jwks.parses == 1
+    metrics = validator.get_metrics()
+    assert metrics["token_cache_hits"] == 3 and metrics["token_cache_misses"] == 3
+
+    # Scope is checked per call, even on a cache hit.
+    unscoped = _token(private_key, "k1", scp="other")
+    assert (await validator.validate_token(unscoped, require_scope=False)).scopes == ["other"]
+    with pytest.raises(AuthError) as excinfo:
+        await validator.validate_token(unscoped)
+    assert excinfo.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_cached_tokens_expire_with_the_token_and_are_bounded(validator_factory):
+    private_key, jwk = _keypair("k1")
+    validator = validator_factory(_StaticJWKS(jwk), token_cache_size=2, clock_skew_seconds=0)
+
+    short = _token(private_key, "k1", exp=int(time.time()) + 5)
+    await validator.validate_token(short)
+    digest, (claims, expires_at, version) = next(iter(validator._token_cache.items()))
+    assert expires_at == claims.raw_claims["exp"]  # token exp is sooner than the 60s TTL
+
+    validator._token_cache[digest] = (claims, time.time() - 1, version)  # lapsed
+    revalidated = await validator.validate_token(short)
+    assert revalidated is not claims
+    assert validator.get_metrics()["token_cache_hits"] == 0
+
+    for i in range(4):
+        await validator.validate_token(_token(private_key, "k1", sub=f"user-{i}"))
+    assert len(validator._token_cache) == 2
+
+    disabled = validator_factory(_StaticJWKS(jwk), token_cache_ttl_seconds=0)
+    await disabled.validate_token(_token(private_key, "k1"))
+    assert not disabled._token_cache and disabled.get_metrics()["token_cache_misses"] == 0
+
+
+@pytest.mark.asyncio
+async def test_key_rotation_invalidates_parsed_keys_and_cached_tokens(validator_factory):
+    old_private, old_jwk = _keypair("k1")
+    new_private, new_jwk = _keypair("k2")
+    jwks = _StaticJWKS(old_jwk)
+    validator = validator_factory(jwks)
+    old_token = _token(old_private, "k1")
+
+    await validator.validate_token(old_token)
+    version = jwks.keys_version
+
+    jwks.jwks = [new_jwk]  # k1 retired
+    await validator.validate_token(_token(new_private, "k2"))  # unknown kid forces a refresh
+    assert jwks.keys_version == version + 1
+    assert "k1" not in jwks._public_keys
+
+    with pytest.raises(AuthError, match="Invalid signing key"):
+        await validator.validate_token(old_token)
+
+    await jwks._fetch_keys()  # same key set again: nothing is re-parsed
+    assert jwks.keys_version == version + 1 and "k2" in jwks._public_keys
+    assert jwks.parses == 2
+
+
+def test_http_dependency_serves_repeat_requests_from_the_cache(validator_factory, monkeypatch):
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+
+    from mozaiks_ai.runtime.auth import dependencies
+
+    private_key, jwk = _keypair("k1")
+    jwks = _StaticJWKS(jwk)
+    validator = validator_factory(jwks)
+    monkeypatch.setattr(dependencies, "get_jwt_validator", lambda: validator)
+    monkeypatch.setattr(dependencies, "get_auth_config", lambda: AuthConfig(issuer_override=ISSUER, audience=AUDIENCE))
+
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user=Depends(dependencies.require_user)):
+        return {"user_id": user.user_id}
+
+    token = _token(private_key, "k1", sub="user-42")
+    with TestClient(app) as client:
+        responses = [client.get("/me", headers={"Authorization": f"Bearer {token}"}) for _ in range(3)]
+        query = client.get("/me", params={"access_token": token})
+        denied = client.get("/me", headers={"Authorization": f"Bearer {_token(private_key, 'k1', scp='other')}"})
+
+    assert [r.json() for r in responses + [query]] == [{"user_id": "user-42"}] * 4
+    assert denied.status_code == 403
+    metrics = validator.get_metrics()
+    assert metrics["token_cache_misses"] == 2 and metrics["token_cache_hits"] == 3
+    assert jwks.parses == 1
@@ -0,0 +1,218 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import pytest
+
+from fake_mongo import FakeClient, FakeCollection
+from mozaiks_ai.runtime.data.persistence.message_store import (
+    MESSAGE_STORAGE_COLLECTION,
+    MESSAGE_STORAGE_EMBEDDED,
+    ChatMessageStore,
+    resolve_message_storage_mode,
+    session_uses_collection,
+)
+from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager
+
+
+def test_build_rows_keeps_ordered_sequences():
+    messages = [
+        {"role": "user", "content": "a", "sequence": 1},
+        {"role": "assistant", "content": "b", "sequence": 2},
+    ]
+    rows, renumbered = ChatMessageStore._build_rows("chat_1", "app_1", messages)
+    assert renumbered is False
+    assert [r["sequence"] for r in rows] == [1, 2]
+    assert all(r["chat_id"] == "chat_1" and r["app_id"] == "app_1" for r in rows)
+    assert "legacy_sequence" not in rows[0]
+
+
+def test_build_rows_renumbers_unsequenced_transcripts():
+    messages = [
+        {"role": "user", "content": "a", "sequence": 1},
+        {"role": "system", "content": "snapshot"},
+        {"role": "assistant", "content": "b", "sequence": 2},
+        "not-a-message",
+    ]
+    rows, renumbered = ChatMessageStore._build_rows("chat_2", "app_1", messages)
+    assert renumbered is True
+    assert [r["sequence"] for r in rows] == [1, 2, 3]
+    assert rows[2]["legacy_sequence"] == 2
+    assert "legacy_sequence" not in rows[1]
+
+
+def test_resolve_message_storage_mode(monkeypatch):
+    monkeypatch.setenv("CHAT_MESSAGE_STORAGE", "Collection")
+    assert resolve_message_storage_mode() == MESSAGE_STORAGE_COLLECTION
+    monkeypatch.setenv("CHAT_MESSAGE_STORAGE", "bogus")
+    assert resolve_message_storage_mode() == MESSAGE_STORAGE_EMBEDDED
+    monkeypatch.delenv("CHAT_MESSAGE_STORAGE")
+    assert resolve_message_storage_mode() == MESSAGE_STORAGE_EMBEDDED
+
+
+def test_session_uses_collection():
+    assert session_uses_collection({"message_storage": "collection"})
+    assert not session_uses_collection({"messages": []})
+    assert not session_uses_collection(None)
+
+
+def _store():
+    persistence = type("Persistence", (), {})()
+    persistence.client = FakeClient()
+
+    async def _ensure_client():
+        return None
+
+    persistence._ensure_client = _ensure_client
+    return ChatMessageStore(persistence), persistence.client["MozaiksAI"]["ChatMessages"]
+
+
+def _embedded_session(chat_id="chat_1", count=3):
+    messages = [{"role": "user", "content": f"m{i}", "sequence": i} for i in range(1, count + 1)]
+    return {"_id": chat_id, "app_id": "app_1", "messages": messages, "last_sequence": count}
+
+
+@pytest.mark.asyncio
+async def test_migrate_session_moves_transcript_and_fetch_reads_ranges():
+    store, rows = _store()
+    sessions = FakeCollection("ChatSessions")
+    sessions.docs.append(_embedded_session(count=5))
+
+    assert await store.migrate_session(sessions, chat_id="chat_1", app_id="app_1") is True
+
+    session = sessions.docs[0]
+    assert session["message_storage"] == MESSAGE_STORAGE_COLLECTION
+    assert "messages" not in session
+    assert len(rows.docs) == 5
+    after = await store.fetch(chat_id="chat_1", app_id="app_1", after_sequence=3)
+    assert [m["sequence"] for m in after] == [4, 5]
+    assert "chat_id" not in after[0] and "_id" not in after[0]
+    tail = await store.fetch_tail(chat_id="chat_1", app_id="app_1", limit=2)
+    assert [m["content"] for m in tail] == ["m4", "m5"]
+
+    # Already migrated: nothing is copied again
+    assert await store.migrate_session(sessions, chat_id="chat_1", app_id="app_1") is True
+    assert rows.calls.count("insert_many") == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_migrations_share_one_lock_until_the_last_waiter_leaves():
+    store, rows = _store()
+    sessions = FakeCollection("ChatSessions")
+    sessions.docs.append(_embedded_session())
+    release = asyncio.Event()
+    sessions.gates["find_one"] = release
+
+    first = asyncio.create_task(store.migrate_session(sessions, chat_id="chat_1", app_id="app_1"))
+    second = asyncio.create_task(store.migrate_session(sessions, chat_id="chat_1", app_id="app_1"))
+    await asyncio.sleep(0)
+    assert store._migration_locks["chat_1"][1] == 2
+
+    del sessions.gates["find_one"]
+    release.set()
+    await first
+    # The first migration finished while the second still waits: a third caller
+    # must queue on the same lock rather than start a parallel migration.
+    third = asyncio.create_task(store.migrate_session(sessions, chat_id="chat_1", app_id="app_1"))
+    assert await asyncio.gather(second, third) == [True, True]
+
+    assert rows.calls.count("insert_many") == 1
+    assert rows.calls.count("delete_many") == 1
+    assert store._migration_locks == {}
+
+
+@pytest.mark.asyncio
+async def test_migration_retries_when_an_embedded_writer_moves_the_transcript():
+    store, rows = _store()
+    sessions = FakeCollection("ChatSessions")
+    sessions.docs.append(_embedded_session(count=2))
+    copying = asyncio.Event()
+    rows.gates["insert_many"] = copying
+
+    migration = asyncio.create_task(store.migrate_session(sessions, chat_id="chat_1", app_id="app_1"))
+    await asyncio.sleep(0)
+    session = sessions.docs[0]
+    session["messages"].append({"role": "assistant", "content": "late", "sequence": 3})
+    session["last_sequence"] = 3
+    del rows.gates["insert_many"]
+    copying.set()
+
+    assert await migration is True
+    assert [m["sequence"] for m in await store.fetch(chat_id="chat_1", app_id="app_1")] == [1, 2, 3]
+    assert rows.calls.count("delete_many") == 2
+
+
+@pytest.mark.asyncio
+async def test_migration_does_not_lose_a_push_that_lands_while_copying():
+    store, rows = _store()
+    sessions = FakeCollection("ChatSessions")
+    session = _embedded_session(count=2)
+    session["last_sequence"] = 3  # sequence 3 is reserved, its $push has not landed yet
+    sessions.docs.append(session)
+    copying = asyncio.Event()
+    rows.gates["insert_many"] = copying
+
+    migration = asyncio.create_task(store.migrate_session(sessions, chat_id="chat_1", app_id="app_1"))
+    await asyncio.sleep(0)
+    session["messages"].append({"role": "assistant", "content": "late", "sequence": 3})
+    del rows.gates["insert_many"]
+    copying.set()
+
+    assert await migration is True
+    assert [m["content"] for m in await store.fetch(chat_id="chat_1", app_id="app_1")] == ["m1", "m2", "late"]
+
+
+@pytest.mark.asyncio
+async def test_legacy_sessions_without_last_sequence_migrate():
+    store, rows = _store()
+    sessions = FakeCollection("ChatSessions")
+    legacy = _embedded_session(count=2)
+    del legacy["last_sequence"]
+    sessions.docs.extend([legacy, {"_id": "chat_2", "app_id": "app_1"}])
+
+    assert await store.migrate_embedded_sessions(sessions) == 2
+    assert all(session_uses_collection(doc) for doc in sessions.docs)
+    assert [m["sequence"] for m in await store.fetch(chat_id="chat_1", app_id="app_1")] == [1, 2]
+    assert await store.fetch(chat_id="chat_2", app_id="app_1") == []
+
+
+@pytest.mark.asyncio
+async def test_appending_in_collection_mode_switches_an_embedded_session(monkeypatch):
+    monkeypatch.setenv("CHAT_MESSAGE_STORAGE", "collection")
+    manager = AG2PersistenceManager()
+    manager.persistence.client = FakeClient()
+    sessions = manager.persistence.client["MozaiksAI"]["ChatSessions"]
+    sessions.docs.append(_embedded_session(count=2))
+
+    seq = await manager.append_chat_message(
+        chat_id="chat_1", app_id="app_1", message={"role": "user", "content": "new"}
+    )
+
+    assert seq == 3
+    session = await sessions.find_one({"_id": "chat_1"})
+    assert session_uses_collection(session)
+    transcript = await manager._load_messages(session, chat_id="chat_1", app_id="app_1")
+    assert [m["content"] for m in transcript] == ["m1", "m2", "new"]
+    assert await manager._load_messages(session, chat_id="chat_1", app_id="app_1", after_sequence=2) == [
+        transcript[-1]
+    ]
+
+    # A process still writing embedded follows the session's own layout field.
+    monkeypatch.setenv("CHAT_MESSAGE_STORAGE", "embedded")
+    embedded_manager = AG2PersistenceManager()
+    embedded_manager.persistence.client = manager.persistence.client
+    assert await embedded_manager.append_chat_message(
+        chat_id="chat_1", app_id="app_1", message={"role": "assistant", "content": "reply"}
+    ) == 4
+    rows = manager.persistence.client["MozaiksAI"]["ChatMessages"]
+    assert [r["sequence"] for r in rows.docs] == [1, 2, 3, 4]
+    assert "messages" not in (await sessions.find_one({"_id": "chat_1"}))
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import pytest
+
+from mozaiks_ai.runtime.transport.outbound_queue import (
+    POLICY_BLOCK,
+    POLICY_COALESCE,
+    POLICY_DROP_OLDEST,
+    OutboundQueue,
+)
+from mozaiks_ai.runtime.transport.simple_transport import SimpleTransport
+
+
+class _GatedSocket:
+    """Records sends; each send waits until the test opens the gate."""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+
+    async def send(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+
+def _print(content, agent="Writer"):
+    return {"type": "chat.print", "data": {"content": content, "agent": agent}}
+
+
+def _delta(path, seq, artifact_id="art"):
+    return {
+        "type": "agui.state.StateDelta",
+        "seq": seq,
+        "data": {"artifact_id": artifact_id, "patch": [{"op": "add", "path": path, "value": 1}]},
+    }
+
+
+def _snapshot(state, seq, artifact_id="art"):
+    return {"type": "agui.state.StateSnapshot", "seq": seq, "data": {"artifact_id": artifact_id, "state": state}}
+
+
+async def _coalesced(*messages):
+    """Queue ``messages`` behind a blocked head and return what the socket receives after it."""
+    sock = _GatedSocket()
+    queue = OutboundQueue("c1", sock.send, max_size=20, policy=POLICY_COALESCE)
+    queue.start()
+    await queue.put({"type": "chat.text", "seq": 0, "data": {"content": "head"}})
+    await asyncio.sleep(0)  # writer picks up the head and blocks on the gate
+    for message in messages:
+        await queue.put(message)
+    sock.gate.set()
+    await queue.drain(timeout=1)
+    await queue.close()
+    return sock.sent[1:], queue.get_metrics()
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_producer_off_the_socket():
+    sock = _GatedSocket()
+    queue = OutboundQueue("c1", sock.send, max_size=3, policy=POLICY_DROP_OLDEST)
+    queue.start()
+    for i in range(6):
+        await queue.put({"type": "chat.text", "data": {"i": i}})
+    before = queue.get_metrics()
+    sock.gate.set()
+    await queue.drain(timeout=1)
+    await queue.close()
+
+    assert before["dropped"] >= 2
+    assert before["depth"] <= 3
+    # Newest messages survive, in order
+    assert [m["data"]["i"] for m in sock.sent][-3:] == [3, 4, 5]
+    assert queue.get_metrics()["sent"] == len(sock.sent)
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_stream_chunks_and_state_deltas():
+    sent, metrics = await _coalesced(
+        _print("a"), _print("b"), _print("c"), _delta("/x", 4), _delta("/y", 5)
+    )
+    assert sent[0]["data"]["content"] == "abc"
+    assert [op["path"] for op in sent[1]["data"]["patch"]] == ["/x", "/y"]
+    assert metrics["coalesced"] == 3
+
+
+@pytest.mark.asyncio
+async def test_merged_delta_moves_to_the_tail_so_seqs_stay_ordered():
+    sent, _ = await _coalesced(_delta("/x", 1), {"type": "chat.text", "seq": 2, "data": {}}, _delta("/y", 3))
+    assert [m["seq"] for m in sent] == [2, 3]
+    assert [op["path"] for op in sent[1]["data"]["patch"]] == ["/x", "/y"]
+
+
+@pytest.mark.asyncio
+async def test_delta_never_merges_across_a_snapshot_of_the_same_artifact():
+    sent, metrics = await _coalesced(_delta("/x", 1), _snapshot({"x": 1}, 2), _delta("/y", 3), _delta("/z", 4, "other"))
+    assert [(m["type"], m["seq"]) for m in sent] == [
+        ("agui.state.StateSnapshot", 2),
+        ("agui.state.StateDelta", 3),
+        ("agui.state.StateDelta", 4),
+    ]
+    assert "patch" not in sent[0]["data"] and len(sent[1]["data"]["patch"]) == 1
+    assert metrics["coalesced"] == 1  # only the delta the snapshot superseded
+
+
+@pytest.mark.asyncio
+async def test_snapshot_supersedes_queued_updates_and_lands_after_later_events():
+    sent, metrics = await _coalesced(
+        _snapshot({"v": 1}, 1),
+        _delta("/a", 2),
+        {"type": "chat.text", "seq": 3, "data": {}},
+        _delta("/b", 4, "other"),
+        _snapshot({"v": 2}, 5),
+    )
+    assert [m["seq"] for m in sent] == [3, 4, 5]
+    assert sent[-1]["data"]["state"] == {"v": 2}
+    assert metrics["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_space_not_for_send():
+    sock = _GatedSocket()
+    queue = OutboundQueue("c1", sock.send, max_size=2, policy=POLICY_BLOCK)
+    queue.start()
+    await queue.put({"type": "chat.text", "data": {"i": 0}})
+    await queue.put({"type": "chat.text", "data": {"i": 1}})
+    blocked = asyncio.create_task(queue.put({"type": "chat.text", "data": {"i": 2}}))
+    await asyncio.sleep(0.01)
+    was_blocked = not blocked.done()
+    sock.gate.set()
+    await blocked
+    await queue.drain(timeout=1)
+    await queue.close()
+
+    assert was_blocked
+    assert [m["data"]["i"] for m in sock.sent] == [0, 1, 2]
+    metrics = queue.get_metrics()
+    assert metrics["dropped"] == 0 and metrics["blocked_puts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batching_packs_messages_within_window():
+    single, batches = [], []
+
+    async def send(message):
+        single.append(message)
+
+    async def send_batch(messages):
+        batches.append(messages)
+
+    queue = OutboundQueue("c1", send, max_size=50, batch_max=4, batch_window_ms=20, send_batch=send_batch)
+    queue.start()
+    for i in range(6):
+        await queue.put({"type": "chat.text", "seq": i + 1})
+    await queue.drain(timeout=1)
+    await queue.put({"type": "chat.text", "seq": 7})
+    await queue.drain(timeout=1)
+    await queue.close()
+
+    assert [[m["seq"] for m in batch] for batch in batches] == [[1, 2, 3, 4], [5, 6]]
+    assert [m["seq"] for m in single] == [7]
+    metrics = queue.get_metrics()
+    assert metrics["sent"] == 7 and metrics["frames"] == 3 and metrics["batches"] == 2
+
+
+class _Socket:
+    def __init__(self):
+        self.frames = []
+        self.gate = asyncio.Event()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.frames.append(json.loads(text))
+
+    async def send_json(self, message):  # must never be used while the writer owns the socket
+        raise AssertionError("direct send_json bypassed the writer queue")
+
+
+@pytest.mark.asyncio
+async def test_transport_replies_queue_behind_events_on_the_same_socket():
+    transport = SimpleTransport()
+    socket = _Socket()
+    transport.connections["chat_1"] = {"websocket": socket, "app_id": "app_1"}
+    await transport._open_outbound_queue("chat_1", socket)
+
+    await transport._queue_message_with_backpressure("chat_1", {"type": "chat.text", "data": {"content": "event"}})
+    await transport._send_reply("chat_1", socket, {"type": "chat.input_ack", "data": {"status": "accepted"}})
+    socket.gate.set()
+    await transport._flush_message_queue("chat_1", timeout=1)
+    await transport._message_queues.pop("chat_1").close()
+
+    assert [f["type"] for f in socket.frames] == ["chat.text", "chat.input_ack"]
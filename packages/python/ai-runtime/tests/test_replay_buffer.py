@@ -0,0 +1,263 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from mozaiks_ai.runtime.transport.frames import WireFrame
+from mozaiks_ai.runtime.transport.replay_buffer import ReplayBuffer
+from mozaiks_ai.runtime.transport.resume_groupchat import GroupChatResumer
+from mozaiks_ai.runtime.transport.simple_transport import SimpleTransport
+
+
+def _record(buffer, chat_id, count):
+    sent = []
+    for i in range(count):
+        envelope = {"type": "chat.print", "data": {"content": f"chunk {i}"}}
+        stamped = buffer.record(chat_id, WireFrame(envelope))
+        assert "seq" not in envelope  # the caller's envelope is left alone
+        sent.append(stamped)
+    return sent
+
+
+def test_reconnect_gets_exactly_the_frames_it_missed():
+    buffer = ReplayBuffer(size=16, ttl_s=60)
+    sent = _record(buffer, "chat1", 10)
+    _record(buffer, "chat2", 3)
+    epoch = buffer.epoch("chat1")
+
+    assert [frame.envelope["seq"] for frame in sent] == list(range(1, 11))
+    assert {frame.envelope["seq_epoch"] for frame in sent} == {epoch}
+    assert buffer.epoch("chat2") != epoch
+    assert buffer.head("chat1") == 10 and buffer.head("chat2") == 3
+    missed = buffer.frames_since("chat1", 7, epoch)
+    assert [frame.envelope["seq"] for frame in missed] == [8, 9, 10]
+    assert all(a is b for a, b in zip(missed, sent[7:]))  # same frames, encoded once
+    assert buffer.frames_since("chat1", 10, epoch) == []
+    assert len(buffer.frames_since("chat1", 0, epoch)) == 10
+    assert buffer.is_recorded("chat1", sent[0]) and not buffer.is_recorded("chat2", sent[0])
+    assert not buffer.is_recorded("chat1", WireFrame({"type": "chat.print", "seq": 1}))
+
+
+def test_gaps_the_ring_cannot_cover_are_misses():
+    buffer = ReplayBuffer(size=4, ttl_s=60)
+    _record(buffer, "chat1", 10)  # ring now holds seq 7..10
+    epoch = buffer.epoch("chat1")
+
+    assert buffer.frames_since("chat1", 5, epoch) is None  # seq 6 was evicted
+    assert [frame.envelope["seq"] for frame in buffer.frames_since("chat1", 6, epoch)] == [7, 8, 9, 10]
+    assert buffer.frames_since("chat1", 11, epoch) is None
+    assert buffer.frames_since("chat1", 8, None) is None  # client without an epoch
+    assert buffer.frames_since("chat1", 8, ReplayBuffer().origin + ".1") is None  # seq from another process
+    assert buffer.frames_since("other", 3, epoch) is None
+
+    metrics = buffer.get_metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses_by_reason"] == {"unknown": 1, "epoch": 2, "evicted": 1, "ahead": 1}
+    assert metrics["hit_rate"] == round(1 / 6, 4)
+    assert metrics["buffered_frames"] == 4
+
+    disabled = ReplayBuffer(size=0)
+    frame = WireFrame({"type": "chat.text", "data": {}})
+    assert disabled.record("chat1", frame) is frame and "seq" not in frame.envelope
+
+
+def test_a_recreated_ring_never_serves_a_stale_seq():
+    buffer = ReplayBuffer(size=8, ttl_s=5)
+    _record(buffer, "idle", 5)
+    old_epoch = buffer.epoch("idle")
+    buffer._rings["idle"].touched -= 10
+    buffer._last_prune -= 10
+    _record(buffer, "active", 1)
+
+    assert buffer.head("idle") == 0
+    assert buffer.frames_since("idle", 1, old_epoch) is None
+    assert buffer.head("active") == 1
+
+    # New frames restart at seq 1 in a new ring; the client's seq 2 is from the old one.
+    _record(buffer, "idle", 3)
+    assert buffer.epoch("idle") != old_epoch
+    assert buffer.frames_since("idle", 2, old_epoch) is None
+    buffer.forget("idle")
+    _record(buffer, "idle", 3)
+    assert buffer.frames_since("idle", 2, old_epoch) is None
+    assert buffer.get_metrics()["misses_by_reason"]["epoch"] == 2
+
+
+class _Transcripts:
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    async def load_chat_transcript(self, *, chat_id, app_id, after_sequence=None):
+        self.calls.append(after_sequence)
+        rows = [m for m in self.messages if after_sequence is None or m.get("sequence", 0) > after_sequence]
+        return {"status": 1, "last_sequence": max((m.get("sequence", 0) for m in self.messages), default=0), "messages": rows}
+
+
+async def _resume(messages, last_client_index):
+    resumer = GroupChatResumer()
+    resumer._persistence_manager = pm = _Transcripts(messages)
+    events = []
+
+    async def send_event(event, chat_id):
+        events.append(event)
+
+    summary = await resumer.handle_resume_request(
+        chat_id="chat1", app_id="app1", last_client_index=last_client_index, send_event=send_event,
+    )
+    return pm.calls, events, summary
+
+
+@pytest.mark.asyncio
+async def test_client_resume_fallback_reads_only_the_transcript_tail():
+    messages = [{"role": "user", "name": "user", "content": f"m{i}", "sequence": i + 1} for i in range(6)]
+
+    calls, events, summary = await _resume(messages, 3)
+    assert calls == [4]
+    assert [(e["index"], e["content"]) for e in events[:-1]] == [(4, "m4"), (5, "m5")]
+    assert events[-1]["kind"] == "resume_boundary" and events[-1]["message_count"] == 6
+    assert summary == {"replayed_messages": 2, "last_message_index": 5, "total_messages": 6}
+
+    # Rows without sequences cannot be addressed by index: load everything and slice.
+    legacy = [{k: v for k, v in m.items() if k != "sequence"} for m in messages]
+    calls, events, summary = await _resume(legacy, 3)
+    assert calls == [4, None]
+    assert [e["index"] for e in events[:-1]] == [4, 5]
+    assert summary["total_messages"] == 6
+
+
+class _ClientSocket:
+    """Fake Starlette WebSocket: sends ``inbound`` after connect, then disconnects on ``close``."""
+
+    def __init__(self, query, inbound=()):
+        self.query_params = query
+        self.inbound = [json.dumps(m) for m in inbound]
+        self.frames = []
+        self.closed = asyncio.Event()
+
+    async def accept(self):
+        return None
+
+    async def receive_text(self):
+        if self.inbound:
+            return self.inbound.pop(0)
+        await self.closed.wait()
+        raise ConnectionError("client went away")
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+    async def send_json(self, message):
+        self.frames.append(message)
+
+    def types(self):
+        return [f.get("type") for f in self.frames]
+
+
+async def _reconnect(transport, socket):
+    task = asyncio.create_task(transport.handle_websocket(socket, "chat1", "user1", "wf", app_id="app1"))
+    for _ in range(200):
+        if "chat.resume_boundary" in socket.types():
+            break
+        await asyncio.sleep(0.005)
+    socket.closed.set()
+    await asyncio.wait_for(task, 2)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    transport = SimpleTransport()
+    transport.loads = []
+
+    async def auto_resume(chat_id, websocket, app_id):
+        transport.loads.append("auto")
+        return True
+
+    async def client_resume(self, **kwargs):
+        transport.loads.append(("client", kwargs["last_client_index"]))
+        return {"replayed_messages": 0, "last_message_index": -1, "total_messages": 0}
+
+    async def snapshot(**kwargs):
+        transport.loads.append(("snapshot", kwargs["mode"]))
+
+    monkeypatch.setattr(transport, "_auto_resume_if_needed", auto_resume)
+    monkeypatch.setattr(transport, "_emit_messages_snapshot", snapshot)
+    monkeypatch.setattr(GroupChatResumer, "handle_resume_request", client_resume)
+    return transport
+
+
+async def _previous_session(transport):
+    for i in range(5):
+        await transport._send_to_chat("chat1", {"type": "chat.print", "data": {"content": f"c{i}"}})
+    transport._pre_connection_buffers.pop("chat1", None)  # the old socket received these
+    return transport._replay.epoch("chat1")
+
+
+@pytest.mark.asyncio
+async def test_connect_replay_then_client_resume_is_one_resume(transport):
+    epoch = await _previous_session(transport)
+    socket = _ClientSocket(
+        {"last_seq": "3", "seq_epoch": epoch},
+        [{"type": "client.resume", "chat_id": "chat1", "lastSeq": 3, "seqEpoch": epoch}],
+    )
+    await _reconnect(transport, socket)
+
+    replayed = [f for f in socket.frames if f.get("type") == "chat.print"]
+    assert [f["seq"] for f in replayed] == [4, 5]  # once, from the ring
+    boundaries = [f for f in socket.frames if f.get("type") == "chat.resume_boundary"]
+    assert len(boundaries) == 1 and boundaries[0]["data"]["resume_mode"] == "buffer"
+    assert transport.loads == []  # nothing read from persistence
+
+
+@pytest.mark.asyncio
+async def test_stale_epoch_falls_back_to_a_single_transcript_resume(transport):
+    await _previous_session(transport)
+    transport._replay.forget("chat1")  # e.g. the ring idled out
+    await transport._send_to_chat("chat1", {"type": "chat.print", "data": {"content": "new ring"}})
+    transport._pre_connection_buffers.pop("chat1", None)
+
+    stale = ReplayBuffer().origin + ".1"
+    socket = _ClientSocket(
+        {"last_seq": "0", "seq_epoch": stale},
+        [{"type": "client.resume", "chat_id": "chat1", "lastSeq": 0, "seqEpoch": stale}],
+    )
+    await _reconnect(transport, socket)
+
+    assert [f for f in socket.frames if f.get("type") == "chat.print"] == []  # seq 1 of the new ring is not a hit
+    boundaries = [f for f in socket.frames if f.get("type") == "chat.resume_boundary"]
+    assert len(boundaries) == 1 and boundaries[0]["data"]["resume_mode"] == "transcript"
+    assert transport.loads == ["auto"]  # no second load or MessagesSnapshot for client.resume
+
+    # A later client.resume on the same socket (a gap mid-session) runs normally.
+    transport.connections["chat1"] = {"websocket": socket, "app_id": "app1"}
+    await transport._handle_resume_request("chat1", None, socket, last_seq=0, seq_epoch=stale)
+    assert transport.loads == ["auto", ("client", -1), ("snapshot", "client")]
+
+
+@pytest.mark.asyncio
+async def test_ring_miss_resumes_from_the_clients_last_message(transport):
+    await _previous_session(transport)
+    transport._replay.forget("chat1")
+    stale = ReplayBuffer().origin + ".1"
+
+    socket = _ClientSocket(
+        {"last_seq": "5", "seq_epoch": stale, "last_client_index": "4"},
+        [{"type": "client.resume", "chat_id": "chat1", "lastClientIndex": 4, "lastSeq": 5, "seqEpoch": stale}],
+    )
+    await _reconnect(transport, socket)
+
+    # Only the transcript tail after message 4 is read; no full auto-resume.
+    assert transport.loads == [("client", 4), ("snapshot", "client")]
+    boundaries = [f for f in socket.frames if f.get("type") == "chat.resume_boundary"]
+    assert len(boundaries) == 1 and boundaries[0]["data"]["resume_mode"] == "transcript"
@@ -0,0 +1,134 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import pytest
+
+from mozaiks_ai.runtime.workflow.context import schema_inference, variables
+from mozaiks_ai.runtime.workflow.context.schema_inference import SchemaInferenceService, merge_field_types
+
+
+class _Cursor:
+    def __init__(self, db, docs):
+        self._db = db
+        self._docs = docs
+        self._limit = None
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, length=None):
+        self._db.active += 1
+        self._db.peak = max(self._db.peak, self._db.active)
+        await asyncio.sleep(0.01)
+        self._db.active -= 1
+        self._db.reads += 1
+        return list(self._docs[: self._limit])
+
+
+class _Collection:
+    def __init__(self, db, docs):
+        self._db = db
+        self._docs = docs
+
+    def find(self, query):
+        return _Cursor(self._db, self._docs)
+
+
+class _Database:
+    """In-memory stand-in for the async Mongo database API used by the service."""
+
+    def __init__(self, collections):
+        self.collections = collections
+        self.active = 0
+        self.peak = 0
+        self.reads = 0
+
+    async def list_collection_names(self):
+        return list(self.collections)
+
+    def __getitem__(self, name):
+        return _Collection(self, self.collections[name])
+
+
+def _service(db, **kwargs):
+    return SchemaInferenceService(client_factory=lambda: {"appdb": db}, **kwargs)
+
+
+def test_field_types_are_merged_across_samples():
+    merged = merge_field_types([
+        {"_id": 1, "name": "a", "count": 1, "tags": []},
+        {"_id": 2, "name": "b", "count": 2.5},
+        {"_id": 3, "name": None, "count": 3},
+    ])
+    assert merged == {"name": "str | null", "count": "int | float", "tags": "list | null"}
+
+
+@pytest.mark.asyncio
+async def test_collections_are_sampled_concurrently_with_a_cap():
+    db = _Database({f"c{i}": [{"app_id": "a1", "n": i}, {"n": None}] for i in range(12)})
+    db.collections["empty"] = []
+    service = _service(db, sample_size=2, concurrency=4, ttl_sec=60)
+
+    snapshot = await service.get_snapshot("appdb")
+
+    assert db.peak == 4
+    assert snapshot.collections["c3"] == {"n": "int | null", "app_id": "str | null"}
+    assert snapshot.skipped == {"empty": "No sample data available"}
+    assert snapshot.first_docs["c0"] == {"app_id": "a1", "n": 0}
+    assert "C0 [app-specific]:" in snapshot.overview()
+    assert "TOTAL COLLECTIONS: 13" in snapshot.overview()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_cached_and_refreshed_in_background():
+    db = _Database({"orders": [{"total": 1}]})
+    service = _service(db, ttl_sec=60)
+
+    first, second = await asyncio.gather(service.get_snapshot("appdb"), service.get_snapshot("appdb"))
+    assert first is second  # concurrent first loads share one build
+    assert db.reads == 1
+    assert await service.get_snapshot("appdb") is first
+
+    service.ttl_sec = 0
+    db.collections["orders"] = [{"total": "1.00"}]
+    stale = await service.get_snapshot("appdb")
+    assert stale is first  # served immediately while the refresh runs
+    for _ in range(100):
+        if not service.get_metrics()["refreshing"]:
+            break
+        await asyncio.sleep(0.01)
+    service.ttl_sec = 60
+    fresh = await service.get_snapshot("appdb")
+
+    assert fresh.collections["orders"] == {"total": "str"}
+    metrics = service.get_metrics()
+    assert metrics["builds"] == 2
+    assert metrics["stale_hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_context_loading_shares_one_snapshot_and_copies_first_docs(monkeypatch):
+    db = _Database({"orders": [{"app_id": "a1", "total": 1}], "users": [{"name": "ada"}]})
+    monkeypatch.setattr(schema_inference, "_service", _service(db, ttl_sec=60))
+
+    overview, docs = await asyncio.gather(
+        variables._get_database_schema_async("appdb"), variables._get_all_collections_first_docs("appdb")
+    )
+    docs["orders"]["total"] = 99  # a workflow mutating its context must not touch the cache
+    again = await variables._get_all_collections_first_docs("appdb")
+
+    assert "ORDERS [app-specific]:" in overview["schema_overview"]
+    assert again["orders"] == {"app_id": "a1", "total": 1}
+    assert db.reads == 2  # one sample per collection, shared by every load
+    assert schema_inference.get_schema_inference_service().get_metrics()["builds"] == 1
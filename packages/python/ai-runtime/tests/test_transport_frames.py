@@ -0,0 +1,71 @@
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from mozaiks_ai.runtime.transport import frames
+
+
+ENVELOPE = {
+    "type": "chat.text",
+    "data": {"content": "héllo ✓", "sequence": 3, "meta": {1: "int key"}, "at": datetime(2026, 1, 1, tzinfo=timezone.utc)},
+}
+
+
+def test_backends_produce_equivalent_json():
+    active = frames.get_encoder_backend()
+    try:
+        decoded = {}
+        for backend in (frames.BACKEND_STDLIB, frames.BACKEND_AUTO):
+            name = frames.set_encoder_backend(backend)
+            decoded[name] = json.loads(frames.encode_json(ENVELOPE))
+        values = list(decoded.values())
+        assert all(v == values[0] for v in values)
+        assert values[0]["data"]["meta"] == {"1": "int key"}
+        assert values[0]["data"]["at"].startswith("2026-01-01T00:00:00")
+    finally:
+        frames.set_encoder_backend(active)
+
+
+def test_stdlib_output_matches_send_json_encoding():
+    active = frames.get_encoder_backend()
+    try:
+        frames.set_encoder_backend(frames.BACKEND_STDLIB)
+        payload = {"type": "chat.print", "data": {"content": "ünïcode", "n": [1, 2]}}
+        expected = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        assert frames.WireFrame(payload).text() == expected
+    finally:
+        frames.set_encoder_backend(active)
+
+
+def test_frame_encodes_once():
+    calls = []
+    frame = frames.WireFrame({"type": "chat.text", "data": {}})
+    original = frames._encode
+    frames._encode = lambda obj: calls.append(obj) or original(obj)
+    try:
+        first = frame.encode()
+        assert frame.encode() is first
+        assert frame.text() == first.decode("utf-8")
+    finally:
+        frames._encode = original
+    assert len(calls) == 1
+
+
+def test_batch_frame_reuses_encoded_events_in_order():
+    events = [frames.WireFrame({"type": "chat.print", "seq": i, "data": {"content": str(i)}}) for i in (7, 8, 9)]
+    encoded = [frame.encode() for frame in events]
+    batch = frames.build_batch_frame(events)
+    decoded = json.loads(batch.text())
+    assert decoded["type"] == frames.BATCH_FRAME_TYPE
+    assert [event["seq"] for event in decoded["events"]] == [7, 8, 9]
+    assert all(frame.encode() is raw for frame, raw in zip(events, encoded))
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+from mozaiks_ai.runtime.events.usage_ingest import UsageIngestClient
+
+
+class _ControlPlane:
+    """Local HTTP stand-in for the control-plane ingest endpoint."""
+
+    def __init__(self):
+        self.status = 202
+        self.requests = []
+        plane = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                plane.requests.append((self.headers.get("Idempotency-Key"), body))
+                self.send_response(plane.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/usage/ingest"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def event_ids(self):
+        return [event["event_id"] for _, body in self.requests for event in body["events"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _summary(i):
+    return {"event_id": f"evt-{i}", "chat_id": "c1", "app_id": "a1", "user_id": "u1", "total_tokens": i}
+
+
+def _client(url, spool_path, **kwargs):
+    kwargs.setdefault("batch_max", 3)
+    kwargs.setdefault("flush_interval_ms", 20)
+    return UsageIngestClient(
+        url=url,
+        enabled=True,
+        spool_path=str(spool_path),
+        backoff_base_sec=0.05,
+        backoff_max_sec=0.05,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def plane():
+    plane = _ControlPlane()
+    yield plane
+    plane.close()
+
+
+async def _wait_for(predicate, timeout=4.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met before timeout"
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_summaries_are_posted_in_batches(plane, tmp_path):
+    client = _client(plane.url, tmp_path / "spool.jsonl")
+    for i in range(7):
+        await client.handle_usage_summary(_summary(i))
+    assert await client.flush(timeout=5)
+    await client.stop()
+    metrics = client.get_metrics()
+
+    assert sorted(plane.event_ids()) == [f"evt-{i}" for i in range(7)]
+    assert [len(body["events"]) for _, body in plane.requests] == [3, 3, 1]
+    assert all(key and key == body["batch_id"] for key, body in plane.requests)
+    assert metrics["events_sent"] == 7
+    assert metrics["events_spooled"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_spooled_and_replayed_with_their_batch_id(plane, tmp_path):
+    plane.status = 503
+    spool = tmp_path / "spool.jsonl"
+
+    client = _client(plane.url, spool, max_attempts=2, retry_interval_sec=60)
+    for i in range(4):
+        await client.handle_usage_summary(_summary(i))
+    await client.stop()
+    down = client.get_metrics()
+    failed_keys = {key for key, _ in plane.requests}
+    plane.requests.clear()
+    plane.status = 202
+
+    # A different batch size after the restart must not re-chunk spooled batches.
+    client = _client(plane.url, spool, batch_max=2, retry_interval_sec=0)
+    await client.start()
+    await client.handle_usage_summary(_summary(4))
+    await _wait_for(lambda: client.get_metrics()["events_replayed"] == 4)
+    await client.stop()
+    up = client.get_metrics()
+
+    assert down["events_spooled"] == 4
+    assert down["events_sent"] == 0
+    assert sorted(plane.event_ids()) == [f"evt-{i}" for i in range(5)]
+    assert up["events_replayed"] == 4
+    assert up["spooled_pending"] == 0
+    assert not spool.exists()
+    assert len(failed_keys) == 1
+    replayed = [(key, [e["event_id"] for e in body["events"]]) for key, body in plane.requests]
+    # The batch that failed is replayed whole, under the key it was first sent with.
+    assert (failed_keys.pop(), ["evt-0", "evt-1", "evt-2"]) in replayed
+
+
+@pytest.mark.asyncio
+async def test_workers_never_share_a_spool_file(plane, tmp_path):
+    plane.status = 503
+    spool = tmp_path / "spool.jsonl"
+    first = _client(plane.url, spool, max_attempts=1, retry_interval_sec=60)
+    second = _client(plane.url, spool, max_attempts=1, retry_interval_sec=60)
+
+    await first.handle_usage_summary(_summary(0))
+    await second.handle_usage_summary(_summary(1))
+    await _wait_for(lambda: first.get_metrics()["events_spooled"] == 1 and second.get_metrics()["events_spooled"] == 1)
+    paths = {first.get_metrics()["spool_path"], second.get_metrics()["spool_path"]}
+
+    assert paths == {str(spool), str(tmp_path / "spool.1.jsonl")}
+    for path in paths:
+        assert len(Path(path).read_text().splitlines()) == 1
+
+    # A worker that exits leaves its slot (and spool) to the next one that starts.
+    await first.stop()
+    plane.status = 202
+    third = _client(plane.url, spool, retry_interval_sec=0)
+    await third.start()
+    await _wait_for(lambda: third.get_metrics()["events_replayed"] == 1)
+    assert third.get_metrics()["spool_path"] == first.get_metrics()["spool_path"]
+    await second.stop()
+    await third.stop()
+
+
+@pytest.mark.asyncio
+async def test_spools_written_one_summary_per_line_are_replayed(plane, tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    spool.write_text("".join(json.dumps(_summary(i)) + "\n" for i in range(4)))
+
+    client = _client(plane.url, spool, retry_interval_sec=0)
+    await client.start()
+    await _wait_for(lambda: client.get_metrics()["events_replayed"] == 4)
+    await client.stop()
+
+    assert [len(body["events"]) for _, body in plane.requests] == [3, 1]
+    assert not spool.exists()
@@ -0,0 +1,136 @@
+import sys
+import threading
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import pytest
+
+from mozaiks_ai.runtime.workflow import bundle as bundle_mod
+
+
+@pytest.fixture
+def loaders(monkeypatch):
+    calls = {"config": 0, "structured": 0, "tools": 0, "plan": 0}
+    configs = {"demo": {"max_turns": 5, "orchestration_pattern": "DefaultPattern"}}
+
+    def load_config(name):
+        calls["config"] += 1
+        return configs.get(name.lower(), {})
+
+    def load_structured(name):
+        calls["structured"] += 1
+        return {"Plan": dict}, {"Planner": dict}
+
+    def load_tools(name):
+        calls["tools"] += 1
+        return {"Planner": [len, sorted]}
+
+    def load_plan(name):
+        calls["plan"] += 1
+        return object(), {"definitions": {}}
+
+    monkeypatch.setattr(bundle_mod, "_load_config", load_config)
+    monkeypatch.setattr(bundle_mod, "_load_structured", load_structured)
+    monkeypatch.setattr(bundle_mod, "_load_tools", load_tools)
+    monkeypatch.setattr(bundle_mod, "_load_context_plan", load_plan)
+    monkeypatch.setattr(bundle_mod, "_BUNDLES", {})
+    monkeypatch.setattr(bundle_mod, "_VERSIONS", {})
+    monkeypatch.delenv("WORKFLOW_BUNDLE_CACHE", raising=False)
+    return calls, configs
+
+
+def test_bundle_is_built_once_and_shared(loaders):
+    calls, _ = loaders
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(bundle_mod.get_workflow_bundle("Demo"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(b is results[0] for b in results)
+    assert calls == {"config": 1, "structured": 1, "tools": 1, "plan": 1}
+    bundle = results[0]
+    assert bundle.config["max_turns"] == 5
+    assert bundle.tool_functions["Planner"] == (len, sorted)
+    assert bundle.tool_count == 2
+    with pytest.raises(TypeError):
+        bundle.tool_functions["Other"] = ()
+
+
+def test_invalidate_bumps_version_and_rebuilds(loaders):
+    calls, configs = loaders
+    first = bundle_mod.get_workflow_bundle("demo")
+
+    configs["demo"] = {"max_turns": 9}
+    bundle_mod.invalidate_workflow_bundle("DEMO")
+    second = bundle_mod.get_workflow_bundle("demo")
+
+    assert second is not first
+    assert second.version == first.version + 1
+    assert second.config["max_turns"] == 9
+    assert first.config["max_turns"] == 5  # in-flight runs keep their bundle
+    assert calls["tools"] == 2
+    assert bundle_mod.peek_workflow_bundle("demo") is second
+
+
+def test_invalidate_drops_the_event_serializer_structured_lookups(loaders, monkeypatch):
+    from mozaiks_ai.runtime.events import event_serialization
+
+    schemas = {("Demo", "Planner"): {"title": "str"}, ("Other", "Planner"): None}
+    monkeypatch.setattr(event_serialization, "_STRUCTURED_SCHEMAS", schemas)
+
+    bundle_mod.invalidate_workflow_bundle("demo")
+
+    assert schemas == {("Other", "Planner"): None}
+
+
+def test_component_failures_are_recorded_not_raised(loaders, monkeypatch):
+    def broken_tools(name):
+        raise RuntimeError("tools.yaml unreadable")
+
+    monkeypatch.setattr(bundle_mod, "_load_tools", broken_tools)
+    bundle = bundle_mod.get_workflow_bundle("demo")
+
+    assert dict(bundle.tool_functions) == {}
+    assert bundle.errors == {"tools": "tools.yaml unreadable"}
+    assert bundle.structured_registry == {"Planner": dict}
+
+
+def test_cache_can_be_disabled(loaders, monkeypatch):
+    calls, _ = loaders
+    monkeypatch.setenv("WORKFLOW_BUNDLE_CACHE", "false")
+
+    assert bundle_mod.get_workflow_bundle("demo") is not bundle_mod.get_workflow_bundle("demo")
+    assert calls["tools"] == 2
+
+
+@pytest.mark.asyncio
+async def test_context_is_loaded_from_the_runs_bundle_after_a_reload(loaders, monkeypatch):
+    from mozaiks_ai.runtime.workflow.context.schema import load_context_variables_config
+    from mozaiks_ai.runtime.workflow.context.variables import _load_context_async
+
+    mode = {"default": "v1"}
+
+    def load_plan(name):
+        section = {"definitions": {"mode": {"type": "string", "source": {"type": "config", "default": mode["default"]}}}}
+        return load_context_variables_config(section), section
+
+    monkeypatch.setattr(bundle_mod, "_load_context_plan", load_plan)
+    run_bundle = bundle_mod.get_workflow_bundle("demo")
+
+    # A reload lands between the run loading its bundle and loading its context.
+    mode["default"] = "v2"
+    bundle_mod.invalidate_workflow_bundle("demo")
+
+    ctx = await _load_context_async("demo", "app1", run_bundle)
+    assert ctx.get("mode") == "v1"
+    assert (await _load_context_async("demo", "app1")).get("mode") == "v2"
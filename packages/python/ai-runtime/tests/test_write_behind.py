@@ -0,0 +1,273 @@
+import sys
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+
+# Ensure local package root is importable when running pytest directly.
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+infra_root = REPO_ROOT / "packages" / "python" / "infrastructure"
+if str(infra_root) not in sys.path:
+    sys.path.insert(0, str(infra_root))
+
+import pytest
+
+from fake_mongo import FakeClient
+from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager
+from mozaiks_ai.runtime.data.persistence.write_behind import PersistenceWriteBehind
+
+
+class _RecordingManager:
+    def __init__(self, message_failures=0, metric_failures=0):
+        self.message_batches = []
+        self.metric_calls = []
+        self.message_failures = message_failures
+        self.metric_failures = metric_failures
+
+    async def _flush_message_batches(self, batches):
+        if self.message_failures:
+            self.message_failures -= 1
+            raise RuntimeError("mongo unavailable")
+        self.message_batches.append({key: [p.message["content"] for p in items] for key, items in batches.items()})
+        batches.clear()
+
+    async def _apply_session_metrics(self, **kwargs):
+        if self.metric_failures:
+            self.metric_failures -= 1
+            raise RuntimeError("mongo unavailable")
+        self.metric_calls.append(kwargs)
+
+
+def _metrics_kwargs(**overrides):
+    kwargs = dict(
+        chat_id="c1",
+        app_id="a",
+        user_id="u",
+        workflow_name="wf",
+        prompt_tokens=10,
+        completion_tokens=5,
+        cost_usd=0.01,
+        agent_name="Agent",
+        event_ts=None,
+        duration_sec=0.0,
+        session_type="workflow",
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+
+def _stage(**overrides):
+    kwargs = dict(flush_interval_ms=10_000, flush_batch_size=1_000, max_pending=1_000, retry_backoff_ms=1)
+    kwargs.update(overrides)
+    return PersistenceWriteBehind(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_messages_flush_in_enqueue_order_per_chat():
+    stage = _stage()
+    manager = _RecordingManager()
+    for i in range(3):
+        await stage.enqueue_message(manager, chat_id="c1", app_id="a", message={"content": f"m{i}"})
+    await stage.enqueue_message(manager, chat_id="c2", app_id="a", message={"content": "other"})
+    assert stage.has_pending("c1") and not stage.has_pending("c3")
+    await stage.flush("c1")
+    await stage.shutdown()
+
+    assert manager.message_batches == [{("c1", "a"): ["m0", "m1", "m2"], ("c2", "a"): ["other"]}]
+    assert stage.get_metrics()["flushed_messages"] == 4
+
+
+@pytest.mark.asyncio
+async def test_metric_deltas_coalesce_per_agent():
+    stage = _stage()
+    manager = _RecordingManager()
+    t0 = datetime.now(UTC)
+    await stage.enqueue_metrics(manager, **_metrics_kwargs(event_ts=t0 + timedelta(seconds=2)))
+    await stage.enqueue_metrics(manager, **_metrics_kwargs(event_ts=t0))
+    await stage.enqueue_metrics(manager, **_metrics_kwargs(agent_name="Other"))
+    await stage.shutdown()
+
+    by_agent = {call["agent_name"]: call for call in manager.metric_calls}
+    assert by_agent["Agent"]["prompt_tokens"] == 20
+    assert by_agent["Agent"]["completion_tokens"] == 10
+    assert by_agent["Agent"]["event_ts"] == t0 + timedelta(seconds=2)
+    assert by_agent["Other"]["prompt_tokens"] == 10
+    metrics = stage.get_metrics()
+    assert metrics["flushed_metric_updates"] == 3
+    assert metrics["coalesced_metric_updates"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_flushes_inline():
+    stage = _stage(max_pending=2)
+    manager = _RecordingManager()
+    for i in range(5):
+        await stage.enqueue_message(manager, chat_id="c1", app_id="a", message={"content": f"m{i}"})
+    assert stage.get_metrics()["pending_messages"] <= 2
+    await stage.shutdown()
+
+    flushed = [content for batch in manager.message_batches for items in batch.values() for content in items]
+    assert flushed == [f"m{i}" for i in range(5)]
+    assert stage.get_metrics()["backpressure_waits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_writes_ahead_of_newer_ones():
+    stage = _stage()
+    manager = _RecordingManager(message_failures=1, metric_failures=1)
+    await stage.enqueue_message(manager, chat_id="c1", app_id="a", message={"content": "m0"})
+    await stage.enqueue_metrics(manager, **_metrics_kwargs())
+    await stage.flush()
+
+    assert manager.message_batches == [] and manager.metric_calls == []
+    assert stage.has_pending("c1")
+    await stage.enqueue_message(manager, chat_id="c1", app_id="a", message={"content": "m1"})
+    await stage.enqueue_metrics(manager, **_metrics_kwargs(prompt_tokens=7))
+    await stage.shutdown()
+
+    assert manager.message_batches == [{("c1", "a"): ["m0", "m1"]}]
+    assert [(c["prompt_tokens"], c["completion_tokens"]) for c in manager.metric_calls] == [(17, 10)]
+    metrics = stage.get_metrics()
+    assert (metrics["flush_errors"], metrics["retried_messages"], metrics["retried_metric_updates"]) == (2, 1, 1)
+    assert metrics["flushed_messages"] == 2 and metrics["dropped_messages"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shutdown_raises_when_retries_are_exhausted():
+    stage = _stage(max_retries=2)
+    manager = _RecordingManager(message_failures=10)
+    await stage.enqueue_message(manager, chat_id="c1", app_id="a", message={"content": "m0"})
+
+    with pytest.raises(RuntimeError, match="lost 1 buffered writes"):
+        await stage.shutdown()
+    assert manager.message_batches == []
+    assert stage.get_metrics()["dropped_messages"] == 1
+    assert stage.get_metrics()["flush_errors"] == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_failure_is_retried_through_the_persistence_manager(monkeypatch):
+    monkeypatch.setenv("CHAT_MESSAGE_STORAGE", "embedded")
+    manager = AG2PersistenceManager()
+    manager.persistence.client = FakeClient()
+    sessions = manager.persistence.client["MozaiksAI"]["ChatSessions"]
+    sessions.docs.append({"_id": "chat_1", "app_id": "app_1", "messages": [], "last_sequence": 0})
+    stage = _stage()
+
+    for i in range(3):
+        await stage.enqueue_message(
+            manager, chat_id="chat_1", app_id="app_1", message={"role": "user", "content": f"m{i}"}
+        )
+    sessions.fail["bulk_write"] = RuntimeError("primary stepped down")
+    await stage.flush("chat_1")
+    assert sessions.docs[0]["messages"] == []
+    assert stage.has_pending("chat_1")
+
+    await stage.enqueue_message(
+        manager, chat_id="chat_1", app_id="app_1", message={"role": "user", "content": "m3"}
+    )
+    await stage.shutdown()
+
+    messages = sessions.docs[0]["messages"]
+    assert [m["content"] for m in messages] == ["m0", "m1", "m2", "m3"]
+    assert [m["sequence"] for m in messages] == [1, 2, 3, 4]  # the retry reused its range
+    assert sessions.docs[0]["last_sequence"] == 4
+
+
+def _manager_with_sessions(monkeypatch, storage, chat_ids):
+    monkeypatch.setenv("CHAT_MESSAGE_STORAGE", storage)
+    manager = AG2PersistenceManager()
+    manager.persistence.client = FakeClient()
+    db = manager.persistence.client["MozaiksAI"]
+    for chat_id in chat_ids:
+        doc = {"_id": chat_id, "app_id": "app_1", "last_sequence": 0}
+        if storage == "collection":
+            doc["message_storage"] = "collection"
+        else:
+            doc["messages"] = []
+        db["ChatSessions"].docs.append(doc)
+    return manager, db
+
+
+async def _enqueue(stage, manager, chat_id, *contents):
+    for content in contents:
+        await stage.enqueue_message(
+            manager, chat_id=chat_id, app_id="app_1", message={"role": "user", "content": content}
+        )
+
+
+def _land_then_fail(collection):
+    """Apply the next bulk_write, then report it as failed (e.g. a lost acknowledgement)."""
+    real = collection.bulk_write
+
+    async def bulk_write(ops, ordered=True):
+        collection.bulk_write = real
+        await real(ops, ordered=ordered)
+        raise RuntimeError("connection reset before the reply")
+
+    collection.bulk_write = bulk_write
+
+
+@pytest.mark.asyncio
+async def test_partial_bulk_write_error_retries_only_the_failed_chat(monkeypatch):
+    manager, db = _manager_with_sessions(monkeypatch, "embedded", ["chat_1", "chat_2"])
+    sessions = db["ChatSessions"]
+    stage = _stage()
+    await _enqueue(stage, manager, "chat_1", "a0", "a1")
+    await _enqueue(stage, manager, "chat_2", "b0", "b1")
+
+    sessions.reject = lambda op: op._filter["_id"] == "chat_2"
+    await stage.flush()
+    sessions.reject = None
+    assert [m["content"] for m in sessions.docs[0]["messages"]] == ["a0", "a1"]
+    assert not stage.has_pending("chat_1") and stage.has_pending("chat_2")
+
+    await _enqueue(stage, manager, "chat_2", "b2")
+    await stage.shutdown()
+
+    chat_1, chat_2 = sessions.docs
+    assert [m["sequence"] for m in chat_1["messages"]] == [1, 2]  # not written again
+    assert [(m["content"], m["sequence"]) for m in chat_2["messages"]] == [("b0", 1), ("b1", 2), ("b2", 3)]
+    assert (chat_1["last_sequence"], chat_2["last_sequence"]) == (2, 3)
+    assert stage.get_metrics()["retried_messages"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_embedded_write_is_not_appended_twice(monkeypatch):
+    manager, db = _manager_with_sessions(monkeypatch, "embedded", ["chat_1"])
+    sessions = db["ChatSessions"]
+    stage = _stage()
+    await _enqueue(stage, manager, "chat_1", "m0", "m1")
+
+    _land_then_fail(sessions)
+    await stage.flush()
+    assert stage.has_pending("chat_1")
+    await _enqueue(stage, manager, "chat_1", "m2")
+    await stage.shutdown()
+
+    messages = sessions.docs[0]["messages"]
+    assert [(m["content"], m["sequence"]) for m in messages] == [("m0", 1), ("m1", 2), ("m2", 3)]
+    assert sessions.docs[0]["last_sequence"] == 3
+
+
+@pytest.mark.asyncio
+async def test_collection_rows_retry_only_failed_rows_and_are_idempotent(monkeypatch):
+    manager, db = _manager_with_sessions(monkeypatch, "collection", ["chat_1"])
+    rows = db["ChatMessages"]
+    stage = _stage()
+    await _enqueue(stage, manager, "chat_1", "m0", "m1", "m2")
+
+    rows.reject = lambda op: op._doc["content"] == "m1"
+    await stage.flush()
+    rows.reject = None
+    assert sorted(r["content"] for r in rows.docs) == ["m0", "m2"]
+
+    _land_then_fail(rows)  # the retried row lands but the flush still fails
+    await stage.flush()
+    await _enqueue(stage, manager, "chat_1", "m3")
+    await stage.shutdown()
+
+    stored = sorted((r["sequence"], r["content"]) for r in rows.docs)
+    assert stored == [(1, "m0"), (2, "m1"), (3, "m2"), (4, "m3")]
+    assert db["ChatSessions"].docs[0]["last_sequence"] == 4
@@ -76,7 +76,7 @@ async def pay_checkout(
     x_correlation_id: str | None = Header(default=None, alias="x-correlation-id"),
     user: dict = Depends(get_current_user),
 ):
-    enforce_rate_limit(request, bucket="mozaiks.pay.checkout", policy=RateLimitPolicy(limit=30, window_s=60))
+    await enforce_rate_limit(request, bucket="mozaiks.pay.checkout", policy=RateLimitPolicy(limit=30, window_s=60))
     correlation_id = _corr_id(response, x_correlation_id)
     token = _parse_bearer_token(authorization)
     connectors = _connectors()
@@ -99,7 +99,7 @@ async def pay_subscription_status(
     x_correlation_id: str | None = Header(default=None, alias="x-correlation-id"),
     user: dict = Depends(get_current_user),
 ):
-    enforce_rate_limit(request, bucket="mozaiks.pay.subscription_status", policy=RateLimitPolicy(limit=60, window_s=60))
+    await enforce_rate_limit(request, bucket="mozaiks.pay.subscription_status", policy=RateLimitPolicy(limit=60, window_s=60))
     correlation_id = _corr_id(response, x_correlation_id)
     token = _parse_bearer_token(authorization)
     connectors = _connectors()
@@ -124,7 +124,7 @@ async def pay_cancel(
     x_correlation_id: str | None = Header(default=None, alias="x-correlation-id"),
     user: dict = Depends(get_current_user),
 ):
-    enforce_rate_limit(request, bucket="mozaiks.pay.cancel", policy=RateLimitPolicy(limit=30, window_s=60))
+    await enforce_rate_limit(request, bucket="mozaiks.pay.cancel", policy=RateLimitPolicy(limit=30, window_s=60))
     correlation_id = _corr_id(response, x_correlation_id)
     token = _parse_bearer_token(authorization)
     connectors = _connectors()
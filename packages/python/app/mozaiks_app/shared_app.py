@@ -24,6 +24,11 @@ from mozaiks_ai.runtime.core_config import get_mongo_client
 from mozaiks_ai.runtime.transport.simple_transport import SimpleTransport
 from mozaiks_ai.runtime.workflow.workflow_manager import workflow_status_summary, get_workflow_transport, get_workflow_tools
 from mozaiks_ai.runtime.data.persistence.persistence_manager import AG2PersistenceManager
+from mozaiks_ai.runtime.data.persistence.write_behind import get_write_behind_metrics, shutdown_write_behind
+from mozaiks_ai.runtime.workflow.bundle import get_bundle_metrics
+from mozaiks_ai.runtime.workflow.agents.templates import get_agent_template_metrics
+from mozaiks_infra.event_bus import event_bus
+from mozaiks_infra.state_manager import state_manager
 from mozaiks_ai.runtime.data.themes.theme_manager import ThemeManager, ThemeResponse
 from mozaiks_ai.runtime.multitenant import build_app_scope_filter, coalesce_app_id
 from mozaiks_ai.runtime.artifacts.attachments import handle_chat_upload
@@ -43,6 +48,7 @@ from mozaiks_ai.runtime.auth import (
     get_auth_config,
     WS_CLOSE_POLICY_VIOLATION,
 )
+from mozaiks_ai.runtime.auth.refresh import close_http_session as close_auth_http_session
 from mozaiks_ai.runtime.auth.dependencies import (
     validate_path_app_id,
     validate_path_chat_id,
@@ -188,6 +194,7 @@ _patch_autogen_file_logger()
 
 # Initialize unified event dispatcher
 from mozaiks_ai.runtime.events import get_event_dispatcher
+from mozaiks_ai.runtime.events.usage_ingest import get_usage_ingest_client
 event_dispatcher = get_event_dispatcher()
 wf_logger.info("🎯 Unified Event Dispatcher initialized")
 
@@ -329,6 +336,41 @@ async def metrics_perf_aggregate(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to collect aggregate metrics: {e}")
 
+@app.get("/metrics/persistence")
+async def metrics_persistence(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return write-behind queue depth, flush-lag and artifact-state write counters (no DB hits)."""
+    try:
+        return {
+            **get_write_behind_metrics(),
+            "artifact_state": persistence_manager.artifact_states.get_metrics(),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect persistence metrics: {e}")
+
+@app.get("/metrics/transport")
+async def metrics_transport(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return per-connection outbound queue depth and send latency (no DB hits)."""
+    try:
+        if simple_transport is None:
+            return {"connections": 0, "chats": {}}
+        return simple_transport.get_outbound_metrics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect transport metrics: {e}")
+
+@app.get("/metrics/workflows")
+async def metrics_workflows(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return compiled workflow bundle and agent template pool counters (no DB hits)."""
+    try:
+        return {"bundles": get_bundle_metrics(), "agent_templates": get_agent_template_metrics()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect workflow metrics: {e}")
+
 @app.get("/metrics/perf/chats")
 async def metrics_perf_chats(
     principal: UserPrincipal = Depends(require_any_auth),
@@ -569,6 +611,7 @@ async def startup():
         # Initialize simple transport
         streaming_start = datetime.now(UTC)
         simple_transport = await SimpleTransport.get_instance()
+        await simple_transport.start_maintenance()
         streaming_time = (datetime.now(UTC) - streaming_start).total_seconds() * 1000
         performance_logger.info(
             "streaming_config_init_duration",
@@ -632,6 +675,15 @@ async def startup():
         except Exception as _svc_err:
             wf_logger.debug(f"RUNTIME_EXTENSIONS_SERVICES_NOT_STARTED: {_svc_err}")
 
+        # Reclaim expired ephemeral state even when it is never read again
+        state_manager.start_expiry_sweeper()
+
+        # Join the cross-process event stream when MOZAIKS_EVENT_BUS_BACKEND=redis
+        await event_bus.connect()
+
+        # Replay usage summaries spooled while the control plane was unreachable
+        await get_usage_ingest_client().start()
+
         # Total startup time
         total_startup_time = (datetime.now(UTC) - startup_start).total_seconds() * 1000
         performance_logger.info(
@@ -686,8 +738,30 @@ async def shutdown():
         _runtime_services = []
 
         if simple_transport:
-            # No explicit disconnect needed for websockets with this transport design
-            pass
+            # No explicit disconnect needed for websockets; stop cross-worker routing and housekeeping
+            await simple_transport.stop_maintenance()
+
+        await state_manager.stop_expiry_sweeper()
+        await event_bus.close()
+
+        # Let queued dispatcher listeners (usage ingest, journey/pack hand-offs) finish
+        try:
+            await event_dispatcher.shutdown(timeout=10.0)
+        except Exception as e:
+            logger.error(f"❌ Failed to drain event dispatcher: {e}")
+
+        try:
+            await get_usage_ingest_client().stop()
+        except Exception as e:
+            logger.error(f"❌ Failed to flush control-plane usage ingest: {e}")
+
+        await close_auth_http_session()
+
+        # Drain buffered transcript/metrics writes before the Mongo client goes away
+        try:
+            await shutdown_write_behind()
+        except Exception as e:
+            logger.error(f"❌ Failed to flush persistence write-behind buffers: {e}")
         
         if mongo_client:
             mongo_client.close()
@@ -1496,9 +1570,16 @@ async def get_cached_artifact_state(
     artifact_id: str,
     app_id: Optional[str] = None,
     chat_id: Optional[str] = None,
+    since_version: Optional[int] = None,
     principal: UserPrincipal = Depends(require_any_auth),
 ):
-    """Return cached artifact state if available and not expired."""
+    """Return cached artifact state if available and not expired.
+
+    With ``chat_id`` and ``since_version`` (the last ``version`` the client
+    applied from a state event), the response is ``mode="delta"`` with the
+    logged patches after that version when they are still retained, or
+    ``mode="snapshot"`` with the full state otherwise.
+    """
     try:
         if principal.mozaiks_app_id and app_id and not principal.validate_app_id(app_id):
             raise HTTPException(status_code=403, detail="Token app_id does not match request app_id")
@@ -1509,6 +1590,22 @@ async def get_cached_artifact_state(
         if not artifact_id:
             raise HTTPException(status_code=400, detail="artifact_id is required")
 
+        if chat_id and since_version is not None:
+            sync = await persistence_manager.get_artifact_state_since(
+                artifact_id=artifact_id,
+                chat_id=chat_id,
+                app_id=resolved_app_id,
+                since_version=since_version,
+            )
+            if not sync:
+                raise HTTPException(status_code=404, detail="Cached artifact not found")
+            return {
+                **sync,
+                "app_id": resolved_app_id,
+                "updated_at": _iso(sync.get("updated_at")),
+                "expires_at": _iso(sync.get("expires_at")),
+            }
+
         doc = await persistence_manager.get_artifact_state(
             artifact_id=artifact_id,
             app_id=resolved_app_id,
@@ -1523,6 +1620,7 @@ async def get_cached_artifact_state(
             "workflow_name": doc.get("workflow_name"),
             "app_id": resolved_app_id,
             "state": doc.get("state"),
+            "version": int(doc.get("version") or 0),
             "updated_at": _iso(doc.get("updated_at")),
             "expires_at": _iso(doc.get("expires_at")),
         }
@@ -0,0 +1,236 @@
+# backend/tests/test_broadcast_fanout.py
+import asyncio
+import sys
+from pathlib import Path
+import unittest
+from unittest import mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+import httpx  # noqa: E402
+
+from mozaiks_ai.runtime.auth.dependencies import require_admin_or_internal  # noqa: E402
+from mozaiks_platform.notifications import broadcast as broadcast_module  # noqa: E402
+from mozaiks_platform.notifications.broadcast import BroadcastService  # noqa: E402
+from mozaiks_platform.notifications.channels import in_app as in_app_module  # noqa: E402
+from mozaiks_platform.notifications.channels.in_app import InAppChannel  # noqa: E402
+from mozaiks_platform.routes import notifications_admin  # noqa: E402
+
+
+class _Result:
+    def __init__(self, inserted_id=None) -> None:
+        self.inserted_id = inserted_id
+
+
+class _Cursor:
+    def __init__(self, docs) -> None:
+        self._docs = docs
+        self.batch = None
+
+    def batch_size(self, size):
+        self.batch = size
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class _Collection:
+    def __init__(self) -> None:
+        self.docs = []
+        self.calls = []
+
+    async def count_documents(self, query):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        self.calls.append("find")
+        return _Cursor(list(self.docs))
+
+    async def insert_one(self, doc):
+        self.calls.append("insert_one")
+        doc["_id"] = ObjectId()
+        self.docs.append(doc)
+        return _Result(doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls.append(("insert_many", len(docs), ordered))
+        for doc in docs:
+            doc["_id"] = ObjectId()
+        self.docs.extend(docs)
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.docs if doc["_id"] == query["_id"]), None)
+
+    async def update_one(self, query, update):
+        self.calls.append(("update_one", dict(update["$set"])))
+        for doc in self.docs:
+            if doc["_id"] == query["_id"]:
+                doc.update(update["$set"])
+
+
+class _Database(dict):
+    def __missing__(self, name):
+        self[name] = _Collection()
+        return self[name]
+
+
+class _PerUserChannel:
+    channel_id = "sms"
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.peak = 0
+        self.sent = []
+        self.hold_after = None  # stall sends once this many users were sent
+        self.release = asyncio.Event()
+
+    def is_enabled(self):
+        return True
+
+    async def send(self, user_id, notification_type, title, message, metadata=None):
+        if self.hold_after is not None and len(self.sent) >= self.hold_after:
+            await self.release.wait()
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0)
+        self.active -= 1
+        self.sent.append(user_id)
+        return not user_id.endswith("7")  # some numbers cannot receive SMS
+
+
+class _Socket:
+    def __init__(self) -> None:
+        self.messages = []
+
+    async def send_json(self, message):
+        self.messages.append(message)
+
+
+class BroadcastFanoutTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.db = _Database()
+        self.db["users"].docs = [{"_id": ObjectId(), "email": f"u{i}@example.com"} for i in range(1234)]
+        self.sms = _PerUserChannel()
+        self.in_app = InAppChannel()
+        channels = {"in_app": self.in_app, "sms": self.sms}
+        patches = [
+            mock.patch.object(broadcast_module, "db", self.db),
+            mock.patch.object(in_app_module, "db", self.db),
+            mock.patch.dict(broadcast_module.CHANNELS, channels, clear=True),
+            mock.patch.object(broadcast_module, "get_enabled_channels", lambda: channels),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _service(self) -> BroadcastService:
+        with mock.patch.dict("os.environ", {"MOZAIKS_BROADCAST_BATCH_SIZE": "500", "MOZAIKS_BROADCAST_CONCURRENCY": "3"}):
+            return BroadcastService()
+
+    def _admin_client(self, service: BroadcastService) -> httpx.AsyncClient:
+        patch = mock.patch.object(notifications_admin, "broadcast_service", service)
+        patch.start()
+        self.addCleanup(patch.stop)
+        app = FastAPI()
+        app.include_router(notifications_admin.router)
+        app.dependency_overrides[require_admin_or_internal] = lambda: {"user_id": "admin"}
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def _until(self, predicate, timeout: float = 2.0) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not predicate():
+            self.assertLess(loop.time(), deadline, "timed out waiting for the broadcast job")
+            await asyncio.sleep(0.01)
+
+    async def test_streams_every_user_in_batches_with_bulk_inserts_and_progress(self) -> None:
+        service = self._service()
+        online_user = str(self.db["users"].docs[10]["_id"])
+        socket = _Socket()
+
+        with mock.patch.dict(in_app_module.websocket_manager.active_connections, {online_user: [socket]}):
+            result = await service.broadcast(
+                "announcement", "Hello", "News", {"type": "all"}, channels=["in_app"], wait=True
+            )
+        self.assertEqual((result["sent_count"], result["failed_count"]), (1234, 0))  # no 10k cap
+
+        notifications = self.db["notifications"]
+        self.assertEqual(len(notifications.docs), 1234)
+        self.assertEqual(
+            [c for c in notifications.calls if c[0] == "insert_many"],
+            [("insert_many", 500, False), ("insert_many", 500, False), ("insert_many", 234, False)],
+        )
+        self.assertNotIn("insert_one", notifications.calls)
+        self.assertEqual(len(socket.messages), 1)  # only connected users get a push
+        self.assertEqual(socket.messages[0]["data"]["metadata"]["broadcast_id"], result["broadcast_id"])
+
+        progress = [c[1] for c in self.db["notification_broadcasts"].calls if c[0] == "update_one"]
+        self.assertEqual([p["processed_count"] for p in progress], [500, 1000, 1234, 1234])
+        self.assertEqual(progress[-1]["status"], "completed")
+        self.assertNotIn("status", progress[0])
+
+    async def test_runs_in_background_with_bounded_per_user_sends(self) -> None:
+        service = self._service()
+
+        started = await service.broadcast(
+            "announcement", "Hello", "News", {"type": "all"}, channels=["in_app", "sms"]
+        )
+        self.assertEqual(started["status"], "in_progress")
+        self.assertEqual(started["user_count"], 1234)
+        await service._jobs[started["broadcast_id"]]
+
+        self.assertEqual(service._jobs, {})
+        self.assertEqual(len(self.sms.sent), 1234)
+        self.assertLessEqual(self.sms.peak, 3)
+        self.assertGreater(self.sms.peak, 1)
+
+        record = self.db["notification_broadcasts"].docs[0]
+        self.assertEqual(str(record["_id"]), started["broadcast_id"])
+        # in_app stored every notification, so an SMS failure alone does not fail the user
+        self.assertEqual((record["status"], record["sent_count"], record["failed_count"]), ("completed", 1234, 0))
+
+    async def test_admin_route_reports_progress_and_interrupted_jobs(self) -> None:
+        service = self._service()
+        self.sms.hold_after = 500  # the second batch stalls on SMS
+        payload = {"title": "Hello", "message": "News", "target": {"type": "all"}, "channels": ["in_app", "sms"]}
+
+        async with self._admin_client(service) as client:
+            started = (await client.post("/__mozaiks/admin/notifications/broadcast", json=payload)).json()
+            broadcast_id = started["broadcast_id"]
+            self.assertEqual(started["status"], "in_progress")
+
+            record = self.db["notification_broadcasts"].docs[0]
+            await self._until(lambda: record.get("processed_count") == 500)
+            details = (await client.get(f"/__mozaiks/admin/notifications/broadcasts/{broadcast_id}")).json()
+            self.assertEqual((details["processed_count"], details["sent_count"]), (500, 500))
+            self.assertEqual(details["status"], "in_progress")
+
+            job = service._jobs[broadcast_id]
+            job.cancel()  # e.g. the app shutting down mid-broadcast
+            with self.assertRaises(asyncio.CancelledError):
+                await job
+            details = (await client.get(f"/__mozaiks/admin/notifications/broadcasts/{broadcast_id}")).json()
+
+        self.assertEqual(service._jobs, {})
+        self.assertEqual((details["status"], details["processed_count"], details["sent_count"]), ("interrupted", 500, 500))
+        self.assertEqual(details["error"], "cancelled")
+        self.assertIn("completed_at", details)
+
+    async def test_no_matching_users_creates_no_record(self) -> None:
+        self.db["users"].docs = []
+        result = await self._service().broadcast("announcement", "Hello", "News", {"type": "all"})
+        self.assertEqual(result["sent_count"], 0)
+        self.assertEqual(self.db["notification_broadcasts"].docs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
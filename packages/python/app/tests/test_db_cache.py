@@ -0,0 +1,114 @@
+# backend/tests/test_db_cache.py
+import asyncio
+import sys
+from pathlib import Path
+import unittest
+from unittest import mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+from mozaiks_infra.config import database  # noqa: E402
+from mozaiks_infra.config.database import DBCache  # noqa: E402
+
+
+class _SlowCollection:
+    def __init__(self, document=None) -> None:
+        self.document = document
+        self.queries = 0
+        self.release = asyncio.Event()
+
+    async def find_one(self, query):
+        self.queries += 1
+        await self.release.wait()
+        return self.document
+
+
+class DBCacheTests(unittest.TestCase):
+    def test_lru_eviction_keeps_recently_used_keys(self) -> None:
+        cache = DBCache(max_size=3)
+        for key in ("a", "b", "c"):
+            cache.set(key, {"k": key})
+        cache.get("a")
+        cache.set("d", {"k": "d"})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"k": "a"})
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self) -> None:
+        cache = DBCache(ttl=10, negative_ttl=1)
+        with mock.patch.object(database.time, "monotonic", return_value=100.0):
+            cache.set("doc", {"v": 1})
+            cache.set("missing", None)
+        with mock.patch.object(database.time, "monotonic", return_value=105.0):
+            self.assertEqual(cache.get("doc"), {"v": 1})
+            self.assertIsNone(cache.get("missing"))
+        stats = cache.stats()
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(len(cache), 1)
+
+
+class DBCacheAsyncTests(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_misses_share_one_query(self) -> None:
+        collection = _SlowCollection({"user_id": "u1", "plan": "pro"})
+        with mock.patch.object(database, "db_cache", DBCache()):
+            lookups = [
+                asyncio.create_task(database.get_cached_document(collection, {"user_id": "u1"}, cache_key="s:u1"))
+                for _ in range(10)
+            ]
+            await asyncio.sleep(0)
+            collection.release.set()
+            results = await asyncio.gather(*lookups)
+            again = await database.get_cached_document(collection, {"user_id": "u1"}, cache_key="s:u1")
+            stats = database.db_cache.stats()
+
+        self.assertEqual(collection.queries, 1)
+        self.assertTrue(all(r == {"user_id": "u1", "plan": "pro"} for r in results))
+        self.assertEqual(again["plan"], "pro")
+        self.assertEqual(stats["coalesced"], 9)
+        self.assertEqual(stats["hits"], 1)
+
+    async def test_negative_caching_is_opt_in(self) -> None:
+        collection = _SlowCollection(None)
+        collection.release.set()
+        with mock.patch.object(database, "db_cache", DBCache()):
+            for _ in range(2):
+                await database.get_cached_document(collection, {"user_id": "x"}, cache_key="a:x")
+            for _ in range(2):
+                await database.get_cached_document(collection, {"user_id": "x"}, cache_key="b:x", cache_missing=True)
+
+        self.assertEqual(collection.queries, 3)
+
+    async def test_invalidation_during_load_skips_caching_stale_read(self) -> None:
+        collection = _SlowCollection({"plan": "free"})
+        with mock.patch.object(database, "db_cache", DBCache()):
+            lookup = asyncio.create_task(database.get_cached_document(collection, {}, cache_key="s:u1"))
+            await asyncio.sleep(0)
+            database.db_cache.invalidate("s:u1")
+            collection.release.set()
+            await lookup
+            self.assertEqual(len(database.db_cache), 0)
+
+    async def test_published_invalidations_are_tracked_until_written(self) -> None:
+        written = []
+        gate = asyncio.Event()
+
+        class _Invalidations:
+            async def insert_one(self, doc):
+                await gate.wait()
+                written.append(doc["key"])
+
+        with mock.patch.object(database, "db", {database.CACHE_INVALIDATION_COLLECTION: _Invalidations()}):
+            database._publish_invalidation("s:u1")
+            self.assertEqual(len(database._publish_tasks), 1)
+            gate.set()
+            await asyncio.wait(list(database._publish_tasks))
+
+        self.assertEqual(written, ["s:u1"])
+        self.assertEqual(database._publish_tasks, set())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+# backend/tests/test_event_bus.py
+import asyncio
+import sys
+import threading
+from pathlib import Path
+import unittest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+from mozaiks_infra.event_bus import EventBus  # noqa: E402
+from mozaiks_infra.events.stream_broker import EmbeddedStreamBroker  # noqa: E402
+from mozaiks_infra.events.stream_bus import RedisStreamEventBus  # noqa: E402
+from mozaiks_infra.utils.resp_client import RespClient  # noqa: E402
+
+
+class EventBusTests(unittest.TestCase):
+    def test_history_is_bounded_per_event_type(self) -> None:
+        bus = EventBus()
+        bus.max_history_per_event = 3
+        for i in range(10):
+            bus.publish("tick", {"i": i})
+
+        history = bus.get_event_history("tick", limit=10)["tick"]
+        self.assertEqual([record["data"]["i"] for record in history], [7, 8, 9])
+        self.assertEqual(bus.get_stats()["events_by_type"]["tick"], 10)
+
+    def test_publishing_from_threads_keeps_exact_counts(self) -> None:
+        bus = EventBus()
+        bus.max_history_per_event = 5
+        # A sync subscriber that publishes again must not deadlock on the bus lock.
+        bus.subscribe("tick", lambda data: bus.publish("tock", data))
+        previous = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, previous)
+
+        def publisher():
+            for i in range(2000):
+                bus.publish("tick", {"i": i})
+                bus.get_event_history(limit=5)
+
+        threads = [threading.Thread(target=publisher) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = bus.get_stats()
+        self.assertEqual(stats["events_published"], 32000)
+        self.assertEqual(stats["events_by_type"], {"tick": 16000, "tock": 16000})
+        self.assertEqual(stats["events_delivered"], 16000)
+        self.assertEqual(stats["latency_ms"]["tick"]["count"], 16000)
+        self.assertEqual(len(bus.get_event_history("tock")["tock"]), 5)
+
+
+class EventBusAsyncTests(unittest.IsolatedAsyncioTestCase):
+    async def test_async_subscribers_use_bounded_worker_pool(self) -> None:
+        bus = EventBus(workers=2)
+        running = 0
+        peak = 0
+        delivered = []
+
+        async def handler(data):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            delivered.append(data["i"])
+            running -= 1
+
+        bus.subscribe("job", handler)
+        for i in range(20):
+            bus.publish("job", {"i": i})
+        drained = await bus.drain(timeout=2)
+        stats = bus.get_stats()
+        await bus.close()
+
+        self.assertTrue(drained)
+        self.assertLessEqual(peak, 2)
+        self.assertEqual(sorted(delivered), list(range(20)))
+        self.assertEqual(stats["events_delivered"], 20)
+        self.assertEqual(stats["latency_ms"]["job"]["count"], 20)
+        self.assertEqual(sum(stats["latency_ms"]["job"]["buckets"].values()), 20)
+
+    async def test_full_queue_drops_instead_of_growing(self) -> None:
+        bus = EventBus(workers=1, queue_max=5)
+
+        async def handler(data):
+            await asyncio.sleep(0)
+
+        bus.subscribe("burst", handler)
+        for i in range(50):
+            bus.publish("burst", {"i": i})
+        dropped = bus.get_stats()["events_dropped"]
+        await bus.drain(timeout=2)
+        await bus.close()
+
+        self.assertEqual(dropped, 45)
+
+
+class RedisStreamEventBusTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.broker = EmbeddedStreamBroker().start()
+        self.raw = RespClient.from_url(self.broker.url, timeout_s=1.0)
+
+    def tearDown(self) -> None:
+        self.raw.close()
+        self.broker.stop()
+
+    def _bus(self, **kwargs) -> RedisStreamEventBus:
+        return RedisStreamEventBus.from_url(self.broker.url, block_ms=50, **kwargs)
+
+    async def _wait_for(self, predicate, timeout=3.0) -> None:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not predicate():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("condition not met before timeout")
+            await asyncio.sleep(0.01)
+
+    def _pending(self, group) -> int:
+        return self.raw.execute("XPENDING", "mozaiks:events", group)[0]
+
+    async def test_events_reach_other_processes_once(self) -> None:
+        worker_a, worker_b = self._bus(), self._bus()
+        seen_a, seen_b = [], []
+        worker_a.subscribe("theme_changed", lambda data: seen_a.append(data["theme"]))
+        worker_b.subscribe("theme_changed", lambda data: seen_b.append(data["theme"]))
+        await worker_a.connect()
+        await worker_b.connect()
+        await self._wait_for(lambda: worker_a._reader.ready and worker_b._reader.ready)
+
+        for theme in ("dark", "light", "solarized"):
+            worker_a.publish("theme_changed", {"user_id": "u1", "theme": theme})
+        await self._wait_for(lambda: len(seen_b) == 3)
+        await asyncio.sleep(0.1)  # give worker_a time to (not) see its own events again
+        stats = worker_a.get_stats()["stream"]
+        await worker_a.close()
+        await worker_b.close()
+
+        self.assertEqual(seen_a, ["dark", "light", "solarized"])
+        self.assertEqual(seen_b, ["dark", "light", "solarized"])
+        self.assertEqual(stats["events_forwarded"], 3)
+        self.assertLess(stats["forward_batches"], 3)
+
+    async def test_unacknowledged_events_are_redelivered_after_restart(self) -> None:
+        self.raw.execute("XGROUP", "CREATE", "mozaiks:events", "app", "$", "MKSTREAM")
+        for plan in ("free", "pro"):
+            self.raw.execute("XADD", "mozaiks:events", "*", "event", "subscription_updated",
+                             "data", '{"plan": "%s"}' % plan, "origin", "elsewhere", "ts", "0")
+        # A consumer that read the batch and then died before acknowledging it
+        self.raw.execute("XREADGROUP", "GROUP", "app", "worker-1", "COUNT", 10, "STREAMS", "mozaiks:events", ">")
+
+        bus = self._bus(group="app", consumer="worker-1")
+        plans = []
+        bus.subscribe("subscription_updated", lambda data: plans.append(data["plan"]))
+        await bus.connect()
+        await self._wait_for(lambda: len(plans) == 2)
+        stats = bus.get_stats()["stream"]
+        await bus.close()
+
+        self.assertEqual(plans, ["free", "pro"])
+        self.assertEqual(stats["events_redelivered"], 2)
+        self.assertEqual(self._pending("app"), 0)
+
+    async def test_remote_events_are_acknowledged_after_async_handlers_finish(self) -> None:
+        publisher = self._bus()
+        consumer = self._bus(group="app", consumer="worker-1", queue_max=1)
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(data):
+            await release.wait()
+            handled.append(data["plan"])
+
+        consumer.subscribe("subscription_updated", handler)
+        await publisher.connect()
+        await consumer.connect()
+        await self._wait_for(lambda: consumer._reader.ready)  # the group starts at "$"
+        for plan in ("free", "pro", "team"):
+            publisher.publish("subscription_updated", {"plan": plan})
+        await self._wait_for(lambda: self._pending("app") == 3)
+        await asyncio.sleep(0.1)
+        self.assertEqual(self._pending("app"), 3)  # still running, so not acknowledged
+
+        release.set()
+        await self._wait_for(lambda: self._pending("app") == 0)
+        stats = consumer.get_stats()
+        await publisher.close()
+        await consumer.close()
+
+        # Remote deliveries are awaited, not queued, so a tiny queue drops nothing
+        self.assertEqual(handled, ["free", "pro", "team"])
+        self.assertEqual(stats["events_dropped"], 0)
+
+    async def test_shared_handlers_run_once_across_processes(self) -> None:
+        workers = [self._bus(), self._bus(), self._bus()]
+        broadcast, shared = [], []
+
+        async def notify(data):
+            shared.append(data["plan"])
+
+        for worker in workers:
+            worker.subscribe("subscription_updated", lambda data: broadcast.append(data["plan"]))
+            worker.subscribe("subscription_updated", notify, shared=True)
+            await worker.connect()
+        self.assertNotIn(notify, workers[0].subscribers["subscription_updated"])
+
+        for plan in ("free", "pro", "team", "enterprise"):
+            workers[0].publish("subscription_updated", {"plan": plan})
+        await self._wait_for(lambda: len(broadcast) == 12 and len(shared) == 4)
+        await asyncio.sleep(0.2)  # no worker runs the shared handler a second time
+        for worker in workers:
+            await worker.close()
+
+        self.assertEqual(sorted(shared), ["enterprise", "free", "pro", "team"])
+        self.assertEqual(self._pending("mozaiks:shared"), 0)
+
+    async def test_shared_handlers_run_locally_until_connected(self) -> None:
+        bus = self._bus()
+        calls = []
+        bus.subscribe("plugin_settings_updated", lambda data: calls.append(data), shared=True)
+        bus.publish("plugin_settings_updated", {"plugin": "notes"})
+        self.assertEqual(calls, [{"plugin": "notes"}])
+
+        await bus.connect()
+        await bus.flush(timeout=1.0)
+        await asyncio.sleep(0.2)  # the forwarded copy is not handled again by the shared group
+        await bus.close()
+        self.assertEqual(len(calls), 1)
+
+    async def test_abandoned_ephemeral_groups_are_removed(self) -> None:
+        self.raw.execute("XGROUP", "CREATE", "mozaiks:events", "mozaiks:ephemeral:gone:1:abcd", "$", "MKSTREAM")
+        self.raw.execute("XGROUP", "CREATE", "mozaiks:events", "app", "$")
+        for group in ("mozaiks:ephemeral:gone:1:abcd", "app"):
+            self.raw.execute("XREADGROUP", "GROUP", group, "dead", "COUNT", 1, "STREAMS", "mozaiks:events", ">")
+        await asyncio.sleep(0.1)
+
+        bus = self._bus(claim_idle_ms=50, group_idle_ms=50)
+        await bus.connect()
+        await self._wait_for(lambda: bus.get_stats()["stream"]["groups_expired"] == 1)
+        names = {info[1] for info in self.raw.execute("XINFO", "GROUPS", "mozaiks:events")}
+        await bus.close()
+
+        self.assertNotIn(b"mozaiks:ephemeral:gone:1:abcd", names)
+        self.assertIn(b"app", names)  # configured groups are never removed
+        self.assertIn(bus.group.encode(), names)
+
+    async def test_events_are_buffered_while_server_is_unreachable(self) -> None:
+        bus = self._bus()
+        delivered = []
+        bus.subscribe("plugin_executed", lambda data: delivered.append(data))
+        self.raw.close()
+        self.broker.stop()
+        await bus.connect()
+        bus.publish("plugin_executed", {"plugin": "notes", "user": "u1"})
+        flushed = await bus.flush(timeout=0.2)
+        stats = bus.get_stats()["stream"]
+        await bus.close()
+
+        self.assertEqual(len(delivered), 1)
+        self.assertFalse(flushed)
+        self.assertEqual(stats["outbox_depth"], 1)
+        self.assertGreaterEqual(stats["forward_errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
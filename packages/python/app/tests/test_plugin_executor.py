@@ -0,0 +1,125 @@
+# backend/tests/test_plugin_executor.py
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+from pathlib import Path
+import unittest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from mozaiks_platform.plugin_executor import (  # noqa: E402
+    MODE_PROCESS,
+    PluginBusyError,
+    PluginExecutor,
+)
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def process_plugin(data):
+    return {"pid": os.getpid(), "total": sum(data["values"])}
+
+
+class PluginExecutorTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.executor = PluginExecutor(thread_workers=4, process_workers=1, max_concurrency=2, queue_limit=1)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+
+    async def test_slow_sync_plugin_runs_off_the_loop_and_times_out(self) -> None:
+        release = threading.Event()
+        self.addCleanup(release.set)
+        ticks = 0
+
+        def slow_plugin(data):
+            release.wait(5)
+            return {"ok": True}
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.executor.run("slow", slow_plugin, {}, timeout_seconds=0.2)
+        ticking.cancel()
+        self.assertGreater(ticks, 5)  # the loop kept serving while the plugin blocked
+
+        stats = self.executor.get_metrics()["plugins"]["slow"]
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["overrunning"], 1)
+        self.assertEqual(stats["running"], 1)  # the slot stays held until the thread returns
+
+    async def test_per_plugin_limit_queues_then_rejects(self) -> None:
+        started = 0
+        peak = 0
+
+        async def busy_plugin(data):
+            nonlocal started, peak
+            started += 1
+            peak = max(peak, self.executor.get_metrics()["plugins"]["busy"]["running"])
+            await asyncio.sleep(0.05)
+            return data["n"]
+
+        calls = [self.executor.run("busy", busy_plugin, {"n": n}, timeout_seconds=1) for n in range(4)]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        self.assertEqual(results[:3], [0, 1, 2])  # two running, one queued
+        self.assertIsInstance(results[3], PluginBusyError)
+        self.assertEqual(peak, 2)
+
+        stats = self.executor.get_metrics()["plugins"]["busy"]
+        self.assertEqual((stats["calls"], stats["completed"], stats["rejected"]), (4, 3, 1))
+        self.assertGreaterEqual(stats["queue_wait_seconds_max"], 0.04)
+        self.assertEqual((stats["running"], stats["queued"]), (0, 0))
+
+    async def test_errors_are_counted_and_sync_plugins_can_run_in_a_process(self) -> None:
+        def broken_plugin(data):
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            await self.executor.run("broken", broken_plugin, {}, timeout_seconds=1)
+        result = await self.executor.run(
+            "cpu", process_plugin, {"values": [1, 2, 3]}, timeout_seconds=10, mode=MODE_PROCESS
+        )
+
+        self.assertEqual(result["total"], 6)
+        self.assertNotEqual(result["pid"], os.getpid())
+        metrics = self.executor.get_metrics()["plugins"]
+        self.assertEqual(metrics["broken"]["errors"], 1)
+        self.assertEqual(metrics["cpu"]["completed"], 1)
+
+    async def test_sync_plugins_see_the_callers_context(self) -> None:
+        def context_plugin(data):
+            return {"request_id": request_id.get(), "thread": threading.get_ident()}
+
+        request_id.set("req-1")
+        result = await self.executor.run("ctx", context_plugin, {}, timeout_seconds=1)
+
+        self.assertEqual(result["request_id"], "req-1")
+        self.assertNotEqual(result["thread"], threading.get_ident())
+
+    async def test_concurrent_requests_keep_their_own_context(self) -> None:
+        both_started = threading.Barrier(2, timeout=2)
+
+        def context_plugin(data):
+            both_started.wait()  # both calls are on worker threads at once
+            return request_id.get()
+
+        async def handle(rid):
+            request_id.set(rid)
+            return await self.executor.run("ctx", context_plugin, {}, timeout_seconds=2)
+
+        results = await asyncio.gather(asyncio.create_task(handle("a")), asyncio.create_task(handle("b")))
+        self.assertEqual(results, ["a", "b"])
+        self.assertIsNone(request_id.get())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# backend/tests/test_plugin_registry.py
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import unittest
+from unittest import mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from mozaiks_platform.plugin_registry import (  # noqa: E402
+    ERROR_NOT_FOUND,
+    PluginRegistryIndex,
+)
+
+
+def _write(path: Path, registry) -> None:
+    previous = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(registry if isinstance(registry, str) else json.dumps(registry), encoding="utf-8")
+    # Make every write visible to the mtime check, even within one timestamp tick.
+    os.utime(path, ns=(time.time_ns(), max(time.time_ns(), previous + 1_000_000)))
+
+
+async def _until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the registry watcher")
+        await asyncio.sleep(0.01)
+
+
+class PluginRegistryIndexTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "plugin_registry.json"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_lookups_are_served_from_memory(self) -> None:
+        _write(self.path, {"plugins": [
+            {"name": "notes", "backend": "plugins.notes.logic"},
+            {"name": "billing", "enabled": False},
+            {"name": "notes", "backend": "plugins.duplicate.logic"},
+        ]})
+        index = PluginRegistryIndex(self.path)
+        self.assertTrue(index.reload())
+
+        with mock.patch("builtins.open", side_effect=AssertionError("disk read on lookup")):
+            self.assertTrue(index.is_enabled("notes"))
+            self.assertFalse(index.is_enabled("billing"))
+            self.assertFalse(index.is_enabled("missing"))
+            self.assertEqual(index.get("notes")["backend"], "plugins.notes.logic")
+            self.assertEqual(index.get("billing"), {"name": "billing", "enabled": False})
+            self.assertNotIn("billing", {p["name"] for p in index.enabled_plugins()})
+            self.assertFalse(index.reload())  # unchanged file: stat only
+
+    async def test_watcher_swaps_in_changes_and_keeps_the_last_good_snapshot(self) -> None:
+        _write(self.path, {"plugins": [{"name": "notes"}]})
+        index = PluginRegistryIndex(self.path, poll_interval_s=0.02)
+        await index.start()
+        self.addAsyncCleanup(index.stop)
+        first = index.snapshot
+        self.assertTrue(index.is_enabled("notes"))
+
+        _write(self.path, {"plugins": [{"name": "notes"}, {"name": "tasks"}]})
+        await _until(lambda: index.is_enabled("tasks"))
+        self.assertIsNot(index.snapshot, first)
+
+        _write(self.path, '{"plugins": [')  # half-written file
+        await _until(lambda: index.get_metrics()["parse_errors"] == 1)
+        await asyncio.sleep(0.1)
+        self.assertTrue(index.is_enabled("tasks"))
+        self.assertEqual(index.get_metrics()["parse_errors"], 1)  # not re-read every poll
+
+        self.path.unlink()
+        await _until(lambda: index.snapshot.error == ERROR_NOT_FOUND)
+        self.assertFalse(index.is_enabled("tasks"))
+        await index.stop()
+        self.assertFalse(index.get_metrics()["watching"])
+
+    def test_published_registry_is_not_read_back(self) -> None:
+        index = PluginRegistryIndex(self.path)
+        self.assertEqual(index.snapshot.error, ERROR_NOT_FOUND)
+
+        registry = {"plugins": [{"name": "notes", "enabled": True}]}
+        _write(self.path, registry)
+        index.publish(registry)
+        self.assertTrue(index.is_enabled("notes"))
+        self.assertFalse(index.reload())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+# backend/tests/test_rate_limit.py
+import asyncio
+import hashlib
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+import unittest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+from fastapi import HTTPException  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from mozaiks_infra.security import rate_limit as rate_limit_module  # noqa: E402
+from mozaiks_infra.security.rate_limit import (  # noqa: E402
+    InMemoryRateLimiter,
+    RateLimitPolicy,
+    RedisRateLimiter,
+    RespClient,
+    enforce_rate_limit,
+    set_rate_limiter,
+)
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _StandInRedis(socketserver.ThreadingTCPServer):
+    """Local Redis-protocol stand-in: runs the limiter script's GCRA in Python."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.store: dict[bytes, int] = {}
+        self.scripts: set[str] = set()
+        self.lock = threading.Lock()
+        self.commands: list[str] = []
+        self.delay_s = 0.0
+
+    def gcra(self, key: bytes, emission: int, window: int) -> list[int]:
+        with self.lock:
+            now = int(time.time() * 1_000_000)
+            tat = max(self.store.get(key, now), now)
+            new_tat = tat + emission
+            allow_at = new_tat - window
+            if now < allow_at:
+                return [0, allow_at - now]
+            self.store[key] = new_tat
+            return [1, 0]
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                size = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(size + 2)[:-2])
+            self.wfile.write(self._dispatch(args))
+
+    def _dispatch(self, args: list) -> bytes:
+        server: _StandInRedis = self.server
+        command = args[0].decode().upper()
+        server.commands.append(command)
+        time.sleep(server.delay_s)
+        if command == "PING":
+            return b"+PONG\r\n"
+        if command in ("EVAL", "EVALSHA"):
+            if command == "EVAL":
+                sha = hashlib.sha1(args[1]).hexdigest()
+                server.scripts.add(sha)
+            elif args[1].decode() not in server.scripts:
+                return b"-NOSCRIPT No matching script.\r\n"
+            allowed, retry = server.gcra(args[3], int(args[4]), int(args[5]))
+            return b"*2\r\n:%d\r\n:%d\r\n" % (allowed, retry)
+        return b"-ERR unknown command\r\n"
+
+
+class InMemoryRateLimiterTests(unittest.TestCase):
+    def test_allows_burst_up_to_limit_then_refills(self) -> None:
+        clock = _FakeClock()
+        limiter = InMemoryRateLimiter(clock=clock)
+        results = [limiter.allow("k", limit=3, window_s=60) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        denied = limiter.check("k", limit=3, window_s=60)
+        self.assertAlmostEqual(denied.retry_after_s, 20.0)
+
+        clock.now += 20.0
+        self.assertTrue(limiter.allow("k", limit=3, window_s=60))
+        self.assertFalse(limiter.allow("k", limit=3, window_s=60))
+
+    def test_idle_keys_are_swept(self) -> None:
+        clock = _FakeClock()
+        limiter = InMemoryRateLimiter(sweep_interval_s=30, clock=clock)
+        for i in range(100):
+            limiter.allow(f"ip-{i}", limit=5, window_s=10)
+        self.assertEqual(len(limiter), 100)
+
+        clock.now += 31.0
+        limiter.allow("fresh", limit=5, window_s=10)
+        self.assertEqual(len(limiter), 1)
+
+
+class RedisRateLimiterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = _StandInRedis()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.url = f"redis://{host}:{port}/0"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_limit_is_shared_across_workers(self) -> None:
+        workers = [RedisRateLimiter(RespClient.from_url(self.url, timeout_s=1.0)) for _ in range(3)]
+        results = [workers[i % 3].allow("pay:1.2.3.4:-", limit=5, window_s=60) for i in range(9)]
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(results[:5], [True] * 5)
+
+        denied = workers[0].check("pay:1.2.3.4:-", limit=5, window_s=60)
+        self.assertFalse(denied.allowed)
+        self.assertGreater(denied.retry_after_s, 0)
+        # The first EVALSHA misses and loads the script via EVAL; every later call reuses it
+        self.assertEqual(self.server.commands.count("EVAL"), 1)
+
+    def test_unreachable_backend_falls_back_to_local_limits(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        limiter = RedisRateLimiter(RespClient.from_url(self.url, timeout_s=0.2))
+        results = [limiter.allow("k", limit=2, window_s=60) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+
+
+class AsyncRateLimitTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.server = _StandInRedis()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.limiter = RedisRateLimiter(RespClient.from_url(f"redis://{host}:{port}/0", timeout_s=1.0))
+        previous = rate_limit_module.rate_limiter
+        set_rate_limiter(self.limiter)
+        self.addCleanup(set_rate_limiter, previous)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def test_backend_round_trip_does_not_block_the_event_loop(self) -> None:
+        self.server.delay_s = 0.2
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        decision = await self.limiter.acheck("k", limit=2, window_s=60)
+        task.cancel()
+        self.assertTrue(decision.allowed)
+        self.assertGreaterEqual(ticks, 5)
+
+    async def test_enforce_rate_limit_raises_429_with_retry_after(self) -> None:
+        request = Request({"type": "http", "client": ("1.2.3.4", 1234), "headers": []})
+        policy = RateLimitPolicy(limit=2, window_s=60)
+        await enforce_rate_limit(request, bucket="pay", policy=policy)
+        await enforce_rate_limit(request, bucket="pay", policy=policy)
+        with self.assertRaises(HTTPException) as ctx:
+            await enforce_rate_limit(request, bucket="pay", policy=policy)
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(ctx.exception.headers["Retry-After"], "30")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+# backend/tests/test_state_manager.py
+import fnmatch
+import threading
+from datetime import datetime
+import sys
+from pathlib import Path
+import unittest
+from unittest import mock
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+from mozaiks_infra import state_manager as state_module  # noqa: E402
+from mozaiks_infra.state_manager import RedisStateBackend, StateManager  # noqa: E402
+
+
+class _DictClient:
+    """In-memory stand-in for RespClient covering the commands the backend issues."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.down = False
+
+    def execute(self, command, *args):
+        if self.down:
+            raise ConnectionError("backend down")
+        if command == "SET":
+            self.data[args[0]] = args[1].encode()
+            return "OK"
+        if command == "GET":
+            return self.data.get(args[0])
+        if command == "MGET":
+            return [self.data.get(key) for key in args]
+        if command == "DEL":
+            return sum(1 for key in args if self.data.pop(key, None) is not None)
+        if command == "SCAN":
+            pattern = args[2].replace("\\*", "*")
+            return [b"0", [key.encode() for key in self.data if fnmatch.fnmatchcase(key, pattern)]]
+        raise AssertionError(f"unexpected command {command}")
+
+    def pipeline(self, commands):
+        return [self.execute(*command) for command in commands]
+
+
+class StateManagerTests(unittest.TestCase):
+    def test_write_only_keys_are_swept_without_reads(self) -> None:
+        manager = StateManager(stripes=4, sweep_interval_s=10)
+        with mock.patch.object(state_module.time, "monotonic", return_value=100.0):
+            for i in range(50):
+                manager.set(f"ctx:{i}", {"claims": i}, expire_in=5)
+            manager.set("forever", 1)
+        self.assertEqual(manager.stats()["keys"], 51)
+        self.assertGreater(manager.stats()["approx_bytes"], 0)
+
+        with mock.patch.object(state_module.time, "monotonic", return_value=106.0):
+            self.assertEqual(manager.sweep_expired(), 50)
+            self.assertEqual(manager.get("forever"), 1)
+        stats = manager.stats()
+        self.assertEqual(stats["keys"], 1)
+        self.assertEqual(stats["pending_expiries"], 0)
+
+    def test_reset_key_keeps_latest_expiry(self) -> None:
+        manager = StateManager(stripes=2)
+        with mock.patch.object(state_module.time, "monotonic", return_value=0.0):
+            manager.set("k", "old", expire_in=1)
+            manager.set("k", "new", expire_in=100)
+        with mock.patch.object(state_module.time, "monotonic", return_value=50.0):
+            manager.sweep_expired()
+            self.assertEqual(manager.get("k"), "new")
+
+    def test_bulk_and_prefix_operations(self) -> None:
+        manager = StateManager()
+        manager.mset({"plugin_access:u1:a": True, "plugin_access:u1:b": False, "plugin_access:u2:a": True})
+        self.assertEqual(
+            manager.mget(["plugin_access:u1:a", "plugin_access:u1:b", "missing"]),
+            {"plugin_access:u1:a": True, "plugin_access:u1:b": False},
+        )
+        self.assertEqual(manager.delete_prefix("plugin_access:u1:"), 2)
+        self.assertEqual(manager.keys("plugin_access:"), ["plugin_access:u2:a"])
+
+
+class RedisStateBackendTests(unittest.TestCase):
+    def test_workers_share_state_through_backend(self) -> None:
+        client = _DictClient()
+        worker_a = StateManager(backend=RedisStateBackend(client))
+        worker_b = StateManager(backend=RedisStateBackend(client))
+
+        worker_a.set("navigation:u1", [{"name": "home"}], expire_in=60)
+        worker_a.mset({"theme_u1": "dark", "theme_u2": "light"})
+        self.assertEqual(worker_b.get("navigation:u1"), [{"name": "home"}])
+        self.assertEqual(worker_b.mget(["theme_u1", "theme_u3"]), {"theme_u1": "dark"})
+
+        worker_b.delete_prefix("theme_")
+        self.assertIsNone(worker_a.get("theme_u2"))
+
+    def test_falls_back_to_local_state_when_backend_is_down(self) -> None:
+        client = _DictClient()
+        client.down = True
+        manager = StateManager(backend=RedisStateBackend(client))
+        manager.set("k", "v")
+        self.assertEqual(manager.get("k"), "v")
+        self.assertGreaterEqual(manager.stats()["backend_errors"], 2)
+
+
+
+class _ThreadRecordingClient(_DictClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads: set[str] = set()
+
+    def execute(self, command, *args):
+        self.threads.add(threading.current_thread().name)
+        return super().execute(command, *args)
+
+
+class AsyncStateManagerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_async_methods_run_backend_calls_off_the_loop(self) -> None:
+        client = _ThreadRecordingClient()
+        manager = StateManager(backend=RedisStateBackend(client))
+
+        await manager.aset("plugin_access:u1:a", True, expire_in=60)
+        await manager.amset({"plugin_access:u1:b": False, "plugin_access:u2:a": True})
+        self.assertEqual(await manager.aget("plugin_access:u1:a"), True)
+        self.assertEqual(await manager.amget(["plugin_access:u1:b", "missing"]), {"plugin_access:u1:b": False})
+        self.assertEqual(await manager.adelete_prefix("plugin_access:u1:"), 2)
+        self.assertEqual(await manager.akeys("plugin_access:"), ["plugin_access:u2:a"])
+        await manager.adelete("plugin_access:u2:a")
+
+        self.assertNotIn(threading.current_thread().name, client.threads)
+        self.assertEqual(client.data, {})
+
+    async def test_shared_backend_returns_json_forms(self) -> None:
+        manager = StateManager(backend=RedisStateBackend(_DictClient()))
+        created = datetime(2026, 1, 2, 3, 4, 5)
+        await manager.aset("user_profile:u1", {"created_at": created, "tags": ("a", "b")})
+        self.assertEqual(
+            await manager.aget("user_profile:u1"),
+            {"created_at": "2026-01-02T03:04:05", "tags": ["a", "b"]},
+        )
+
+    async def test_memory_store_async_methods_stay_inline(self) -> None:
+        manager = StateManager()
+        await manager.aset("k", {"v": 1})
+        self.assertEqual(await manager.akeys(""), ["k"])
+        self.assertEqual(await manager.adelete_prefix(""), 1)
+        self.assertIsNone(await manager.aget("k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -334,6 +334,52 @@ class TestAG2TransitionIntegration:
             pytest.skip(f"AG2 ReplyResultTransitionEvent setup failed: {e}")
 
 
+# ---------------------------------------------------------------------------
+# Builder registry / memoized lookups
+# ---------------------------------------------------------------------------
+
+class TestBuilderRegistry:
+    """The AG2 class registry and structured-output lookups are resolved once."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_caches(self):
+        from mozaiks_ai.runtime.events import event_serialization
+
+        event_serialization.clear_event_builder_caches()
+        yield event_serialization
+        event_serialization.clear_event_builder_caches()
+
+    def test_builder_resolved_once_per_event_class(self, fresh_caches, mock_ctx):
+        agent_events = pytest.importorskip("autogen.events.agent_events")
+        ev = agent_events.GroupChatResumeEvent.model_construct(uuid="r1")
+
+        first = build_ui_event_payload(ev=ev, ctx=mock_ctx)
+        second = build_ui_event_payload(ev=ev, ctx=mock_ctx)
+
+        assert first["kind"] == second["kind"] == "resume_boundary"
+        assert fresh_caches._BUILDERS_BY_CLASS[type(ev)] is not None
+
+    def test_structured_output_lookup_is_memoized(self, fresh_caches, mock_ctx):
+        agent_events = pytest.importorskip("autogen.events.agent_events")
+        calls = []
+
+        def has_structured(workflow_name, agent):
+            calls.append((workflow_name, agent))
+            return True
+
+        fresh_caches._structured_helpers = (has_structured, lambda wf, agent: {"title": "str"})
+        fresh_caches._json_extractor = lambda text: {"title": "Plan"}
+        ev = agent_events.TextEvent.model_construct(uuid="t1", content='{"title": "Plan"}')
+        # model_construct drops ``sender`` on some ag2 versions; set it directly.
+        object.__setattr__(ev, "sender", "PlannerAgent")
+
+        payloads = [build_ui_event_payload(ev=ev, ctx=mock_ctx) for _ in range(3)]
+
+        assert calls == [("TestWorkflow", "PlannerAgent")]
+        assert all(p["structured_output"] == {"title": "Plan"} for p in payloads)
+        assert all(p["structured_schema"] == {"title": "str"} for p in payloads)
+
+
 # ---------------------------------------------------------------------------
 # Run with pytest
 # ---------------------------------------------------------------------------
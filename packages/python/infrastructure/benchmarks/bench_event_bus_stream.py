@@ -0,0 +1,115 @@
+"""Event bus publish latency and cross-worker throughput.
+
+Times ``publish`` on the in-process bus and on the Redis Streams bus, then
+measures how long events take to reach a second bus instance (a stand-in for
+another uvicorn worker) and the sustained end-to-end rate. Uses the embedded
+stream broker unless ``--url`` points at a real Redis (>= 6.2).
+
+Usage:
+    python benchmarks/bench_event_bus_stream.py [--events 20000] [--url redis://localhost:6379/0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mozaiks_infra.events.bus_base import InMemoryEventBus  # noqa: E402
+from mozaiks_infra.events.stream_broker import EmbeddedStreamBroker  # noqa: E402
+from mozaiks_infra.events.stream_bus import RedisStreamEventBus  # noqa: E402
+
+
+def _payload(i: int) -> dict:
+    return {"user_id": f"user-{i % 500}", "plan": "pro", "sequence": i, "source": "billing"}
+
+
+def _publish_us(bus, events: int) -> list[float]:
+    samples = []
+    for i in range(events):
+        start = time.perf_counter()
+        bus.publish("subscription_updated", _payload(i))
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<28} p50 {statistics.median(samples):>8.1f} us   p99 {p99:>8.1f} us")
+
+
+async def main(events: int, url: str | None, batch_max: int) -> None:
+    _report("publish (in-memory)", _publish_us(InMemoryEventBus(), events))
+
+    broker = None
+    if url is None:
+        broker = EmbeddedStreamBroker().start()
+        url = broker.url
+    try:
+        publisher = RedisStreamEventBus.from_url(url, stream="bench:events", batch_max=batch_max, block_ms=100)
+        consumer = RedisStreamEventBus.from_url(url, stream="bench:events", batch_max=batch_max, block_ms=100)
+        received = 0
+        done = asyncio.Event()
+        arrived = asyncio.Event()
+
+        def on_event(data):
+            nonlocal received
+            received += 1
+            arrived.set()
+            if received == events:
+                done.set()
+
+        consumer.subscribe("subscription_updated", on_event)
+        await publisher.connect()
+        await consumer.connect()
+        while not consumer._reader.ready:
+            await asyncio.sleep(0.01)
+
+        # Idle round trip: one event at a time, publish to delivery on the other worker
+        round_trips = []
+        for i in range(min(200, events)):
+            arrived.clear()
+            start = time.perf_counter()
+            publisher.publish("subscription_updated", _payload(i))
+            await arrived.wait()
+            round_trips.append((time.perf_counter() - start) * 1_000_000)
+        _report("round trip (idle)", round_trips)
+        received = 0
+        publisher.reset_stats()
+        consumer.reset_stats()
+
+        start = time.perf_counter()
+        _report(f"publish (stream, batch {batch_max})", _publish_us(publisher, events))
+        await publisher.flush()
+        forwarded = time.perf_counter() - start
+        await asyncio.wait_for(done.wait(), timeout=max(60.0, events / 100))
+        elapsed = time.perf_counter() - start
+
+        stats = publisher.get_stats()["stream"]
+        latency = consumer.get_stats()["stream"]["remote_latency_ms"]
+        print(f"{'forwarded to stream':<28} {events / forwarded:>12,.0f} ev/s   "
+              f"({stats['forward_batches']} batches, avg {events / max(1, stats['forward_batches']):.1f})")
+        print(f"{'delivered to 2nd worker':<28} {events / elapsed:>12,.0f} ev/s   "
+              f"burst latency p50 <= {latency['p50_ms']} ms, p99 <= {latency['p99_ms']} ms")
+        await publisher.close()
+        await consumer.close()
+    finally:
+        if broker is not None:
+            broker.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--url", default=None, help="Redis URL (default: embedded broker)")
+    parser.add_argument("--batch-max", type=int, default=128)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.url, args.batch_max))
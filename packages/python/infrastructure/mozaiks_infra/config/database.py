@@ -2,8 +2,12 @@
 import os
 import logging
 import asyncio
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
 from dotenv import load_dotenv
 import functools
 import time
@@ -290,38 +294,142 @@ async def initialize_database():
         await create_token_usage_indexes()
 
 # Cache for frequently accessed database lookups
+_MISSING = object()
+
+
 class DBCache:
-    def __init__(self, max_size=1000, ttl=300):
-        self.cache = {}
-        self.max_size = max_size
+    """LRU + TTL cache for document lookups.
+
+    - O(1) get/set/evict (OrderedDict kept in recency order)
+    - Negative entries (document not found) with their own, shorter TTL
+    - Single-flight loading: concurrent misses for one key share a single query
+    - Hit/miss/eviction counters via ``stats()``
+    """
+
+    def __init__(self, max_size=1000, ttl=300, negative_ttl=30):
+        self._entries = OrderedDict()  # key -> (value, expires_at); value None = cached miss
+        self._inflight = {}  # key -> asyncio.Future of the running load
+        self.max_size = max(1, int(max_size))
         self.ttl = ttl  # Time to live in seconds
-    
+        self.negative_ttl = negative_ttl
+        self._listeners = []
+        self._stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return _MISSING
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        self._stats["negative_hits" if value is None else "hits"] += 1
+        return value
+
     def get(self, key):
-        if key in self.cache:
-            value, timestamp = self.cache[key]
-            if time.time() - timestamp <= self.ttl:
-                return value
+        value = self._lookup(key)
+        return None if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        """Cache ``value`` (``None`` records a negative entry with ``negative_ttl``)."""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+        entries[key] = (value, time.monotonic() + ttl)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_or_load(self, key, loader, *, cache_missing=False):
+        """Return the cached value for ``key`` or await ``loader()`` once for all concurrent callers."""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        pending = self._inflight.get(key)
+        while pending is not None:
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this caller was cancelled
+                # The loading caller was cancelled; retry (or take over the load).
+                pending = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._stats["loads"] += 1
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody else was waiting
             else:
-                # Expired, remove from cache
-                del self.cache[key]
-        return None
-    
-    def set(self, key, value):
-        # Enforce cache size limit - remove oldest items if needed
-        if len(self.cache) >= self.max_size:
-            # Sort by timestamp and remove oldest
-            oldest_keys = sorted(self.cache.keys(), key=lambda k: self.cache[k][1])[:len(self.cache) // 10]
-            for old_key in oldest_keys:
-                del self.cache[old_key]
-        
-        self.cache[key] = (value, time.time())
-    
-    def invalidate(self, key):
-        if key in self.cache:
-            del self.cache[key]
-    
+                future.cancel()
+            raise
+        # An invalidation during the load detaches the future; don't cache a possibly stale read.
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            if value is not None or cache_missing:
+                self.set(key, value)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key, *, propagate=True):
+        self._inflight.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self._stats["invalidations"] += 1
+        if propagate:
+            for listener in self._listeners:
+                try:
+                    listener(key)
+                except Exception as e:
+                    logger.warning(f"Cache invalidation listener failed for {key}: {e}")
+
     def clear(self):
-        self.cache.clear()
+        self._entries.clear()
+        self._inflight.clear()
+
+    def add_invalidation_listener(self, listener):
+        """Register ``listener(key)``, called for every local invalidation (e.g. to notify other workers)."""
+        self._listeners.append(listener)
+
+    def remove_invalidation_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["negative_hits"] + self._stats["misses"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "inflight": len(self._inflight),
+            **self._stats,
+            "hit_ratio": round((self._stats["hits"] + self._stats["negative_hits"]) / lookups, 4) if lookups else 0.0,
+        }
 
 # Create global cache instance
 db_cache = DBCache()
@@ -331,30 +439,113 @@ def make_cache_key(collection_name, document_id):
     return f"{collection_name}:{document_id}"
 
 # Helper to get document with caching
-async def get_cached_document(collection, query, cache_key=None):
+async def get_cached_document(collection, query, cache_key=None, *, cache_missing=False):
     """
-    Get a document with caching support
+    Get a document with caching support.
+
+    Concurrent misses for the same ``cache_key`` share one query. With
+    ``cache_missing=True`` a "not found" result is cached briefly as well.
+    Returns a shallow copy so callers can adjust top-level fields freely.
     """
-    if cache_key:
-        cached = db_cache.get(cache_key)
-        if cached:
-            return cached
-    
-    document = await collection.find_one(query)
-    
-    if cache_key and document:
-        db_cache.set(cache_key, document)
-    
-    return document
+    if not cache_key:
+        return await collection.find_one(query)
+
+    document = await db_cache.get_or_load(
+        cache_key, lambda: collection.find_one(query), cache_missing=cache_missing
+    )
+    return dict(document) if isinstance(document, dict) else document
 
 # Helper to update a document and invalidate cache
-async def update_and_invalidate(collection, query, update, cache_key=None):
+async def update_and_invalidate(collection, query, update, cache_key=None, **kwargs):
     """
-    Update a document and invalidate cache if needed
+    Update a document and invalidate cache if needed.
+    Extra keyword arguments (e.g. ``upsert=True``) are passed to ``update_one``.
     """
-    result = await collection.update_one(query, update)
+    result = await collection.update_one(query, update, **kwargs)
     
     if cache_key:
         db_cache.invalidate(cache_key)
     
     return result
+
+
+# Cross-worker invalidation (opt-in): MOZAIKS_DB_CACHE_INVALIDATION=mongo broadcasts
+# invalidated keys through a small capped collection tailed by every worker.
+CACHE_INVALIDATION_COLLECTION = "cache_invalidations"
+_CACHE_INVALIDATION_CAP_BYTES = 1024 * 1024
+_worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_invalidation_task = None
+# In-flight invalidation inserts; the loop only keeps weak references to tasks.
+_publish_tasks = set()
+
+
+def _cache_invalidation_enabled():
+    return (os.getenv("MOZAIKS_DB_CACHE_INVALIDATION") or "").strip().lower() == "mongo"
+
+
+def _publish_invalidation(key):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    collection = db[CACHE_INVALIDATION_COLLECTION]
+    task = loop.create_task(collection.insert_one({"key": key, "origin": _worker_id, "ts": datetime.utcnow()}))
+    _publish_tasks.add(task)
+    task.add_done_callback(_publish_done)
+
+
+def _publish_done(task):
+    _publish_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to publish cache invalidation: {task.exception()}")
+
+
+async def _tail_invalidations():
+    collection = db[CACHE_INVALIDATION_COLLECTION]
+    since = datetime.utcnow()
+    while True:
+        try:
+            cursor = collection.find({"ts": {"$gt": since}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                async for doc in cursor:
+                    since = doc.get("ts", since)
+                    if doc.get("origin") != _worker_id and doc.get("key"):
+                        db_cache.invalidate(doc["key"], propagate=False)
+                await asyncio.sleep(0.1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener error: {e}; retrying")
+            db_cache.clear()  # we may have missed invalidations while disconnected
+        await asyncio.sleep(1)
+
+
+async def start_cache_invalidation_listener():
+    """Start cross-worker cache invalidation if MOZAIKS_DB_CACHE_INVALIDATION=mongo."""
+    global _invalidation_task
+    if not _cache_invalidation_enabled() or db is None or _invalidation_task is not None:
+        return False
+    try:
+        await db.create_collection(CACHE_INVALIDATION_COLLECTION, capped=True, size=_CACHE_INVALIDATION_CAP_BYTES)
+    except CollectionInvalid:
+        pass  # already created by another worker
+    db_cache.add_invalidation_listener(_publish_invalidation)
+    _invalidation_task = asyncio.create_task(_tail_invalidations())
+    logger.info("✅ Cross-worker DB cache invalidation enabled")
+    return True
+
+
+async def stop_cache_invalidation_listener():
+    global _invalidation_task
+    task, _invalidation_task = _invalidation_task, None
+    if task is None:
+        return
+    db_cache.remove_invalidation_listener(_publish_invalidation)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    if _publish_tasks:
+        # Let other workers hear about the last invalidations before the client closes
+        await asyncio.wait(list(_publish_tasks), timeout=2.0)
@@ -137,6 +137,9 @@ class Settings:
     max_request_body_bytes: int
     plugin_exec_timeout_s: float
     plugin_exec_max_concurrency: int
+    plugin_exec_queue_limit: int
+    plugin_exec_thread_workers: int
+    plugin_exec_process_workers: int
     websocket_max_connections_per_user: int
     openapi_enabled: bool
     debug_endpoints_enabled: bool
@@ -218,6 +221,12 @@ class Settings:
             raise RuntimeError("PLUGIN_EXEC_TIMEOUT_S must be > 0.")
         if self.plugin_exec_max_concurrency <= 0:
             raise RuntimeError("PLUGIN_EXEC_MAX_CONCURRENCY must be > 0.")
+        if self.plugin_exec_queue_limit < 0:
+            raise RuntimeError("PLUGIN_EXEC_QUEUE_LIMIT must be >= 0.")
+        if self.plugin_exec_thread_workers <= 0:
+            raise RuntimeError("PLUGIN_EXEC_THREAD_WORKERS must be > 0.")
+        if self.plugin_exec_process_workers <= 0:
+            raise RuntimeError("PLUGIN_EXEC_PROCESS_WORKERS must be > 0.")
         if self.websocket_max_connections_per_user <= 0:
             raise RuntimeError("WEBSOCKET_MAX_CONNECTIONS_PER_USER must be > 0.")
         if self.insights_push_interval_s <= 0:
@@ -363,6 +372,9 @@ def load_settings() -> Settings:
             default=_env_float("PLUGIN_EXEC_TIMEOUT_S", default=30.0),
         ),
         plugin_exec_max_concurrency=_env_int("PLUGIN_EXEC_MAX_CONCURRENCY", default=8),
+        plugin_exec_queue_limit=_env_int("PLUGIN_EXEC_QUEUE_LIMIT", default=32),
+        plugin_exec_thread_workers=_env_int("PLUGIN_EXEC_THREAD_WORKERS", default=16),
+        plugin_exec_process_workers=_env_int("PLUGIN_EXEC_PROCESS_WORKERS", default=2),
         websocket_max_connections_per_user=_env_int("WEBSOCKET_MAX_CONNECTIONS_PER_USER", default=5),
         openapi_enabled=_env_bool("OPENAPI_ENABLED", default=env != "production"),
         debug_endpoints_enabled=_env_bool("DEBUG_ENDPOINTS_ENABLED", default=env != "production"),
@@ -1,10 +1,13 @@
 # backend/core/events/bus_base.py
 import logging
+import os
 import threading
 import traceback
 import asyncio
 import time
 from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
 
 logger = logging.getLogger("mozaiks_core.event_bus")
 
@@ -33,22 +36,96 @@ class EventBusInterface(ABC):
     def publish(self, event: str, data: dict):
         pass
 
-class InMemoryEventBus(EventBusInterface):
+_DEFAULT_WORKERS = 4
+_DEFAULT_QUEUE_MAX = 10000
+
+# Upper bounds (ms) of the per-event-type latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _env_int(name, default, minimum=1):
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except ValueError:
+        logger.warning(f"Invalid {name}; using {default}")
+        return default
+
+
+class _LatencyHistogram:
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
     def __init__(self):
-        self.subscribers = {}
-        self.lock = threading.Lock()  # Ensures thread safety
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+    def _quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (max for the open bucket).
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 3)
+        return 0.0
+
+    def snapshot(self):
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self._quantile(0.5),
+            "p95_ms": self._quantile(0.95),
+            "p99_ms": self._quantile(0.99),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class InMemoryEventBus(EventBusInterface):
+    """In-process pub/sub.
+
+    ``publish`` is O(1) per subscriber: subscriber lists are copy-on-write
+    tuples read without locking, history is a ``deque(maxlen)`` per event type,
+    counters and history are updated under ``lock`` (sync plugins publish from
+    worker threads), and async subscribers are handed to a bounded pool of worker tasks through
+    ``async_queue`` instead of one task per delivery. Latency (publish to
+    handler completion) is recorded per event type and reported by ``get_stats``.
+    """
+
+    def __init__(self, *, workers=None, queue_max=None):
+        self.subscribers = {}  # event -> tuple of callbacks (replaced, never mutated)
+        self.lock = threading.Lock()  # Serializes subscriber changes and stats/history updates; never held across a callback
         self.event_history = {}
         self.max_history_per_event = 100
         self.max_retry_count = 3
-        self.async_queue = asyncio.Queue()
+        self.worker_count = workers or _env_int("MOZAIKS_EVENT_BUS_WORKERS", _DEFAULT_WORKERS)
+        self.queue_max = queue_max or _env_int("MOZAIKS_EVENT_BUS_QUEUE_MAX", _DEFAULT_QUEUE_MAX)
+        self.async_queue = None  # created on the loop that runs the workers
         self.is_processing = False
         self.task = None
+        self._workers = []
+        self._loop = None
         
         # Statistics for monitoring
-        self.stats = {
+        self.stats = self._new_stats()
+        self._latency = {}
+
+    @staticmethod
+    def _new_stats():
+        return {
             "events_published": 0,
             "events_delivered": 0,
             "delivery_failures": 0,
+            "events_dropped": 0,
             "events_by_type": {}
         }
 
@@ -57,17 +134,19 @@ class InMemoryEventBus(EventBusInterface):
         pass
 
     async def close(self):
-        """No-op for in-memory bus"""
-        pass
+        """Stop the async delivery workers"""
+        await self.stop_background_processing()
 
-    def subscribe(self, event, callback):
+    def subscribe(self, event, callback, shared=False):
         """
         Subscribes a callback function to an event.
+
+        ``shared`` marks a side-effecting handler that must run once per event
+        even when several processes share the event stream; in a single
+        process every handler already runs once.
         """
         with self.lock:
-            if event not in self.subscribers:
-                self.subscribers[event] = []
-            self.subscribers[event].append(callback)
+            self.subscribers[event] = self.subscribers.get(event, ()) + (callback,)
             logger.info(f"✅ Subscribed '{callback.__name__}' to event '{event}'")
 
     def unsubscribe(self, event, callback):
@@ -75,152 +154,190 @@ class InMemoryEventBus(EventBusInterface):
         Unsubscribes a callback from an event.
         """
         with self.lock:
-            if event in self.subscribers and callback in self.subscribers[event]:
-                self.subscribers[event].remove(callback)
+            current = self.subscribers.get(event, ())
+            if callback in current:
+                remaining = list(current)
+                remaining.remove(callback)
                 logger.info(f"❌ Unsubscribed '{callback.__name__}' from event '{event}'")
 
                 # Remove event if no subscribers remain
-                if not self.subscribers[event]:
+                if remaining:
+                    self.subscribers[event] = tuple(remaining)
+                else:
                     del self.subscribers[event]
 
     def publish(self, event, data):
         """
         Publishes an event with the provided data.
-        Uses fire-and-forget pattern for performance.
+        Sync subscribers run inline; async subscribers are queued for the worker pool.
         """
-        # Update statistics
+        published_at = time.monotonic()
+        self._record(event, data)
+
+        event_subscribers = self.subscribers.get(event)
+        if not event_subscribers:
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📢 Event '%s' triggered with data: %s", event, data)
+
+        self._dispatch(event, event_subscribers, data, published_at)
+
+    def _dispatch(self, event, callbacks, data, published_at):
+        for callback in callbacks:
+            if asyncio.iscoroutinefunction(callback):
+                self._enqueue_async(event, callback, data, published_at, 0)
+                continue
+            self._call_sync(event, callback, data, published_at)
+
+    def _record(self, event, data):
+        entry = {"timestamp": time.time(), "data": data}
         with self.lock:
-            self.stats["events_published"] += 1
-            if event not in self.stats["events_by_type"]:
-                self.stats["events_by_type"][event] = 0
-            self.stats["events_by_type"][event] += 1
-            
-            # Store in event history (with timestamp)
-            if event not in self.event_history:
-                self.event_history[event] = []
-            
-            # Add event to history with timestamp
-            event_record = {
-                "timestamp": time.time(),
-                "data": data
-            }
-            
-            # Maintain fixed history size
-            history = self.event_history[event]
-            history.append(event_record)
-            if len(history) > self.max_history_per_event:
-                history.pop(0)  # Remove oldest event
-            
-            # Get subscribers while holding the lock
-            event_subscribers = self.subscribers.get(event, []).copy()
-        
-        if event_subscribers:
-            logger.info(f"📢 Event '{event}' triggered with data: {data}")
-            
-            # Process subscribers outside the lock for better concurrency
-            for callback in event_subscribers:
-                try:
-                    # Check if callback is a coroutine function and handle appropriately
-                    if asyncio.iscoroutinefunction(callback):
-                        # Queue the async task
-                        asyncio.create_task(self._process_async_callback(callback, data, event))
-                    else:
-                        # Regular function, just call it
-                        callback(data)
-                        with self.lock:
-                            self.stats["events_delivered"] += 1
-                except Exception as e:
-                    with self.lock:
-                        self.stats["delivery_failures"] += 1
-                    logger.error(f"❌ Error in event callback for '{event}': {e}")
-                    logger.error(traceback.format_exc())
-    
-    async def _process_async_callback(self, callback, data, event_name, retry_count=0):
-        """
-        Process an async callback with retry logic
-        """
+            stats = self.stats
+            stats["events_published"] += 1
+            by_type = stats["events_by_type"]
+            by_type[event] = by_type.get(event, 0) + 1
+
+            history = self.event_history.get(event)
+            if history is None:
+                history = self.event_history[event] = deque(maxlen=self.max_history_per_event)
+            history.append(entry)
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+            return self.stats[key]
+
+    def _call_sync(self, event, callback, data, published_at):
         try:
-            await callback(data)
-            with self.lock:
-                self.stats["events_delivered"] += 1
+            callback(data)
+            self._count("events_delivered")
         except Exception as e:
-            with self.lock:
-                self.stats["delivery_failures"] += 1
-            
-            logger.error(f"❌ Error in async event callback for '{event_name}': {e}")
+            self._count("delivery_failures")
+            logger.error(f"❌ Error in event callback for '{event}': {e}")
             logger.error(traceback.format_exc())
-            
-            # Retry logic for async callbacks
-            if retry_count < self.max_retry_count:
-                retry_delay = 0.5 * (2 ** retry_count)  # Exponential backoff
-                logger.info(f"Retrying event callback for '{event_name}' in {retry_delay}s (attempt {retry_count + 1})")
-                await asyncio.sleep(retry_delay)
-                await self._process_async_callback(callback, data, event_name, retry_count + 1)
-    
-    def get_stats(self):
-        """Return current event bus statistics"""
-        with self.lock:
-            return self.stats.copy()
-    
-    def reset_stats(self):
-        """Reset statistics counters"""
+        self._observe(event, published_at)
+
+    # ------------------------------------------------------------------
+    # Async delivery (bounded worker pool)
+    # ------------------------------------------------------------------
+    def _enqueue_async(self, event, callback, data, published_at, attempt):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            # Published from a thread without a loop: hand over to the workers' loop if there is one.
+            if self._loop is not None and self._loop.is_running():
+                self._loop.call_soon_threadsafe(self._enqueue_async, event, callback, data, published_at, attempt)
+                return
+            self._count("delivery_failures")
+            logger.error(f"❌ No running event loop to deliver async event '{event}' to '{callback.__name__}'")
+            return
+        if loop is not self._loop or not self._workers:
+            self._start_workers(loop)
+        try:
+            self.async_queue.put_nowait((event, callback, data, published_at, attempt))
+        except asyncio.QueueFull:
+            dropped = self._count("events_dropped")
+            if dropped % 100 == 1:
+                logger.warning(
+                    f"🚨 Event bus queue full ({self.queue_max}); dropped async delivery of '{event}' "
+                    f"({dropped} dropped so far)"
+                )
+
+    def _start_workers(self, loop):
+        if self._loop is not loop:
+            # New loop (e.g. tests/asyncio.run): the old queue and workers belong to the old one.
+            self._workers = []
+            self.async_queue = asyncio.Queue(maxsize=self.queue_max)
+            self._loop = loop
+        self.is_processing = True
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.worker_count:
+            self._workers.append(loop.create_task(self._worker(), name=f"event-bus-worker-{len(self._workers)}"))
+        self.task = self._workers[0]
+
+    async def _worker(self):
+        """Deliver queued async events, one callback at a time."""
+        queue = self.async_queue
+        while True:
+            event, callback, data, published_at, attempt = await queue.get()
+            try:
+                await callback(data)
+                self._count("events_delivered")
+                self._observe(event, published_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._count("delivery_failures")
+                logger.error(f"❌ Error in async event callback for '{event}': {e}")
+                logger.error(traceback.format_exc())
+                # Retry with exponential backoff without holding a worker
+                if attempt < self.max_retry_count:
+                    retry_delay = 0.5 * (2 ** attempt)
+                    logger.info(f"Retrying event callback for '{event}' in {retry_delay}s (attempt {attempt + 1})")
+                    asyncio.get_running_loop().call_later(
+                        retry_delay, self._enqueue_async, event, callback, data, published_at, attempt + 1
+                    )
+                else:
+                    self._observe(event, published_at)
+            finally:
+                queue.task_done()
+
+    def _observe(self, event, published_at):
+        elapsed_ms = (time.monotonic() - published_at) * 1000.0
         with self.lock:
-            self.stats = {
-                "events_published": 0,
-                "events_delivered": 0,
-                "delivery_failures": 0,
-                "events_by_type": {}
-            }
-    
+            histogram = self._latency.get(event)
+            if histogram is None:
+                histogram = self._latency[event] = _LatencyHistogram()
+            histogram.observe(elapsed_ms)
+
     async def start_background_processing(self):
-        """Start background processing of async events if not already running"""
-        if not self.is_processing:
-            self.is_processing = True
-            self.task = asyncio.create_task(self._process_queue())
-            logger.info("Started background event processing")
+        """Start the async delivery workers if not already running"""
+        if not self.is_processing or self._loop is not asyncio.get_running_loop():
+            self._start_workers(asyncio.get_running_loop())
+            logger.info(f"Started background event processing ({self.worker_count} workers)")
     
     async def stop_background_processing(self):
-        """Stop background processing of async events"""
-        if self.is_processing and self.task:
-            self.is_processing = False
-            self.task.cancel()
+        """Stop the async delivery workers (queued deliveries are discarded)"""
+        workers, self._workers = self._workers, []
+        self.is_processing = False
+        self.task = None
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
             try:
-                await self.task
+                await worker
             except asyncio.CancelledError:
                 pass
+        if workers:
             logger.info("Stopped background event processing")
+
+    async def drain(self, timeout=None):
+        """Wait until every queued async delivery has been handled."""
+        if self.async_queue is None:
+            return True
+        try:
+            await asyncio.wait_for(self.async_queue.join(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
     
-    async def _process_queue(self):
-        """Process async events from the queue"""
-        while self.is_processing:
-            try:
-                event, data = await self.async_queue.get()
-                await self._dispatch_event(event, data)
-                self.async_queue.task_done()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error processing event queue: {e}")
-                logger.error(traceback.format_exc())
+    def get_stats(self):
+        """Return current event bus statistics, including per-event-type latency histograms"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["events_by_type"] = dict(self.stats["events_by_type"])
+            stats["queue_depth"] = self.async_queue.qsize() if self.async_queue is not None else 0
+            stats["workers"] = len([w for w in self._workers if not w.done()])
+            stats["latency_ms"] = {event: h.snapshot() for event, h in list(self._latency.items())}
+            return stats
     
-    async def _dispatch_event(self, event, data):
-        """Dispatch an event to subscribers"""
+    def reset_stats(self):
+        """Reset statistics counters"""
         with self.lock:
-            subscribers = self.subscribers.get(event, []).copy()
-        
-        for callback in subscribers:
-            try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(data)
-                else:
-                    callback(data)
-                    
-                with self.lock:
-                    self.stats["events_delivered"] += 1
-            except Exception as e:
-                with self.lock:
-                    self.stats["delivery_failures"] += 1
-                logger.error(f"Error in event callback: {e}")
+            self.stats = self._new_stats()
+            self._latency = {}
 
     def get_event_history(self, event_type=None, limit=10):
         """
@@ -236,11 +353,7 @@ class InMemoryEventBus(EventBusInterface):
         with self.lock:
             if event_type:
                 # Return history for specific event type
-                history = self.event_history.get(event_type, [])
-                return {event_type: history[-limit:]}
-            else:
-                # Return history for all event types
-                result = {}
-                for evt, history in self.event_history.items():
-                    result[evt] = history[-limit:]
-                return result
+                history = self.event_history.get(event_type, ())
+                return {event_type: list(history)[-limit:]}
+            # Return history for all event types
+            return {evt: list(history)[-limit:] for evt, history in self.event_history.items()}
@@ -0,0 +1,348 @@
+# backend/core/events/stream_broker.py
+"""Embedded Redis-protocol stream broker for tests and benchmarks.
+
+Implements the subset of Redis Streams that ``RedisStreamEventBus`` uses
+(XADD with MAXLEN trimming, consumer groups, XREADGROUP with BLOCK, XACK,
+XAUTOCLAIM, XPENDING summary, XINFO GROUPS/CONSUMERS, XLEN) on a local TCP port, so the networked
+event bus can be exercised across processes without a Redis server::
+
+    with EmbeddedStreamBroker() as broker:
+        bus = RedisStreamEventBus.from_url(broker.url)
+
+It keeps everything in memory and is not meant for production traffic.
+"""
+from __future__ import annotations
+
+import bisect
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_StreamId = Tuple[int, int]
+
+
+class _BrokerError(Exception):
+    pass
+
+
+def _parse_id(raw: bytes) -> _StreamId:
+    text = raw.decode()
+    ms, _, seq = text.partition("-")
+    try:
+        return int(ms), int(seq or 0)
+    except ValueError:
+        raise _BrokerError("ERR Invalid stream ID specified as stream command argument") from None
+
+
+def _format_id(stream_id: _StreamId) -> bytes:
+    return b"%d-%d" % stream_id
+
+
+class _Group:
+    __slots__ = ("last_delivered", "pending", "seen")
+
+    def __init__(self, last_delivered: _StreamId) -> None:
+        self.last_delivered = last_delivered
+        # id -> [consumer, last delivery time (ms), delivery count]
+        self.pending: Dict[_StreamId, list] = {}
+        self.seen: Dict[bytes, int] = {}  # consumer -> last interaction (ms)
+
+
+class _Stream:
+    __slots__ = ("ids", "fields", "last_id", "groups")
+
+    def __init__(self) -> None:
+        self.ids: List[_StreamId] = []
+        self.fields: Dict[_StreamId, list] = {}
+        self.last_id: _StreamId = (0, 0)
+        self.groups: Dict[bytes, _Group] = {}
+
+    def next_id(self) -> _StreamId:
+        ms = int(time.time() * 1000)
+        if ms > self.last_id[0]:
+            return ms, 0
+        return self.last_id[0], self.last_id[1] + 1
+
+    def trim(self, maxlen: int) -> None:
+        excess = len(self.ids) - maxlen
+        if excess > 0:
+            for stream_id in self.ids[:excess]:
+                del self.fields[stream_id]
+            del self.ids[:excess]
+
+    def entry(self, stream_id: _StreamId) -> list:
+        return [_format_id(stream_id), self.fields.get(stream_id)]
+
+
+class EmbeddedStreamBroker(socketserver.ThreadingTCPServer):
+    """In-memory Redis Streams subset served over RESP on ``127.0.0.1``."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _BrokerHandler)
+        self.streams: Dict[bytes, _Stream] = {}
+        self.changed = threading.Condition()
+        self.command_counts: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "EmbeddedStreamBroker":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve_forever, name="embedded-stream-broker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+        with self.changed:
+            self.changed.notify_all()
+
+    def __enter__(self) -> "EmbeddedStreamBroker":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Commands (called with ``self.changed`` held)
+    # ------------------------------------------------------------------
+    def _stream(self, key: bytes, *, create: bool = False) -> Optional[_Stream]:
+        stream = self.streams.get(key)
+        if stream is None and create:
+            stream = self.streams[key] = _Stream()
+        return stream
+
+    def _group(self, key: bytes, name: bytes) -> Tuple[_Stream, _Group]:
+        stream = self._stream(key)
+        group = stream.groups.get(name) if stream is not None else None
+        if group is None:
+            raise _BrokerError(f"NOGROUP No such key '{key.decode()}' or consumer group '{name.decode()}'")
+        return stream, group
+
+    def xadd(self, args: List[bytes]) -> bytes:
+        key, rest = args[0], args[1:]
+        maxlen = None
+        if rest and rest[0].upper() == b"MAXLEN":
+            rest = rest[1:]
+            if rest[0] in (b"~", b"="):
+                rest = rest[1:]
+            maxlen, rest = int(rest[0]), rest[1:]
+        raw_id, fields = rest[0], rest[1:]
+        if not fields or len(fields) % 2:
+            raise _BrokerError("ERR wrong number of arguments for 'xadd' command")
+        stream = self._stream(key, create=True)
+        stream_id = stream.next_id() if raw_id == b"*" else _parse_id(raw_id)
+        if stream_id <= stream.last_id:
+            raise _BrokerError("ERR The ID specified in XADD is equal or smaller than the target stream top item")
+        stream.ids.append(stream_id)
+        stream.fields[stream_id] = list(fields)
+        stream.last_id = stream_id
+        if maxlen is not None:
+            stream.trim(maxlen)
+        self.changed.notify_all()
+        return _format_id(stream_id)
+
+    def xgroup(self, args: List[bytes]) -> Any:
+        sub = args[0].upper()
+        if sub == b"CREATE":
+            key, name, raw_id = args[1], args[2], args[3]
+            mkstream = any(arg.upper() == b"MKSTREAM" for arg in args[4:])
+            stream = self._stream(key, create=mkstream)
+            if stream is None:
+                raise _BrokerError("ERR The XGROUP subcommand requires the key to exist")
+            if name in stream.groups:
+                raise _BrokerError("BUSYGROUP Consumer Group name already exists")
+            stream.groups[name] = _Group(stream.last_id if raw_id == b"$" else _parse_id(raw_id))
+            return "OK"
+        if sub == b"DESTROY":
+            stream = self._stream(args[1])
+            return int(stream is not None and stream.groups.pop(args[2], None) is not None)
+        if sub == b"DELCONSUMER":
+            _, group = self._group(args[1], args[2])
+            group.seen.pop(args[3], None)
+            owned = [stream_id for stream_id, pending in group.pending.items() if pending[0] == args[3]]
+            for stream_id in owned:
+                del group.pending[stream_id]
+            return len(owned)
+        raise _BrokerError(f"ERR unknown XGROUP subcommand '{sub.decode()}'")
+
+    def xreadgroup(self, args: List[bytes]) -> Any:
+        options = {}
+        i = 0
+        while args[i].upper() != b"STREAMS":
+            option = args[i].upper()
+            if option == b"GROUP":
+                options["group"], options["consumer"] = args[i + 1], args[i + 2]
+                i += 3
+            elif option in (b"COUNT", b"BLOCK"):
+                options[option.decode().lower()] = int(args[i + 1])
+                i += 2
+            else:
+                i += 1
+        key, raw_id = args[i + 1], args[i + 2]
+        count = options.get("count") or 0
+        block_ms = options.get("block")
+        deadline = None if block_ms is None else time.monotonic() + (block_ms / 1000.0 if block_ms else 3600.0)
+        while True:
+            stream, group = self._group(key, options["group"])
+            group.seen[options["consumer"]] = int(time.time() * 1000)
+            if raw_id != b">":
+                # Re-read this consumer's own pending entries after the given id
+                after = _parse_id(raw_id)
+                ids = sorted(
+                    stream_id for stream_id, pending in group.pending.items()
+                    if pending[0] == options["consumer"] and stream_id > after
+                )
+                ids = ids[:count] if count else ids
+                now_ms = int(time.time() * 1000)
+                for stream_id in ids:
+                    group.pending[stream_id][1] = now_ms
+                    group.pending[stream_id][2] += 1
+                return [[key, [stream.entry(stream_id) for stream_id in ids]]]
+            start = bisect.bisect_right(stream.ids, group.last_delivered)
+            ids = stream.ids[start:start + count] if count else stream.ids[start:]
+            if ids:
+                now_ms = int(time.time() * 1000)
+                for stream_id in ids:
+                    group.pending[stream_id] = [options["consumer"], now_ms, 1]
+                group.last_delivered = ids[-1]
+                return [[key, [stream.entry(stream_id) for stream_id in ids]]]
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is None or remaining <= 0:
+                return None
+            self.changed.wait(min(remaining, 0.5))
+
+    def xack(self, args: List[bytes]) -> int:
+        _, group = self._group(args[0], args[1])
+        return sum(1 for raw in args[2:] if group.pending.pop(_parse_id(raw), None) is not None)
+
+    def xautoclaim(self, args: List[bytes]) -> list:
+        key, name, consumer, min_idle, start = args[:5]
+        count = 100
+        if len(args) > 6 and args[5].upper() == b"COUNT":
+            count = int(args[6])
+        stream, group = self._group(key, name)
+        now_ms = int(time.time() * 1000)
+        group.seen[consumer] = now_ms
+        start_id = _parse_id(start)
+        candidates = sorted(
+            stream_id for stream_id, pending in group.pending.items()
+            if stream_id >= start_id and now_ms - pending[1] >= int(min_idle)
+        )
+        claimed, deleted = [], []
+        for stream_id in candidates[:count]:
+            pending = group.pending[stream_id]
+            if stream_id not in stream.fields:
+                del group.pending[stream_id]
+                deleted.append(_format_id(stream_id))
+                continue
+            pending[0], pending[1], pending[2] = consumer, now_ms, pending[2] + 1
+            claimed.append(stream.entry(stream_id))
+        cursor = _format_id(candidates[count]) if len(candidates) > count else b"0-0"
+        return [cursor, claimed, deleted]
+
+    def xpending(self, args: List[bytes]) -> list:
+        _, group = self._group(args[0], args[1])
+        if not group.pending:
+            return [0, None, None, None]
+        ids = sorted(group.pending)
+        per_consumer: Dict[bytes, int] = {}
+        for pending in group.pending.values():
+            per_consumer[pending[0]] = per_consumer.get(pending[0], 0) + 1
+        return [
+            len(ids),
+            _format_id(ids[0]),
+            _format_id(ids[-1]),
+            [[consumer, str(n).encode()] for consumer, n in sorted(per_consumer.items())],
+        ]
+
+    def xinfo(self, args: List[bytes]) -> list:
+        sub = args[0].upper()
+        now_ms = int(time.time() * 1000)
+        if sub == b"GROUPS":
+            stream = self._stream(args[1])
+            if stream is None:
+                raise _BrokerError("ERR no such key")
+            return [
+                [b"name", name, b"consumers", len(group.seen), b"pending", len(group.pending),
+                 b"last-delivered-id", _format_id(group.last_delivered)]
+                for name, group in stream.groups.items()
+            ]
+        if sub == b"CONSUMERS":
+            _, group = self._group(args[1], args[2])
+            return [
+                [b"name", consumer, b"pending", sum(1 for p in group.pending.values() if p[0] == consumer),
+                 b"idle", now_ms - seen]
+                for consumer, seen in group.seen.items()
+            ]
+        raise _BrokerError(f"ERR unknown XINFO subcommand '{sub.decode()}'")
+
+    def xlen(self, args: List[bytes]) -> int:
+        stream = self._stream(args[0])
+        return len(stream.ids) if stream is not None else 0
+
+    def dispatch(self, args: List[bytes]) -> Any:
+        command = args[0].decode().upper()
+        self.command_counts[command] = self.command_counts.get(command, 0) + 1
+        if command == "PING":
+            return "PONG"
+        if command == "DEL":
+            with self.changed:
+                return sum(1 for key in args[1:] if self.streams.pop(key, None) is not None)
+        handler = getattr(self, command.lower(), None)
+        if not command.startswith("X") or handler is None:
+            raise _BrokerError(f"ERR unknown command '{command}'")
+        with self.changed:
+            return handler(args[1:])
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                size = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(size + 2)[:-2])
+            try:
+                reply = self.server.dispatch(args)
+            except _BrokerError as e:
+                self.wfile.write(b"-%s\r\n" % str(e).encode())
+                continue
+            except (IndexError, ValueError):
+                self.wfile.write(b"-ERR syntax error\r\n")
+                continue
+            self.wfile.write(_encode(reply))
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"*-1\r\n"
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+
+__all__ = ["EmbeddedStreamBroker"]
@@ -0,0 +1,501 @@
+# backend/core/events/stream_bus.py
+"""Cross-process event bus on Redis Streams.
+
+``RedisStreamEventBus`` delivers to local subscribers exactly like
+``InMemoryEventBus`` and also appends every published event to a shared
+stream, so other uvicorn workers and plugin-host containers see it too.
+
+* Publishing never blocks: events are serialized to JSON and buffered, and a
+  background thread writes them in pipelined ``XADD`` batches (waiting up to
+  ``batch_window_ms`` for a batch to fill).
+* Each process reads the stream through a consumer group and acknowledges a
+  batch only after its local subscribers have finished with it (async
+  handlers are awaited, with the usual retries), so delivery is
+  at-least-once: unacknowledged entries are re-read on restart (same consumer
+  name) or claimed from dead consumers with ``XAUTOCLAIM``.
+* Events a process published itself are skipped on the way back in; they were
+  already delivered locally.
+
+By default every process gets its own throwaway group (so every process sees
+every event). Throwaway groups are destroyed on ``close`` and, if the process
+died instead, by the next process that finds all of the group's consumers idle
+for ``group_idle_ms``. Set a stable ``group``/``consumer`` pair per worker to
+keep unacknowledged entries across restarts; processes sharing a group split
+the stream between them instead of each receiving every event.
+
+Handlers with side effects (sending a notification, writing a record) must run
+once per event, not once per process: subscribe them with ``shared=True``.
+They are not called on publish but read through ``shared_group``, a single
+group joined by every process that has shared handlers, so each event goes to
+exactly one of them. Every process in that group must register the same shared
+handlers; give processes with different handler sets different group names.
+
+Remote subscribers receive the JSON round-tripped payload (non-JSON values
+are converted with ``str``). If the stream server is unreachable, events keep
+being delivered locally and up to ``outbox_max`` of them are held for retry.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+
+from mozaiks_infra.events.bus_base import InMemoryEventBus, _LatencyHistogram
+from mozaiks_infra.utils.resp_client import RespClient, RespError
+
+logger = logging.getLogger("mozaiks_core.event_bus")
+
+_BACKOFF_MAX_S = 5.0
+_EPHEMERAL_PREFIX = "mozaiks:ephemeral:"
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class _GroupReader:
+    """Consumer-group state for one reader thread."""
+
+    __slots__ = ("group", "client", "shared", "ready", "claim_cursor")
+
+    def __init__(self, group, client, shared):
+        self.group = group
+        self.client = client
+        self.shared = shared
+        self.ready = False
+        self.claim_cursor = "0-0"
+
+
+class RedisStreamEventBus(InMemoryEventBus):
+    def __init__(
+        self,
+        client,
+        *,
+        read_client=None,
+        shared_read_client=None,
+        stream="mozaiks:events",
+        group=None,
+        consumer=None,
+        shared_group="mozaiks:shared",
+        maxlen=100000,
+        batch_max=128,
+        batch_window_ms=2,
+        block_ms=1000,
+        claim_idle_ms=60000,
+        group_idle_ms=300000,
+        delivery_timeout_s=30.0,
+        outbox_max=10000,
+        workers=None,
+        queue_max=None,
+    ):
+        super().__init__(workers=workers, queue_max=queue_max)
+        self._client = client  # publisher and housekeeping
+        self._read_client = read_client or client  # long-blocking XREADGROUP
+        self._shared_read_client = shared_read_client or self._read_client
+        self.stream = stream
+        self.origin = uuid.uuid4().hex
+        self._ephemeral_group = group is None
+        self.group = group or f"{_EPHEMERAL_PREFIX}{socket.gethostname()}:{os.getpid()}:{self.origin[:8]}"
+        self.shared_group = shared_group
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}"
+        self.shared_subscribers = {}  # event -> tuple of callbacks run once across processes
+        self.maxlen = int(maxlen)
+        self.batch_max = max(1, int(batch_max))
+        self.batch_window_s = max(0.0, float(batch_window_ms) / 1000.0)
+        self.block_ms = max(1, int(block_ms))
+        self.claim_idle_ms = int(claim_idle_ms)
+        self.group_idle_ms = int(group_idle_ms)
+        self.delivery_timeout_s = float(delivery_timeout_s)
+        self.outbox_max = max(1, int(outbox_max))
+
+        self._outbox = deque()
+        self._outbox_ready = threading.Event()
+        self._sending = 0
+        self._stopping = threading.Event()
+        self._threads = []
+        self._remote_loop = None
+        self._reader = _GroupReader(self.group, self._read_client, shared=False)
+        self._shared_reader = _GroupReader(self.shared_group, self._shared_read_client, shared=True)
+        self._remote_latency = _LatencyHistogram()
+        self.stream_stats = self._new_stream_stats()
+
+    def _count_stream(self, key, n=1):
+        with self.lock:
+            self.stream_stats[key] += n
+            return self.stream_stats[key]
+
+    @staticmethod
+    def _new_stream_stats():
+        return {
+            "events_forwarded": 0,
+            "events_received": 0,
+            "events_redelivered": 0,
+            "shared_events_handled": 0,
+            "forward_batches": 0,
+            "forward_errors": 0,
+            "groups_expired": 0,
+            "outbox_dropped": 0,
+            "read_errors": 0,
+        }
+
+    @classmethod
+    def from_url(cls, url, *, timeout_s=1.0, **kwargs):
+        block_ms = kwargs.get("block_ms", 1000)
+        return cls(
+            RespClient.from_url(url, timeout_s=timeout_s),
+            read_client=RespClient.from_url(url, timeout_s=timeout_s + block_ms / 1000.0),
+            shared_read_client=RespClient.from_url(url, timeout_s=timeout_s + block_ms / 1000.0),
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def connect(self):
+        """Start forwarding to and consuming from the shared stream."""
+        self._remote_loop = asyncio.get_running_loop()
+        await self.start_background_processing()
+        if self._threads and all(t.is_alive() for t in self._threads):
+            return
+        self._stopping.clear()
+        readers = [self._reader] + ([self._shared_reader] if self.shared_subscribers else [])
+        # Create the groups before forwarding starts so they see everything published from here on
+        for reader in readers:
+            try:
+                await asyncio.to_thread(self._ensure_group, reader)
+            except (OSError, ConnectionError, RespError):
+                pass  # the reader thread keeps retrying
+        self._threads = [threading.Thread(target=self._publish_loop, name="event-bus-stream-publisher", daemon=True)]
+        self._threads[0].start()
+        for reader in readers:
+            self._start_reader(reader)
+        logger.info(f"Event bus streaming via '{self.stream}' (group '{self.group}', consumer '{self.consumer}')")
+
+    def _start_reader(self, reader):
+        name = "event-bus-stream-shared-consumer" if reader.shared else "event-bus-stream-consumer"
+        thread = threading.Thread(target=self._consume_loop, args=(reader,), name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    async def close(self):
+        """Flush buffered events, stop the stream threads and the local workers."""
+        self._stopping.set()
+        self._outbox_ready.set()
+        threads, self._threads = self._threads, []
+        for thread in threads:
+            await asyncio.to_thread(thread.join, self.block_ms / 1000.0 + 2.0)
+        if self._ephemeral_group and self._reader.ready:
+            try:
+                self._client.execute("XGROUP", "DESTROY", self.stream, self.group)
+            except (OSError, ConnectionError, RespError) as e:
+                logger.warning(f"Could not remove event bus consumer group '{self.group}': {e}")
+        self._reader.ready = self._shared_reader.ready = False
+        clients = (self._client, self._read_client, self._shared_read_client)
+        for client in {id(client): client for client in clients}.values():
+            client.close()
+        await super().close()
+
+    async def flush(self, timeout=None):
+        """Wait until every buffered event has been written to the stream."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._outbox or self._sending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.001)
+        return True
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+    def subscribe(self, event, callback, shared=False):
+        """
+        Subscribes a callback function to an event.
+
+        ``shared`` callbacks run once per event across every process in
+        ``shared_group`` instead of once in each process.
+        """
+        if not shared:
+            return super().subscribe(event, callback)
+        with self.lock:
+            self.shared_subscribers[event] = self.shared_subscribers.get(event, ()) + (callback,)
+            logger.info(f"✅ Subscribed '{callback.__name__}' to event '{event}' (shared)")
+        if self._threads and not any(t.name == "event-bus-stream-shared-consumer" for t in self._threads):
+            self._start_reader(self._shared_reader)
+
+    def unsubscribe(self, event, callback):
+        super().unsubscribe(event, callback)
+        with self.lock:
+            current = self.shared_subscribers.get(event, ())
+            if callback in current:
+                remaining = list(current)
+                remaining.remove(callback)
+                logger.info(f"❌ Unsubscribed '{callback.__name__}' from event '{event}' (shared)")
+                if remaining:
+                    self.shared_subscribers[event] = tuple(remaining)
+                else:
+                    del self.shared_subscribers[event]
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+    def publish(self, event, data):
+        """Deliver locally, then queue the event for the shared stream."""
+        super().publish(event, data)
+        streaming = bool(self._threads)
+        if not streaming:
+            # Not reading the shared group (yet): shared handlers run here like the others
+            shared = self.shared_subscribers.get(event)
+            if shared:
+                self._dispatch(event, shared, data, time.monotonic())
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        self._outbox.append((event, payload, time.time(), "1" if streaming else "0"))
+        if len(self._outbox) > self.outbox_max:
+            self._outbox.popleft()
+            dropped = self._count_stream("outbox_dropped")
+            if dropped % 100 == 1:
+                logger.warning(
+                    f"🚨 Event bus stream outbox full ({self.outbox_max}); dropped oldest event "
+                    f"({dropped} dropped so far)"
+                )
+        if len(self._outbox) >= self.batch_max or not self._outbox_ready.is_set():
+            self._outbox_ready.set()
+
+    def _xadd(self, event, payload, ts, shared):
+        return (
+            "XADD", self.stream, "MAXLEN", "~", self.maxlen, "*",
+            "event", event, "data", payload, "origin", self.origin, "ts", repr(ts), "shared", shared,
+        )
+
+    def _publish_loop(self):
+        failures = 0
+        while True:
+            self._outbox_ready.wait(1.0)
+            stopping = self._stopping.is_set()
+            if not stopping and self.batch_window_s and len(self._outbox) < self.batch_max:
+                time.sleep(self.batch_window_s)  # let the batch fill
+            self._outbox_ready.clear()
+            while self._outbox:
+                self._sending = 1  # mark in-flight before the outbox can look empty to flush()
+                batch = []
+                while self._outbox and len(batch) < self.batch_max:
+                    batch.append(self._outbox.popleft())
+                try:
+                    replies = self._client.pipeline(self._xadd(*item) for item in batch)
+                except (OSError, ConnectionError) as e:
+                    self._outbox.extendleft(reversed(batch))
+                    self._sending = 0
+                    failures += 1
+                    self._count_stream("forward_errors")
+                    if failures == 1 or failures % 100 == 0:
+                        logger.warning(f"Event bus stream publish failed ({e}); {len(self._outbox)} event(s) buffered")
+                    if stopping:
+                        return
+                    self._stopping.wait(min(_BACKOFF_MAX_S, 0.05 * (2 ** min(failures, 7))))
+                    break
+                failures = 0
+                self._sending = 0
+                rejected = sum(1 for reply in replies if isinstance(reply, RespError))
+                if rejected:
+                    self._count_stream("forward_errors", rejected)
+                    logger.error(f"❌ Stream server rejected {rejected} event(s): {next(r for r in replies if isinstance(r, RespError))}")
+                self._count_stream("events_forwarded", len(batch) - rejected)
+                self._count_stream("forward_batches")
+            if stopping:
+                return
+
+    # ------------------------------------------------------------------
+    # Consuming
+    # ------------------------------------------------------------------
+    def _ensure_group(self, reader):
+        try:
+            reader.client.execute("XGROUP", "CREATE", self.stream, reader.group, "$", "MKSTREAM")
+        except RespError as e:
+            if not str(e).startswith("BUSYGROUP"):
+                raise
+        reader.ready = True
+
+    def _read(self, reader, start_id):
+        command = ["XREADGROUP", "GROUP", reader.group, self.consumer, "COUNT", self.batch_max]
+        if start_id == ">":
+            command += ["BLOCK", self.block_ms]
+        reply = reader.client.execute(*command, "STREAMS", self.stream, start_id)
+        return reply[0][1] if reply else []
+
+    def _claim(self, reader):
+        reply = self._client.execute(
+            "XAUTOCLAIM", self.stream, reader.group, self.consumer, self.claim_idle_ms,
+            reader.claim_cursor, "COUNT", self.batch_max,
+        )
+        reader.claim_cursor = _text(reply[0])
+        return reply[1]
+
+    def _info(self, *args):
+        return [
+            {_text(item[i]): _text(item[i + 1]) for i in range(0, len(item) - 1, 2)}
+            for item in self._client.execute("XINFO", *args)
+        ]
+
+    def _sweep_groups(self):
+        """Destroy throwaway groups left by dead processes and forget dead shared-group consumers."""
+        for info in self._info("GROUPS", self.stream):
+            name = info.get("name")
+            if name == self.group:
+                continue
+            if name == self.shared_group:
+                for consumer in self._info("CONSUMERS", self.stream, name):
+                    if consumer["pending"] == 0 and consumer["idle"] >= self.group_idle_ms:
+                        self._client.execute("XGROUP", "DELCONSUMER", self.stream, name, consumer["name"])
+                continue
+            if not name or not name.startswith(_EPHEMERAL_PREFIX):
+                continue
+            consumers = self._info("CONSUMERS", self.stream, name)
+            if consumers and all(consumer["idle"] >= self.group_idle_ms for consumer in consumers):
+                self._client.execute("XGROUP", "DESTROY", self.stream, name)
+                self._count_stream("groups_expired")
+                logger.info(f"Removed abandoned event bus consumer group '{name}'")
+
+    def _consume_loop(self, reader):
+        failures = 0
+        backlog = True  # first re-read entries this consumer left unacknowledged
+        next_claim = time.monotonic() + self.claim_idle_ms / 1000.0
+        while not self._stopping.is_set():
+            try:
+                if not reader.ready:
+                    self._ensure_group(reader)
+                if backlog:
+                    entries = self._read(reader, "0")
+                    backlog = bool(entries)
+                    redelivered = len(entries)
+                else:
+                    entries = self._read(reader, ">")
+                    redelivered = 0
+                if self.claim_idle_ms and time.monotonic() >= next_claim:
+                    claimed = self._claim(reader)
+                    entries = entries + claimed
+                    redelivered += len(claimed)
+                    if reader.claim_cursor == "0-0":
+                        next_claim = time.monotonic() + self.claim_idle_ms / 1000.0
+                        if not reader.shared and self.group_idle_ms:
+                            self._sweep_groups()
+                if entries:
+                    self._count_stream("events_redelivered", redelivered)
+                    if not self._handle(reader, entries):
+                        backlog = True
+                        self._stopping.wait(0.1)
+                failures = 0
+            except (OSError, ConnectionError, RespError) as e:
+                failures += 1
+                self._count_stream("read_errors")
+                if "NOGROUP" in str(e):
+                    reader.ready = False
+                if failures == 1 or failures % 100 == 0:
+                    logger.warning(f"Event bus stream read failed ({e}); retrying")
+                backlog = True
+                self._stopping.wait(min(_BACKOFF_MAX_S, 0.05 * (2 ** min(failures, 7))))
+
+    def _handle(self, reader, entries):
+        """Run the local handlers for one batch, then acknowledge it; returns False if they did not finish."""
+        ids, remote = [], []
+        for raw_id, fields in entries:
+            ids.append(raw_id)
+            if not fields:
+                continue  # trimmed from the stream before it could be delivered
+            message = {fields[i].decode(): fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+            if reader.shared:
+                if message.get("shared") != b"1":
+                    continue  # published before the stream was up; shared handlers already ran there
+            elif message.get("origin", b"").decode() == self.origin:
+                continue
+            remote.append(message)
+        if remote:
+            loop = self._remote_loop
+            if loop is None or loop.is_closed():
+                return False
+            future = asyncio.run_coroutine_threadsafe(self._deliver_remote(remote, reader.shared), loop)
+            try:
+                future.result(timeout=self.delivery_timeout_s)
+            except Exception as e:
+                future.cancel()
+                logger.error(f"❌ Failed to deliver {len(remote)} stream event(s) locally: {e!r}")
+                return False
+        self._client.execute("XACK", self.stream, reader.group, *ids)
+        return True
+
+    async def _deliver_remote(self, messages, shared):
+        now = time.time()
+        for message in messages:
+            event = message["event"].decode()
+            try:
+                data = json.loads(message["data"])
+            except (KeyError, ValueError) as e:
+                logger.error(f"❌ Dropping malformed stream event '{event}': {e}")
+                continue
+            published_at = time.monotonic()
+            if shared:
+                callbacks = self.shared_subscribers.get(event, ())
+                self._count_stream("shared_events_handled")
+            else:
+                self._record(event, data)
+                callbacks = self.subscribers.get(event, ())
+                self._count_stream("events_received")
+                try:
+                    self._remote_latency.observe(max(0.0, (now - float(message["ts"])) * 1000.0))
+                except (KeyError, ValueError):
+                    pass
+            pending = []
+            for callback in callbacks:
+                if asyncio.iscoroutinefunction(callback):
+                    pending.append(self._call_async(event, callback, data, published_at))
+                else:
+                    self._call_sync(event, callback, data, published_at)
+            if pending:
+                await asyncio.gather(*pending)
+
+    async def _call_async(self, event, callback, data, published_at):
+        """Await one async handler, retrying with the same backoff as the local workers."""
+        for attempt in range(self.max_retry_count + 1):
+            try:
+                await callback(data)
+                self._count("events_delivered")
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._count("delivery_failures")
+                logger.error(f"❌ Error in async event callback for '{event}': {e}")
+                logger.error(traceback.format_exc())
+                if attempt < self.max_retry_count:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+        self._observe(event, published_at)
+
+    # ------------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------------
+    def get_stats(self):
+        stats = super().get_stats()
+        with self.lock:
+            stream_stats = dict(self.stream_stats)
+        stats["stream"] = dict(
+            stream_stats,
+            stream=self.stream,
+            group=self.group,
+            shared_group=self.shared_group,
+            consumer=self.consumer,
+            outbox_depth=len(self._outbox),
+            connected=any(t.is_alive() for t in self._threads),
+            remote_latency_ms=self._remote_latency.snapshot(),
+        )
+        return stats
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.stream_stats = self._new_stream_stats()
+        self._remote_latency = _LatencyHistogram()
+
+
+__all__ = ["RedisStreamEventBus"]
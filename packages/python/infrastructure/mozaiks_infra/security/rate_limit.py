@@ -1,12 +1,43 @@
 # backend/security/rate_limit.py
+"""Request rate limiting for HTTP routes.
+
+Callers describe a limit with ``RateLimitPolicy`` and ``await enforce_rate_limit``;
+the backing limiter is pluggable:
+
+- ``InMemoryRateLimiter``: process-local GCRA (one float per key, idle keys swept).
+- ``RedisRateLimiter``: the same GCRA evaluated atomically by a Lua script on a
+  Redis-protocol server, so limits hold across uvicorn workers and hosts. The
+  client is blocking, so ``acheck`` runs the round trip in a worker thread and
+  the event loop never waits on the socket.
+
+Backend selection (read once at import):
+
+- ``MOZAIKS_RATE_LIMIT_BACKEND``: ``memory`` (default) or ``redis``
+- ``MOZAIKS_RATE_LIMIT_REDIS_URL`` (falls back to ``REDIS_URL``):
+  ``redis://[user:password@]host:port/db`` or ``rediss://`` for TLS
+- ``MOZAIKS_RATE_LIMIT_TIMEOUT_MS``: socket timeout for the shared backend (default 250)
+
+If the shared backend is unreachable, requests are limited by a process-local
+fallback until it recovers (fail-open to per-worker limits, never fail-closed).
+"""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
 import time
-from collections import deque
 from dataclasses import dataclass
+from typing import Callable, Optional, Protocol
 
 from fastapi import HTTPException, Request, status
 
+from mozaiks_infra.utils.resp_client import RespClient, RespError
+
+logger = logging.getLogger("mozaiks_core.rate_limit")
+
 
 @dataclass(frozen=True)
 class RateLimitPolicy:
@@ -14,35 +45,175 @@ class RateLimitPolicy:
     window_s: int
 
 
-class InMemoryRateLimiter:
-    """Process-local, best-effort rate limiter.
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after_s: float = 0.0
 
-    Not a substitute for a distributed limiter (e.g., Redis) in multi-worker deployments.
-    """
 
-    def __init__(self) -> None:
-        self._hits: dict[str, deque[float]] = {}
+class RateLimiter(Protocol):
+    """Interface every limiter backend implements."""
 
-    def allow(self, key: str, *, limit: int, window_s: int) -> bool:
-        now = time.monotonic()
-        window_start = now - float(window_s)
+    def check(self, key: str, *, limit: int, window_s: float) -> RateLimitDecision: ...
 
-        bucket = self._hits.get(key)
-        if bucket is None:
-            bucket = deque()
-            self._hits[key] = bucket
+    async def acheck(self, key: str, *, limit: int, window_s: float) -> RateLimitDecision: ...
 
-        while bucket and bucket[0] <= window_start:
-            bucket.popleft()
+    def allow(self, key: str, *, limit: int, window_s: float) -> bool: ...
 
-        if len(bucket) >= int(limit):
-            return False
 
-        bucket.append(now)
-        return True
+def _gcra_params(limit: int, window_s: float) -> tuple[float, float]:
+    """(emission interval, window) in seconds; ``limit`` requests may burst within ``window``."""
+    window = max(float(window_s), 1e-3)
+    return window / max(int(limit), 1), window
 
 
-rate_limiter = InMemoryRateLimiter()
+class InMemoryRateLimiter:
+    """Process-local GCRA limiter.
+
+    Each key stores only its theoretical arrival time (TAT). A key whose TAT is in
+    the past is indistinguishable from an unseen key, so such keys are swept
+    periodically and memory stays proportional to recently active clients.
+    """
+
+    def __init__(
+        self,
+        *,
+        sweep_interval_s: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._tat: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sweep_interval_s = float(sweep_interval_s)
+        self._next_sweep = clock() + self._sweep_interval_s
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def check(self, key: str, *, limit: int, window_s: float) -> RateLimitDecision:
+        emission, window = _gcra_params(limit, window_s)
+        with self._lock:
+            now = self._clock()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + emission
+            allow_at = new_tat - window
+            if now < allow_at:
+                return RateLimitDecision(False, allow_at - now)
+            self._tat[key] = new_tat
+            return RateLimitDecision(True)
+
+    async def acheck(self, key: str, *, limit: int, window_s: float) -> RateLimitDecision:
+        # Pure in-memory arithmetic: cheaper inline than a thread hop.
+        return self.check(key, limit=limit, window_s=window_s)
+
+    def allow(self, key: str, *, limit: int, window_s: float) -> bool:
+        return self.check(key, limit=limit, window_s=window_s).allowed
+
+    def sweep(self) -> int:
+        """Drop idle keys now; returns how many were removed."""
+        with self._lock:
+            return self._sweep(self._clock())
+
+    def _sweep(self, now: float) -> int:
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        self._next_sweep = now + self._sweep_interval_s
+        return len(idle)
+
+
+# GCRA evaluated server-side with the server clock, so workers never disagree on "now".
+# Keys expire once their TAT passes, so idle clients cost nothing on the server either.
+_GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local emission = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + emission
+local allow_at = new_tat - window
+if now < allow_at then
+  return {0, allow_at - now}
+end
+-- string.format keeps full precision (tostring would round to 14 digits)
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, 0}
+"""
+_GCRA_SHA = hashlib.sha1(_GCRA_LUA.encode("utf-8")).hexdigest()
+
+
+class RedisRateLimiter:
+    """GCRA limiter shared through a Redis-protocol server (atomic Lua script)."""
+
+    def __init__(
+        self,
+        client: RespClient,
+        *,
+        prefix: str = "mozaiks:rl:",
+        fallback: Optional[RateLimiter] = None,
+        retry_backend_after_s: float = 5.0,
+    ) -> None:
+        self._client = client
+        self._prefix = prefix
+        self._fallback = fallback if fallback is not None else InMemoryRateLimiter()
+        self._retry_backend_after_s = float(retry_backend_after_s)
+        self._backend_down_until = 0.0
+
+    def check(self, key: str, *, limit: int, window_s: float) -> RateLimitDecision:
+        if time.monotonic() < self._backend_down_until:
+            return self._fallback.check(key, limit=limit, window_s=window_s)
+        emission, window = _gcra_params(limit, window_s)
+        args = (1, self._prefix + key, int(emission * 1_000_000), int(window * 1_000_000))
+        try:
+            try:
+                allowed, retry_us = self._client.execute("EVALSHA", _GCRA_SHA, *args)
+            except RespError as e:
+                if not str(e).startswith("NOSCRIPT"):
+                    raise
+                allowed, retry_us = self._client.execute("EVAL", _GCRA_LUA, *args)
+        except (OSError, ConnectionError, RespError, ValueError) as e:
+            self._backend_down_until = time.monotonic() + self._retry_backend_after_s
+            logger.warning(f"Rate limit backend unavailable ({e}); using process-local limits")
+            return self._fallback.check(key, limit=limit, window_s=window_s)
+        return RateLimitDecision(bool(allowed), int(retry_us) / 1_000_000)
+
+    async def acheck(self, key: str, *, limit: int, window_s: float) -> RateLimitDecision:
+        if time.monotonic() < self._backend_down_until:
+            return self._fallback.check(key, limit=limit, window_s=window_s)
+        return await asyncio.to_thread(self.check, key, limit=limit, window_s=window_s)
+
+    def allow(self, key: str, *, limit: int, window_s: float) -> bool:
+        return self.check(key, limit=limit, window_s=window_s).allowed
+
+
+def build_rate_limiter() -> RateLimiter:
+    backend = (os.getenv("MOZAIKS_RATE_LIMIT_BACKEND") or "memory").strip().lower()
+    if backend == "redis":
+        url = (os.getenv("MOZAIKS_RATE_LIMIT_REDIS_URL") or os.getenv("REDIS_URL") or "").strip()
+        if not url:
+            logger.warning("MOZAIKS_RATE_LIMIT_BACKEND=redis but no MOZAIKS_RATE_LIMIT_REDIS_URL set; using memory")
+            return InMemoryRateLimiter()
+        try:
+            timeout_ms = float(os.getenv("MOZAIKS_RATE_LIMIT_TIMEOUT_MS", "250"))
+        except ValueError:
+            timeout_ms = 250.0
+        return RedisRateLimiter(RespClient.from_url(url, timeout_s=timeout_ms / 1000.0))
+    if backend != "memory":
+        logger.warning(f"Unknown MOZAIKS_RATE_LIMIT_BACKEND '{backend}'; using memory")
+    return InMemoryRateLimiter()
+
+
+rate_limiter: RateLimiter = build_rate_limiter()
+
+
+def set_rate_limiter(limiter: RateLimiter) -> None:
+    """Swap the limiter used by ``enforce_rate_limit`` (custom backends, tests)."""
+    global rate_limiter
+    rate_limiter = limiter
 
 
 def _client_ip(request: Request) -> str:
@@ -55,7 +226,7 @@ def _client_ip(request: Request) -> str:
     return "unknown"
 
 
-def enforce_rate_limit(
+async def enforce_rate_limit(
     request: Request,
     *,
     bucket: str,
@@ -66,12 +237,17 @@ def enforce_rate_limit(
     suffix = identity or "-"
     key = f"{bucket}:{client}:{suffix}"
 
-    if rate_limiter.allow(key, limit=policy.limit, window_s=policy.window_s):
+    acheck = getattr(rate_limiter, "acheck", None)
+    if acheck is not None:
+        decision = await acheck(key, limit=policy.limit, window_s=policy.window_s)
+    else:
+        # Custom limiter without an async path: keep its I/O off the event loop.
+        decision = await asyncio.to_thread(rate_limiter.check, key, limit=policy.limit, window_s=policy.window_s)
+    if decision.allowed:
         return
 
     raise HTTPException(
         status_code=status.HTTP_429_TOO_MANY_REQUESTS,
         detail="Too many requests",
-        headers={"Retry-After": str(int(policy.window_s))},
+        headers={"Retry-After": str(max(1, math.ceil(decision.retry_after_s)))},
     )
-
@@ -1,58 +1,426 @@
 # backend/core/state_manager.py
-import threading
+"""Ephemeral key/value state with per-key expiry.
+
+The in-process store is split into lock-striped shards so concurrent callers
+rarely contend, and expiry is driven by a per-shard min-heap: expired keys are
+reclaimed by a periodic sweep even if they are never read again.
+
+Set ``MOZAIKS_STATE_BACKEND=redis`` (with ``MOZAIKS_STATE_REDIS_URL`` or
+``REDIS_URL``) to keep state on a shared Redis-protocol server so every worker
+sees the same values. Values are stored as JSON. If the shared backend is
+unreachable, operations fall back to the in-process store.
+
+With the shared backend a value comes back as its JSON form, not the object
+that was stored: tuples become lists, ``datetime``/``date`` values become ISO
+8601 strings (the same text FastAPI renders for them) and other
+non-JSON types (``ObjectId``, ``Decimal``) become ``str()``. Store plain JSON
+values, or convert on read, when the type matters.
+
+Async code should use the ``a*`` methods (``aget``, ``aset``, ``amget``,
+``amset``, ``adelete``, ``akeys``, ``adelete_prefix``): with the shared backend
+they run the blocking round trips in a worker thread.
+"""
+import asyncio
+import datetime
+import heapq
+import json
 import logging
+import os
+import sys
+import threading
 import time
+
 from mozaiks_infra.utils.log_sanitizer import sanitize_for_log
+from mozaiks_infra.utils.resp_client import RespClient, RespError
 
 logger = logging.getLogger("mozaiks_core.state_manager")
 
-class StateManager:
+_DEFAULT_STRIPES = 16
+_DEFAULT_SWEEP_INTERVAL_S = 30.0
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _approx_size(key, value):
+    # Shallow sizes: cheap, and good enough to spot runaway growth.
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class _Stripe:
+    __slots__ = ("lock", "entries", "expiry_heap", "bytes")
+
     def __init__(self):
-        self.state = {}
-        self._lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> [value, expires_at or None, approx_bytes]
+        self.expiry_heap = []  # (expires_at, key); stale items are skipped on pop
+        self.bytes = 0
+
+
+class RedisStateBackend:
+    """Shared state on a Redis-protocol server (JSON values, server-side TTLs)."""
+
+    def __init__(self, client, *, prefix="mozaiks:state:"):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, *, timeout_s=0.25, prefix="mozaiks:state:"):
+        return cls(RespClient.from_url(url, timeout_s=timeout_s), prefix=prefix)
+
+    @staticmethod
+    def _dumps(value):
+        return json.dumps(value, separators=(",", ":"), default=_json_default)
+
+    @staticmethod
+    def _loads(raw):
+        return None if raw is None else json.loads(raw)
+
+    def _set_command(self, key, value, expire_in):
+        command = ["SET", self._prefix + key, self._dumps(value)]
+        if expire_in:
+            command += ["PX", max(1, int(float(expire_in) * 1000))]
+        return command
+
+    def set(self, key, value, expire_in=None):
+        self._client.execute(*self._set_command(key, value, expire_in))
+
+    def get(self, key):
+        return self._loads(self._client.execute("GET", self._prefix + key))
+
+    def mset(self, mapping, expire_in=None):
+        replies = self._client.pipeline(self._set_command(k, v, expire_in) for k, v in mapping.items())
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+
+    def mget(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raw = self._client.execute("MGET", *[self._prefix + key for key in keys])
+        return {key: self._loads(value) for key, value in zip(keys, raw) if value is not None}
+
+    def delete(self, key):
+        return bool(self._client.execute("DEL", self._prefix + key))
+
+    def keys(self, prefix=""):
+        pattern = self._prefix + prefix.replace("*", r"\*").replace("?", r"\?") + "*"
+        cursor, found = b"0", []
+        while True:
+            cursor, batch = self._client.execute("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+            found.extend(k.decode("utf-8")[len(self._prefix):] for k in batch)
+            if cursor in (b"0", "0"):
+                return found
+
+    def delete_prefix(self, prefix):
+        keys = self.keys(prefix)
+        for start in range(0, len(keys), 500):
+            self._client.execute("DEL", *[self._prefix + key for key in keys[start:start + 500]])
+        return len(keys)
+
+    def clear(self):
+        return self.delete_prefix("")
+
+
+class StateManager:
+    def __init__(self, *, stripes=_DEFAULT_STRIPES, backend=None, sweep_interval_s=_DEFAULT_SWEEP_INTERVAL_S):
+        count = 1
+        while count < max(1, int(stripes)):
+            count <<= 1
+        self._stripes = [_Stripe() for _ in range(count)]
+        self._mask = count - 1
+        self._backend = backend
+        self._sweep_interval_s = float(sweep_interval_s)
+        self._next_sweep = time.monotonic() + self._sweep_interval_s
+        self._sweeper_task = None
+        self._backend_errors = 0
+        self._expired = 0
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) & self._mask]
+
+    # ------------------------------------------------------------------
+    # Local (in-process) store
+    # ------------------------------------------------------------------
+    def _local_set(self, key, value, expire_in, now):
+        stripe = self._stripe(key)
+        expires_at = now + expire_in if expire_in else None
+        size = _approx_size(key, value)
+        with stripe.lock:
+            previous = stripe.entries.get(key)
+            if previous is not None:
+                stripe.bytes -= previous[2]
+            stripe.entries[key] = [value, expires_at, size]
+            stripe.bytes += size
+            if expires_at is not None:
+                heapq.heappush(stripe.expiry_heap, (expires_at, key))
+                # Re-set keys leave stale heap items behind; rebuild when they dominate.
+                if len(stripe.expiry_heap) > 2 * len(stripe.entries) + 64:
+                    stripe.expiry_heap = [(e[1], k) for k, e in stripe.entries.items() if e[1] is not None]
+                    heapq.heapify(stripe.expiry_heap)
+
+    def _local_get(self, key, now):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and now > entry[1]:
+                del stripe.entries[key]
+                stripe.bytes -= entry[2]
+                self._expired += 1
+                return None
+            return entry[0]
+
+    def _local_delete(self, key):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.pop(key, None)
+            if entry is not None:
+                stripe.bytes -= entry[2]
+            return entry is not None
+
+    def _maybe_sweep(self, now):
+        if now >= self._next_sweep:
+            self._next_sweep = now + self._sweep_interval_s
+            self.sweep_expired(now)
+
+    def sweep_expired(self, now=None):
+        """Reclaim every expired key; returns how many were removed."""
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                heap = stripe.expiry_heap
+                while heap and heap[0][0] <= now:
+                    expires_at, key = heapq.heappop(heap)
+                    entry = stripe.entries.get(key)
+                    if entry is not None and entry[1] == expires_at:
+                        del stripe.entries[key]
+                        stripe.bytes -= entry[2]
+                        removed += 1
+        self._expired += removed
+        return removed
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def _backend_failed(self, operation, error):
+        self._backend_errors += 1
+        if self._backend_errors % 100 == 1:
+            logger.warning(f"Shared state backend {operation} failed ({error}); using in-process state")
 
     def set(self, key, value, expire_in=None):
         """
-        Stores a key-value pair in memory.
+        Stores a key-value pair.
         Optionally, set an expiration time in seconds.
         """
-        with self._lock:
-            self.state[key] = {"value": value, "expires_at": time.time() + expire_in if expire_in else None}
-            logger.info(f"🔹 State updated: '{sanitize_for_log(key)}' set (Expires in: {expire_in} sec)")
+        if self._backend is not None:
+            try:
+                self._backend.set(key, value, expire_in)
+                return
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("set", e)
+        now = time.monotonic()
+        self._local_set(key, value, expire_in, now)
+        self._maybe_sweep(now)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🔹 State updated: '{sanitize_for_log(key)}' set (Expires in: {expire_in} sec)")
 
     def get(self, key):
         """
-        Retrieves a value from memory.
-        If the value has expired, it is deleted and None is returned.
+        Retrieves a value.
+        Expired values are never returned.
         """
-        with self._lock:
-            entry = self.state.get(key)
-            if not entry:
-                return None
+        if self._backend is not None:
+            try:
+                return self._backend.get(key)
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("get", e)
+        return self._local_get(key, time.monotonic())
 
-            # If expired, remove from state and return None
-            if entry["expires_at"] and time.time() > entry["expires_at"]:
-                del self.state[key]
-                logger.info(f"⚠️ Expired state key removed: '{sanitize_for_log(key)}'")
-                return None
+    def mset(self, mapping, expire_in=None):
+        """Store several key-value pairs with the same expiry."""
+        if self._backend is not None:
+            try:
+                self._backend.mset(mapping, expire_in)
+                return
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("mset", e)
+        now = time.monotonic()
+        for key, value in mapping.items():
+            self._local_set(key, value, expire_in, now)
+        self._maybe_sweep(now)
 
-            return entry["value"]
+    def mget(self, keys):
+        """Return ``{key: value}`` for the keys that exist and have not expired."""
+        if self._backend is not None:
+            try:
+                return self._backend.mget(keys)
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("mget", e)
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            value = self._local_get(key, now)
+            if value is not None:
+                found[key] = value
+        return found
 
     def delete(self, key):
         """
         Removes a key-value pair from the state.
         """
-        with self._lock:
-            if key in self.state:
-                del self.state[key]
-                logger.info(f"🗑️ State key removed: '{sanitize_for_log(key)}'")
+        if self._backend is not None:
+            try:
+                self._backend.delete(key)
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("delete", e)
+        if self._local_delete(key) and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🗑️ State key removed: '{sanitize_for_log(key)}'")
+
+    def keys(self, prefix=""):
+        """Live keys starting with ``prefix``."""
+        if self._backend is not None:
+            try:
+                return self._backend.keys(prefix)
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("keys", e)
+        now = time.monotonic()
+        found = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                found.extend(
+                    key for key, entry in stripe.entries.items()
+                    if key.startswith(prefix) and (entry[1] is None or now <= entry[1])
+                )
+        return found
+
+    def delete_prefix(self, prefix):
+        """Remove every key starting with ``prefix``; returns how many were removed."""
+        removed = 0
+        if self._backend is not None:
+            try:
+                removed = self._backend.delete_prefix(prefix)
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("delete_prefix", e)
+        for stripe in self._stripes:
+            with stripe.lock:
+                doomed = [key for key in stripe.entries if key.startswith(prefix)]
+                for key in doomed:
+                    stripe.bytes -= stripe.entries.pop(key)[2]
+                removed += len(doomed)
+        return removed
 
     def clear(self):
         """
         Clears all stored state data.
         """
-        with self._lock:
-            self.state.clear()
-            logger.info("🧹 All state cleared.")
+        if self._backend is not None:
+            try:
+                self._backend.clear()
+            except (OSError, ConnectionError, RespError) as e:
+                self._backend_failed("clear", e)
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+                stripe.expiry_heap.clear()
+                stripe.bytes = 0
+        logger.info("🧹 All state cleared.")
+
+    # Async variants: shared-backend I/O runs off the event loop.
+    async def aset(self, key, value, expire_in=None):
+        if self._backend is None:
+            return self.set(key, value, expire_in)
+        return await asyncio.to_thread(self.set, key, value, expire_in)
+
+    async def aget(self, key):
+        if self._backend is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def amset(self, mapping, expire_in=None):
+        if self._backend is None:
+            return self.mset(mapping, expire_in)
+        return await asyncio.to_thread(self.mset, mapping, expire_in)
+
+    async def amget(self, keys):
+        if self._backend is None:
+            return self.mget(keys)
+        return await asyncio.to_thread(self.mget, list(keys))
+
+    async def adelete(self, key):
+        if self._backend is None:
+            return self.delete(key)
+        return await asyncio.to_thread(self.delete, key)
+
+    async def akeys(self, prefix=""):
+        if self._backend is None:
+            return self.keys(prefix)
+        return await asyncio.to_thread(self.keys, prefix)
+
+    async def adelete_prefix(self, prefix):
+        if self._backend is None:
+            return self.delete_prefix(prefix)
+        return await asyncio.to_thread(self.delete_prefix, prefix)
+
+    # ------------------------------------------------------------------
+    # Background expiry
+    # ------------------------------------------------------------------
+    def start_expiry_sweeper(self, interval_s=None):
+        """Sweep expired keys on the running event loop every ``interval_s`` seconds."""
+        if self._sweeper_task is not None and not self._sweeper_task.done():
+            return self._sweeper_task
+        interval = float(interval_s or self._sweep_interval_s)
+
+        async def _run():
+            while True:
+                await asyncio.sleep(interval)
+                removed = self.sweep_expired()
+                if removed and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"⚠️ Expired {removed} state key(s)")
+
+        self._sweeper_task = asyncio.get_running_loop().create_task(_run())
+        return self._sweeper_task
+
+    async def stop_expiry_sweeper(self):
+        task, self._sweeper_task = self._sweeper_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        keys = sum(len(stripe.entries) for stripe in self._stripes)
+        return {
+            "backend": "redis" if self._backend is not None else "memory",
+            "stripes": len(self._stripes),
+            "keys": keys,
+            "approx_bytes": sum(stripe.bytes for stripe in self._stripes),
+            "pending_expiries": sum(len(stripe.expiry_heap) for stripe in self._stripes),
+            "expired": self._expired,
+            "backend_errors": self._backend_errors,
+        }
+
+
+def _build_state_backend():
+    if (os.getenv("MOZAIKS_STATE_BACKEND") or "memory").strip().lower() != "redis":
+        return None
+    url = (os.getenv("MOZAIKS_STATE_REDIS_URL") or os.getenv("REDIS_URL") or "").strip()
+    if not url:
+        logger.warning("MOZAIKS_STATE_BACKEND=redis but no MOZAIKS_STATE_REDIS_URL set; using in-process state")
+        return None
+    try:
+        return RedisStateBackend.from_url(url)
+    except ValueError as e:
+        logger.warning(f"Invalid MOZAIKS_STATE_REDIS_URL ({e}); using in-process state")
+        return None
+
 
-state_manager = StateManager()
\ No newline at end of file
+state_manager = StateManager(backend=_build_state_backend())
@@ -0,0 +1,162 @@
+# backend/utils/resp_client.py
+"""Minimal blocking client for Redis-protocol (RESP2) servers.
+
+Shared by the rate limiter and the state manager's optional shared backend so
+the infrastructure package does not need a hard Redis client dependency.
+"""
+from __future__ import annotations
+
+import socket
+import ssl
+import threading
+from typing import Any, Iterable, List, Optional, Sequence
+from urllib.parse import unquote, urlsplit
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """Minimal blocking RESP2 client (one connection, serialized by a lock).
+
+    Covers what mozaiks needs (GET/SET/MGET/SCAN/DEL/EVALSHA...); ``pipeline``
+    sends several commands in one round trip.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_ssl: bool = False,
+        timeout_s: float = 0.25,
+    ) -> None:
+        self.host = host
+        self.port = int(port)
+        self.db = int(db)
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout_s = float(timeout_s)
+        self._sock: Optional[socket.socket] = None
+        self._reader: Any = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, *, timeout_s: float = 0.25) -> "RespClient":
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported Redis URL scheme: {parts.scheme!r}")
+        db_path = (parts.path or "/").lstrip("/")
+        return cls(
+            parts.hostname or "localhost",
+            parts.port or 6379,
+            db=int(db_path) if db_path.isdigit() else 0,
+            username=unquote(parts.username) if parts.username else None,
+            password=unquote(parts.password) if parts.password else None,
+            use_ssl=parts.scheme == "rediss",
+            timeout_s=timeout_s,
+        )
+
+    def execute(self, *args: Any) -> Any:
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(self._encode(args))
+                reply = self._read_reply()
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+            if isinstance(reply, RespError):
+                raise reply
+            return reply
+
+    def pipeline(self, commands: Iterable[Sequence[Any]]) -> List[Any]:
+        """Send ``commands`` in one write and return their replies (errors as RespError values)."""
+        commands = list(commands)
+        if not commands:
+            return []
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(b"".join(self._encode(tuple(args)) for args in commands))
+                return [self._read_reply() for _ in commands]
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _connect(self) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout_s)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.use_ssl:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        try:
+            if self.password is not None:
+                auth = ("AUTH", self.username, self.password) if self.username else ("AUTH", self.password)
+                self._handshake(auth)
+            if self.db:
+                self._handshake(("SELECT", self.db))
+        except Exception:
+            self._close()
+            raise
+
+    def _handshake(self, args: tuple) -> None:
+        self._sock.sendall(self._encode(args))
+        reply = self._read_reply()
+        if isinstance(reply, RespError):
+            raise reply
+
+    def _close(self) -> None:
+        for closeable in (self._reader, self._sock):
+            if closeable is not None:
+                try:
+                    closeable.close()
+                except OSError:
+                    pass
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by Redis-protocol server")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode("utf-8")
+        if prefix == b"-":
+            return RespError(body.decode("utf-8"))
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            data = self._reader.read(size + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(body)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected RESP reply prefix: {prefix!r}")
+
+
+__all__ = ["RespClient", "RespError"]
@@ -0,0 +1,201 @@
+"""Admin broadcast throughput: serial per-user delivery vs. batched fan-out.
+
+"serial" is what ``BroadcastService.broadcast`` did before the fan-out engine:
+load up to 10k users with ``to_list``, then for each user await every channel
+in turn (one ``insert_one`` per in-app notification). "fan-out" is the current
+engine: stream the cursor in batches, one ``insert_many`` per batch for
+in-app, per-user channels with bounded concurrency.
+
+MongoDB is replaced by a local in-memory stand-in that charges ``--rtt-ms``
+per round trip (insert, update, cursor batch). A per-user channel (like SMS
+or web push) charges ``--channel-ms`` per send.
+
+Usage:
+    python benchmarks/bench_broadcast_fanout.py [--users 10000] [--rtt-ms 0.5] [--channel-ms 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = Path(__file__).resolve().parents[4]
+for path in (ROOT, REPO_ROOT / "packages" / "python" / "infrastructure"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from bson import ObjectId  # noqa: E402
+
+from mozaiks_platform.notifications import broadcast as broadcast_module  # noqa: E402
+from mozaiks_platform.notifications.broadcast import BroadcastService  # noqa: E402
+from mozaiks_platform.notifications.channels import in_app as in_app_module  # noqa: E402
+from mozaiks_platform.notifications.channels.in_app import InAppChannel  # noqa: E402
+
+
+class _Result:
+    def __init__(self, inserted_id=None):
+        self.inserted_id = inserted_id
+
+
+class _Cursor:
+    def __init__(self, collection, docs):
+        self._collection = collection
+        self._docs = docs
+        self._batch = 101  # MongoDB's default first batch
+
+    def batch_size(self, size):
+        self._batch = size
+        return self
+
+    async def to_list(self, length):
+        docs = self._docs[:length]
+        for _ in range(0, len(docs), self._batch):
+            await self._collection.round_trip()
+        return docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for start in range(0, len(self._docs), self._batch):
+            await self._collection.round_trip()
+            for doc in self._docs[start:start + self._batch]:
+                yield doc
+
+
+class _LocalCollection:
+    """In-memory collection that charges one RTT per server round trip."""
+
+    def __init__(self, rtt_s):
+        self.rtt_s = rtt_s
+        self.docs = []
+        self.round_trips = 0
+
+    async def round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt_s)
+
+    async def count_documents(self, query):
+        await self.round_trip()
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        return _Cursor(self, list(self.docs))
+
+    async def insert_one(self, doc):
+        await self.round_trip()
+        doc["_id"] = ObjectId()
+        self.docs.append(doc)
+        return _Result(doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        await self.round_trip()
+        for doc in docs:
+            doc["_id"] = ObjectId()
+        self.docs.extend(docs)
+
+    async def update_one(self, query, update):
+        await self.round_trip()
+
+
+class _LocalMongo(dict):
+    def __init__(self, rtt_s):
+        super().__init__()
+        self.rtt_s = rtt_s
+
+    def __missing__(self, name):
+        self[name] = _LocalCollection(self.rtt_s)
+        return self[name]
+
+
+class _RemoteChannel:
+    """Per-user channel (SMS/web push) backed by an external API."""
+
+    channel_id = "sms"
+
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+
+    def is_enabled(self):
+        return True
+
+    async def send(self, user_id, notification_type, title, message, metadata=None):
+        await asyncio.sleep(self.latency_s)
+        return True
+
+
+async def _serial_broadcast(db, channels, users_query, title, message):
+    """The pre-fan-out delivery loop."""
+    users = await db["users"].find(users_query, {"_id": 1, "email": 1}).to_list(length=10000)
+    sent = 0
+    for user in users:
+        success = False
+        for channel in channels:
+            if await channel.send(
+                user_id=str(user["_id"]),
+                notification_type="announcement",
+                title=title,
+                message=message,
+                metadata={"email": user.get("email")},
+            ):
+                success = True
+        sent += success
+        await asyncio.sleep(0)
+    return sent
+
+
+async def _run(label, users, rtt_s, channel_s, channel_ids, batch_size, concurrency):
+    db = _LocalMongo(rtt_s)
+    db["users"].docs = [{"_id": ObjectId(), "email": f"user{i}@example.com"} for i in range(users)]
+    channels = {"in_app": InAppChannel(), "sms": _RemoteChannel(channel_s)}
+    selected = [channels[c] for c in channel_ids]
+
+    with mock.patch.object(broadcast_module, "db", db), mock.patch.object(in_app_module, "db", db), \
+            mock.patch.dict(broadcast_module.CHANNELS, channels, clear=True), \
+            mock.patch.object(broadcast_module, "get_enabled_channels", lambda: channels):
+        start = time.perf_counter()
+        if label == "serial":
+            sent = await _serial_broadcast(db, selected, {}, "Hello", "News")
+        else:
+            service = BroadcastService()
+            service.batch_size = batch_size
+            service.concurrency = concurrency
+            service._delivery_slots = asyncio.Semaphore(concurrency)
+            result = await service.broadcast(
+                "announcement", "Hello", "News", {"type": "all"}, channels=list(channel_ids), wait=True
+            )
+            sent = result["sent_count"]
+        elapsed = time.perf_counter() - start
+    trips = sum(c.round_trips for c in db.values())
+    return elapsed, sent, trips
+
+
+def main(users, rtt_ms, channel_ms, batch_size, concurrency):
+    print(f"users={users} rtt={rtt_ms}ms channel={channel_ms}ms batch={batch_size} concurrency={concurrency}")
+    for channel_ids in (("in_app",), ("in_app", "sms")):
+        rows = []
+        for label in ("serial", "fan-out"):
+            elapsed, sent, trips = asyncio.run(
+                _run(label, users, rtt_ms / 1000, channel_ms / 1000, channel_ids, batch_size, concurrency)
+            )
+            rows.append((label, elapsed, sent, trips))
+        print(f"channels={'+'.join(channel_ids)}")
+        for label, elapsed, sent, trips in rows:
+            print(f"  {label:<8} {elapsed:>8.2f}s  {sent / elapsed:>9.0f} users/s  sent={sent:<6} db_round_trips={trips}")
+        print(f"  speedup  {rows[0][1] / rows[1][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--channel-ms", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    main(args.users, args.rtt_ms, args.channel_ms, args.batch_size, args.concurrency)
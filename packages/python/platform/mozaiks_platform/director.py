@@ -22,6 +22,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Union
 
 from .plugin_manager import PLUGIN_DIR, plugin_manager
+from .plugin_executor import plugin_executor
+from .plugin_registry import ERROR_NOT_FOUND, registry_index
 from mozaiks_platform.subscription_manager import subscription_manager
 from mozaiks_platform.subscription_stub import SubscriptionStub
 from .event_bus import event_bus
@@ -444,13 +446,13 @@ async def ensure_plugins_up_to_date():
     if _plugin_refresh_in_progress:
         return
     
-    last_refresh = state_manager.get("last_plugin_refresh_time")
+    last_refresh = await state_manager.aget("last_plugin_refresh_time")
     current_time = time.time()
     
     # Only refresh if it's been more than 5 minutes (300 seconds) since last refresh
     if not last_refresh or (current_time - last_refresh > 300):
         # Update timestamp first to prevent multiple refreshes
-        state_manager.set("last_plugin_refresh_time", current_time)
+        await state_manager.aset("last_plugin_refresh_time", current_time)
         
         # Create a background task for the refresh to not block current request
         asyncio.create_task(async_refresh_plugins())
@@ -556,7 +558,7 @@ async def get_navigation(user: dict = Depends(get_current_user)):
     """
     # Use a cache key specific to this user
     cache_key = f"navigation:{user['user_id']}"
-    cached_nav = state_manager.get(cache_key)
+    cached_nav = await state_manager.aget(cache_key)
     
     # Return cached navigation if available (except during development)
     if cached_nav and os.getenv("ENV") != "development":
@@ -569,16 +571,6 @@ async def get_navigation(user: dict = Depends(get_current_user)):
         # Load navigation config
         nav_config = load_config("navigation_config.json")
         
-        # Get plugin registry
-        plugin_registry_path = get_config_path() / "plugin_registry.json"
-        try:
-            with open(plugin_registry_path, "r") as f:
-                registry = json.load(f)
-                installed_plugins = registry.get("plugins", [])
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Error reading plugin registry: {e}")
-            installed_plugins = []
-
         # Start with default navigation items
         final_navigation = []
         for item in nav_config.get("default", []):
@@ -604,7 +596,7 @@ async def get_navigation(user: dict = Depends(get_current_user)):
 
             # When monetization is disabled, include all enabled plugins
             # When monetization is enabled, check subscription access
-            plugin_is_enabled = any(p.get("name") == plugin_name and p.get("enabled", True) for p in installed_plugins)
+            plugin_is_enabled = registry_index.is_enabled(plugin_name)
             
             if plugin_is_enabled:
                 if not MONETIZATION or await subscription_manager.is_plugin_accessible(user["user_id"], plugin_name):
@@ -612,7 +604,7 @@ async def get_navigation(user: dict = Depends(get_current_user)):
 
         # Cache navigation for this user
         cache_ttl = 60 if os.getenv("ENV") == "development" else 300  # 1 minute in dev, 5 minutes in prod
-        state_manager.set(cache_key, final_navigation, expire_in=cache_ttl)
+        await state_manager.aset(cache_key, final_navigation, expire_in=cache_ttl)
         
         return {"navigation": final_navigation}
 
@@ -654,7 +646,7 @@ async def get_user_profile(user: dict = Depends(get_current_user)):
     API to fetch user profile information.
     """
     cache_key = f"user_profile:{user['user_id']}"
-    cached_profile = state_manager.get(cache_key)
+    cached_profile = await state_manager.aget(cache_key)
     
     # Return cached profile if available (except in development)
     if cached_profile and os.getenv("ENV") != "development":
@@ -676,7 +668,7 @@ async def get_user_profile(user: dict = Depends(get_current_user)):
     
     # Cache for 5 minutes (shorter in development)
     cache_ttl = 60 if os.getenv("ENV") == "development" else 300
-    state_manager.set(cache_key, user_data, expire_in=cache_ttl)
+    await state_manager.aset(cache_key, user_data, expire_in=cache_ttl)
     
     return user_data
 
@@ -708,7 +700,7 @@ async def update_user_profile(request: Request, user: dict = Depends(get_current
         
         # Invalidate profile cache
         cache_key = f"user_profile:{user['user_id']}"
-        state_manager.delete(cache_key)
+        await state_manager.adelete(cache_key)
         db_cache.invalidate(f"user:{user['username']}")
         
         # Publish profile update event
@@ -728,7 +720,7 @@ async def get_available_plugins(user: dict = Depends(get_current_user)):
     """
     # Use caching for plugin list
     cache_key = f"available_plugins:{user['user_id']}"
-    cached_plugins = state_manager.get(cache_key)
+    cached_plugins = await state_manager.aget(cache_key)
     
     # Return cached result if available (except in development)
     if cached_plugins and os.getenv("ENV") != "development":
@@ -737,46 +729,34 @@ async def get_available_plugins(user: dict = Depends(get_current_user)):
     # Auto-detect new plugins - essential for this endpoint
     await ensure_plugins_up_to_date()
     
-    plugin_registry_path = get_config_path() / "plugin_registry.json"
+    snapshot = registry_index.snapshot
+    if snapshot.error:
+        logger.error(f"⚠️ {snapshot.error}")
+        status_code = 404 if snapshot.error == ERROR_NOT_FOUND else 500
+        raise HTTPException(status_code=status_code, detail=f"{snapshot.error}.")
 
-    try:
-        with open(plugin_registry_path, "r") as f:
-            registry = json.load(f)
-            # Filter plugins that are enabled
-            enabled_plugins = [plugin for plugin in registry.get("plugins", []) 
-                              if plugin.get("enabled", True)]
-            
-            # If monetization is disabled, return all enabled plugins
-            if not MONETIZATION:
-                # Cache for 5 minutes (shorter in development)
-                cache_ttl = 60 if os.getenv("ENV") == "development" else 300
-                state_manager.set(cache_key, enabled_plugins, expire_in=cache_ttl)
-                return {"plugins": enabled_plugins}
-                
-            # Filter plugins that the user has access to when monetization is enabled
-            accessible_plugins = []
-            for plugin in enabled_plugins:
-                # Regular plugin access check
-                if await subscription_manager.is_plugin_accessible(user["user_id"], plugin["name"]):
-                    accessible_plugins.append(plugin)
-            
-            # Cache for 5 minutes (shorter in development)
-            cache_ttl = 60 if os.getenv("ENV") == "development" else 300
-            state_manager.set(cache_key, accessible_plugins, expire_in=cache_ttl)
-            
-            return {"plugins": accessible_plugins}
+    # Filter plugins that are enabled
+    enabled_plugins = [plugin for plugin in snapshot.plugins if plugin.get("name") in snapshot.enabled]
 
-    except FileNotFoundError:
-        logger.error("⚠️ Plugin registry file not found.")
-        raise HTTPException(status_code=404, detail="Plugin registry file not found.")
+    # If monetization is disabled, return all enabled plugins
+    if not MONETIZATION:
+        # Cache for 5 minutes (shorter in development)
+        cache_ttl = 60 if os.getenv("ENV") == "development" else 300
+        await state_manager.aset(cache_key, enabled_plugins, expire_in=cache_ttl)
+        return {"plugins": enabled_plugins}
+
+    # Filter plugins that the user has access to when monetization is enabled
+    accessible_plugins = []
+    for plugin in enabled_plugins:
+        # Regular plugin access check
+        if await subscription_manager.is_plugin_accessible(user["user_id"], plugin["name"]):
+            accessible_plugins.append(plugin)
 
-    except json.JSONDecodeError:
-        logger.error("❌ Invalid JSON in plugin registry.")
-        raise HTTPException(status_code=500, detail="Invalid JSON in plugin registry.")
+    # Cache for 5 minutes (shorter in development)
+    cache_ttl = 60 if os.getenv("ENV") == "development" else 300
+    await state_manager.aset(cache_key, accessible_plugins, expire_in=cache_ttl)
 
-    except Exception as e:
-        logger.error(f"⚠️ Error loading plugin registry: {e}")
-        raise HTTPException(status_code=500, detail="Unexpected error loading plugin registry.")
+    return {"plugins": accessible_plugins}
 
 
 # Contract v1.0.0: Alias endpoint for plugin discovery
@@ -803,29 +783,20 @@ async def execute_plugin(plugin_name: str, request: Request, user: dict = Depend
     
     This endpoint no longer triggers plugin refresh on every call.
     """
-    # Check if plugin exists in registry
-    plugin_registry_path = get_config_path() / "plugin_registry.json"
-    try:
-        with open(plugin_registry_path, "r") as f:
-            registry = json.load(f)
-            installed_plugins = registry.get("plugins", [])
-            plugin_exists = any(p.get("name") == plugin_name and p.get("enabled", True) for p in installed_plugins)
-            if not plugin_exists:
-                logger.warning(f"Plugin {plugin_name} not found in registry or disabled")
-                raise HTTPException(status_code=404, detail=f"Plugin '{plugin_name}' not found or disabled")
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Error reading plugin registry: {e}")
+    # Check if plugin exists in registry (in-memory index, kept current by a file watcher)
+    snapshot = registry_index.snapshot
+    if snapshot.error:
+        logger.error(f"Error reading plugin registry: {snapshot.error}")
         raise HTTPException(status_code=500, detail="Error reading plugin configuration")
-    
-    # Check if plugin is loaded in plugin manager
+    if plugin_name not in snapshot.enabled:
+        logger.warning(f"Plugin {plugin_name} not found in registry or disabled")
+        raise HTTPException(status_code=404, detail=f"Plugin '{plugin_name}' not found or disabled")
+
+    # Check if plugin is loaded in plugin manager; the registry lists it, so load just this one
     if plugin_name not in plugin_manager.plugins:
         logger.warning(f"Plugin {plugin_name} not loaded in plugin manager. Available plugins: {list(plugin_manager.plugins.keys())}")
-        # Try to reload all plugins - for compatibility with original code
-        await plugin_manager.refresh_plugins()
-        
-        # Check again after refresh
-        if plugin_name not in plugin_manager.plugins:
-            logger.warning(f"Plugin {plugin_name} still not loaded after refresh")
+        if not await plugin_manager.ensure_plugin_loaded(plugin_name):
+            logger.warning(f"Plugin {plugin_name} could not be loaded")
             raise HTTPException(status_code=404, detail=f"Plugin '{plugin_name}' not found.")
 
     try:
@@ -878,6 +849,8 @@ async def execute_plugin(plugin_name: str, request: Request, user: dict = Depend
 
         if isinstance(result, dict) and "error" in result:
             logger.error(f"Execution error for plugin {plugin_name}: {result['error']}")
+            if result.get("error_code") == "PLUGIN_BUSY":
+                raise HTTPException(status_code=503, detail=result["error"])
             raise HTTPException(status_code=500, detail=result["error"])
 
         # Contract v1.1.0: Auto-consume entitlements on success
@@ -916,21 +889,21 @@ async def check_plugin_access(plugin_name: str, user: dict = Depends(get_current
     """
     # Use cache for frequent access checks - 5 seconds for immediate feedback
     cache_key = f"plugin_access:{user['user_id']}:{plugin_name}"
-    cached_access = state_manager.get(cache_key)
+    cached_access = await state_manager.aget(cache_key)
     
     if cached_access is not None:
         return {"plugin": plugin_name, "access": cached_access}
     
     # Always grant access when monetization is disabled
     if not MONETIZATION:
-        state_manager.set(cache_key, True, expire_in=60)  # Cache for 1 minute
+        await state_manager.aset(cache_key, True, expire_in=60)  # Cache for 1 minute
         return {"plugin": plugin_name, "access": True}
     
     # Regular plugin access check
     access = await subscription_manager.is_plugin_accessible(user["user_id"], plugin_name)
     
     # Cache result for 1 minute for compatibility with original code
-    state_manager.set(cache_key, access, expire_in=60)
+    await state_manager.aset(cache_key, access, expire_in=60)
     
     return {"plugin": plugin_name, "access": access}
 
@@ -950,7 +923,7 @@ if MONETIZATION:
         Get current user subscription details
         """
         cache_key = f"user_subscription:{user['user_id']}"
-        cached_subscription = state_manager.get(cache_key)
+        cached_subscription = await state_manager.aget(cache_key)
         
         if cached_subscription is not None:
             return cached_subscription
@@ -958,7 +931,7 @@ if MONETIZATION:
         subscription = await subscription_manager.get_user_subscription(user["user_id"])
         
         # Cache subscription for 5 minutes
-        state_manager.set(cache_key, subscription, expire_in=300)
+        await state_manager.aset(cache_key, subscription, expire_in=300)
         
         return subscription
 
@@ -978,15 +951,13 @@ if MONETIZATION:
             response = await subscription_manager.change_user_subscription(user["user_id"], new_plan)
 
             # Invalidate subscription cache
-            state_manager.delete(f"user_subscription:{user['user_id']}")
+            await state_manager.adelete(f"user_subscription:{user['user_id']}")
             
             # Invalidate navigation and plugin access caches for this user
-            state_manager.delete(f"navigation:{user['user_id']}")
+            await state_manager.adelete(f"navigation:{user['user_id']}")
             
             # Clear all plugin access caches for this user
-            for key in list(state_manager.state.keys()):
-                if key.startswith(f"plugin_access:{user['user_id']}:"):
-                    state_manager.delete(key)
+            await state_manager.adelete_prefix(f"plugin_access:{user['user_id']}:")
 
             # Publish event when a user changes their subscription
             event_bus.publish("subscription_updated", {"user_id": user["user_id"], "plan": new_plan})
@@ -1009,15 +980,13 @@ if MONETIZATION:
             response = await subscription_manager.cancel_user_subscription(user["user_id"])
 
             # Invalidate subscription cache
-            state_manager.delete(f"user_subscription:{user['user_id']}")
+            await state_manager.adelete(f"user_subscription:{user['user_id']}")
             
             # Invalidate navigation cache for this user
-            state_manager.delete(f"navigation:{user['user_id']}")
+            await state_manager.adelete(f"navigation:{user['user_id']}")
             
             # Clear all plugin access caches for this user
-            for key in list(state_manager.state.keys()):
-                if key.startswith(f"plugin_access:{user['user_id']}:"):
-                    state_manager.delete(key)
+            await state_manager.adelete_prefix(f"plugin_access:{user['user_id']}:")
 
             # Publish event when a user cancels their subscription
             event_bus.publish("subscription_canceled", {"user_id": user["user_id"]})
@@ -1043,7 +1012,7 @@ async def change_theme(request: Request, user: dict = Depends(get_current_user))
             raise HTTPException(status_code=400, detail="Theme name is required")
 
         # Store the selected theme in session/state
-        state_manager.set(f"theme_{user['user_id']}", new_theme)
+        await state_manager.aset(f"theme_{user['user_id']}", new_theme)
 
         # Publish event when the theme is changed
         event_bus.publish("theme_changed", {"user_id": user["user_id"], "theme": new_theme})
@@ -1061,7 +1030,7 @@ async def get_current_theme(user: dict = Depends(get_current_user)):
     """
     API to get the user's current theme setting.
     """
-    theme = state_manager.get(f"theme_{user['user_id']}")
+    theme = await state_manager.aget(f"theme_{user['user_id']}")
     if not theme:
         # Get default theme from config
         theme_config = load_config("theme_config.json")
@@ -1098,10 +1067,8 @@ async def debug_plugin_status():
                            if os.path.isdir(os.path.join(plugins_dir, d))
                            and not d.startswith('_')],
         "navigation_config": load_config("navigation_config.json"),
-        "db_cache_stats": {
-            "size": getattr(db_cache, "cache", {}).get("size", 0),
-            "ttl": getattr(db_cache, "ttl", 0)
-        }
+        "db_cache_stats": db_cache.stats(),
+        "plugin_execution": plugin_executor.get_metrics(),
     }
 
 @app.get("/api/plugin-settings/{plugin_name}")
@@ -1249,15 +1216,22 @@ async def startup_event():
     # Initialize the plugin manager asynchronously
     global plugin_manager
     plugin_manager = await plugin_manager.init_async()
+    await registry_index.start()
     
     # Register all websocket routes after plugins are loaded
     from mozaiks_platform.plugin_manager import register_websockets
     await register_websockets(app)
     
     # Set up database
-    from mozaiks_infra.config.database import verify_connection, initialize_database
+    from mozaiks_infra.config.database import (
+        verify_connection,
+        initialize_database,
+        start_cache_invalidation_listener,
+    )
     await verify_connection()
     await initialize_database()
+    await start_cache_invalidation_listener()
+    await event_bus.connect()
     
     # Log startup complete with total plugins loaded
     logger.info(f"✅ Startup complete - {len(plugin_manager.plugins)} plugins loaded")
@@ -1270,9 +1244,13 @@ async def shutdown_event():
     logger.info("🛑 Shutting down Mozaiks API")
     
     # Clear caches
+    from mozaiks_infra.config.database import stop_cache_invalidation_listener
+    await stop_cache_invalidation_listener()
+    await event_bus.close()
+    await registry_index.stop()
+    plugin_executor.shutdown()
     state_manager.clear()
-    if hasattr(db_cache, "clear"):
-        db_cache.clear()
+    db_cache.clear()
     config_cache.clear()
     
     logger.info("✅ Shutdown complete")
@@ -8,14 +8,23 @@ Supports targeting by subscription tier, plugin access, or custom queries.
 Access Control:
     Requires X-Mozaiks-App-Admin-Key header or platform admin JWT
     
+Delivery streams matching users from the cursor in batches (no cap on
+audience size). In-app notifications are written with one insert_many per
+batch; per-user channels (email, SMS, push) run with bounded concurrency.
+The broadcast record's processed/sent/failed counts update after each batch;
+a job cancelled mid-way is marked interrupted with the counts reached.
+
 Environment Variables:
     MOZAIKS_APP_ADMIN_KEY: Admin API key for broadcast operations
+    MOZAIKS_BROADCAST_BATCH_SIZE: Users per delivery batch (default 500)
+    MOZAIKS_BROADCAST_CONCURRENCY: Concurrent per-user channel sends (default 50)
 """
 
 import os
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 from mozaiks_infra.config.database import db
 from .channels import get_enabled_channels, CHANNELS
@@ -37,6 +46,10 @@ class BroadcastService:
     
     def __init__(self):
         self.admin_key = os.getenv("MOZAIKS_APP_ADMIN_KEY", "")
+        self.batch_size = max(1, int(os.getenv("MOZAIKS_BROADCAST_BATCH_SIZE", "500")))
+        self.concurrency = max(1, int(os.getenv("MOZAIKS_BROADCAST_CONCURRENCY", "50")))
+        self._delivery_slots = asyncio.Semaphore(self.concurrency)
+        self._jobs: Dict[str, asyncio.Task] = {}
     
     def verify_admin_access(self, provided_key: str) -> bool:
         """Verify admin key for broadcast access."""
@@ -53,11 +66,16 @@ class BroadcastService:
         target: Dict[str, Any],
         channels: Optional[List[str]] = None,
         metadata: Optional[Dict[str, Any]] = None,
-        sender_id: Optional[str] = None
+        sender_id: Optional[str] = None,
+        wait: bool = False
     ) -> Dict[str, Any]:
         """
         Broadcast notification to multiple users.
         
+        Delivery runs as a background job that streams the matching users in
+        batches and records progress on the broadcast record; the call returns
+        once the job is started unless ``wait`` is set.
+        
         Args:
             notification_type: Type of notification
             title: Notification title
@@ -66,6 +84,7 @@ class BroadcastService:
             channels: Channels to use (defaults to ["in_app"])
             metadata: Additional notification data
             sender_id: Admin user ID (for audit)
+            wait: Wait for delivery to finish and return the final counts
             
         Target options:
             {"type": "all"} - All users
@@ -75,26 +94,8 @@ class BroadcastService:
             {"type": "user_ids", "ids": ["id1", "id2"]} - Specific users
             
         Returns:
-            Dict with broadcast results
+            Dict with broadcast id and status (final counts when ``wait`` is set)
         """
-        start_time = datetime.utcnow()
-        
-        # Build user query from target
-        user_query = self._build_user_query(target)
-        
-        # Get target users
-        users_collection = db["users"]
-        cursor = users_collection.find(user_query, {"_id": 1, "email": 1})
-        users = await cursor.to_list(length=10000)  # Cap at 10k per broadcast
-        
-        if not users:
-            return {
-                "success": True,
-                "sent_count": 0,
-                "failed_count": 0,
-                "message": "No users matched target criteria"
-            }
-        
         # Use enabled channels or default to in_app
         delivery_channels = channels or ["in_app"]
         enabled = get_enabled_channels()
@@ -106,6 +107,18 @@ class BroadcastService:
                 "error": "No enabled channels for broadcast"
             }
         
+        # Build user query from target
+        user_query = self._build_user_query(target)
+        user_count = await db["users"].count_documents(user_query)
+        
+        if not user_count:
+            return {
+                "success": True,
+                "sent_count": 0,
+                "failed_count": 0,
+                "message": "No users matched target criteria"
+            }
+        
         # Create broadcast record
         broadcast_id = await self._create_broadcast_record(
             notification_type=notification_type,
@@ -113,53 +126,143 @@ class BroadcastService:
             message=message,
             target=target,
             channels=delivery_channels,
-            user_count=len(users),
+            user_count=user_count,
             sender_id=sender_id
         )
         
-        # Send to all users
-        sent_count = 0
-        failed_count = 0
+        job = asyncio.create_task(self._run_broadcast(
+            broadcast_id=broadcast_id,
+            user_query=user_query,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            channels=delivery_channels,
+            metadata=metadata or {}
+        ))
+        self._jobs[broadcast_id] = job
+        job.add_done_callback(lambda _: self._jobs.pop(broadcast_id, None))
         
-        for user in users:
-            user_id = str(user["_id"])
-            success = await self._send_to_user(
-                user_id=user_id,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                channels=delivery_channels,
-                metadata={
-                    **(metadata or {}),
-                    "broadcast_id": broadcast_id,
-                    "email": user.get("email")
-                }
-            )
-            
-            if success:
-                sent_count += 1
-            else:
-                failed_count += 1
+        if wait:
+            return await job
         
-        # Update broadcast record
-        await self._update_broadcast_record(
-            broadcast_id=broadcast_id,
-            sent_count=sent_count,
-            failed_count=failed_count
-        )
+        return {
+            "success": True,
+            "broadcast_id": broadcast_id,
+            "status": "in_progress",
+            "user_count": user_count
+        }
+    
+    async def _run_broadcast(
+        self,
+        broadcast_id: str,
+        user_query: Dict[str, Any],
+        notification_type: str,
+        title: str,
+        message: str,
+        channels: List[str],
+        metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Stream target users in batches and deliver each batch (background job)."""
+        start_time = datetime.utcnow()
+        counts = {"processed_count": 0, "sent_count": 0, "failed_count": 0}
+        
+        try:
+            cursor = db["users"].find(user_query, {"_id": 1, "email": 1}).batch_size(self.batch_size)
+            batch = []
+            async for user in cursor:
+                batch.append(user)
+                if len(batch) >= self.batch_size:
+                    await self._deliver_batch(batch, broadcast_id, notification_type, title, message, channels, metadata, counts)
+                    batch = []
+            if batch:
+                await self._deliver_batch(batch, broadcast_id, notification_type, title, message, channels, metadata, counts)
+        except asyncio.CancelledError:
+            # Shutdown or an admin cancel: leave the record with the counts delivered so far.
+            logger.warning(f"Broadcast {broadcast_id} interrupted after {counts['processed_count']} users")
+            await self._update_broadcast_record(broadcast_id, counts, status="interrupted", error="cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {broadcast_id} failed after {counts['processed_count']} users: {e}")
+            await self._update_broadcast_record(broadcast_id, counts, status="failed", error=str(e))
+            return {"success": False, "broadcast_id": broadcast_id, "error": str(e), **counts}
+        
+        await self._update_broadcast_record(broadcast_id, counts, status="completed")
         
         duration = (datetime.utcnow() - start_time).total_seconds()
         
-        logger.info(f"Broadcast {broadcast_id} complete: {sent_count} sent, {failed_count} failed, {duration:.2f}s")
+        logger.info(f"Broadcast {broadcast_id} complete: {counts['sent_count']} sent, {counts['failed_count']} failed, {duration:.2f}s")
         
         return {
             "success": True,
             "broadcast_id": broadcast_id,
-            "sent_count": sent_count,
-            "failed_count": failed_count,
+            "sent_count": counts["sent_count"],
+            "failed_count": counts["failed_count"],
             "duration_seconds": duration
         }
     
+    async def _deliver_batch(
+        self,
+        users: List[Dict[str, Any]],
+        broadcast_id: str,
+        notification_type: str,
+        title: str,
+        message: str,
+        channels: List[str],
+        metadata: Dict[str, Any],
+        counts: Dict[str, int]
+    ):
+        """Deliver one batch on every channel, then record progress."""
+        recipients = [
+            (str(user["_id"]), {**metadata, "broadcast_id": broadcast_id, "email": user.get("email")})
+            for user in users
+        ]
+        delivered = {user_id: False for user_id, _ in recipients}
+        
+        for channel_id in channels:
+            channel = CHANNELS.get(channel_id)
+            if not channel or not channel.is_enabled():
+                continue
+            if hasattr(channel, "send_many"):
+                # Batched channel (in_app): one bulk write for the whole batch
+                results = await channel.send_many(recipients, notification_type, title, message)
+            else:
+                results = dict(await asyncio.gather(*(
+                    self._send_via_channel(channel, user_id, notification_type, title, message, user_metadata)
+                    for user_id, user_metadata in recipients
+                )))
+            for user_id, ok in results.items():
+                if ok:
+                    delivered[user_id] = True
+        
+        sent = sum(delivered.values())
+        counts["processed_count"] += len(recipients)
+        counts["sent_count"] += sent
+        counts["failed_count"] += len(recipients) - sent
+        await self._update_broadcast_record(broadcast_id, counts)
+    
+    async def _send_via_channel(
+        self,
+        channel,
+        user_id: str,
+        notification_type: str,
+        title: str,
+        message: str,
+        metadata: Dict[str, Any]
+    ) -> Tuple[str, bool]:
+        """Send to one user on a per-user channel, bounded by the shared concurrency limit."""
+        async with self._delivery_slots:
+            try:
+                return user_id, bool(await channel.send(
+                    user_id=user_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    metadata=metadata
+                ))
+            except Exception as e:
+                logger.error(f"Channel {channel.channel_id} failed for user {user_id}: {e}")
+                return user_id, False
+    
     def _build_user_query(self, target: Dict[str, Any]) -> Dict[str, Any]:
         """Build MongoDB query from target specification."""
         target_type = target.get("type", "all")
@@ -195,36 +298,6 @@ class BroadcastService:
         
         return {}
     
-    async def _send_to_user(
-        self,
-        user_id: str,
-        notification_type: str,
-        title: str,
-        message: str,
-        channels: List[str],
-        metadata: Dict[str, Any]
-    ) -> bool:
-        """Send notification to a single user via specified channels."""
-        success = False
-        
-        for channel_id in channels:
-            channel = CHANNELS.get(channel_id)
-            if channel and channel.is_enabled():
-                try:
-                    result = await channel.send(
-                        user_id=user_id,
-                        notification_type=notification_type,
-                        title=title,
-                        message=message,
-                        metadata=metadata
-                    )
-                    if result:
-                        success = True
-                except Exception as e:
-                    logger.error(f"Channel {channel_id} failed for user {user_id}: {e}")
-        
-        return success
-    
     async def _create_broadcast_record(
         self,
         notification_type: str,
@@ -245,6 +318,7 @@ class BroadcastService:
             "target": target,
             "channels": channels,
             "user_count": user_count,
+            "processed_count": 0,
             "sent_count": 0,
             "failed_count": 0,
             "sender_id": sender_id,
@@ -258,24 +332,23 @@ class BroadcastService:
     async def _update_broadcast_record(
         self,
         broadcast_id: str,
-        sent_count: int,
-        failed_count: int
+        counts: Dict[str, int],
+        status: Optional[str] = None,
+        error: Optional[str] = None
     ):
-        """Update broadcast record with results."""
+        """Record progress on the broadcast; ``status`` marks it finished."""
         from bson import ObjectId
         collection = db["notification_broadcasts"]
         
-        await collection.update_one(
-            {"_id": ObjectId(broadcast_id)},
-            {
-                "$set": {
-                    "sent_count": sent_count,
-                    "failed_count": failed_count,
-                    "status": "completed",
-                    "completed_at": datetime.utcnow()
-                }
-            }
-        )
+        now = datetime.utcnow()
+        update = {**counts, "updated_at": now}
+        if status:
+            update["status"] = status
+            update["completed_at"] = now
+        if error:
+            update["error"] = error
+        
+        await collection.update_one({"_id": ObjectId(broadcast_id)}, {"$set": update})
     
     async def get_broadcast_history(
         self,
@@ -294,6 +367,8 @@ class BroadcastService:
                 b["created_at"] = b["created_at"].isoformat()
             if "completed_at" in b:
                 b["completed_at"] = b["completed_at"].isoformat()
+            if "updated_at" in b:
+                b["updated_at"] = b["updated_at"].isoformat()
         
         return broadcasts
     
@@ -309,6 +384,8 @@ class BroadcastService:
                 broadcast["created_at"] = broadcast["created_at"].isoformat()
             if "completed_at" in broadcast:
                 broadcast["completed_at"] = broadcast["completed_at"].isoformat()
+            if "updated_at" in broadcast:
+                broadcast["updated_at"] = broadcast["updated_at"].isoformat()
         
         return broadcast
 
@@ -8,9 +8,10 @@ This is the default channel and is always enabled.
 No additional environment variables required.
 """
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from bson import ObjectId
 
 from mozaiks_infra.config.database import db
@@ -108,7 +109,79 @@ class InAppChannel(NotificationChannel):
             })
         except Exception as e:
             logger.warning(f"WebSocket delivery failed (user may be offline): {e}")
-    
+
+    async def send_many(
+        self,
+        recipients: List[Tuple[str, Dict[str, Any]]],
+        notification_type: str,
+        title: str,
+        message: str
+    ) -> Dict[str, bool]:
+        """
+        Store one notification per recipient with a single insert_many and push
+        it to the recipients that currently have a WebSocket open.
+
+        Args:
+            recipients: (user_id, metadata) pairs
+            notification_type: Type of notification
+            title: Notification title
+            message: Notification message
+
+        Returns:
+            Dict mapping user_id to whether the notification was stored
+        """
+        if not recipients:
+            return {}
+
+        created_at = datetime.utcnow()
+        docs = [
+            {
+                "user_id": user_id,
+                "type": notification_type,
+                "title": title,
+                "message": message,
+                "metadata": metadata or {},
+                "read": False,
+                "created_at": created_at,
+                "channel": self.channel_id
+            }
+            for user_id, metadata in recipients
+        ]
+        results = {user_id: True for user_id, _ in recipients}
+
+        try:
+            # Unordered: one bad document does not stop the rest of the batch
+            await db[self.collection_name].insert_many(docs, ordered=False)
+        except Exception as e:
+            write_errors = (getattr(e, "details", None) or {}).get("writeErrors")
+            if write_errors is None:
+                logger.error(f"Failed to store in-app notifications for {len(docs)} users: {e}")
+                return {user_id: False for user_id in results}
+            for error in write_errors:
+                results[docs[error["index"]]["user_id"]] = False
+            logger.error(f"Failed to store {len(write_errors)} of {len(docs)} in-app notifications: {e}")
+
+        # Only connected users get a push; everyone else sees it on next load
+        online = websocket_manager.active_connections
+        pushes = [
+            self._send_websocket(doc["user_id"], {
+                "id": str(doc.get("_id", "")),
+                "type": notification_type,
+                "title": title,
+                "message": message,
+                "metadata": doc["metadata"],
+                "read": False,
+                "created_at": created_at.isoformat()
+            })
+            for doc in docs
+            if results[doc["user_id"]] and online.get(doc["user_id"])
+        ]
+        if pushes:
+            await asyncio.gather(*pushes)
+
+        logger.info(f"In-app notification stored for {sum(results.values())} of {len(docs)} users")
+        return results
+
     async def get_user_notifications(
         self,
         user_id: str,
@@ -58,9 +58,10 @@ class NotificationsManager:
         """
         Register class-based event handlers so each is bound to 'self'
         """
-        event_bus.subscribe("subscription_updated", self.handle_subscription_update)
-        event_bus.subscribe("subscription_canceled", self.handle_subscription_cancel)
-        event_bus.subscribe("plugin_settings_updated", self.handle_plugin_settings_updated)
+        # Shared: each event creates its notifications once, not once per worker
+        event_bus.subscribe("subscription_updated", self.handle_subscription_update, shared=True)
+        event_bus.subscribe("subscription_canceled", self.handle_subscription_cancel, shared=True)
+        event_bus.subscribe("plugin_settings_updated", self.handle_plugin_settings_updated, shared=True)
         logger.info("✅ Notification event handlers registered")
 
     def _load_config(self):
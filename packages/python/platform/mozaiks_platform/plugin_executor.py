@@ -0,0 +1,246 @@
+# backend/core/plugin_executor.py
+"""
+Execution engine for plugin entry points.
+
+Async plugins run on the event loop. Sync plugins never do: they run on a
+bounded thread pool, or on a process pool when their registry entry sets
+``"execution": "process"`` (CPU-heavy plugins that would otherwise hold the
+GIL). Every call is subject to the plugin timeout, and cancelling the caller
+cancels a call that has not started yet.
+
+Each plugin gets ``max_concurrency`` execution slots (registry entry
+``"max_concurrency"``, default PLUGIN_EXEC_MAX_CONCURRENCY). Callers beyond
+that wait in a queue of at most PLUGIN_EXEC_QUEUE_LIMIT; further calls are
+rejected with ``PluginBusyError``. A sync call that times out keeps its slot
+until the thread or process actually returns, so a plugin that hangs can
+only tie up its own slots, not the whole pool.
+
+Environment (read through mozaiks_infra settings):
+    PLUGIN_EXEC_MAX_CONCURRENCY: execution slots per plugin (default 8)
+    PLUGIN_EXEC_QUEUE_LIMIT: callers allowed to wait per plugin (default 32)
+    PLUGIN_EXEC_THREAD_WORKERS: thread pool size for sync plugins (default 16)
+    PLUGIN_EXEC_PROCESS_WORKERS: process pool size for process-mode plugins (default 2)
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import importlib
+import inspect
+import logging
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("mozaiks_core.plugin_executor")
+
+MODE_THREAD = "thread"
+MODE_PROCESS = "process"
+
+
+class PluginBusyError(RuntimeError):
+    """Raised when a plugin's execution queue is full."""
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from mozaiks_infra.config.settings import settings
+        return getattr(settings, name)
+    except Exception:
+        return default
+
+
+def _call_in_process(module_name: str, func_name: str, data: Any, import_paths: tuple) -> Any:
+    # Runs in a pool worker: resolve the plugin function by name so only the payload is pickled.
+    for path in import_paths:
+        if path not in sys.path:
+            sys.path.append(path)
+    return getattr(importlib.import_module(module_name), func_name)(data)
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[..., Any], *args: Any) -> None:
+    # Worker-thread completion callback; the loop may already be closed at shutdown.
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        pass
+
+
+class _PluginLane:
+    """Concurrency slots, queue depth and timings for one plugin."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.stats: Dict[str, Any] = {
+            "calls": 0,
+            "completed": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "overrunning": 0,  # timed out but still occupying a worker
+            "exec_seconds_total": 0.0,
+            "exec_seconds_max": 0.0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+        }
+
+    def release(self) -> None:
+        self.running -= 1
+        self.slots.release()
+
+    def record(self, key: str, seconds: float) -> None:
+        self.stats[f"{key}_seconds_total"] += seconds
+        if seconds > self.stats[f"{key}_seconds_max"]:
+            self.stats[f"{key}_seconds_max"] = seconds
+
+
+class PluginExecutor:
+    def __init__(
+        self,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        queue_limit: Optional[int] = None,
+    ):
+        self.thread_workers = thread_workers or _setting("plugin_exec_thread_workers", 16)
+        self.process_workers = process_workers or _setting("plugin_exec_process_workers", 2)
+        self.max_concurrency = max_concurrency or _setting("plugin_exec_max_concurrency", 8)
+        self.queue_limit = queue_limit if queue_limit is not None else _setting("plugin_exec_queue_limit", 32)
+        self._threads: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._processes: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lanes: Dict[str, _PluginLane] = {}
+
+    def _lane(self, plugin_name: str, max_concurrency: Optional[int]) -> _PluginLane:
+        lane = self._lanes.get(plugin_name)
+        if lane is None:
+            lane = _PluginLane(max(1, int(max_concurrency or self.max_concurrency)))
+            self._lanes[plugin_name] = lane
+        return lane
+
+    def _thread_pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="plugin-exec"
+            )
+        return self._threads
+
+    def _process_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._processes is None:
+            self._processes = concurrent.futures.ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._processes
+
+    async def run(
+        self,
+        plugin_name: str,
+        func: Callable[[Any], Any],
+        data: Any,
+        timeout_seconds: float,
+        mode: str = MODE_THREAD,
+        max_concurrency: Optional[int] = None,
+    ) -> Any:
+        """
+        Run a plugin entry point with the plugin's concurrency limit and timeout.
+
+        Raises:
+            PluginBusyError if the plugin's queue is full
+            asyncio.TimeoutError if the call (including time queued) exceeds the timeout
+        """
+        lane = self._lane(plugin_name, max_concurrency)
+        lane.stats["calls"] += 1
+        if lane.slots.locked() and lane.waiting >= self.queue_limit:
+            lane.stats["rejected"] += 1
+            raise PluginBusyError(f"Plugin {plugin_name} is busy")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        queued_at = time.perf_counter()
+        lane.waiting += 1
+        try:
+            if lane.slots.locked():
+                await asyncio.wait_for(lane.slots.acquire(), timeout=timeout_seconds)
+            else:
+                await lane.slots.acquire()  # free slot: taken without yielding to the loop
+        except asyncio.TimeoutError:
+            lane.stats["timeouts"] += 1
+            raise
+        finally:
+            lane.waiting -= 1
+            lane.record("queue_wait", time.perf_counter() - queued_at)
+
+        lane.running += 1
+        started_at = time.perf_counter()
+        release_on_exit = True
+        try:
+            if inspect.iscoroutinefunction(func):
+                awaitable = func(data)
+            else:
+                future = self._submit(func, data, mode)
+                # The slot follows the worker, not the caller: freed when the call really ends.
+                release_on_exit = False
+                future.add_done_callback(lambda _: _call_soon(loop, lane.release))
+                awaitable = asyncio.wrap_future(future)
+            result = await asyncio.wait_for(awaitable, timeout=max(0.0, deadline - loop.time()))
+            lane.stats["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            lane.stats["timeouts"] += 1
+            if not release_on_exit and not future.done():
+                lane.stats["overrunning"] += 1
+                future.add_done_callback(lambda _: _call_soon(loop, self._overrun_finished, lane))
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            lane.stats["errors"] += 1
+            raise
+        finally:
+            lane.record("exec", time.perf_counter() - started_at)
+            if release_on_exit:
+                lane.release()
+
+    def _submit(self, func: Callable[[Any], Any], data: Any, mode: str) -> concurrent.futures.Future:
+        if mode == MODE_PROCESS:
+            return self._process_pool().submit(
+                _call_in_process, func.__module__, func.__name__, data, tuple(sys.path)
+            )
+        # Carry the caller's context (request ids, log context) into the worker thread.
+        return self._thread_pool().submit(contextvars.copy_context().run, func, data)
+
+    @staticmethod
+    def _overrun_finished(lane: _PluginLane) -> None:
+        lane.stats["overrunning"] -= 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        plugins = {}
+        for name, lane in self._lanes.items():
+            stats = dict(lane.stats)
+            finished = stats["completed"] + stats["errors"]
+            stats["exec_seconds_avg"] = stats["exec_seconds_total"] / finished if finished else 0.0
+            admitted = stats["calls"] - stats["rejected"]
+            stats["queue_wait_seconds_avg"] = stats["queue_wait_seconds_total"] / admitted if admitted else 0.0
+            plugins[name] = {
+                **stats,
+                "running": lane.running,
+                "queued": lane.waiting,
+                "max_concurrency": lane.max_concurrency,
+            }
+        return {
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "queue_limit": self.queue_limit,
+            "plugins": plugins,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pools; calls that have not started are cancelled."""
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = None
+        self._processes = None
+
+
+plugin_executor = PluginExecutor()
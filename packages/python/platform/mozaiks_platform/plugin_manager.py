@@ -5,10 +5,8 @@ import importlib
 import importlib.util
 import sys
 import logging
-import inspect
 import asyncio
 import time
-from functools import lru_cache
 
 from .config.config_loader import (
     get_plugin_registry,
@@ -18,6 +16,8 @@ from .config.config_loader import (
     reload_configs,
 )
 from mozaiks_infra.utils.log_sanitizer import sanitize_for_log
+from .plugin_executor import MODE_THREAD, PluginBusyError, plugin_executor
+from .plugin_registry import registry_index
 
 logger = logging.getLogger("mozaiks_core.plugin_manager")
 
@@ -68,18 +68,11 @@ class PluginManager:
         await self.load_plugins()
         return self
 
-    @lru_cache(maxsize=128)
     def get_plugin_metadata(self, plugin_name):
         """
-        Get plugin metadata from registry. Cached for performance.
+        Get plugin metadata from the in-memory registry index.
         """
-        if not self._registry_cache:
-            self._registry_cache = get_plugin_registry()
-        
-        for plugin in self._registry_cache.get("plugins", []):
-            if plugin.get("name") == plugin_name:
-                return plugin
-        return None
+        return registry_index.get(plugin_name)
 
     def update_registry(self):
         """
@@ -164,6 +157,7 @@ class PluginManager:
             
             # Update cache and clear config loader cache
             self._registry_cache = registry
+            registry_index.publish(registry)
             self._registry_last_refresh = time.time()
             reload_configs()  # Clear cached configs
             
@@ -358,7 +352,8 @@ class PluginManager:
         Execute a plugin with the given data.
         Access control is now handled by the director.py before calling this method.
         
-        Contract v1.0.0: Enforces MOZAIKS_PLUGIN_TIMEOUT_SECONDS (default 30s).
+        Contract v1.0.0: Enforces MOZAIKS_PLUGIN_TIMEOUT_SECONDS (default 30s)
+        for async and sync plugins alike.
         """
         # Get timeout from settings
         try:
@@ -373,34 +368,28 @@ class PluginManager:
         if plugin_name in self.plugins:
             try:
                 module = self.plugins[plugin_name]["module"]
-                
-                # Check if execute function exists
-                if hasattr(module, "execute"):
-                    execute_func = module.execute
-                    
-                    # Check if it's an async function
-                    if inspect.iscoroutinefunction(execute_func):
-                        # If async, await it with timeout enforcement
-                        return await asyncio.wait_for(execute_func(data), timeout=timeout_seconds)
-                    else:
-                        # If not async, just call it (no timeout for sync)
-                        return execute_func(data)
-                        
-                # Fall back to run method if execute doesn't exist
-                elif hasattr(module, "run"):
-                    run_func = module.run
-                    
-                    # Check if it's an async function
-                    if inspect.iscoroutinefunction(run_func):
-                        # If async, await it with timeout enforcement
-                        return await asyncio.wait_for(run_func(data), timeout=timeout_seconds)
-                    else:
-                        # If not async, just call it (no timeout for sync)
-                        return run_func(data)
-                        
-                else:
+                plugin_config = self.plugins[plugin_name].get("config") or {}
+
+                # Prefer execute(), fall back to run()
+                entry_point = getattr(module, "execute", None) or getattr(module, "run", None)
+                if entry_point is None:
                     return {"error": f"Plugin {plugin_name} has no execute() or run() method"}
-            
+
+                # Async entry points run on the loop; sync ones on the thread/process pool.
+                # Both are bounded by the timeout and the plugin's concurrency limit.
+                return await plugin_executor.run(
+                    plugin_name,
+                    entry_point,
+                    data,
+                    timeout_seconds,
+                    mode=plugin_config.get("execution", MODE_THREAD),
+                    max_concurrency=plugin_config.get("max_concurrency"),
+                )
+
+            except PluginBusyError:
+                logger.warning(f"Plugin {safe_plugin_name} rejected a call: execution queue is full")
+                return {"error": "Plugin is busy, try again later", "error_code": "PLUGIN_BUSY"}
+
             except asyncio.TimeoutError:
                 logger.error(f"Plugin {safe_plugin_name} execution timed out after {timeout_seconds}s")
                 return {"error": f"Plugin execution timed out after {timeout_seconds} seconds"}
@@ -453,16 +442,8 @@ class PluginManager:
             }
 
     async def check_plugin_exists(self, plugin_name):
-        """Check if a plugin exists in the registry regardless of whether it's loaded"""
-        # Reload registry if needed
-        if not self._registry_cache or (time.time() - self._registry_last_refresh > self._registry_refresh_interval):
-            self.update_registry()
-        
-        for plugin in self._registry_cache.get("plugins", []):
-            if plugin.get("name") == plugin_name and plugin.get("enabled", True):
-                return True
-        
-        return False
+        """Check if a plugin exists (and is enabled) in the registry regardless of whether it's loaded"""
+        return registry_index.is_enabled(plugin_name)
 
     async def ensure_plugin_loaded(self, plugin_name):
         """
@@ -479,12 +460,7 @@ class PluginManager:
             return False
             
         # Get plugin config from registry
-        plugin_config = None
-        for plugin in self._registry_cache.get("plugins", []):
-            if plugin.get("name") == plugin_name:
-                plugin_config = plugin
-                break
-                
+        plugin_config = registry_index.get(plugin_name)
         if not plugin_config:
             logger.warning(f"Plugin {plugin_name} config not found")
             return False
@@ -0,0 +1,192 @@
+# backend/core/plugin_registry.py
+"""
+In-memory index of plugin_registry.json.
+
+The registry is parsed once into an immutable snapshot indexed by plugin name.
+A background watcher polls the file's mtime/size and swaps in a new snapshot
+when it changes, so request handlers answer ``is_enabled`` / ``get`` from
+memory and never touch the disk. A registry that fails to parse keeps the last
+good snapshot in place.
+
+Environment:
+    MOZAIKS_PLUGIN_REGISTRY_POLL_SEC: seconds between mtime checks (default 2)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from mozaiks_infra.config.config_loader import get_config_path
+
+logger = logging.getLogger("mozaiks_core.plugin_registry")
+
+REGISTRY_FILENAME = "plugin_registry.json"
+ERROR_NOT_FOUND = "Plugin registry file not found"
+ERROR_INVALID = "Invalid JSON in plugin registry"
+
+
+def _poll_interval_from_env() -> float:
+    try:
+        return max(0.1, float(os.getenv("MOZAIKS_PLUGIN_REGISTRY_POLL_SEC", "2")))
+    except ValueError:
+        return 2.0
+
+
+class RegistrySnapshot:
+    """One parsed version of the registry. Never mutated after construction."""
+
+    __slots__ = ("plugins", "by_name", "enabled", "signature", "loaded_at", "error")
+
+    def __init__(
+        self,
+        plugins: List[Dict[str, Any]],
+        signature: Optional[Tuple[int, int]] = None,
+        error: Optional[str] = None,
+    ):
+        self.plugins: Tuple[Dict[str, Any], ...] = tuple(p for p in plugins if isinstance(p, dict))
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        for plugin in self.plugins:
+            name = plugin.get("name")
+            if name and name not in self.by_name:  # first entry wins, as the old linear scans did
+                self.by_name[name] = plugin
+        self.enabled: FrozenSet[str] = frozenset(
+            name for name, plugin in self.by_name.items() if plugin.get("enabled", True)
+        )
+        self.signature = signature  # (mtime_ns, size) of the file this was parsed from
+        self.loaded_at = time.time()
+        self.error = error  # set when no usable registry has been read yet
+
+    @classmethod
+    def from_registry(cls, registry: Any, signature: Optional[Tuple[int, int]] = None) -> "RegistrySnapshot":
+        plugins = registry.get("plugins", []) if isinstance(registry, dict) else []
+        return cls(plugins if isinstance(plugins, list) else [], signature)
+
+
+class PluginRegistryIndex:
+    """Watches plugin_registry.json and serves O(1) lookups from the current snapshot."""
+
+    def __init__(self, path: Optional[Path] = None, poll_interval_s: Optional[float] = None):
+        self._path = Path(path) if path else None
+        self._poll_interval_s = poll_interval_s if poll_interval_s is not None else _poll_interval_from_env()
+        self._snapshot: Optional[RegistrySnapshot] = None
+        self._rejected_signature: Optional[Tuple[int, int]] = None  # last unparseable version
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"reloads": 0, "parse_errors": 0, "checks": 0}
+
+    @property
+    def path(self) -> Path:
+        return self._path or get_config_path() / REGISTRY_FILENAME
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # First access before the watcher ran: one synchronous read, then memory only.
+            self.reload()
+            snapshot = self._snapshot
+        self._ensure_watching()
+        return snapshot
+
+    def is_enabled(self, plugin_name: str) -> bool:
+        return plugin_name in self.snapshot.enabled
+
+    def get(self, plugin_name: str) -> Optional[Dict[str, Any]]:
+        return self.snapshot.by_name.get(plugin_name)
+
+    def plugins(self) -> List[Dict[str, Any]]:
+        return list(self.snapshot.plugins)
+
+    def enabled_plugins(self) -> List[Dict[str, Any]]:
+        snapshot = self.snapshot
+        return [p for p in snapshot.plugins if p.get("name") in snapshot.enabled]
+
+    def publish(self, registry: Dict[str, Any]) -> None:
+        """Swap in a registry this process just wrote, without waiting for the watcher."""
+        self._snapshot = RegistrySnapshot.from_registry(registry, self._signature())
+        self._stats["reloads"] += 1
+
+    def reload(self) -> bool:
+        """Re-read the file if it changed since the current snapshot. Returns True on swap."""
+        self._stats["checks"] += 1
+        signature = self._signature()
+        current = self._snapshot
+        if current is not None and signature == current.signature:
+            return False
+        if signature is not None and signature == self._rejected_signature:
+            return False
+        if signature is None:
+            logger.warning(f"Plugin registry not found: {self.path}")
+            self._snapshot = RegistrySnapshot([], error=ERROR_NOT_FOUND)
+            return True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                registry = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self._stats["parse_errors"] += 1
+            self._rejected_signature = signature
+            if current is not None and current.error is None:
+                logger.error(f"Invalid plugin registry, keeping previous snapshot: {e}")
+                return False
+            logger.error(f"Invalid plugin registry: {e}")
+            self._snapshot = RegistrySnapshot([], signature, error=ERROR_INVALID)
+            return True
+        self._snapshot = RegistrySnapshot.from_registry(registry, signature)
+        self._stats["reloads"] += 1
+        logger.info(f"Plugin registry loaded: {len(self._snapshot.by_name)} plugins, {len(self._snapshot.enabled)} enabled")
+        return True
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ensure_watching(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # sync caller outside the event loop; the next async lookup starts it
+        self._task = loop.create_task(self._watch())
+
+    async def start(self) -> None:
+        if self._snapshot is None:
+            await asyncio.to_thread(self.reload)
+        self._ensure_watching()
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval_s)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.error(f"Plugin registry watcher error: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            "path": str(self.path),
+            "plugins": len(snapshot.by_name) if snapshot else 0,
+            "enabled": len(snapshot.enabled) if snapshot else 0,
+            "error": snapshot.error if snapshot else None,
+            "watching": self._task is not None and not self._task.done(),
+        }
+
+
+registry_index = PluginRegistryIndex()
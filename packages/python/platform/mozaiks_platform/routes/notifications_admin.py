@@ -78,6 +78,9 @@ async def send_broadcast(
     - plugin: Users with access to specific plugin
     - query: Custom MongoDB filter
     - user_ids: List of specific user IDs
+    
+    Delivery runs in the background; the response carries the broadcast_id,
+    and GET /broadcasts/{broadcast_id} reports progress (processed/sent/failed).
     """
     result = await broadcast_service.broadcast(
         notification_type=request.notification_type,
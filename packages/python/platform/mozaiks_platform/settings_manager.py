@@ -1,8 +1,14 @@
 # backend/core/settings_manager.py
+import copy
 import json
 import logging
 from fastapi import HTTPException
-from mozaiks_infra.config.database import settings_collection
+from mozaiks_infra.config.database import (
+    settings_collection,
+    get_cached_document,
+    make_cache_key,
+    update_and_invalidate,
+)
 from mozaiks_infra.config.config_loader import get_config_path
 from mozaiks_infra.event_bus import event_bus
 
@@ -29,8 +35,16 @@ class SettingsManager:
     
     async def get_user_settings(self, user_id):
         """Get all settings for a user"""
-        user_settings = await settings_collection.find_one({"user_id": user_id})
-        if not user_settings:
+        user_settings = await get_cached_document(
+            settings_collection,
+            {"user_id": user_id},
+            cache_key=make_cache_key("settings", user_id),
+            cache_missing=True,
+        )
+        if user_settings:
+            # Callers edit nested sections in place before saving; keep the cached copy intact
+            user_settings = copy.deepcopy(user_settings)
+        else:
             # Initialize empty settings if not found
             user_settings = {
                 "user_id": user_id,
@@ -68,9 +82,11 @@ class SettingsManager:
         user_settings["plugin_settings"][plugin_name] = settings_data
         
         # Save to database
-        await settings_collection.update_one(
+        await update_and_invalidate(
+            settings_collection,
             {"user_id": user_id},
             {"$set": user_settings},
+            cache_key=make_cache_key("settings", user_id),
             upsert=True
         )
         
@@ -169,9 +185,11 @@ class SettingsManager:
             user_settings["notification_preferences"] = valid_prefs
             
             # Save to database
-            result = await settings_collection.update_one(
+            result = await update_and_invalidate(
+                settings_collection,
                 {"user_id": user_id},
                 {"$set": user_settings},
+                cache_key=make_cache_key("settings", user_id),
                 upsert=True
             )
             
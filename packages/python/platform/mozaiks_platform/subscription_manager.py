@@ -30,6 +30,9 @@ from mozaiks_infra.config.database import (
     subscriptions_collection,
     subscription_history_collection,
     billing_history_collection,
+    get_cached_document,
+    make_cache_key,
+    update_and_invalidate,
 )
 from mozaiks_infra.utils.log_sanitizer import sanitize_for_log, sanitize_dict_for_log
 
@@ -89,13 +92,32 @@ class SubscriptionManager:
         """
         return self.subscription_config.get("subscription_plans", [])
 
+    async def _load_subscription(self, user_id: str):
+        """Subscription document (or None), served from the shared DB cache."""
+        return await get_cached_document(
+            subscriptions_collection,
+            {"user_id": user_id},
+            cache_key=make_cache_key("subscriptions", user_id),
+            cache_missing=True,
+        )
+
+    async def _update_subscription(self, user_id: str, update: dict, **kwargs):
+        """Apply ``update`` to the user's subscription and drop its cached copy."""
+        return await update_and_invalidate(
+            subscriptions_collection,
+            {"user_id": user_id},
+            update,
+            cache_key=make_cache_key("subscriptions", user_id),
+            **kwargs,
+        )
+
     async def get_user_subscription(self, user_id: str):
         """Retrieves the user's current subscription from MongoDB."""
         if subscriptions_collection is None:
             logger.error("❌ Database connection is unavailable!")
             raise HTTPException(status_code=500, detail="Database error")
         
-        subscription = await subscriptions_collection.find_one({"user_id": user_id})
+        subscription = await self._load_subscription(user_id)
         if not subscription:
             return {"user_id": user_id, "plan": "free", "status": "inactive"}
         
@@ -135,8 +157,8 @@ class SubscriptionManager:
             
             # Update subscription with trial end date if it's not already set
             if not subscription.get("trial_end_date"):
-                await subscriptions_collection.update_one(
-                    {"user_id": user_id},
+                await self._update_subscription(
+                    user_id,
                     {"$set": {"trial_end_date": end_date.isoformat()}}
                 )
 
@@ -176,8 +198,8 @@ class SubscriptionManager:
         if new_plan.lower() not in valid_plans:
             raise HTTPException(status_code=400, detail="Invalid subscription plan")
         now = datetime.now(timezone.utc)
-        result = await subscriptions_collection.update_one(
-            {"user_id": user_id},
+        result = await self._update_subscription(
+            user_id,
             {
                 "$set": {
                     "plan": new_plan,
@@ -212,8 +234,8 @@ class SubscriptionManager:
         now = datetime.now(timezone.utc)
         subscription = await self.get_user_subscription(user_id)
         previous_plan = subscription["plan"]
-        result = await subscriptions_collection.update_one(
-            {"user_id": user_id},
+        result = await self._update_subscription(
+            user_id,
             {
                 "$set": {
                     "plan": "free",
@@ -268,8 +290,8 @@ class SubscriptionManager:
         trial_end = now + relativedelta(days=trial_days)
         
         # Create subscription record
-        await subscriptions_collection.update_one(
-            {"user_id": user_id},
+        await self._update_subscription(
+            user_id,
             {
                 "$set": {
                     "user_id": user_id,
@@ -294,7 +316,7 @@ class SubscriptionManager:
 
     async def check_trial_status(self, user_id: str):
         """Check if a trial has expired and update status if needed"""
-        subscription = await subscriptions_collection.find_one({"user_id": user_id})
+        subscription = await self._load_subscription(user_id)
         if not subscription:
             return False
         
@@ -308,8 +330,8 @@ class SubscriptionManager:
         
         if now > trial_end:
             # Trial expired, downgrade to free
-            await subscriptions_collection.update_one(
-                {"user_id": user_id},
+            await self._update_subscription(
+                user_id,
                 {
                     "$set": {
                         "plan": "free",
@@ -387,7 +409,7 @@ class SubscriptionManager:
         await self.check_trial_status(user_id)
 
         # Get current subscription
-        subscription = await subscriptions_collection.find_one({"user_id": user_id})
+        subscription = await self._load_subscription(user_id)
 
         if not subscription:
             return "free"
@@ -432,8 +454,8 @@ class SubscriptionManager:
 
         now = datetime.now(timezone.utc)
 
-        await subscriptions_collection.update_one(
-            {"user_id": user_id},
+        await self._update_subscription(
+            user_id,
             {
                 "$set": {
                     f"plugin_tiers.{plugin_name}": tier,
@@ -501,8 +523,8 @@ class SubscriptionManager:
             update_doc["external_subscription_id"] = subscription_data["stripe_subscription_id"]
         
         # Upsert subscription
-        result = await subscriptions_collection.update_one(
-            {"user_id": user_id},
+        result = await self._update_subscription(
+            user_id,
             {"$set": update_doc},
             upsert=True
         )